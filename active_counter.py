@@ -0,0 +1,71 @@
+"""Maintained count of available food listings.
+
+`count_documents({"is_available": True})` scans the whole is_available
+index, which is far too expensive to run on every search and insert just
+to print a total. Instead we keep the count in a small counter document
+and adjust it atomically with `$inc` whenever a listing is posted or sells
+out, so reading it is a single `_id` lookup.
+
+Adjustments are made after the write they record. If the counter does not
+exist yet, the first adjustment creates it from a count that already
+includes that write, so the delta is not applied a second time.
+"""
+
+from pymongo import ReturnDocument
+
+COUNTERS_COLLECTION_NAME = "counters"
+ACTIVE_ITEMS_COUNTER_ID = "active_food_items"
+
+
+class ActiveItemCounter:
+    """Counter document tracking how many listings are available."""
+
+    def __init__(self, db, food_collection, counter_id: str = ACTIVE_ITEMS_COUNTER_ID):
+        self.counters = db[COUNTERS_COLLECTION_NAME]
+        self.food_collection = food_collection
+        self.counter_id = counter_id
+        self._seeded = False
+
+    def seed(self) -> int:
+        """Create the counter from a one-off count if it does not exist yet."""
+        existing = self.counters.find_one({"_id": self.counter_id})
+        if existing is not None:
+            self._seeded = True
+            return existing["value"]
+        return self.resync()
+
+    def resync(self) -> int:
+        """Recount available listings and overwrite the counter (admin/repair)."""
+        total = self.food_collection.count_documents({"is_available": True})
+        self.counters.update_one({"_id": self.counter_id}, {"$set": {"value": total}}, upsert=True)
+        self._seeded = True
+        return total
+
+    @property
+    def seeded(self) -> bool:
+        """True once this process has found or created the counter document."""
+        return self._seeded
+
+    def increment(self, amount: int = 1) -> int:
+        """Adjust the counter after a write and return its new value in the same round trip."""
+        # An $inc upsert on a missing counter would start it from zero
+        if not self._seeded:
+            if self.counters.find_one({"_id": self.counter_id}) is None:
+                return self.resync()
+            self._seeded = True
+        counter = self.counters.find_one_and_update(
+            {"_id": self.counter_id},
+            {"$inc": {"value": amount}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["value"]
+
+    def decrement(self, amount: int = 1) -> int:
+        return self.increment(-amount)
+
+    def value(self) -> int:
+        if not self._seeded:
+            return self.seed()
+        counter = self.counters.find_one({"_id": self.counter_id})
+        return counter["value"] if counter else 0
@@ -0,0 +1,199 @@
+"""Freshness policy and archival of stale and sold-out listings.
+
+Every listing gets an `expires_at` when it is posted (`created_at` plus a
+shelf life). Searches and bookings only match listings that have not
+expired, and the compound search indexes carry `expires_at` so the
+cut-off is applied to index keys before any document is fetched.
+
+A background `ArchiveSweeper` moves rows that can no longer be booked,
+expired ones and ones sold out for longer than a grace period, into the
+`food_items_history` collection in batches, so the live collection and
+its indexes only hold what workers can still book. Listings with portions
+on hold (see reservations.py) stay until the holds are settled. History
+rows can be dropped after a retention period by a TTL index on
+`archived_at`.
+
+Usage:
+    python archival.py --uri mongodb://localhost:27017              # one sweep
+    python archival.py --uri mongodb://localhost:27017 --dry-run    # count only
+"""
+
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from tracing import logger
+
+HISTORY_COLLECTION_NAME = "food_items_history"
+DEFAULT_SHELF_LIFE = timedelta(hours=12)
+SOLD_OUT_GRACE = timedelta(hours=1)
+ARCHIVE_BATCH_SIZE = 1000
+DUPLICATE_KEY_ERROR = 11000
+
+
+def expiry_time(created_at: datetime, shelf_life: timedelta = DEFAULT_SHELF_LIFE) -> datetime:
+    return created_at + shelf_life
+
+
+def archivable_filter(now: datetime, sold_out_grace: timedelta = SOLD_OUT_GRACE) -> dict:
+    """Listings that can no longer be booked: expired, or sold out for a while, with nothing on hold."""
+    return {
+        "$or": [
+            {"expires_at": {"$lte": now}},
+            {"is_available": False, "last_booked": {"$lte": now - sold_out_grace}}
+        ],
+        "held": {"$not": {"$gt": 0}}
+    }
+
+
+def backfill_expiry(collection, shelf_life: timedelta = DEFAULT_SHELF_LIFE) -> int:
+    """Give listings stored before expiry existed an expires_at from their created_at."""
+    updated = 0
+    batch = []
+    for document in collection.find({"expires_at": {"$exists": False}}, {"created_at": 1, "timestamp": 1}):
+        created_at = document.get("created_at") or document.get("timestamp") or datetime.now()
+        batch.append(UpdateOne({"_id": document["_id"]}, {"$set": {"expires_at": expiry_time(created_at, shelf_life)}}))
+        if len(batch) == ARCHIVE_BATCH_SIZE:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
+
+
+def ensure_history_indexes(history, retention_days: float = None) -> list:
+    """Indexes for the history collection; a TTL on archived_at when retention is set."""
+    names = [history.create_index([("hotel_name", ASCENDING), ("created_at", ASCENDING)])]
+    existing = history.index_information().get("archived_at_1", {})
+    ttl = int(retention_days * 86400) if retention_days else None
+    if existing and existing.get("expireAfterSeconds") != ttl:
+        history.drop_index("archived_at_1")
+    if ttl:
+        names.append(history.create_index("archived_at", expireAfterSeconds=ttl))
+    else:
+        names.append(history.create_index("archived_at"))
+    return names
+
+
+def archive_batch(collection, history, now: datetime = None, sold_out_grace: timedelta = SOLD_OUT_GRACE,
+                  batch_size: int = ARCHIVE_BATCH_SIZE) -> list:
+    """Copy one batch of archivable listings to history, then delete them.
+
+    Copy-then-delete is safe to repeat: a batch interrupted after the copy
+    is picked up again by the next sweep and its duplicate keys in history
+    are ignored. Returns the listings removed from the live collection,
+    which can be fewer than were copied: one booked or extended between
+    the read and the delete stays live and its history copy is dropped.
+    """
+    now = now or datetime.now()
+    condition = archivable_filter(now, sold_out_grace)
+    documents = list(collection.find(condition).limit(batch_size))
+    if not documents:
+        return []
+
+    # TTL indexes compare against UTC
+    archived_at = datetime.now(timezone.utc)
+    copies = [
+        dict(document, archived_at=archived_at, archive_reason="sold_out" if not document.get("is_available") else "expired")
+        for document in documents
+    ]
+    try:
+        history.insert_many(copies, ordered=False)
+    except BulkWriteError as e:
+        if any(error.get("code") != DUPLICATE_KEY_ERROR for error in e.details.get("writeErrors", [])):
+            raise
+
+    # Same condition again, so nothing that changed since the read is deleted
+    ids = [document["_id"] for document in documents]
+    result = collection.delete_many({"_id": {"$in": ids}, **condition})
+    if result.deleted_count == len(documents):
+        return documents
+    still_live = {document["_id"] for document in collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+    history.delete_many({"_id": {"$in": list(still_live)}})
+    return [document for document in documents if document["_id"] not in still_live]
+
+
+def archive_stale_listings(collection, history, now: datetime = None, sold_out_grace: timedelta = SOLD_OUT_GRACE,
+                           batch_size: int = ARCHIVE_BATCH_SIZE, on_archived=None) -> dict:
+    """Archive every archivable listing, batch by batch; returns counts by reason."""
+    now = now or datetime.now()
+    counts = {"expired": 0, "sold_out": 0}
+    while True:
+        documents = archive_batch(collection, history, now, sold_out_grace, batch_size)
+        if not documents:
+            return counts
+        for document in documents:
+            counts["sold_out" if not document.get("is_available") else "expired"] += 1
+        if on_archived is not None:
+            on_archived(documents)
+        if len(documents) < batch_size:
+            return counts
+
+
+class ArchiveSweeper:
+    """Runs archive_stale_listings every `interval_seconds` in a daemon thread."""
+
+    def __init__(self, collection, history, interval_seconds: float = 300, sold_out_grace: timedelta = SOLD_OUT_GRACE,
+                 batch_size: int = ARCHIVE_BATCH_SIZE, on_archived=None):
+        self.collection = collection
+        self.history = history
+        self.interval_seconds = interval_seconds
+        self.sold_out_grace = sold_out_grace
+        self.batch_size = batch_size
+        self.on_archived = on_archived
+        self.archived = {"expired": 0, "sold_out": 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sweep(self) -> dict:
+        counts = archive_stale_listings(self.collection, self.history, sold_out_grace=self.sold_out_grace,
+                                        batch_size=self.batch_size, on_archived=self.on_archived)
+        for reason, count in counts.items():
+            self.archived[reason] += count
+        return counts
+
+    def start(self):
+        def run():
+            while not self._stop.wait(self.interval_seconds):
+                try:
+                    self.sweep()
+                except PyMongoError as e:
+                    logger.warning("⚠️ Archive sweep failed: %s", e)
+
+        self._thread = threading.Thread(target=run, name="archive-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", required=True, help="MongoDB connection string")
+    parser.add_argument("--database", default="food_waste_db")
+    parser.add_argument("--collection", default="food_items")
+    parser.add_argument("--sold-out-grace-minutes", type=float, default=SOLD_OUT_GRACE.total_seconds() / 60)
+    parser.add_argument("--dry-run", action="store_true", help="Only count archivable listings")
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+    from active_counter import ActiveItemCounter
+    db = MongoClient(args.uri)[args.database]
+    collection = db[args.collection]
+    grace = timedelta(minutes=args.sold_out_grace_minutes)
+
+    if args.dry_run:
+        print(f"✓ {collection.count_documents(archivable_filter(datetime.now(), grace))} listings can be archived")
+        return
+
+    counts = archive_stale_listings(collection, db[HISTORY_COLLECTION_NAME], sold_out_grace=grace)
+    if counts["expired"]:
+        ActiveItemCounter(db, collection).resync()
+    print(f"✓ Archived {counts['expired']} expired and {counts['sold_out']} sold-out listings to {HISTORY_COLLECTION_NAME}")
+
+
+if __name__ == "__main__":
+    main()
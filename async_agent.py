@@ -0,0 +1,720 @@
+"""Asyncio mode for the food agent.
+
+The interactive modes in hotelWorker.py serve one user per process and
+spend most of each turn blocked on Gemini, MongoDB or the geolocation API.
+This module runs the same graph end-to-end on asyncio so one process can
+multiplex many hotel/worker sessions:
+
+- tools are async variants on PyMongo's AsyncMongoClient and httpx
+  (via the geolocation provider)
+- the model node awaits `llm.ainvoke`
+- the compiled graph is driven with `astream`
+- `serve()` is a small newline-delimited JSON server, one task per client;
+  on SIGINT/SIGTERM it stops accepting turns and drains the running ones
+
+The tools keep the names, arguments and docstrings of the sync ones (and
+still work synchronously), so the prompt and the model see no difference.
+
+Protocol (one JSON object per line, in both directions):
+    -> {"session_id": "abc", "user_type": "worker", "message": "food under $10"}
+    <- {"type": "reply", "session_id": "abc", "reply": "Found 3 option(s) under $10 ..."}
+Food alerts for a session are pushed on the connection that last sent a
+message for it, whenever a matching listing is posted:
+    <- {"type": "notification", "session_id": "abc", "subscription_id": "1f2e3d4c5b6a49788796a5b4c3d2e1f0", "notification": "🔔 New food ...", "listings": [...]}
+Every line the server sends has a "type": "reply" answers a turn (errors
+included), in the order the turns were sent; "notification" can come at
+any time.
+
+Usage:
+    python async_agent.py --host 0.0.0.0 --port 8765
+    python async_agent.py --metrics-file /var/lib/node_exporter/sufra.prom   # Prometheus textfile metrics
+
+One process uses one core; runner.py runs several behind a sticky router.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import signal
+import sys
+import time
+
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import StructuredTool
+from pymongo import AsyncMongoClient, ReturnDocument
+from pymongo.errors import ConnectionFailure
+
+import hotelWorker as hw
+from active_counter import ACTIVE_ITEMS_COUNTER_ID, COUNTERS_COLLECTION_NAME
+from booking import abook_listing, abook_many
+from bulk_ingest import ainsert_food_batch, summarize_results
+from food_queries import SEARCH_PROJECTION, decode_page_token, geo_search_pipeline, search_query
+from reservations import RESERVATIONS_COLLECTION_NAME, ahold_listing, ahold_many
+from sessions import SESSIONS_COLLECTION_NAME
+from subscriptions import NotificationSink
+from tracing import PrometheusExporter, configure_logging, find_exporter, llm_usage, logger, set_attributes
+
+MAX_CONCURRENT_TURNS = 200
+METRICS_WRITE_INTERVAL_SECONDS = 15
+# On shutdown, how long running turns get to finish before the process exits
+DRAIN_SECONDS = 30
+
+# Created on first use so it binds to the running event loop
+async_db = None
+
+
+def get_async_db():
+    global async_db
+    if async_db is None:
+        async_db = AsyncMongoClient(hw.MONGODB_URI, **hw.mongo_client_options())[hw.DATABASE_NAME]
+    return async_db
+
+
+def async_food_collection():
+    return get_async_db()[hw.COLLECTION_NAME]
+
+
+def async_reservations():
+    return get_async_db()[RESERVATIONS_COLLECTION_NAME]
+
+
+def async_sessions():
+    return get_async_db()[SESSIONS_COLLECTION_NAME]
+
+
+async def arecord_turn(state: hw.AgentState, messages: list):
+    """Add a completed turn to the session history without blocking the event loop."""
+    kept = await hw.context().session_store.aappend(state.get("session_id", "default"), messages, async_sessions())
+    logger.debug("   🗂️ Session history: %s messages", len(kept))
+
+
+async def adjust_active_items(amount: int) -> int:
+    active_items = hw.context().active_items
+    if not active_items.seeded:
+        # Seeding counts the listings once, the write being recorded included
+        return await asyncio.to_thread(active_items.increment, amount)
+    counter = await get_async_db()[COUNTERS_COLLECTION_NAME].find_one_and_update(
+        {"_id": ACTIVE_ITEMS_COUNTER_ID},
+        {"$inc": {"value": amount}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["value"]
+
+
+async def count_active_items() -> int:
+    listing_cache = hw.context().listing_cache
+    if listing_cache is not None:
+        return len(listing_cache)
+    active_items = hw.context().active_items
+    if not active_items.seeded:
+        return await asyncio.to_thread(active_items.value)
+    counter = await get_async_db()[COUNTERS_COLLECTION_NAME].find_one({"_id": ACTIVE_ITEMS_COUNTER_ID})
+    return counter["value"] if counter else 0
+
+
+async def record_booking(booked_item: dict):
+    ctx = hw.context()
+    if ctx.listing_cache is not None:
+        ctx.listing_cache.upsert(booked_item)
+    ctx.listings_changed()
+    if not booked_item["is_available"]:
+        await adjust_active_items(-1)
+
+
+# ============== ASYNC TOOLS ==============
+
+async def aget_location(hotel_name: str = None, state: dict = None) -> str:
+    logger.debug("🔧 [TOOL] get_location() called (async)")
+
+    try:
+        if hotel_name:
+            coordinates = hw.hotel_locations.get(hotel_name)
+            if coordinates is None:
+                coordinates = await asyncio.to_thread(hw.known_hotel_location, hotel_name)
+            if coordinates:
+                return coordinates
+
+        key, client_ip = hw.location_cache_key(state)
+        with hw.tracer.span("geolocation", "geolocation"):
+            location = await hw.location_cache.aget(key, client_ip)
+        if location is None:
+            return "error - coordinates not found"
+        logger.info("   ✓ Retrieved coordinates: %s", location.coordinates())
+        return location.coordinates()
+    except Exception as e:
+        logger.error("   ❌ Error getting location: %s", e)
+        return "error - coordinates not found"
+
+
+async def astore_food_in_db(hotel_name: str, food_name: str, price: float, quantity: int, hotel_location: str) -> str:
+    logger.debug("🔧 [TOOL] store_food_in_db() called (async)")
+    logger.debug("   📝 %s x %s ($%s) from %s at %s", quantity, food_name, price, hotel_name, hotel_location)
+
+    try:
+        document = hw.build_food_document(hotel_name, food_name, price, quantity, hotel_location, hw.LISTING_SHELF_LIFE)
+        result = await async_food_collection().insert_one(document)
+        ctx = hw.context()
+        if ctx.listing_cache is not None:
+            ctx.listing_cache.upsert(document)
+        ctx.listings_changed()
+        hw.hotel_locations[hotel_name] = hotel_location
+        total_items = await adjust_active_items(1)
+        hw.notify_subscribers([document])
+
+        logger.info("   ✓ Stored document %s (%s active items)", result.inserted_id, total_items)
+        return f"✓ Stored: {food_name} (${price}) from {hotel_name} at location {hotel_location}"
+
+    except ValueError as e:
+        logger.error("   ❌ Error parsing location: %s", e)
+        return f"❌ Error: Invalid location format. Please use 'latitude,longitude'"
+    except Exception as e:
+        logger.error("   ❌ Database error: %s", e)
+        return f"❌ Error storing food in database: {str(e)}"
+
+
+async def afetch_candidates(max_price: float, item_name: str = None, lat: float = None, lon: float = None,
+                            max_distance_meters: float = None, after: tuple = None, limit: int = None) -> list:
+    """Async variant of hotelWorker.fetch_candidates."""
+    listing_cache = hw.context().listing_cache
+    if max_distance_meters is not None:
+        if listing_cache is not None and hw.USE_LOCAL_GEO_SEARCH:
+            return listing_cache.search(max_price, item_name, lat, lon, max_distance_meters, after, limit)
+        cursor = await async_food_collection().aggregate(
+            geo_search_pipeline(lat, lon, max_distance_meters, max_price, item_name, after, limit)
+        )
+        return await cursor.to_list(limit)
+    if listing_cache is not None:
+        return listing_cache.search(max_price, item_name, after=after, limit=limit)
+    cursor = async_food_collection().find(search_query(max_price, item_name, after), SEARCH_PROJECTION) \
+        .sort([("price", 1), ("_id", 1)]).limit(limit)
+    return await cursor.to_list(limit)
+
+
+async def aget_available_food(max_price: float, item_name: str = None, max_distance_km: float = None, user_location: str = None,
+                              page_token: str = None, limit: int = None, sort_by: str = None) -> str:
+    logger.debug("🔧 [TOOL] get_available_food() called (async)")
+    logger.debug("   📝 Max Price: $%s, Item: %s, Distance: %s km", max_price, item_name or 'Any', max_distance_km or 'Any')
+
+    try:
+        limit = hw.search_page_size(limit)
+        token = decode_page_token(page_token) if page_token else None
+        order, ranked = hw.search_order(sort_by, bool(max_distance_km and user_location), token)
+        after = token.after if token and not ranked else None
+        fetch = hw.RANKING_MAX_CANDIDATES if ranked else limit + 1
+        lat = lon = max_distance_meters = None
+        ctx = hw.context()
+        if ctx.listing_cache is not None:
+            await asyncio.to_thread(ctx.listing_cache.refresh_if_stale)
+
+        if max_distance_km and user_location:
+            try:
+                lat, lon = map(float, user_location.split(','))
+            except ValueError as e:
+                logger.error("   ❌ Error parsing user location: %s", e)
+                return "❌ Error: Invalid location format. Please try again."
+            max_distance_meters = max_distance_km * 1000
+
+        affordable_foods = None
+        if ctx.search_cache is not None and token is None:
+            async def aload(query):
+                return await afetch_candidates(query.max_price, item_name, query.lat, query.lon, query.radius_m, None, query.limit)
+            affordable_foods = await ctx.search_cache.asearch(max_price, item_name, lat, lon, max_distance_meters, fetch, aload)
+            set_attributes(search_cache_hits=int(affordable_foods is not None))
+        if affordable_foods is None:
+            affordable_foods = await afetch_candidates(max_price, item_name, lat, lon, max_distance_meters, after, fetch)
+
+        logger.info("   ✓ Found %s items", len(affordable_foods))
+        ranked_at = scale = None
+        if ranked:
+            affordable_foods, ranked_at, scale = hw.rank_search_results(affordable_foods, order, token, limit + 1, max_distance_meters)
+        result, shown = hw.format_food_results(affordable_foods, max_price, item_name, max_distance_km, user_location, limit, token is None,
+                                               order, ranked_at, scale)
+        set_attributes(results=shown, sort_by=order, first_page=token is None)
+
+        if not shown and token is None and await count_active_items() == 0:
+            logger.warning("   ⚠️ Database is empty")
+            return "Sorry, no food available right now. Please check back later."
+
+        return result
+
+    except ValueError as e:
+        logger.error("   ❌ Bad search arguments: %s", e)
+        return f"❌ Error: {e}." + (" Start the search again without a page_token." if page_token else "")
+    except Exception as e:
+        logger.error("   ❌ Database query error: %s", e)
+        return f"❌ Error searching for food: {str(e)}"
+
+
+async def abook_food(hotel_name: str, food_name: str, listing_id: str = None, state: dict = None) -> str:
+    logger.debug("🔧 [TOOL] book_food() called (async)")
+    logger.debug("   📝 %s from %s", food_name, hotel_name)
+
+    try:
+        query = hw.listing_filter(hotel_name, food_name, listing_id)
+        reservation = None
+        if hw.USE_RESERVATIONS:
+            held = await ahold_listing(async_food_collection(), async_reservations(), query, ttl=hw.RESERVATION_HOLD_TTL,
+                                       session_id=hw.session_of(state))
+            reservation, booked_item = held or (None, None)
+        else:
+            booked_item = await abook_listing(async_food_collection(), query)
+
+        if not booked_item:
+            logger.error("   ❌ Food item not found or not available")
+            return f"❌ Sorry, '{food_name}' from {hotel_name} is not available. It may have been booked already."
+
+        await record_booking(booked_item)
+        logger.info("   ✓ Booked, new quantity: %s", booked_item['quantity'])
+        return hw.booking_reply(booked_item["hotel_name"], booked_item["food_name"], booked_item, reservation)
+
+    except Exception as e:
+        logger.error("   ❌ Database error: %s", e)
+        return f"❌ Error booking food: {str(e)}"
+
+
+async def abook_many_tool(hotel_names: list[str], food_names: list[str], quantities: list[int] = None,
+                          listing_ids: list[str] = None, state: dict = None) -> str:
+    logger.debug("🔧 [TOOL] book_many() called (async)")
+
+    if len(hotel_names) != len(food_names):
+        return "❌ Error: Each booking needs both a hotel name and a food name."
+    if not quantities:
+        quantities = [1] * len(food_names)
+    elif len(quantities) != len(food_names):
+        return "❌ Error: Please give one quantity per booking."
+    if not listing_ids:
+        listing_ids = [None] * len(food_names)
+    elif len(listing_ids) != len(food_names):
+        return "❌ Error: Please give one listing id per booking."
+
+    try:
+        bookings = [
+            (hw.listing_filter(hotel, food, listing_id), int(quantity))
+            for hotel, food, quantity, listing_id in zip(hotel_names, food_names, quantities, listing_ids)
+        ]
+        valid = [(query, quantity) for query, quantity in bookings if quantity >= 1]
+        if hw.USE_RESERVATIONS:
+            results = await ahold_many(async_food_collection(), async_reservations(), valid, ttl=hw.RESERVATION_HOLD_TTL,
+                                       session_id=hw.session_of(state))
+        else:
+            results = [(query, quantity, (None, booked_item) if booked_item else None)
+                       for query, quantity, booked_item in await abook_many(async_food_collection(), valid)]
+
+        lines = []
+        booked_count = 0
+        results = iter(results)
+        for hotel, food, (_, quantity) in zip(hotel_names, food_names, bookings):
+            if quantity < 1:
+                lines.append(hw.quantity_problem_line(hotel, food, quantity))
+                continue
+            _, _, booked = next(results)
+            if booked:
+                booked_count += 1
+                await record_booking(booked[1])
+            lines.append(hw.booked_line(hotel, food, quantity, booked))
+
+        logger.info("   ✓ Booked %s/%s items", booked_count, len(bookings))
+        return f"Booked {booked_count} of {len(bookings)} requested items:\n" + "\n".join(lines)
+
+    except Exception as e:
+        logger.error("   ❌ Database error: %s", e)
+        return f"❌ Error booking food: {str(e)}"
+
+
+async def aconfirm_pickup(hotel_name: str, reservation_codes: list[str], state: dict = None) -> str:
+    # Pickups are rare next to searches and bookings; the sync tool is enough
+    return await asyncio.to_thread(hw.confirm_pickup.func, hotel_name, reservation_codes, state)
+
+
+async def acancel_reservation(reservation_code: str, state: dict = None) -> str:
+    return await asyncio.to_thread(hw.cancel_reservation.func, reservation_code, state)
+
+
+async def asearch_near_me(max_price: float, item_name: str = None, max_distance_km: float = None, page_token: str = None, limit: int = None,
+                          sort_by: str = None, state: dict = None) -> str:
+    logger.debug("🔧 [TOOL] search_near_me() called (async)")
+
+    user_location = None
+    if max_distance_km:
+        user_location = await aget_location(state=state)
+        if user_location.startswith("error"):
+            return "❌ Could not determine your location. Try searching without a distance."
+    return await aget_available_food(max_price, item_name, max_distance_km, user_location, page_token, limit, sort_by)
+
+
+async def apost_surplus_here(hotel_name: str, food_name: str, price: float, quantity: int, state: dict = None) -> str:
+    logger.debug("🔧 [TOOL] post_surplus_here() called (async)")
+
+    hotel_location = await aget_location(hotel_name, state)
+    if hotel_location.startswith("error"):
+        return "❌ Could not determine the hotel's location. Please try again."
+    return await astore_food_in_db(hotel_name, food_name, price, quantity, hotel_location)
+
+
+
+async def astore_food_batch(hotel_name: str, food_names: list, prices: list, quantities: list, state: dict = None) -> str:
+    logger.debug("🔧 [TOOL] store_food_batch() called (async)")
+    logger.debug("   📝 %s items from %s", len(food_names), hotel_name)
+
+    if not (len(food_names) == len(prices) == len(quantities)):
+        return "❌ Error: Please give one price and one quantity per food item."
+
+    hotel_location = await aget_location(hotel_name, state)
+    if hotel_location.startswith("error"):
+        return "❌ Could not determine the hotel's location. Please try again."
+
+    items = [
+        {"food_name": food_name, "price": price, "quantity": quantity}
+        for food_name, price, quantity in zip(food_names, prices, quantities)
+    ]
+    try:
+        results, stored = await ainsert_food_batch(async_food_collection(), hotel_name, items, hotel_location, shelf_life=hw.LISTING_SHELF_LIFE)
+        ctx = hw.context()
+        if ctx.listing_cache is not None:
+            for document in stored:
+                ctx.listing_cache.upsert(document)
+        hw.hotel_locations[hotel_name] = hotel_location
+        if stored:
+            ctx.listings_changed()
+            await adjust_active_items(len(stored))
+            hw.notify_subscribers(stored)
+
+        logger.info("   ✓ Stored %s/%s items", len(stored), len(results))
+        return f"{summarize_results(results)}\nHotel: {hotel_name} at location {hotel_location}"
+
+    except ValueError as e:
+        logger.error("   ❌ Invalid batch: %s", e)
+        return f"❌ Error: {e}"
+    except Exception as e:
+        logger.error("   ❌ Database error: %s", e)
+        return f"❌ Error storing food in database: {str(e)}"
+
+async def asubscribe_to_food(max_price: float, item_name: str = None, max_distance_km: float = None, state: dict = None) -> str:
+    logger.debug("🔧 [TOOL] subscribe_to_food() called (async)")
+
+    user_location = None
+    if max_distance_km:
+        user_location = await aget_location(state=state)
+        if user_location.startswith("error"):
+            return "❌ Could not determine your location. Try an alert without a distance."
+    return hw.add_subscription(state, max_price, item_name, max_distance_km, user_location)
+
+
+async def aunsubscribe_from_food(subscription_id: str = None, state: dict = None) -> str:
+    # In memory only, so nothing to await
+    return hw.unsubscribe_from_food.func(subscription_id, state)
+
+
+def async_variant(sync_tool, coroutine):
+    """Same tool as the model sees it, with an async implementation attached."""
+    return StructuredTool.from_function(
+        func=sync_tool.func,
+        coroutine=coroutine,
+        name=sync_tool.name,
+        description=sync_tool.description,
+        args_schema=sync_tool.args_schema
+    )
+
+
+async_tools = [hw.tracer.instrument_tool(async_tool) for async_tool in (
+    async_variant(hw.get_location, aget_location),
+    async_variant(hw.store_food_in_db, astore_food_in_db),
+    async_variant(hw.get_available_food, aget_available_food),
+    async_variant(hw.book_food, abook_food),
+    async_variant(hw.book_many, abook_many_tool),
+    async_variant(hw.search_near_me, asearch_near_me),
+    async_variant(hw.post_surplus_here, apost_surplus_here),
+    async_variant(hw.store_food_batch, astore_food_batch),
+    async_variant(hw.confirm_pickup, aconfirm_pickup),
+    async_variant(hw.cancel_reservation, acancel_reservation),
+    async_variant(hw.subscribe_to_food, asubscribe_to_food),
+    async_variant(hw.unsubscribe_from_food, aunsubscribe_from_food),
+)]
+
+
+# ============== ASYNC GRAPH ==============
+
+async def amodel_call(state: hw.AgentState) -> hw.AgentState:
+    history = await hw.context().session_store.aget_history(state.get("session_id", "default"), async_sessions())
+    all_messages = hw.build_model_messages(state, history)
+    response = hw.cached_response(all_messages)
+    if response is not None:
+        return await afinish_model_turn(state, response)
+    started = time.perf_counter()
+    with hw.tracer.span("llm", "llm", messages=len(all_messages)) as span:
+        response = await hw.get_llm(state.get("user_type")).ainvoke(all_messages)
+        span.set(tool_calls=len(response.tool_calls), **llm_usage(response))
+    hw.router_metrics.record_llm_call(time.perf_counter() - started)
+    logger.debug("   📥 Received response from LLM")
+    hw.cache_response(all_messages, response)
+    return await afinish_model_turn(state, response)
+
+
+async def afinish_model_turn(state: hw.AgentState, response) -> hw.AgentState:
+    """Async variant of hotelWorker.finish_model_turn."""
+    turn = hw.completed_turn(state, response)
+    if turn is not None:
+        await arecord_turn(state, turn)
+    return {"messages": [response]}
+
+
+async def arun_intent(intent, state: hw.AgentState):
+    """Async variant of hotelWorker.run_intent."""
+    args = intent.args
+
+    if intent.action == "search":
+        return await asearch_near_me(args["max_price"], args["item_name"], args["max_distance_km"], state=state)
+
+    if intent.action == "book":
+        if args["quantity"] == 1:
+            return hw.booked_reply(await abook_food(args["hotel_name"], args["food_name"], state=state))
+        return hw.booked_reply(await abook_many_tool([args["hotel_name"]], [args["food_name"]], [args["quantity"]], state=state))
+
+    if intent.action == "post":
+        return await apost_surplus_here(state=state, **args)
+
+    return None
+
+
+async def afast_path(state: hw.AgentState) -> hw.AgentState:
+    logger.debug("\n⚡ [ROUTER] Checking for a structured request...")
+    intent = hw.parse_fast_path(state)
+    if intent is None:
+        hw.router_metrics.record_fallback()
+        return {}
+
+    started = time.perf_counter()
+    reply = await arun_intent(intent, state)
+    if reply is None:
+        return hw.fast_path_missed(intent)
+    await arecord_turn(state, hw.fast_path_turn(state, intent, reply))
+    return hw.fast_path_served(intent, reply, started)
+
+
+_async_app = None
+
+
+def get_async_app():
+    """The compiled async graph, built on first use."""
+    global _async_app
+    if _async_app is None:
+        _async_app = hw.build_graph(amodel_call, async_tools, router_node=afast_path)
+    return _async_app
+
+
+async def achat(session_id: str, user_type: str, message: str, client_ip: str = None) -> str:
+    """Run one user turn through the async graph and return the final reply."""
+    inputs = {
+        "messages": [HumanMessage(content=message)],
+        "user_type": user_type,
+        "session_id": session_id
+    }
+    if client_ip:
+        inputs["client_ip"] = client_ip
+    final_state = None
+    async for state in get_async_app().astream(inputs, stream_mode="values"):
+        final_state = state
+    return final_state["messages"][-1].content
+
+
+async def prewarm():
+    """Build the graph, create the LLM client and open the async MongoDB pool before the first turn."""
+    get_async_app()
+    for user_type in ("hotel", "worker"):
+        hw.get_llm(user_type)
+    await get_async_db().command("ping")
+
+
+# ============== SERVER ==============
+
+class ShuttingDown(Exception):
+    """A turn arrived after the server started draining."""
+
+
+class TurnGate:
+    """Admits turns up to a concurrency limit and, on shutdown, waits for the admitted ones.
+
+    Once `drain()` starts, new turns are refused, so a turn's tool calls
+    (a booking, a post) either run to completion or never start.
+    """
+
+    def __init__(self, max_concurrent_turns: int):
+        self._slots = asyncio.Semaphore(max_concurrent_turns)
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.closing = False
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @contextlib.asynccontextmanager
+    async def turn(self):
+        if self.closing:
+            raise ShuttingDown()
+        self._in_flight += 1
+        self._idle.clear()
+        try:
+            async with self._slots:
+                yield
+        finally:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> int:
+        """Refuse new turns and wait up to `timeout` seconds for the running ones; returns how many are still running."""
+        self.closing = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._in_flight
+
+
+class ConnectionSink(NotificationSink):
+    """Pushes food alerts to the connection each session last spoke on."""
+
+    def __init__(self):
+        self._writers = {}  # session id -> StreamWriter
+
+    def register(self, session_id: str, writer):
+        self._writers[session_id] = writer
+
+    def forget(self, writer):
+        for session_id in [s for s, w in self._writers.items() if w is writer]:
+            del self._writers[session_id]
+
+    async def send(self, notification):
+        writer = self._writers.get(notification.subscription.session_id)
+        if writer is None or writer.is_closing():
+            return
+        writer.write((json.dumps({"type": "notification", **notification.to_json()}) + "\n").encode())
+        await writer.drain()
+
+
+async def handle_client(reader, writer, turns: TurnGate, connections: ConnectionSink, trust_client_ip: bool = False):
+    """Serve one connection: each line is one turn, answered in order.
+
+    With `trust_client_ip` (behind runner.py's router) a request's
+    "client_ip" is the client's address; otherwise the peer's is used.
+    """
+    peer = writer.get_extra_info("peername")
+    logger.info("🔌 Client connected: %s", peer)
+    try:
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+                connections.register(request["session_id"], writer)
+                client_ip = (request.get("client_ip") if trust_client_ip else None) or (peer[0] if peer else None)
+                async with turns.turn():
+                    reply = await achat(request["session_id"], request.get("user_type", "worker"), request["message"],
+                                        client_ip=client_ip)
+                response = {"session_id": request["session_id"], "reply": reply}
+            except ShuttingDown:
+                response = {"session_id": request["session_id"], "error": "Server is shutting down, please send this again",
+                            "retry": True}
+            except (ValueError, KeyError) as e:
+                response = {"error": f"Bad request: {e}"}
+            except Exception as e:
+                response = {"error": str(e)}
+            writer.write((json.dumps({"type": "reply", **response}) + "\n").encode())
+            await writer.drain()
+    finally:
+        connections.forget(writer)
+        writer.close()
+        logger.info("🔌 Client disconnected: %s", peer)
+
+
+async def write_metrics(path: str, interval_seconds: float = METRICS_WRITE_INTERVAL_SECONDS):
+    """Rewrite the Prometheus metrics file every `interval_seconds`."""
+    exporter = find_exporter(hw.tracer, PrometheusExporter)
+    if exporter is None:
+        exporter = PrometheusExporter()
+        hw.tracer.exporters.append(exporter)
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(exporter.write, path)
+        except OSError as e:
+            logger.warning("⚠️ Could not write metrics to %s: %s", path, e)
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, max_concurrent_turns: int = MAX_CONCURRENT_TURNS,
+                metrics_file: str = None, trust_client_ip: bool = False, drain_seconds: float = DRAIN_SECONDS,
+                stop: asyncio.Event = None, on_ready=None):
+    """Serve until `stop` is set (by default on SIGINT or SIGTERM), then drain.
+
+    Draining closes the listening socket, refuses new turns and waits up to
+    `drain_seconds` for the running ones before the background work stops
+    and MongoDB is disconnected. `on_ready()` is called once the graph,
+    the LLM client and the connection pools are warm and the port is open.
+    """
+    ctx = await asyncio.to_thread(hw.startup)
+    await prewarm()
+    turns = TurnGate(max_concurrent_turns)
+    connections = ConnectionSink()
+    ctx.notifier.sinks.append(connections)
+    loop = asyncio.get_running_loop()
+    ctx.notifier.start(loop)
+    if stop is None:
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError):  # no signal handlers on Windows event loops
+                loop.add_signal_handler(signum, stop.set)
+    clients = {}  # StreamWriter -> the task serving it
+
+    async def client_connected(reader, writer):
+        clients[writer] = asyncio.current_task()
+        try:
+            await handle_client(reader, writer, turns, connections, trust_client_ip)
+        finally:
+            del clients[writer]
+
+    server = await asyncio.start_server(client_connected, host, port)
+    print(f"✓ Async agent listening on {host}:{port} (max {max_concurrent_turns} concurrent turns)")
+    metrics_task = asyncio.create_task(write_metrics(metrics_file)) if metrics_file else None
+    if on_ready is not None:
+        on_ready()
+    try:
+        await stop.wait()
+        server.close()
+        logger.info("⏳ Draining %s running turn(s)...", turns.in_flight)
+        still_running = await turns.drain(drain_seconds)
+        if still_running:
+            logger.warning("⚠️ Stopping with %s turn(s) still running after %gs", still_running, drain_seconds)
+        # Hang up on idle connections ourselves rather than leave their tasks to be cancelled
+        tasks = list(clients.values())
+        for writer in list(clients):
+            writer.close()
+        if tasks:
+            await asyncio.wait(tasks, timeout=1)
+    finally:
+        if metrics_task is not None:
+            metrics_task.cancel()
+        hw.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-concurrent-turns", type=int, default=MAX_CONCURRENT_TURNS)
+    parser.add_argument("--metrics-file", default=None, help="Write Prometheus text format metrics to this file")
+    parser.add_argument("--drain-seconds", type=float, default=DRAIN_SECONDS, help="On shutdown, wait this long for running turns")
+    parser.add_argument("--log-level", default=None, help="DEBUG, INFO or WARNING (default: hotelWorker.LOG_LEVEL)")
+    args = parser.parse_args()
+    if args.log_level:
+        configure_logging(args.log_level)
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_concurrent_turns, args.metrics_file, drain_seconds=args.drain_seconds))
+    except ConnectionFailure as e:
+        logger.error("❌ Failed to connect to MongoDB: %s", e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Admin view: the old show_database vs. server-side reports and a streaming export.
+
+For each size, fills a collection with listings (some partly booked) and
+reports time and peak Python memory (tracemalloc) for:
+- old view: list(find()) over the whole collection, formatted a dozen
+  lines per listing, as show_database did
+- reports: reports.format_summary (per-hotel counts, meals saved, sell-
+  through, price histogram) plus the first page of list_listings
+- export: reports.export_listings to NDJSON, vs. json.dumps of the whole
+  list(find())
+
+mongomock evaluates aggregations in Python, so on it the reports still
+read every row; against a real server (--uri) only the aggregates cross
+the wire. Memory is the honest comparison on both.
+
+Usage:
+    python benchmarks/admin_reports.py
+    python benchmarks/admin_reports.py --sizes 100000,1000000 --uri mongodb://localhost:27017
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_ingest import build_food_document
+from reports import export_listings, format_summary, list_listings
+
+DISHES = ["Paneer Tikka", "Chicken Biryani", "Veg Noodles", "Margherita Pizza", "Lentil Soup", "Garlic Naan"]
+
+
+class NullWriter:
+    def write(self, text: str):
+        return len(text)
+
+
+def get_db(uri: str):
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri)["food_waste_benchmarks"]
+    import mongomock
+    return mongomock.MongoClient()["food_waste_benchmarks"]
+
+
+def seed(collection, size: int):
+    rng = random.Random(size)
+    collection.drop()
+    now = datetime.now()
+    for start in range(0, size, 10000):
+        documents = []
+        for i in range(start, min(start + 10000, size)):
+            document = build_food_document(f"Hotel {i % 300}", rng.choice(DISHES), round(rng.uniform(1, 40), 2), rng.randint(1, 9),
+                                           f"{25.2 + rng.uniform(-0.3, 0.3):.5f},{55.3 + rng.uniform(-0.3, 0.3):.5f}")
+            document["created_at"] = now - timedelta(hours=rng.uniform(0, 24 * 7))
+            sold = rng.randint(0, document["quantity"])
+            document["quantity"] -= sold
+            document["is_available"] = document["quantity"] > 0
+            documents.append(document)
+        collection.insert_many(documents)
+    collection.create_index([("created_at", 1)])
+
+
+def old_view(collection) -> str:
+    out = io.StringIO()
+    for i, food in enumerate(list(collection.find()), 1):
+        out.write(f"\n{i}. {food['food_name']}\n   Hotel: {food['hotel_name']}\n   Price: ${food['price']}\n"
+                  f"   Quantity: {food['quantity']}\n   Location: {food['hotel_location']}\n   Available: {food['is_available']}\n"
+                  f"   Status: {food.get('status', 'active')}\n   Added: {food['timestamp']}\n   MongoDB ID: {food['_id']}\n")
+    return out.getvalue()
+
+
+def new_view(collection, history) -> str:
+    summary = format_summary(collection, history)
+    listings, _ = list_listings(collection)
+    return summary + "".join(str(listing) for listing in listings)
+
+
+def old_export(collection):
+    NullWriter().write(json.dumps(list(collection.find()), default=str))
+
+
+def measure(function) -> tuple:
+    """(seconds, peak MB); timed and traced in separate runs, since tracing slows mongomock down many times over."""
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="5000,20000", help="Comma-separated listing counts")
+    parser.add_argument("--uri", default=None, help="MongoDB URI (defaults to an in-process mongomock)")
+    args = parser.parse_args()
+
+    db = get_db(args.uri)
+    collection, history = db["admin_reports"], db["admin_reports_history"]
+    history.drop()
+    print(f"📊 Admin view and export: seconds / peak MB of Python memory")
+    print(f"   {'listings':>9} {'old view':>16} {'reports':>16} {'old export':>16} {'stream export':>16}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        seed(collection, size)
+        results = [
+            measure(lambda: old_view(collection)),
+            measure(lambda: new_view(collection, history)),
+            measure(lambda: old_export(collection)),
+            measure(lambda: export_listings(collection, NullWriter()))
+        ]
+        print(f"   {size:>9} " + " ".join(f"{f'{seconds:.2f}s / {mb:.0f} MB':>16}" for seconds, mb in results), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Load test for the async agent with a fake LLM and a local Mongo stand-in.
+
+Runs many concurrent hotel/worker sessions through async_agent.achat and,
+for comparison, the same turns one after another through the sync graph
+the interactive modes use. The fake LLM answers each user message with
+one tool call and then a short reply, sleeping --llm-latency seconds per
+call to stand in for the Gemini round-trip.
+
+MongoDB is replaced by an in-process mongomock database (with a thin
+async wrapper for the async tools), so no server or API keys are needed.
+
+Usage:
+    python benchmarks/async_load.py --sessions 200 --turns 3 --llm-latency 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongomock
+import pymongo
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+MOCK_CLIENT = mongomock.MongoClient()
+pymongo.MongoClient = lambda *args, **kwargs: MOCK_CLIENT
+
+
+class FakeLLM:
+    """Deterministic stand-in for the Gemini client: one tool call, then a reply."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def _respond(self, messages):
+        self.calls += 1
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"Here is what I found: {str(last.content)[:80]}")
+        text = last.content
+        if text.startswith("post"):
+            _, food, price = text.split()
+            args = {"hotel_name": "Load Hotel", "food_name": food, "price": float(price), "quantity": 5,
+                    "hotel_location": f"{25.2 + random.uniform(-0.05, 0.05)},{55.3 + random.uniform(-0.05, 0.05)}"}
+            name = "store_food_in_db"
+        elif text.startswith("book"):
+            args = {"hotel_name": "Load Hotel", "food_name": text.split()[1]}
+            name = "book_food"
+        else:
+            args = {"max_price": float(text.split()[-1]), "max_distance_km": 5, "user_location": "25.2,55.3"}
+            name = "get_available_food"
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{self.calls}"}])
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.cursor)
+
+
+class AsyncCollection:
+    """Async facade over a mongomock collection, shaped like AsyncMongoClient's."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+    async def aggregate(self, pipeline):
+        return AsyncCursor(self.collection.aggregate(pipeline))
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class AsyncDatabase:
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.db[name])
+
+
+def script_for(session_number: int, turns: int) -> tuple:
+    foods = ["pasta", "biryani", "falafel", "noodles", "curry"]
+    if session_number % 4 == 0:
+        user_type = "hotel"
+        messages = [f"post {foods[(session_number + t) % len(foods)]} {4 + t}" for t in range(turns)]
+    else:
+        user_type = "worker"
+        messages = [f"food under {8 + t}" if t % 2 == 0 else f"book {foods[session_number % len(foods)]}" for t in range(turns)]
+    return user_type, messages
+
+
+def summarize(label: str, latencies: list, elapsed: float):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    print(f"   {label:<6} turns={len(latencies):<6} wall={elapsed:8.2f}s "
+          f"throughput={len(latencies) / elapsed:8.1f} turns/s "
+          f"p50={statistics.median(latencies) * 1000:7.1f}ms p95={p95 * 1000:7.1f}ms")
+
+
+async def run_async(async_agent, sessions: int, turns: int):
+    latencies = []
+
+    async def session(number: int):
+        user_type, messages = script_for(number, turns)
+        for message in messages:
+            started = time.perf_counter()
+            await async_agent.achat(f"async-{number}", user_type, message)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(n) for n in range(sessions)))
+    return latencies, time.perf_counter() - started
+
+
+def run_sync(hw, sessions: int, turns: int):
+    latencies = []
+    started = time.perf_counter()
+    for number in range(sessions):
+        user_type, messages = script_for(number, turns)
+        for message in messages:
+            turn_started = time.perf_counter()
+            hw.app.invoke({"messages": [HumanMessage(content=message)], "user_type": user_type, "session_id": f"sync-{number}"})
+            latencies.append(time.perf_counter() - turn_started)
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake LLM call")
+    parser.add_argument("--sync-sessions", type=int, default=10, help="Sessions for the sequential sync baseline (0 to skip)")
+    args = parser.parse_args()
+
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        import hotelWorker as hw
+        import async_agent
+    hw.llm = FakeLLM(args.llm_latency)
+    async_agent.async_db = AsyncDatabase(MOCK_CLIENT[hw.DATABASE_NAME])
+
+    print(f"📊 Async load test: {args.sessions} sessions x {args.turns} turns, fake LLM latency {args.llm_latency}s")
+    with contextlib.redirect_stdout(io.StringIO()):
+        async_latencies, async_elapsed = asyncio.run(run_async(async_agent, args.sessions, args.turns))
+        if args.sync_sessions:
+            sync_latencies, sync_elapsed = run_sync(hw, args.sync_sessions, args.turns)
+    summarize("async", async_latencies, async_elapsed)
+    if args.sync_sessions:
+        summarize("sync", sync_latencies, sync_elapsed)
+    print(f"   LLM calls: {hw.llm.calls}, listings stored: {MOCK_CLIENT[hw.DATABASE_NAME][hw.COLLECTION_NAME].count_documents({})}")
+
+
+if __name__ == "__main__":
+    main()
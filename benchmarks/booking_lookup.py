@@ -0,0 +1,151 @@
+"""Booking lookup: anchored case-insensitive $regex vs. listing id vs. normalized names.
+
+Seeds a large collection of listings (many hotels, many dishes each, some
+names with regex metacharacters), then times finding the listing to book
+three ways:
+- regex: the old filter, `^name$` with the "i" option on hotel_name and
+  food_name, which no index can serve
+- listing id: the handle from the search results, decoded to an _id lookup
+- names: exact match on hotel_name_norm and food_name_norm, served by
+  the {hotel_name_norm, food_name_norm, expires_at} index
+
+Only the lookup is timed (find_one with the booking filter), so the
+numbers compare filters, not the write. Against a server (--uri) it also
+reports the documents each lookup examined, from explain; mongomock
+scans the collection for every filter, so there only that column's
+absence and the correctness check below mean anything. It then checks which listing each
+filter finds for names like "Pasta (veg)" or "C++ Cafe", where the
+unescaped regex finds nothing or the wrong listing.
+
+Usage:
+    python benchmarks/booking_lookup.py                        # mongomock stand-in
+    python benchmarks/booking_lookup.py --listings 200000 --uri mongodb://localhost:27017
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_ingest import build_food_document
+from food_queries import booking_query, listing_handle
+from indexes import ensure_indexes
+
+DISHES = ["Paneer Tikka", "Chicken Biryani", "Veg Noodles", "Margherita Pizza", "Beef Burger", "French Fries", "Dal Makhani",
+          "Falafel Wrap", "Chicken Shawarma", "Lentil Soup", "Caesar Salad", "Garlic Naan", "Chocolate Cake", "Pasta"]
+# (hotel, dish) pairs the old regex gets wrong
+TRICKY = [
+    ("Joe's (Downtown)", "Pasta (veg)"),
+    ("C++ Cafe", "Fish + Chips"),
+    ("Cafe1", "Tea"),
+    ("Cafe.", "Tea"),
+    ("Grand Plaza", "Mac & Cheese [large]")
+]
+
+
+def get_collection(uri: str):
+    if uri:
+        from pymongo import MongoClient
+        collection = MongoClient(uri)["food_waste_benchmarks"]["booking_lookup"]
+    else:
+        import mongomock
+        collection = mongomock.MongoClient()["food_waste_benchmarks"]["booking_lookup"]
+    collection.drop()
+    return collection
+
+
+def seed(collection, listings: int, rng) -> list:
+    """Insert the listings; returns (hotel, dish, _id) for each."""
+    hotels = max(1, listings // len(DISHES))
+    documents = [build_food_document(f"Hotel {i // len(DISHES)}", DISHES[i % len(DISHES)], round(rng.uniform(1, 25), 2),
+                                     rng.randint(1, 9), f"{25 + rng.random():.5f},{55 + rng.random():.5f}")
+                 for i in range(hotels * len(DISHES))]
+    documents += [build_food_document(hotel, dish, 5.0, 3, "25.20000,55.30000") for hotel, dish in TRICKY]
+    for start in range(0, len(documents), 10000):
+        collection.insert_many(documents[start:start + 10000])
+    return [(d["hotel_name"], d["food_name"], d["_id"]) for d in documents]
+
+
+def regex_filter(hotel_name: str, food_name: str) -> dict:
+    """The filter book_food used before listing ids."""
+    return {
+        "hotel_name": {"$regex": f"^{hotel_name}$", "$options": "i"},
+        "food_name": {"$regex": f"^{food_name}$", "$options": "i"},
+        "expires_at": {"$gt": datetime.now()}
+    }
+
+
+def time_lookups(collection, filters: list) -> tuple:
+    """(median ms, p95 ms, hits) of find_one over `filters`."""
+    timings, hits = [], 0
+    for query in filters:
+        started = time.perf_counter()
+        found = collection.find_one(query, {"_id": 1})
+        timings.append(time.perf_counter() - started)
+        hits += found is not None
+    timings.sort()
+    return statistics.median(timings) * 1000, timings[int(len(timings) * 0.95)] * 1000, hits
+
+
+def docs_examined(collection, query: dict):
+    """totalDocsExamined for one lookup, or None where explain has no execution stats (mongomock)."""
+    try:
+        plan = collection.database.command("explain", {"find": collection.name, "filter": query, "limit": 1},
+                                           verbosity="executionStats")
+        return plan["executionStats"]["totalDocsExamined"]
+    except Exception:
+        return None
+
+
+def found_id(collection, query) -> str:
+    try:
+        document = collection.find_one(query, {"_id": 1})
+    except Exception as e:  # the regex can fail to compile, e.g. "C++"
+        return f"error: {type(e).__name__}"
+    return "-" if document is None else str(document["_id"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=None, help="MongoDB URI (defaults to an in-process mongomock)")
+    parser.add_argument("--listings", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    collection = get_collection(args.uri)
+    listings = seed(collection, args.listings, rng)
+    ensure_indexes(collection)
+    sample = rng.sample(listings[:-len(TRICKY)], min(args.lookups, len(listings) - len(TRICKY)))
+
+    print(f"📊 Booking lookup over {len(listings)} listings ({len(sample)} lookups each)")
+    print(f"   {'filter':<12} {'median ms':>10} {'p95 ms':>8} {'found':>6} {'examined':>9}")
+    for name, build in [
+        ("regex", lambda hotel, dish, _id: regex_filter(hotel.upper(), dish.lower())),
+        ("listing id", lambda hotel, dish, _id: booking_query(listing_id=listing_handle(_id))),
+        ("names", lambda hotel, dish, _id: booking_query(hotel.upper(), dish.lower()))
+    ]:
+        filters = [build(*listing) for listing in sample]
+        median, p95, hits = time_lookups(collection, filters)
+        examined = docs_examined(collection, filters[0])
+        print(f"   {name:<12} {median:>10.3f} {p95:>8.3f} {hits:>6} {'-' if examined is None else examined:>9}")
+
+    print("🔎 Listing found for names with regex metacharacters (expected / regex / names)")
+    ok = True
+    for hotel, dish, listing_id in listings[-len(TRICKY):]:
+        by_regex = found_id(collection, regex_filter(hotel, dish))
+        by_names = found_id(collection, booking_query(hotel, dish))
+        by_handle = found_id(collection, booking_query(listing_id=listing_handle(listing_id)))
+        ok = ok and by_names == by_handle == str(listing_id)
+        print(f"   {dish} @ {hotel}: {listing_id} / {by_regex} / {by_names}")
+    print("✓ Names and listing ids find the right listing" if ok else "❌ Names or listing ids found the wrong listing")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
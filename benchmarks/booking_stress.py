@@ -0,0 +1,144 @@
+"""Concurrency stress benchmark for the atomic booking path.
+
+Seeds one listing with a fixed number of portions, then lets many threads
+race to book it until it sells out. A correct booking path books exactly
+the seeded number of portions, never drives quantity below zero and
+leaves the listing marked sold out.
+
+Pass --legacy to run the old find_one + update_one path for comparison;
+it oversells as soon as two threads read the same quantity.
+
+Usage:
+    python benchmarks/booking_stress.py                      # mongomock stand-in
+    python benchmarks/booking_stress.py --uri mongodb://localhost:27017
+    python benchmarks/booking_stress.py --legacy
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking import book_listing
+
+
+def get_collection(uri: str):
+    if uri:
+        from pymongo import MongoClient
+        client = MongoClient(uri)
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    collection = client["food_waste_benchmarks"]["booking_stress"]
+    collection.drop()
+    if not uri:
+        serialize_find_one_and_update(collection)
+    return collection
+
+
+def serialize_find_one_and_update(collection):
+    """mongod applies find_one_and_update atomically per document; mongomock
+    does not, so model the server's guarantee with a lock."""
+    lock = threading.Lock()
+    original = collection.find_one_and_update
+
+    def locked(*args, **kwargs):
+        with lock:
+            return original(*args, **kwargs)
+
+    collection.find_one_and_update = locked
+
+
+def legacy_book(collection, listing_filter: dict):
+    """The pre-atomic booking path: read quantity, then write quantity - 1."""
+    food_item = collection.find_one(dict(listing_filter, is_available=True))
+    if not food_item:
+        return None
+    new_quantity = food_item["quantity"] - 1
+    update_data = {"quantity": new_quantity, "last_booked": datetime.now()}
+    if new_quantity <= 0:
+        update_data["is_available"] = False
+        update_data["status"] = "sold_out"
+    collection.update_one({"_id": food_item["_id"]}, {"$set": update_data})
+    return food_item
+
+
+def run(collection, threads: int, portions: int, book=book_listing) -> dict:
+    collection.insert_one({
+        "hotel_name": "Stress Hotel",
+        "food_name": "biryani",
+        "price": 5.0,
+        "quantity": portions,
+        "is_available": True,
+        "status": "active",
+        "created_at": datetime.now()
+    })
+
+    successes = [0] * threads
+    attempts = [0] * threads
+    start_barrier = threading.Barrier(threads)
+
+    def worker(index: int):
+        start_barrier.wait()
+        while True:
+            attempts[index] += 1
+            booked = book(collection, {"hotel_name": "Stress Hotel", "food_name": "biryani"})
+            if booked is None:
+                break
+            successes[index] += 1
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    final = collection.find_one({"hotel_name": "Stress Hotel"})
+    booked_total = sum(successes)
+    return {
+        "threads": threads,
+        "portions": portions,
+        "booked": booked_total,
+        "oversold": max(0, booked_total - portions),
+        "final_quantity": final["quantity"],
+        "final_status": final["status"],
+        "is_available": final["is_available"],
+        "attempts": sum(attempts),
+        "seconds": elapsed,
+        "bookings_per_second": booked_total / elapsed if elapsed else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=None, help="MongoDB URI (defaults to an in-process mongomock)")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--portions", type=int, default=2000)
+    parser.add_argument("--legacy", action="store_true", help="Benchmark the old find_one + update_one path")
+    args = parser.parse_args()
+
+    collection = get_collection(args.uri)
+    result = run(collection, args.threads, args.portions, legacy_book if args.legacy else book_listing)
+
+    print("📊 Booking stress results")
+    for key, value in result.items():
+        print(f"   {key}: {round(value, 3) if isinstance(value, float) else value}")
+
+    ok = (
+        result["booked"] == args.portions
+        and result["final_quantity"] == 0
+        and result["final_status"] == "sold_out"
+        and not result["is_available"]
+    )
+    print("✓ No oversells" if ok else "❌ Booking invariant violated")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Throughput of per-item inserts vs. the bulk ingestion path.
+
+Before: one insert_one plus one counter $inc per dish, as store_food_in_db
+does. After: insert_food_batch validates the whole list and writes it with
+insert_many(ordered=False) in chunks, then bumps the counter once.
+
+A few malformed rows are mixed in so the per-item results are exercised.
+
+Usage:
+    python benchmarks/bulk_ingest.py                          # mongomock stand-in
+    python benchmarks/bulk_ingest.py --uri mongodb://localhost:27017
+    python benchmarks/bulk_ingest.py --items 10000 --chunk-size 1000
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from active_counter import ActiveItemCounter
+from bulk_ingest import build_food_document, insert_food_batch, normalize_item
+
+FOOD_NAMES = ["pasta", "biryani", "chicken tikka", "pizza", "burger", "sandwich", "noodles", "falafel", "shawarma", "dal"]
+HOTEL_NAME = "Benchmark Hotel"
+HOTEL_LOCATION = "25.2048,55.2708"
+
+
+def get_database(uri: str):
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri)["food_waste_benchmarks"]
+    import mongomock
+    return mongomock.MongoClient()["food_waste_benchmarks"]
+
+
+def make_items(count: int) -> list:
+    rng = random.Random(count)
+    items = []
+    for i in range(count):
+        item = {"food_name": f"{rng.choice(FOOD_NAMES)} {i}", "price": round(rng.uniform(1, 50), 2), "quantity": rng.randint(1, 10)}
+        if i % 500 == 499:
+            item["quantity"] = 0  # rejected by validation
+        items.append(item)
+    return items
+
+
+def ingest_per_item(collection, counter, items: list, chunk_size: int) -> tuple:
+    """Returns (stored, round trips)."""
+    stored = 0
+    for item in items:
+        try:
+            food_name, price, quantity = normalize_item(item)
+        except ValueError:
+            continue
+        collection.insert_one(build_food_document(HOTEL_NAME, food_name, price, quantity, HOTEL_LOCATION))
+        counter.increment()
+        stored += 1
+    return stored, 2 * stored
+
+
+def ingest_batch(collection, counter, items: list, chunk_size: int) -> tuple:
+    """Returns (stored, round trips)."""
+    results, stored = insert_food_batch(collection, HOTEL_NAME, items, HOTEL_LOCATION, chunk_size)
+    if stored:
+        counter.increment(len(stored))
+    valid = sum(1 for r in results if r.status != "invalid")
+    return len(stored), math.ceil(valid / chunk_size) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", help="MongoDB URI (default: in-process mongomock)")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = get_database(args.uri)
+    items = make_items(args.items)
+    print(f"📊 Ingesting {args.items} items ({'MongoDB' if args.uri else 'mongomock'})")
+
+    for label, run in (("per-item", ingest_per_item), ("batch", ingest_batch)):
+        collection = db[f"bulk_ingest_{label.replace('-', '_')}"]
+        collection.drop()
+        counter = ActiveItemCounter(db, collection, counter_id=f"bulk_ingest_{label}")
+        counter.resync()
+
+        started = time.perf_counter()
+        stored, round_trips = run(collection, counter, items, args.chunk_size)
+        elapsed = time.perf_counter() - started
+        print(f"   {label:<9} stored={stored:<6} time={elapsed:6.2f}s  {stored / elapsed:8.0f} items/s  round trips={round_trips:<6} counter={counter.value()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""How much traffic the fast-path router serves without an LLM call.
+
+Replays a scripted mix of hotel and worker messages through the compiled
+graph with a fake LLM (fixed latency per call, one tool call then a reply)
+and a mongomock database, then prints the router metrics: the fraction of
+turns served on the fast path and the estimated LLM time saved.
+
+Usage:
+    python benchmarks/fast_path_router.py --llm-latency 0.8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongomock
+import pymongo
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+pymongo.MongoClient = lambda *args, **kwargs: mongomock.MongoClient()
+
+SCRIPT = [
+    ("hotel", "I'm from Taj Hotel. We have 5 pasta portions for $8 each"),
+    ("hotel", "We are Grand Plaza, we have 3 chicken biryani for 6"),
+    ("hotel", "This is Marriott. There are 10 plates of rice for $2.5 each"),
+    ("hotel", "Hi, we have some leftover desserts, what should I do?"),
+    ("worker", "Show me food under $10"),
+    ("worker", "I want pizza within 5km under $15"),
+    ("worker", "chicken biryani under $8"),
+    ("worker", "anything below $5 near me"),
+    ("worker", "book pasta from Taj Hotel"),
+    ("worker", "order 2 rice from Marriott"),
+    ("worker", "I'll take the first option"),
+    ("worker", "Show me chicken"),
+    ("worker", "food under $10 but not spicy"),
+    ("worker", "what's cheap around here?"),
+]
+
+
+class FakeLLM:
+    """Answers with a get_available_food call, then a short reply, after a fixed delay."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        self.calls += 1
+        if isinstance(messages[-1], ToolMessage):
+            return AIMessage(content="Here is what I found.")
+        return AIMessage(content="", tool_calls=[{"name": "get_available_food", "args": {"max_price": 999999}, "id": f"call_{self.calls}"}])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Seconds per fake LLM call")
+    parser.add_argument("--repeat", type=int, default=3, help="Times to replay the script")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import hotelWorker as hw
+    from geolocation import FakeLocationProvider
+    hw.llm = FakeLLM(args.llm_latency)
+    hw.location_cache.provider = FakeLocationProvider()
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for round_number in range(args.repeat):
+            for i, (user_type, message) in enumerate(SCRIPT):
+                hw.app.invoke({
+                    "messages": [HumanMessage(content=message)],
+                    "user_type": user_type,
+                    "session_id": f"{user_type}-{round_number}-{i}"
+                })
+    elapsed = time.perf_counter() - started
+
+    summary = hw.router_metrics.summary()
+    print(f"📊 Fast-path router over {summary['turns']} turns ({elapsed:.2f}s wall, {hw.llm.calls} LLM calls)")
+    print(f"   Served without LLM: {summary['fast_path_turns']} ({summary['fast_path_fraction']:.0%})")
+    print(f"   Avg fast-path turn: {summary['avg_fast_path_ms']:.1f} ms")
+    print(f"   Avg LLM call: {summary['avg_llm_call_ms']:.1f} ms, {summary['llm_calls_per_llm_turn']:.1f} calls per LLM turn")
+    print(f"   Estimated LLM time saved: {summary['estimated_llm_seconds_saved']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
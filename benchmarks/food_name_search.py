@@ -0,0 +1,122 @@
+"""Item-name search: regex scan vs. word-prefix scan vs. the listing cache's name index.
+
+For each size, fills a listing cache with dishes from a fixed menu (and
+some misspelled names, as hotels type them) and, for every query below,
+reports which dishes are found and how long it takes to fill one page of
+results, cheapest first, with:
+- regex: the old unanchored, case-insensitive `$regex` on food_name,
+  checked row by row in price order
+- prefix: food_queries.matches_item_name (word prefixes and synonyms,
+  what MongoDB's food_name_tokens index answers), checked the same way
+- index: ListingCache.search, which looks the name up in FoodNameIndex
+  (prefixes, synonyms and small typos) before touching any row
+
+Usage:
+    python benchmarks/food_name_search.py
+    python benchmarks/food_name_search.py --sizes 10000,50000 --repeats 5 --page 11
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongomock
+
+from bulk_ingest import build_food_document
+from food_queries import matches_item_name
+from listing_cache import ListingCache
+
+MENU = [
+    "Paneer Tikka", "Chicken Tikka Masala", "Chicken Biryani", "Mutton Biryani", "Veg Noodles", "Chicken Chow Mein",
+    "Margherita Pizza", "Pepperoni Pizza", "Beef Burger", "French Fries", "Dal Makhani", "Aloo Gobi", "Falafel Wrap",
+    "Chicken Shawarma", "Hummus", "Lentil Soup", "Caesar Salad", "Garlic Naan", "Mango Lassi", "Chocolate Cake"
+]
+MISSPELLED = ["Chiken Biryani", "Biriyani Rice", "Pizzza Slice", "Shawerma Plate"]
+
+# (query, what a worker means)
+QUERIES = [
+    ("tikka", "exact word"),
+    ("chiken", "typo"),
+    ("biriyani", "typo"),
+    ("pizaa", "typo"),
+    ("noodles", "synonym (chow mein)"),
+    ("lentils", "synonym (dal)"),
+    ("fries", "plain"),
+    ("chicken biryani", "two words"),
+]
+MAX_PRICE = 30
+
+
+def scan(documents, matches, limit):
+    results = []
+    for document in documents:
+        if document["price"] > MAX_PRICE:
+            break
+        if matches(document):
+            results.append(dict(document))
+            if limit is not None and len(results) == limit:
+                break
+    return results
+
+
+def regex_scan(documents, item_name, limit=None):
+    pattern = re.compile(re.escape(item_name), re.IGNORECASE)
+    return scan(documents, lambda document: pattern.search(document["food_name"]), limit)
+
+
+def prefix_scan(documents, item_name, limit=None):
+    return scan(documents, lambda document: matches_item_name(document, item_name), limit)
+
+
+def timed(function, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def build(size: int):
+    rng = random.Random(size)
+    collection = mongomock.MongoClient()["food_waste_benchmarks"]["food_items"]
+    documents = []
+    for i in range(size):
+        name = rng.choice(MISSPELLED) if rng.random() < 0.05 else rng.choice(MENU)
+        documents.append(build_food_document(f"Hotel {i % 500}", name, round(rng.uniform(1, 40), 2), rng.randint(1, 9),
+                                             f"{25.2 + rng.uniform(-0.3, 0.3):.5f},{55.3 + rng.uniform(-0.3, 0.3):.5f}"))
+    collection.insert_many(documents)
+    cache = ListingCache(collection)
+    cache.load()
+    available = sorted((document for document in documents if document["is_available"]), key=lambda d: (d["price"], d["_id"]))
+    return cache, available
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,50000", help="Comma-separated listing counts")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--page", type=int, default=11, help="Results per search (a page plus one, as search_near_me asks)")
+    args = parser.parse_args()
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        cache, documents = build(size)
+        print(f"📊 {size} listings: dishes found (all matches under ${MAX_PRICE}) and median time (ms) to fill a page of {args.page}")
+        print(f"   {'query':<16} {'meaning':<20} {'regex':>6} {'prefix':>7} {'index':>6} {'regex ms':>9} {'prefix ms':>10} {'index ms':>9}")
+        for query, meaning in QUERIES:
+            found = [len({document["food_name"] for document in rows})
+                     for rows in (regex_scan(documents, query), prefix_scan(documents, query), cache.search(MAX_PRICE, query))]
+            regex_ms = timed(lambda: regex_scan(documents, query, args.page), args.repeats)
+            prefix_ms = timed(lambda: prefix_scan(documents, query, args.page), args.repeats)
+            index_ms = timed(lambda: cache.search(MAX_PRICE, query, limit=args.page), args.repeats)
+            print(f"   {query:<16} {meaning:<20} {found[0]:>6} {found[1]:>7} {found[2]:>6} {regex_ms:>9.2f} {prefix_ms:>10.2f} {index_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
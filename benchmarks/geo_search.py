@@ -0,0 +1,138 @@
+"""Radius and k-nearest search: in-memory GeoIndex vs. brute force vs. $geoNear.
+
+For each size, scatters listings around Dubai and times a 5 km radius
+query (nearest first) with:
+- python: the old per-listing math haversine loop
+- numpy: vectorized haversine over every point
+- GeoIndex: grid candidates + vectorized haversine (geo.py), and its
+  k-nearest query
+- $geoNear: MongoDB with a 2dsphere index (only with --uri; mongomock has
+  no $geoNear)
+
+Usage:
+    python benchmarks/geo_search.py --sizes 10000,100000,1000000
+    python benchmarks/geo_search.py --uri mongodb://localhost:27017 --sizes 10000,100000
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from geo import GeoIndex, haversine_m
+
+CENTER = (25.2, 55.3)
+SPREAD_DEGREES = 0.5
+RADIUS_M = 5000
+K = 10
+
+
+def python_radius(lat, lon, lats, lons, radius_m):
+    results = []
+    for i, (lat2, lon2) in enumerate(zip(lats, lons)):
+        dlat = math.radians(lat2 - lat)
+        dlon = math.radians(lon2 - lon)
+        a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+        distance = 6371000.0 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        if distance <= radius_m:
+            results.append((distance, i))
+    results.sort()
+    return results
+
+
+def numpy_radius(lat, lon, lats, lons, radius_m):
+    distances = haversine_m(lat, lon, lats, lons)
+    inside = np.nonzero(distances <= radius_m)[0]
+    return inside[np.argsort(distances[inside], kind="stable")]
+
+
+def geo_near(collection, lat, lon, radius_m):
+    return list(collection.aggregate([
+        {"$geoNear": {"near": {"type": "Point", "coordinates": [lon, lat]}, "distanceField": "distance",
+                      "maxDistance": radius_m, "spherical": True}},
+        {"$project": {"_id": 1, "distance": 1}}
+    ]))
+
+
+def seed_mongo(db, lats, lons):
+    from pymongo import GEOSPHERE
+    collection = db["geo_search"]
+    collection.drop()
+    collection.create_index([("location", GEOSPHERE)])
+    batch = []
+    for i, (lat, lon) in enumerate(zip(lats.tolist(), lons.tolist())):
+        batch.append({"_id": i, "location": {"type": "Point", "coordinates": [lon, lat]}})
+        if len(batch) == 10000:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+    return collection
+
+
+def timed(function, queries, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        for lat, lon in queries:
+            started = time.perf_counter()
+            function(lat, lon)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=None, help="MongoDB URI for the $geoNear column")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated listing counts")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--python-max", type=int, default=100000, help="Skip the pure-Python loop above this size")
+    args = parser.parse_args()
+
+    db = None
+    if args.uri:
+        from pymongo import MongoClient
+        db = MongoClient(args.uri)["food_waste_benchmarks"]
+
+    rng = np.random.default_rng(7)
+    queries = [(CENTER[0] + dlat, CENTER[1] + dlon) for dlat, dlon in rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES, (args.queries, 2))]
+
+    print(f"📊 Median {RADIUS_M / 1000:g} km radius query (ms); k-nearest with k={K}")
+    print(f"   {'listings':>9} {'build':>7} {'python':>9} {'numpy':>8} {'GeoIndex':>9} {'k-NN':>7} {'$geoNear':>9}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        lats = CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES, size)
+        lons = CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES, size)
+        ids = list(range(size))
+
+        started = time.perf_counter()
+        index = GeoIndex(ids, lats, lons)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        lat_list, lon_list = lats.tolist(), lons.tolist()
+        python_ms = timed(lambda lat, lon: python_radius(lat, lon, lat_list, lon_list, RADIUS_M), queries[:3], 1) \
+            if size <= args.python_max else None
+        numpy_ms = timed(lambda lat, lon: numpy_radius(lat, lon, lats, lons, RADIUS_M), queries, args.repeats)
+        index_ms = timed(lambda lat, lon: index.radius(lat, lon, RADIUS_M), queries, args.repeats)
+        knn_ms = timed(lambda lat, lon: index.nearest(lat, lon, K), queries, args.repeats)
+
+        geo_near_ms = None
+        if db is not None:
+            collection = seed_mongo(db, lats, lons)
+            geo_near_ms = timed(lambda lat, lon: geo_near(collection, lat, lon, RADIUS_M), queries, args.repeats)
+
+        python_text = f"{python_ms:>9.2f}" if python_ms is not None else f"{'-':>9}"
+        geo_near_text = f"{geo_near_ms:>9.2f}" if geo_near_ms is not None else f"{'-':>9}"
+        print(f"   {size:>9} {build_ms:>7.0f} {python_text} {numpy_ms:>8.2f} {index_ms:>9.3f} {knn_ms:>7.3f} {geo_near_text}")
+
+    if db is None:
+        print("   ($geoNear column needs --uri: mongomock does not implement it)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Cold import time of hotelWorker, and the cost of the first request after it.
+
+Each run starts a fresh interpreter that imports hotelWorker and then
+answers one search through the get_available_food tool, and reports:
+- import: `import hotelWorker` alone
+- first search: the first tool call, which opens the MongoDB context
+  (and, on the first search, loads the listing cache)
+- mongo calls at import: collection/database methods called by the import
+
+MongoDB is an in-process mongomock by default, or a real server with --uri.
+Run it on two checkouts to compare them.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 10 --uri mongodb://localhost:27017
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+uri = sys.argv[1]
+calls = [0]
+
+import pymongo
+if uri:
+    real_client = pymongo.MongoClient
+    pymongo.MongoClient = lambda *args, **kwargs: real_client(uri, **kwargs)
+else:
+    import mongomock
+    from mongomock.collection import Collection
+    from mongomock.database import Database
+
+    def counted(method):
+        def wrapper(*args, **kwargs):
+            calls[0] += 1
+            return method(*args, **kwargs)
+        return wrapper
+
+    for cls in (Collection, Database):
+        for name in ("find", "find_one", "count_documents", "create_index", "create_indexes", "index_information",
+                     "update_one", "bulk_write", "aggregate", "command"):
+            if hasattr(cls, name):
+                setattr(cls, name, counted(getattr(cls, name)))
+    client = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *args, **kwargs: client
+
+started = time.perf_counter()
+import hotelWorker as hw
+imported = time.perf_counter()
+import_calls = calls[0]
+hw.configure_logging("WARNING")
+hw.get_available_food.invoke({"max_price": 10})
+searched = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_search_ms": (searched - imported) * 1000,
+                  "import_calls": import_calls if not uri else None}))
+"""
+
+
+def run_once(uri: str) -> dict:
+    completed = subprocess.run([sys.executable, "-c", CHILD, uri or ""], cwd=ROOT, capture_output=True, text=True, timeout=300)
+    if completed.returncode != 0:
+        raise SystemExit(f"❌ Import failed:\n{completed.stdout}{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--uri", default=None, help="MongoDB URI (defaults to an in-process mongomock)")
+    args = parser.parse_args()
+
+    runs = [run_once(args.uri) for _ in range(args.runs)]
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    first_search_ms = statistics.median(run["first_search_ms"] for run in runs)
+    print(f"📊 Cold start over {args.runs} fresh interpreters ({'MongoDB' if args.uri else 'mongomock'}), median ms")
+    print(f"   import hotelWorker: {import_ms:>8.1f}")
+    print(f"   first search:       {first_search_ms:>8.1f}")
+    print(f"   total:              {import_ms + first_search_ms:>8.1f}")
+    if runs[0]["import_calls"] is not None:
+        print(f"   mongo calls at import: {runs[0]['import_calls']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Search latency as dead listings pile up, before and after archival.
+
+Seeds a fixed number of bookable listings plus a growing "history" of
+rows nobody can book any more (sold out hours ago, or past their
+expires_at), measures the worker search, then runs the archive sweep and
+measures it again on the trimmed collection.
+
+Usage:
+    python benchmarks/listing_expiry.py                          # mongomock stand-in
+    python benchmarks/listing_expiry.py --uri mongodb://localhost:27017
+    python benchmarks/listing_expiry.py --active 2000 --history 0,5000,20000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archival import archive_stale_listings
+from bulk_ingest import build_food_document
+from food_queries import SEARCH_PROJECTION, search_query
+from indexes import ensure_indexes
+
+FOOD_NAMES = ["pasta", "biryani", "chicken tikka", "pizza", "burger", "sandwich", "noodles", "falafel", "shawarma", "dal"]
+
+
+def get_database(uri: str):
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri)["food_waste_benchmarks"]
+    import mongomock
+    return mongomock.MongoClient()["food_waste_benchmarks"]
+
+
+def seed(db, active: int, history: int):
+    collection = db["listing_expiry"]
+    collection.drop()
+    db["listing_expiry_history"].drop()
+    ensure_indexes(collection)
+    rng = random.Random(active + history)
+    long_ago = datetime.now() - timedelta(days=2)
+
+    documents = []
+    for i in range(active + history):
+        document = build_food_document(f"Hotel {i % 500}", rng.choice(FOOD_NAMES), round(rng.uniform(1, 50), 2), rng.randint(1, 10),
+                                       f"{25.2 + rng.uniform(-0.3, 0.3)},{55.3 + rng.uniform(-0.3, 0.3)}")
+        if i >= active:
+            if rng.random() < 0.5:
+                document.update(is_available=False, quantity=0, status="sold_out", last_booked=long_ago)
+            else:
+                document.update(created_at=long_ago, timestamp=long_ago, expires_at=long_ago + timedelta(hours=12))
+        documents.append(document)
+        if len(documents) == 10000:
+            collection.insert_many(documents)
+            documents = []
+    if documents:
+        collection.insert_many(documents)
+    return collection
+
+
+def measure(collection, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        list(collection.find(search_query(20), SEARCH_PROJECTION).sort([("price", 1), ("_id", 1)]).limit(11))
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=None, help="MongoDB URI (defaults to an in-process mongomock)")
+    parser.add_argument("--active", type=int, default=2000, help="Bookable listings")
+    parser.add_argument("--history", default="0,5000,20000", help="Comma-separated counts of dead listings")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    db = get_database(args.uri)
+    print(f"📊 Median search latency (ms) with {args.active} bookable listings")
+    print(f"   {'dead rows':>10} {'before':>10} {'archive s':>10} {'after':>10} {'speedup':>8}")
+    for history in [int(h) for h in args.history.split(",")]:
+        collection = seed(db, args.active, history)
+        before = measure(collection, args.repeats)
+        started = time.perf_counter()
+        archive_stale_listings(collection, db["listing_expiry_history"])
+        archive_seconds = time.perf_counter() - started
+        after = measure(collection, args.repeats)
+        print(f"   {history:>10} {before:>10.2f} {archive_seconds:>10.2f} {after:>10.2f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+"""Load test: replay a hotel/worker traffic mix and write the results as JSON.
+
+Seeds synthetic hotels and listings, then replays the same deterministic
+mix of requests two ways:
+
+- tools: the agent tools called directly (search_near_me, book_food,
+  post_surplus_here, store_food_batch)
+- graph: full turns through the compiled `app` graph, with a stub LLM that
+  answers each message with its planned tool call and then a short reply
+  (the fast-path router stays on unless --no-fast-path)
+
+For each mode and request kind it reports p50/p95/p99 latency,
+throughput, MongoDB operations per request and LLM calls per request,
+plus process memory. Results go to a JSON file, and --compare prints the
+change against an earlier one, so runs can be tracked over time.
+
+MongoDB operations are counted per request through a context variable,
+which LangGraph carries into the threads its tool node runs tools on:
+command events from pymongo against a real mongod, and collection method
+calls against mongomock. Background threads (cache polling, archive
+sweeps) run outside any request and are not counted.
+
+Usage:
+    python benchmarks/load_suite.py                                   # mongomock
+    python benchmarks/load_suite.py --uri mongodb://localhost:27017   # scratch mongod
+    python benchmarks/load_suite.py --listings 50000 --requests 5000 --output after.json --compare before.json
+    python benchmarks/load_suite.py --mix search=50,book=30,post=15,menu=5 --modes tools
+"""
+
+import argparse
+import contextlib
+import contextvars
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymongo
+from pymongo import monitoring
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCHMARK_DATABASE = "food_waste_benchmarks"
+CENTER = (25.2, 55.3)
+SPREAD_DEGREES = 0.3
+FOOD_NAMES = ["pasta", "chicken biryani", "falafel wrap", "pizza", "burger", "veg sandwich", "noodles", "shawarma", "dal",
+              "paneer tikka", "fried rice", "soup", "salad", "cake", "samosa"]
+DEFAULT_MIX = "search=65,book=20,post=10,menu=5"
+MENU_SIZE = 6
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# ---------- MongoDB operation counting ----------
+
+class Counts:
+    def __init__(self):
+        self.mongo_ops = 0
+        self.llm_calls = 0
+
+
+_request_counts = contextvars.ContextVar("request_counts", default=None)
+_mock_depth = threading.local()
+
+
+def _count_op():
+    counts = _request_counts.get()
+    if counts is not None:
+        counts.mongo_ops += 1
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to a real mongod for the request that sent them."""
+
+    def started(self, event):
+        _count_op()
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+MOCK_OPERATIONS = ["find", "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+                   "delete_one", "delete_many", "find_one_and_update", "aggregate", "count_documents", "bulk_write",
+                   "distinct", "estimated_document_count"]
+
+
+def count_mongomock_operations():
+    """Wrap mongomock's collection methods so each outermost call counts as one operation."""
+    from mongomock.collection import Collection
+
+    def counted(method):
+        def wrapper(self, *args, **kwargs):
+            depth = getattr(_mock_depth, "value", 0)
+            if not depth:
+                _count_op()
+            _mock_depth.value = depth + 1
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                _mock_depth.value = depth
+        return wrapper
+
+    for name in MOCK_OPERATIONS:
+        setattr(Collection, name, counted(getattr(Collection, name)))
+
+
+class ScratchClient:
+    """MongoClient proxy that sends every database name to the benchmark database."""
+
+    def __init__(self, client, database: str):
+        self._client = client
+        self._database = database
+
+    def __getitem__(self, name):
+        return self._client[self._database]
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def patch_mongo(uri: str):
+    """Point hotelWorker at a scratch database before it is imported; returns the backend name."""
+    if uri:
+        client = ScratchClient(pymongo.MongoClient(uri, event_listeners=[CommandCounter()]), BENCHMARK_DATABASE)
+        backend = "mongod"
+    else:
+        import mongomock
+        count_mongomock_operations()
+        client = mongomock.MongoClient()
+        backend = "mongomock"
+    pymongo.MongoClient = lambda *args, **kwargs: client
+    return backend
+
+
+# ---------- traffic ----------
+
+class Request:
+    def __init__(self, kind: str, user_type: str, session_id: str, message: str, tool: str, args: dict):
+        self.kind = kind
+        self.user_type = user_type
+        self.session_id = session_id
+        self.message = message
+        self.tool = tool
+        self.args = args
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        kind, weight = part.split("=")
+        if kind not in ("search", "book", "post", "menu"):
+            raise SystemExit(f"Unknown request kind in --mix: {kind}")
+        weights[kind] = float(weight)
+    return weights
+
+
+def seed(hw, hotels: int, listings: int, rng: random.Random) -> dict:
+    """Insert `listings` listings spread over `hotels` hotels; returns {hotel: [food names]}."""
+    from bulk_ingest import insert_food_batch
+    hw.food_collection.delete_many({})
+    menus = {}
+    per_hotel = max(1, listings // hotels)
+    for number in range(hotels):
+        hotel = f"Hotel {number}"
+        location = f"{CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES):.5f},{CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES):.5f}"
+        items = [{"food_name": f"{rng.choice(FOOD_NAMES)} {i}", "price": round(rng.uniform(1, 30), 2), "quantity": rng.randint(1, 20)}
+                 for i in range(per_hotel)]
+        _, stored = insert_food_batch(hw.food_collection, hotel, items, location)
+        menus[hotel] = [document["food_name"] for document in stored]
+        hw.hotel_locations[hotel] = location
+    hw.active_items.resync()
+    if hw.listing_cache is not None:
+        hw.listing_cache.load()
+    return menus
+
+
+def make_traffic(count: int, mix: dict, menus: dict, sessions: int, rng: random.Random) -> list:
+    kinds, weights = zip(*mix.items())
+    hotels = list(menus)
+    traffic = []
+    for number in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        session_id = f"load-{number % sessions}"
+        hotel = rng.choice(hotels)
+        if kind == "search":
+            args = {"max_price": rng.choice([5, 8, 10, 15, 25])}
+            message = f"Show me food under ${args['max_price']}"
+            if rng.random() < 0.4:
+                args["item_name"] = rng.choice(FOOD_NAMES).split()[0]
+                message = f"Show me {args['item_name']} under ${args['max_price']}"
+            if rng.random() < 0.5:
+                args["max_distance_km"] = rng.choice([2, 5, 10])
+                message += f" within {args['max_distance_km']}km"
+            traffic.append(Request(kind, "worker", session_id, message, "search_near_me", args))
+        elif kind == "book":
+            food = rng.choice(menus[hotel])
+            args = {"hotel_name": hotel, "food_name": food}
+            traffic.append(Request(kind, "worker", session_id, f"Book the {food} from {hotel}", "book_food", args))
+        elif kind == "post":
+            food = f"{rng.choice(FOOD_NAMES)} special {number}"
+            args = {"hotel_name": hotel, "food_name": food, "price": round(rng.uniform(1, 20), 2), "quantity": rng.randint(1, 10)}
+            message = f"I'm from {hotel}. We have {args['quantity']} {food} portions for ${args['price']} each"
+            traffic.append(Request(kind, "hotel", f"hotel-{hotel}", message, "post_surplus_here", args))
+        else:
+            foods = [f"{rng.choice(FOOD_NAMES)} tray {number}-{i}" for i in range(MENU_SIZE)]
+            prices = [round(rng.uniform(1, 20), 2) for _ in foods]
+            quantities = [rng.randint(1, 10) for _ in foods]
+            args = {"hotel_name": hotel, "food_names": foods, "prices": prices, "quantities": quantities}
+            message = f"{hotel} closing up: " + ", ".join(f"{q} {f} ${p}" for f, p, q in zip(foods, prices, quantities))
+            traffic.append(Request(kind, "hotel", f"hotel-{hotel}", message, "store_food_batch", args))
+    return traffic
+
+
+class StubLLM:
+    """Deterministic LLM stand-in: the planned tool call for a message, then a short reply."""
+
+    def __init__(self, plans: dict, latency: float = 0.0):
+        self.plans = plans
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, messages):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            call_id = self.calls
+        counts = _request_counts.get()
+        if counts is not None:
+            counts.llm_calls += 1
+        if isinstance(messages[-1], ToolMessage):
+            return AIMessage(content=f"Here you go: {str(messages[-1].content)[:80]}")
+        tool, args = self.plans[messages[-1].content]
+        return AIMessage(content="", tool_calls=[{"name": tool, "args": args, "id": f"call_{call_id}"}])
+
+
+# ---------- running and reporting ----------
+
+def run_request(hw, mode: str, request: Request) -> tuple:
+    """(kind, seconds, mongo ops, llm calls) for one request."""
+    counts = Counts()
+    token = _request_counts.set(counts)
+    state = {"session_id": request.session_id, "user_type": request.user_type, "client_ip": ip_for(request.session_id)}
+    started = time.perf_counter()
+    if mode == "tools":
+        tool = getattr(hw, request.tool)
+        args = dict(request.args)
+        if request.tool != "book_food":
+            args["state"] = state
+        tool.invoke(args)
+    else:
+        hw.app.invoke({"messages": [HumanMessage(content=request.message)], **state})
+    elapsed = time.perf_counter() - started
+    _request_counts.reset(token)
+    return request.kind, elapsed, counts.mongo_ops, counts.llm_calls
+
+
+def ip_for(session_id: str) -> str:
+    """Stable fake client IP per session, so workers keep their location across requests."""
+    digest = zlib.crc32(session_id.encode())
+    return f"10.{digest >> 16 & 255}.{digest >> 8 & 255}.{digest & 255}"
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples: list, wall_seconds: float = None) -> dict:
+    latencies = sorted(seconds * 1000 for _, seconds, _, _ in samples)
+    summary = {
+        "requests": len(samples),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "max": round(latencies[-1], 3) if latencies else 0.0
+        },
+        "mongo_ops_per_request": round(sum(ops for _, _, ops, _ in samples) / max(len(samples), 1), 2),
+        "llm_calls_per_request": round(sum(calls for _, _, _, calls in samples) / max(len(samples), 1), 2)
+    }
+    if wall_seconds is not None:
+        summary["wall_seconds"] = round(wall_seconds, 3)
+        summary["throughput_rps"] = round(len(samples) / wall_seconds, 1) if wall_seconds else 0.0
+    return summary
+
+
+def run_mode(hw, mode: str, traffic: list, concurrency: int) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                samples = list(pool.map(lambda request: run_request(hw, mode, request), traffic))
+        else:
+            samples = [run_request(hw, mode, request) for request in traffic]
+        wall = time.perf_counter() - started
+    result = summarize(samples, wall)
+    result["by_kind"] = {kind: summarize([s for s in samples if s[0] == kind])
+                         for kind in sorted({sample[0] for sample in samples})}
+    return result
+
+
+def rss_mb() -> float:
+    """Current resident set size, where /proc is available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return round(int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10, 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_report(report: dict):
+    print(f"📊 Load suite on {report['backend']}: {report['seed']['listings']} listings, {report['seed']['hotels']} hotels")
+    print(f"   {'mode':<6} {'kind':<7} {'reqs':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'mongo ops':>10} {'LLM':>5}")
+    for mode, result in report["results"].items():
+        rows = [("all", result)] + list(result["by_kind"].items())
+        for kind, row in rows:
+            latency = row["latency_ms"]
+            throughput = f"{row['throughput_rps']:>8.1f}" if "throughput_rps" in row else f"{'':>8}"
+            print(f"   {mode:<6} {kind:<7} {row['requests']:>6} {latency['p50']:>9.2f} {latency['p95']:>9.2f} {latency['p99']:>9.2f} "
+                  f"{throughput} {row['mongo_ops_per_request']:>10.2f} {row['llm_calls_per_request']:>5.2f}")
+    memory = report["memory"]
+    print(f"   Memory: RSS {memory['rss_start_mb']} → {memory['rss_end_mb']} MB, peak {memory['rss_peak_mb']} MB")
+
+
+def print_comparison(report: dict, baseline: dict):
+    def change(new, old):
+        return f"{(new - old) / old * 100:+7.1f}%" if old else f"{'n/a':>8}"
+
+    print(f"\n📈 Change vs. {baseline.get('git_commit') or 'baseline'} ({baseline.get('started_at', '?')})")
+    print(f"   {'mode':<6} {'kind':<7} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'mongo ops':>10}")
+    for mode, result in report["results"].items():
+        old_result = baseline.get("results", {}).get(mode)
+        if not old_result:
+            continue
+        rows = [("all", result, old_result)] + [(kind, row, old_result["by_kind"][kind])
+                                                for kind, row in result["by_kind"].items() if kind in old_result.get("by_kind", {})]
+        for kind, row, old in rows:
+            latency, old_latency = row["latency_ms"], old["latency_ms"]
+            throughput = change(row["throughput_rps"], old["throughput_rps"]) if "throughput_rps" in row else f"{'':>8}"
+            print(f"   {mode:<6} {kind:<7} {change(latency['p50'], old_latency['p50'])} {change(latency['p95'], old_latency['p95'])} "
+                  f"{change(latency['p99'], old_latency['p99'])} {throughput} "
+                  f"{change(row['mongo_ops_per_request'], old['mongo_ops_per_request']):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=None, help=f"Scratch mongod to use (database {BENCHMARK_DATABASE}); defaults to mongomock")
+    parser.add_argument("--hotels", type=int, default=200)
+    parser.add_argument("--listings", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests replayed per mode")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated kind=weight (kinds: search, book, post, menu)")
+    parser.add_argument("--modes", default="tools,graph", help="Comma-separated: tools, graph")
+    parser.add_argument("--sessions", type=int, default=100, help="Distinct worker sessions in the traffic")
+    parser.add_argument("--concurrency", type=int, default=1, help="Threads replaying requests")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per stub LLM call (graph mode)")
+    parser.add_argument("--no-fast-path", action="store_true", help="Send every graph turn through the stub LLM")
+    parser.add_argument("--log-level", default="WARNING", help="Level for the tool diagnostics (DEBUG prints every step)")
+    parser.add_argument("--no-tracing", action="store_true", help="Disable spans")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help=f"Where to write the JSON results (default: a timestamped file in {RESULTS_DIR})")
+    parser.add_argument("--compare", default=None, help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    if args.output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        args.output = os.path.join(RESULTS_DIR, f"load_suite-{datetime.now():%Y%m%d-%H%M%S}.json")
+    modes = [mode.strip() for mode in args.modes.split(",")]
+    rss_start = rss_mb()
+    backend = patch_mongo(args.uri)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import hotelWorker as hw
+        hw.startup(migrations=True)
+    from geolocation import FakeLocationProvider, Location
+
+    rng = random.Random(args.seed + 1)
+    hw.location_cache.provider = FakeLocationProvider(by_client_ip={
+        ip_for(f"load-{n}"): Location(CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+                                      CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES), 30.0)
+        for n in range(args.sessions)
+    })
+    if args.no_fast_path:
+        hw.USE_FAST_PATH_ROUTER = False
+    hw.configure_logging(args.log_level)
+    hw.tracer.enabled = not args.no_tracing
+
+    results = {}
+    for mode in modes:
+        if mode not in ("tools", "graph"):
+            raise SystemExit(f"Unknown mode: {mode}")
+        # Same data and the same traffic for every mode, so the modes compare like for like
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            menus = seed(hw, args.hotels, args.listings, rng)
+        seed_seconds = time.perf_counter() - started
+        traffic = make_traffic(args.requests, mix, menus, args.sessions, rng)
+        hw.llm = StubLLM({request.message: (request.tool, request.args) for request in traffic}, args.llm_latency)
+        results[mode] = run_mode(hw, mode, traffic, args.concurrency)
+
+    report = {
+        "suite": "load_suite",
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "backend": backend,
+        "config": vars(args),
+        "seed": {"hotels": args.hotels, "listings": args.listings, "seconds": round(seed_seconds, 2)},
+        "results": results,
+        "memory": {"rss_start_mb": rss_start, "rss_end_mb": rss_mb(), "rss_peak_mb": peak_rss_mb()}
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+
+    print_report(report)
+    print(f"   Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as baseline:
+            print_comparison(report, json.load(baseline))
+    hw.shutdown()
+
+
+if __name__ == "__main__":
+    main()
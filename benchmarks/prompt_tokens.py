@@ -0,0 +1,171 @@
+"""Input tokens sent to the model per user turn.
+
+Replays a scripted hotel session and worker session through the compiled
+graph with a scripted fake LLM, which records the estimated size of every
+request it receives (sessions.estimate_tokens: ~4 characters per token).
+The worker session pages through search results, books from them and
+searches again, so old search pages stay in the session history.
+
+Tool schemas are bound to the real model and sent with every call too;
+they are the same in every run and are reported separately.
+
+Run it on two checkouts, or with --compare on a saved report:
+
+Usage:
+    python benchmarks/prompt_tokens.py --output after.json
+    python benchmarks/prompt_tokens.py --compare before.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongomock
+import pymongo
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+MOCK_CLIENT = mongomock.MongoClient()
+pymongo.MongoClient = lambda *args, **kwargs: MOCK_CLIENT
+
+NEXT_PAGE = "<next_page>"
+
+# (session, user_type, message, steps); each step is the list of tool calls
+# the model emits in one round, and a turn ends with a text reply
+SCRIPT = [
+    ("hotel-1", "hotel", "I'm from Taj Hotel. We have 5 pasta portions for $8 each",
+     [[("post_surplus_here", {"hotel_name": "Taj Hotel", "food_name": "pasta", "price": 8, "quantity": 5})]]),
+    ("hotel-1", "hotel", "Also 4 biryani at $6 and 3 falafel wraps at $4",
+     [[("post_surplus_here", {"hotel_name": "Taj Hotel", "food_name": "biryani", "price": 6, "quantity": 4}),
+       ("post_surplus_here", {"hotel_name": "Taj Hotel", "food_name": "falafel wrap", "price": 4, "quantity": 3})]]),
+    ("worker-1", "worker", "Show me food under $10",
+     [[("search_near_me", {"max_price": 10})]]),
+    ("worker-1", "worker", "Show me more",
+     [[("search_near_me", {"max_price": 10, "page_token": NEXT_PAGE})]]),
+    ("worker-1", "worker", "Any pizza within 5km under $15?",
+     [[("search_near_me", {"max_price": 15, "item_name": "pizza", "max_distance_km": 5})]]),
+    ("worker-1", "worker", "I'll take the first option",
+     [[("book_food", {"hotel_name": "Hotel 0", "food_name": "pizza 0"})]]),
+    ("worker-1", "worker", "What's the closest food under $6?",
+     [[("search_near_me", {"max_price": 6, "max_distance_km": 3, "sort_by": "distance"})]]),
+    ("worker-1", "worker", "Book 2 of the first one and 1 of the second",
+     [[("book_many", {"hotel_names": ["Hotel 1", "Hotel 2"], "food_names": ["rice 1", "rice 2"], "quantities": [2, 1]})]]),
+]
+
+FOOD_NAMES = ["pizza", "pasta", "rice", "soup", "salad", "bread"]
+
+
+class RecordingLLM:
+    """Replays the scripted tool calls and records the estimated input tokens of each call."""
+
+    def __init__(self, plans: dict):
+        from sessions import estimate_tokens
+        self.estimate_tokens = estimate_tokens
+        self.plans = plans
+        self.calls = []
+
+    def invoke(self, messages):
+        system = sum(self.estimate_tokens([m]) for m in messages if isinstance(m, SystemMessage))
+        tools = sum(self.estimate_tokens([m]) for m in messages if isinstance(m, ToolMessage))
+        self.calls.append({"input_tokens": self.estimate_tokens(messages), "system_tokens": system, "tool_result_tokens": tools})
+        turn_start = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+        steps = self.plans[messages[turn_start].content]
+        step = sum(1 for m in messages[turn_start:] if isinstance(m, AIMessage))
+        if step >= len(steps):
+            return AIMessage(content="Done.")
+        tool_calls = []
+        for i, (name, args) in enumerate(steps[step]):
+            if args.get("page_token") == NEXT_PAGE:
+                args = {**args, "page_token": last_next_page(messages)}
+            tool_calls.append({"name": name, "args": args, "id": f"call_{len(self.calls)}_{i}"})
+        return AIMessage(content="", tool_calls=tool_calls)
+
+
+def last_next_page(messages) -> str:
+    for message in reversed(messages):
+        if "next_page=" in str(message.content):
+            return str(message.content).rsplit("next_page=", 1)[1].split()[0]
+    raise SystemExit("❌ No next_page token in the conversation")
+
+
+def seed(hw, listings: int):
+    from bulk_ingest import insert_food_batch
+    rng = random.Random(7)
+    for number in range(listings // 10):
+        items = [{"food_name": f"{rng.choice(FOOD_NAMES)} {i}", "price": round(rng.uniform(1, 14), 2), "quantity": rng.randint(1, 9)}
+                 for i in range(10)]
+        insert_food_batch(hw.food_collection, f"Hotel {number}", items, f"{25.2 + rng.uniform(-0.02, 0.02):.5f},{55.3 + rng.uniform(-0.02, 0.02):.5f}")
+    hw.active_items.resync()
+
+
+def run(hw) -> list:
+    llm = RecordingLLM({message: steps for _, _, message, steps in SCRIPT})
+    hw.llm = llm
+    turns = []
+    for session_id, user_type, message, _ in SCRIPT:
+        first_call = len(llm.calls)
+        with contextlib.redirect_stdout(io.StringIO()):
+            hw.app.invoke({"messages": [HumanMessage(content=message)], "user_type": user_type, "session_id": session_id})
+        calls = llm.calls[first_call:]
+        turns.append({
+            "session": session_id,
+            "message": message,
+            "llm_calls": len(calls),
+            "input_tokens": sum(call["input_tokens"] for call in calls),
+            "system_tokens": sum(call["system_tokens"] for call in calls),
+            "tool_result_tokens": sum(call["tool_result_tokens"] for call in calls)
+        })
+    return turns
+
+
+def print_report(turns: list, baseline: list = None):
+    print("📊 Estimated input tokens per user turn (all LLM calls of the turn)")
+    header = f"   {'#':>2} {'session':<9} {'calls':>5} {'input':>7} {'system':>7} {'tool results':>12}"
+    print(header + (f" {'before':>7} {'change':>7}" if baseline else ""))
+    for number, turn in enumerate(turns, 1):
+        line = (f"   {number:>2} {turn['session']:<9} {turn['llm_calls']:>5} {turn['input_tokens']:>7} "
+                f"{turn['system_tokens']:>7} {turn['tool_result_tokens']:>12}")
+        if baseline:
+            before = baseline[number - 1]["input_tokens"]
+            line += f" {before:>7} {(turn['input_tokens'] - before) / before:>+7.0%}"
+        print(line)
+    total = sum(turn["input_tokens"] for turn in turns)
+    print(f"   total input tokens: {total}" + (f" (before: {sum(turn['input_tokens'] for turn in baseline)})" if baseline else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=200)
+    parser.add_argument("--output", default=None, help="Write the per-turn report to this JSON file")
+    parser.add_argument("--compare", default=None, help="A report from an earlier run to compare against")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import hotelWorker as hw
+        hw.configure_logging("WARNING")
+        hw.USE_FAST_PATH_ROUTER = False
+        from geolocation import FakeLocationProvider
+        hw.location_cache.provider = FakeLocationProvider()
+        seed(hw, args.listings)
+
+    turns = run(hw)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as before:
+            baseline = json.load(before)["turns"]
+    print_report(turns, baseline)
+    schema_tokens = len(json.dumps([convert_to_openai_tool(t) for t in hw.tools])) // 4
+    print(f"   tool schemas: ~{schema_tokens} tokens per call, not included above")
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"turns": turns, "tool_schema_tokens": schema_tokens}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Concurrency stress benchmark for hold-and-confirm reservations.
+
+Seeds a few listings, then lets worker threads hold portions and confirm,
+cancel or abandon their holds, while racer threads confirm and cancel
+random codes from everyone (so the same hold is often confirmed and
+cancelled at once) and the reaper keeps releasing expired holds. Holds
+get short TTLs, so many expire mid-race.
+
+At the end every remaining hold is released, and the run checks that no
+portion leaked or was counted twice:
+- each listing's quantity plus its confirmed portions equals what it was
+  seeded with, and nothing is left on hold
+- confirmed portions agree between the listings, the reservations
+  collection and the calls that reported success
+- no reservation was settled twice, and quantity never went negative
+
+Pass --naive to cancel with a read-then-$inc instead of the conditional
+release; concurrent cancels of one code then give its portions back twice.
+
+Usage:
+    python benchmarks/reservation_stress.py                      # mongomock stand-in
+    python benchmarks/reservation_stress.py --uri mongodb://localhost:27017
+    python benchmarks/reservation_stress.py --naive
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reservations import cancel_reservation, close_update, confirm_reservation, hold_listing, release_expired_holds
+
+def get_collections(uri: str):
+    if uri:
+        from pymongo import MongoClient
+        db = MongoClient(uri)["food_waste_benchmarks"]
+    else:
+        import mongomock
+        db = mongomock.MongoClient()["food_waste_benchmarks"]
+    listings, reservations = db["reservation_stress"], db["reservation_stress_holds"]
+    listings.drop()
+    reservations.drop()
+    if not uri:
+        # mongod applies each update atomically per document; mongomock does
+        # not, so model the server's guarantee with one lock around every call
+        lock = threading.RLock()
+        listings, reservations = Serialized(listings, lock), Serialized(reservations, lock)
+    return listings, reservations
+
+
+class Serialized:
+    """A collection whose calls (and cursor reads) hold a shared lock."""
+
+    def __init__(self, collection, lock):
+        self._collection = collection
+        self._lock = lock
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                result = method(*args, **kwargs)
+            return LockedCursor(result, self._lock) if name == "find" else result
+
+        return locked
+
+
+class LockedCursor:
+    def __init__(self, cursor, lock):
+        self._cursor = cursor
+        self._lock = lock
+
+    def limit(self, count: int):
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._cursor))
+
+
+def naive_cancel(listings, reservations, code):
+    """Cancel by reading the reservation, then adding its portions back."""
+    reservation = reservations.find_one({"_id": code})
+    if reservation is None or reservation["status"] != "held":
+        return False
+    listings.update_one({"_id": reservation["listing_id"]},
+                        {"$inc": {"quantity": reservation["quantity"], "held": -reservation["quantity"]},
+                         "$pull": {"holds": {"_id": code}}, "$set": {"is_available": True}})
+    reservations.update_one({"_id": code}, close_update("cancelled"))
+    return True
+
+
+def run(listings, reservations, workers: int, racers: int, holds_per_worker: int, listing_count: int, portions: int,
+        naive: bool = False) -> dict:
+    listings.insert_many([
+        {"hotel_name": f"Stress Hotel {i}", "food_name": "biryani", "price": 5.0, "quantity": portions,
+         "is_available": True, "status": "active", "created_at": datetime.now()}
+        for i in range(listing_count)
+    ])
+
+    codes = []
+    settled = Counter()  # code -> successful confirm/cancel calls
+    confirmed_portions = [0]
+    counts = Counter()
+    tally_lock = threading.Lock()
+    done = threading.Event()
+    cancel = naive_cancel if naive else (lambda c, r, code: cancel_reservation(c, r, code).ok)
+
+    def settle(code, quantity, action):
+        if action == "confirm":
+            ok = confirm_reservation(listings, reservations, code).ok
+        else:
+            ok = cancel(listings, reservations, code)
+        with tally_lock:
+            counts[f"{action}_calls"] += 1
+            if ok:
+                settled[code] += 1
+                counts["confirmed" if action == "confirm" else "cancelled"] += 1
+                if action == "confirm":
+                    confirmed_portions[0] += quantity
+
+    def worker(index: int):
+        rng = random.Random(index)
+        for _ in range(holds_per_worker):
+            quantity = rng.randint(1, 3)
+            ttl = timedelta(milliseconds=rng.choice((1, 20, 200, 60000)))
+            held = hold_listing(listings, reservations, {"hotel_name": f"Stress Hotel {rng.randrange(listing_count)}"}, quantity, ttl)
+            with tally_lock:
+                counts["holds" if held else "hold_misses"] += 1
+            if not held:
+                continue
+            reservation, _ = held
+            with tally_lock:
+                codes.append((reservation["_id"], quantity))
+            roll = rng.random()
+            if roll < 0.5:
+                settle(reservation["_id"], quantity, "confirm")
+            elif roll < 0.75:
+                settle(reservation["_id"], quantity, "cancel")
+            # else abandoned: the reaper releases it once it expires
+
+    def racer(index: int):
+        rng = random.Random(1000 + index)
+        while not done.is_set():
+            with tally_lock:
+                picked = rng.choice(codes) if codes else None
+            if picked is not None:
+                settle(picked[0], picked[1], rng.choice(("confirm", "cancel")))
+
+    def reaper():
+        while not done.is_set():
+            released = release_expired_holds(listings, reservations)
+            with tally_lock:
+                counts["reaped_portions"] += released
+            time.sleep(0.005)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    background = [threading.Thread(target=racer, args=(i,)) for i in range(racers)] + [threading.Thread(target=reaper)]
+    started = time.perf_counter()
+    for t in pool + background:
+        t.start()
+    for t in pool:
+        t.join()
+    done.set()
+    for t in background:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    # Release everything still held, as if every hold had expired
+    release_expired_holds(listings, reservations, now=datetime.now() + timedelta(days=1))
+    final = list(listings.find({}))
+    recorded_confirmed = sum(r["quantity"] for r in reservations.find({"status": "confirmed"}))
+    seeded = portions * listing_count
+    remaining = sum(listing["quantity"] for listing in final)
+    return {
+        "workers": workers,
+        "racers": racers,
+        "holds": counts["holds"],
+        "hold_misses": counts["hold_misses"],
+        "confirm_calls": counts["confirm_calls"],
+        "confirmed": counts["confirmed"],
+        "cancel_calls": counts["cancel_calls"],
+        "cancelled": counts["cancelled"],
+        "reaped_portions": counts["reaped_portions"],
+        "seeded_portions": seeded,
+        "remaining_portions": remaining,
+        "confirmed_portions": confirmed_portions[0],
+        "recorded_confirmed_portions": recorded_confirmed,
+        "leaked_portions": seeded - remaining - confirmed_portions[0],
+        "still_held": sum(listing.get("held", 0) for listing in final),
+        "open_holds": sum(len(listing.get("holds", [])) for listing in final),
+        "settled_twice": sum(1 for n in settled.values() if n > 1),
+        "negative_quantity": sum(1 for listing in final if listing["quantity"] < 0),
+        "availability_mismatch": sum(1 for listing in final if listing["is_available"] != (listing["quantity"] > 0)),
+        "seconds": elapsed,
+        "holds_per_second": counts["holds"] / elapsed if elapsed else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=None, help="MongoDB URI (defaults to an in-process mongomock)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--racers", type=int, default=4)
+    parser.add_argument("--holds", type=int, default=100, help="Holds per worker")
+    parser.add_argument("--listings", type=int, default=5)
+    parser.add_argument("--portions", type=int, default=200, help="Portions per listing")
+    parser.add_argument("--naive", action="store_true", help="Cancel with read-then-$inc instead of the conditional release")
+    args = parser.parse_args()
+
+    listings, reservations = get_collections(args.uri)
+    result = run(listings, reservations, args.workers, args.racers, args.holds, args.listings, args.portions, args.naive)
+
+    print("📊 Reservation stress results")
+    for key, value in result.items():
+        print(f"   {key}: {round(value, 3) if isinstance(value, float) else value}")
+
+    ok = (
+        result["leaked_portions"] == 0
+        and result["confirmed_portions"] == result["recorded_confirmed_portions"]
+        and result["still_held"] == 0
+        and result["open_holds"] == 0
+        and result["settled_twice"] == 0
+        and result["negative_quantity"] == 0
+        and result["availability_mismatch"] == 0
+    )
+    print("✓ No leaked or double-counted portions" if ok else "❌ Reservation invariant violated")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Scaling across cores: runner.py with 1, 2, 4, ... workers and a stub LLM.
+
+For each worker count, starts `python runner.py --workers N` with
+--worker-init pointing at `setup_worker` below, which gives every worker
+its own mongomock database (seeded with the same listings), the stub LLM
+from async_load.py and an async facade over mongomock. Then --connections
+clients replay hotel and worker turns against the router, each session
+sending a location from one of --cities cities, and the run reports
+throughput, p50/p95 turn latency, errors and how the sessions were spread
+over the workers (from the routing itself, recomputed with SessionRouter).
+
+At the end of each run every client sends one more turn and the runner
+gets SIGTERM while those turns are still waiting on the stub LLM; the
+drain columns count the turns answered, the ones refused with a
+retryable error, and any lost (connection closed without an answer),
+plus how long the runner took to exit.
+
+Each worker has its own in-process database, so writes are not shared
+between workers here; pass --uri for a real server. Throughput can only
+scale up to the number of cores (os.cpu_count() is printed), and the
+router is one process shared by all workers.
+
+Usage:
+    python benchmarks/runner_scaling.py
+    python benchmarks/runner_scaling.py --workers 1,2,4,8 --connections 128 --turns 4000 --llm-latency 0.05
+    python benchmarks/runner_scaling.py --uri mongodb://localhost:27017   # scratch database food_waste_benchmarks
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+
+from runner import SessionRouter
+
+CITIES = [(25.2, 55.3), (24.45, 54.38), (25.35, 55.42), (23.59, 58.41), (26.22, 50.59), (25.29, 51.53), (29.37, 47.98),
+          (21.49, 39.19)]
+FOODS = ["pasta", "biryani", "falafel", "noodles", "curry"]
+TURNS_PER_SESSION = 3
+
+
+# ---------- inside each worker (runner.py --worker-init) ----------
+
+def setup_worker(index: int):
+    """Point this worker at a seeded database and the stub LLM before hotelWorker is imported."""
+    import pymongo
+    mongo_client = pymongo.MongoClient
+    from async_load import AsyncDatabase, FakeLLM, MOCK_CLIENT  # replaces pymongo.MongoClient with mongomock
+
+    uri = os.environ.get("RUNNER_SCALING_URI")
+    if uri:
+        pymongo.MongoClient = mongo_client
+    with contextlib.redirect_stdout(io.StringIO()):
+        import async_agent
+        import hotelWorker as hw
+    hw.llm = FakeLLM(float(os.environ.get("RUNNER_SCALING_LLM_LATENCY", "0.05")))
+    if uri:
+        hw.MONGODB_URI, hw.DATABASE_NAME = uri, "food_waste_benchmarks"
+        return
+
+    class Database(AsyncDatabase):
+        async def command(self, *args, **kwargs):
+            return self.db.command(*args, **kwargs)
+
+    async_agent.async_db = Database(MOCK_CLIENT[hw.DATABASE_NAME])
+    # Nothing else writes to this worker's database, and mongomock is not thread-safe
+    hw.LISTING_CACHE_MAX_STALENESS_SECONDS = hw.ARCHIVE_SWEEP_INTERVAL_SECONDS = hw.RESERVATION_REAPER_INTERVAL_SECONDS = 3600
+    seed(MOCK_CLIENT[hw.DATABASE_NAME][hw.COLLECTION_NAME], int(os.environ.get("RUNNER_SCALING_LISTINGS", "2000")))
+
+
+def seed(collection, listings: int):
+    from bulk_ingest import build_food_document
+    from indexes import ensure_indexes
+    rng = random.Random(5)
+    collection.insert_many([build_food_document("Load Hotel" if i % 10 == 0 else f"Hotel {i % 200}", rng.choice(FOODS),
+                                                round(rng.uniform(2, 20), 2), rng.randint(1, 20), location(rng.choice(CITIES), rng))
+                            for i in range(listings)])
+    ensure_indexes(collection)
+
+
+# ---------- the clients ----------
+
+def location(city: tuple, rng) -> str:
+    return f"{city[0] + rng.uniform(-0.1, 0.1):.5f},{city[1] + rng.uniform(-0.1, 0.1):.5f}"
+
+
+def script(connections: int, turns: int, cities: list, rng) -> list:
+    """Per connection, [(session_id, user_type, message, location)] in the order it sends them."""
+    scripts = [[] for _ in range(connections)]
+    for number in range(turns):
+        connection = number % connections
+        turn = len(scripts[connection])
+        if turn % TURNS_PER_SESSION == 0:
+            session_id = f"c{connection}-s{turn // TURNS_PER_SESSION}"
+            user_type = "hotel" if rng.random() < 0.2 else "worker"
+            where = location(rng.choice(cities), rng)
+        else:
+            session_id, user_type, _, where = scripts[connection][-1]
+        if user_type == "hotel":
+            message = f"post {rng.choice(FOODS)} {rng.randint(3, 12)}"
+        elif turn % 2:
+            message = f"book {rng.choice(FOODS)}"
+        else:
+            message = f"food under {rng.randint(5, 15)}"
+        scripts[connection].append((session_id, user_type, message, where))
+    return scripts
+
+
+async def send(reader, writer, session_id: str, user_type: str, message: str, where: str) -> dict:
+    request = {"session_id": session_id, "user_type": user_type, "message": message, "location": where}
+    writer.write((json.dumps(request) + "\n").encode())
+    await writer.drain()
+    while line := await reader.readline():
+        response = json.loads(line)
+        if response.get("type") == "reply":
+            return response
+    return None
+
+
+async def replay(port: int, scripts: list) -> tuple:
+    """(latencies, error messages, elapsed seconds) of every connection's turns, connections in parallel."""
+    latencies, errors = [], []
+
+    async def connection(turns: list):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            for turn in turns:
+                started = time.perf_counter()
+                response = await send(reader, writer, *turn)
+                latencies.append(time.perf_counter() - started)
+                if response is None or "error" in response:
+                    errors.append(response["error"] if response else "connection closed")
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connection(turns) for turns in scripts))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def drain(port: int, runner, scripts: list, llm_latency: float) -> tuple:
+    """(answered, asked to retry, lost, seconds to exit) for one turn per connection in flight at SIGTERM."""
+    connections = [await asyncio.open_connection("127.0.0.1", port) for _ in scripts]
+    pending = [asyncio.create_task(send(reader, writer, f"{turns[0][0]}-drain", *turns[0][1:]))
+               for (reader, writer), turns in zip(connections, scripts)]
+    await asyncio.sleep(max(llm_latency, 0.05))
+    stopped = time.perf_counter()
+    runner.send_signal(signal.SIGTERM)
+    responses = await asyncio.gather(*pending)
+    await asyncio.to_thread(runner.wait, 120)
+    elapsed = time.perf_counter() - stopped
+    for _, writer in connections:
+        writer.close()
+    answered = sum(1 for r in responses if r is not None and "reply" in r)
+    retry = sum(1 for r in responses if r is not None and r.get("retry"))
+    return answered, retry, len(responses) - answered - retry, elapsed
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_runner(workers: int, port: int, args, log):
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join([BENCHMARKS, ROOT, os.environ.get("PYTHONPATH", "")]),
+                       RUNNER_SCALING_LLM_LATENCY=str(args.llm_latency), RUNNER_SCALING_LISTINGS=str(args.listings),
+                       RUNNER_SCALING_URI=args.uri or "")
+    command = [sys.executable, os.path.join(ROOT, "runner.py"), "--workers", str(workers), "--port", str(port),
+               "--worker-base-port", str(free_port_block(workers)), "--worker-init", "runner_scaling:setup_worker",
+               "--log-level", "WARNING", "--drain-seconds", "10"]
+    runner = subprocess.Popen(command, env=environment, stdout=log, stderr=subprocess.STDOUT, cwd=ROOT)
+    deadline = time.monotonic() + 180
+    while time.monotonic() < deadline:
+        if runner.poll() is not None:
+            raise SystemExit(f"❌ runner.py exited with code {runner.returncode}, see {log.name}")
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=1):
+            return runner
+        time.sleep(0.2)
+    runner.kill()
+    raise SystemExit(f"❌ runner.py did not start, see {log.name}")
+
+
+def free_port_block(count: int) -> int:
+    """A port p with p .. p + count - 1 all free right now."""
+    while True:
+        start = free_port()
+        if start + count < 65536 and all(_is_free(start + offset) for offset in range(1, count)):
+            return start
+
+
+def _is_free(port: int) -> bool:
+    with socket.socket() as probe:
+        try:
+            probe.bind(("127.0.0.1", port))
+        except OSError:
+            return False
+    return True
+
+
+def spread(workers: int, scripts: list) -> str:
+    """Sessions per worker, as the router assigns them."""
+    router = SessionRouter(workers)
+    for turns in scripts:
+        for session_id, _, _, where in turns:
+            router.route(session_id, where)
+    return "/".join(str(count) for count in router.summary()["per_worker"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=1500)
+    parser.add_argument("--cities", type=int, default=len(CITIES))
+    parser.add_argument("--listings", type=int, default=2000, help="Listings seeded into each worker's mongomock")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per stub LLM call")
+    parser.add_argument("--uri", default=None, help="MongoDB URI shared by the workers (defaults to one mongomock per worker)")
+    args = parser.parse_args()
+
+    scripts = script(args.connections, args.turns, CITIES[:args.cities], random.Random(7))
+    print(f"📊 runner.py: {args.turns} turns over {args.connections} connections from {args.cities} cities, "
+          f"stub LLM latency {args.llm_latency}s, {os.cpu_count()} CPU(s)")
+    print(f"   {'workers':>7} {'turns/s':>8} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'sessions/worker':>16} "
+          f"{'drained':>8} {'retry':>6} {'lost':>5} {'exit s':>7}")
+    baseline = None
+    with tempfile.NamedTemporaryFile("w", prefix="runner_scaling_", suffix=".log", delete=False) as log:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            if args.uri:
+                import pymongo
+                collection = pymongo.MongoClient(args.uri)["food_waste_benchmarks"]["food_items"]
+                collection.drop()
+                seed(collection, args.listings)
+            port = free_port()
+            runner = start_runner(workers, port, args, log)
+            try:
+                latencies, errors, elapsed = asyncio.run(replay(port, scripts))
+                answered, retry, lost, exit_seconds = asyncio.run(drain(port, runner, scripts, args.llm_latency))
+            finally:
+                if runner.poll() is None:
+                    runner.kill()
+            throughput = len(latencies) / elapsed
+            baseline = baseline or throughput
+            latencies.sort()
+            print(f"   {workers:>7} {throughput:>8.1f} {throughput / baseline:>7.2f}x {statistics.median(latencies) * 1000:>8.1f} "
+                  f"{latencies[int(len(latencies) * 0.95)] * 1000:>8.1f} {len(errors):>7} {spread(workers, scripts):>16} "
+                  f"{answered:>8} {retry:>6} {lost:>5} {exit_seconds:>7.2f}")
+    print(f"   worker logs: {log.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Search and LLM response caching under a meal-peak traffic mix.
+
+Seeds listings around one city, then replays first-page searches from
+workers clustered at a few dozen sites (labour camps, depots), with
+budgets, dishes, radii and sort orders drawn from what workers ask most,
+interleaved with bookings and new posts. Each run serves the searches
+with get_available_food, from the listing cache or straight from the
+collection. Collection searches run with and without the level 1 search
+cache (result_cache.py), which the app only uses without a listing cache.
+It reports:
+- median and p95 search latency, and the cache's hit rate
+- whether every cached result matched the uncached one (same listings,
+  same order); the cached runs also compute the uncached result for
+  each search, untimed, to check this
+
+Bookings and posts bump the listings version, which empties the cache,
+so the hit rate depends on --write-share. mongomock has no $geoNear, so
+there the collection backend replays the searches without their
+distance; pass --uri for a real server.
+
+The level 2 section replays the first model call of workers' turns
+(free-form messages the fast path cannot parse, some repeated with other
+capitalisation or spacing) through model_call with a stub LLM. It reports
+how many calls the response cache saved.
+
+Usage:
+    python benchmarks/search_cache.py
+    python benchmarks/search_cache.py --listings 20000 --requests 2000 --write-share 0.02
+    python benchmarks/search_cache.py --uri mongodb://localhost:27017   # scratch database food_waste_benchmarks
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongomock
+import pymongo
+from langchain_core.messages import AIMessage, HumanMessage
+
+from bulk_ingest import build_food_document
+from indexes import ensure_indexes
+
+CITY = (25.2, 55.3)
+SPREAD_DEGREES = 0.15
+SITES = 40
+DISHES = ["Chicken Biryani", "Veg Biryani", "Dal Makhani", "Paneer Tikka", "Chicken Shawarma", "Falafel Wrap", "Margherita Pizza",
+          "Beef Burger", "Veg Noodles", "Lentil Soup", "Garlic Naan", "Fried Rice", "Chicken Curry", "Chapati", "Samosa"]
+WANTED = [None, None, None, None, "biryani", "rice", "chicken", "shawarma", "curry"]
+BUDGETS = [3, 4, 5, 5, 5, 6, 8, 10]
+RADII_KM = [2, 3, 3, 5]
+ORDERS = [None, None, "price", "distance"]
+PHRASES = ["anything cheap to eat around here?", "what's good for lunch today", "I'm hungry, what can I get for a few dirhams",
+           "is there any rice left nearby", "something filling please", "what do you have for dinner",
+           "any veg food?", "cheapest thing you've got"]
+_LISTING_ID = re.compile(r"🔖 Listing: (\w+)")
+
+
+class StubLLM:
+    """Answers every call with the same short reply, counting the calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return AIMessage(content="Here is what I found.")
+
+
+def seed(collection, listings: int, rng) -> list:
+    collection.drop()
+    documents = [build_food_document(f"Hotel {i % 400}", rng.choice(DISHES), round(rng.uniform(1, 15), 2), rng.randint(1, 20),
+                                     f"{CITY[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES):.5f},"
+                                     f"{CITY[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES):.5f}")
+                 for i in range(listings)]
+    collection.insert_many(documents)
+    return [document["_id"] for document in documents]
+
+
+def make_traffic(requests: int, write_share: float, rng) -> list:
+    sites = [(CITY[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES), CITY[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES))
+             for _ in range(SITES)]
+    traffic = []
+    for _ in range(requests):
+        roll = rng.random()
+        if roll < write_share * 0.8:
+            traffic.append(("book", {}))
+        elif roll < write_share:
+            traffic.append(("post", {"hotel_name": f"Hotel {rng.randrange(400)}", "food_name": rng.choice(DISHES),
+                                     "price": round(rng.uniform(1, 15), 2), "quantity": rng.randint(1, 20)}))
+        else:
+            lat, lon = rng.choice(sites)
+            args = {"max_price": rng.choice(BUDGETS), "sort_by": rng.choice(ORDERS)}
+            if rng.random() < 0.8:
+                args["max_distance_km"] = rng.choice(RADII_KM)
+                args["user_location"] = f"{lat + rng.gauss(0, 0.002):.6f},{lon + rng.gauss(0, 0.002):.6f}"
+            item = rng.choice(WANTED)
+            if item:
+                args["item_name"] = item
+            traffic.append(("search", {k: v for k, v in args.items() if v is not None}))
+    return traffic
+
+
+def new_context(hw, listing_cache: bool, search_cache: bool):
+    if hw._context is not None:
+        hw._context.close()
+        hw._context = None
+    hw.USE_LISTING_CACHE = listing_cache
+    hw.USE_SEARCH_RESULT_CACHE = search_cache
+    return hw.context()
+
+
+def without_distance(traffic: list) -> list:
+    return [(kind, {k: v for k, v in args.items() if k not in ("max_distance_km", "user_location")} if kind == "search" else args)
+            for kind, args in traffic]
+
+
+def replay(hw, traffic: list, listing_ids: list, rng, check: bool) -> dict:
+    ctx = hw.context()
+    timings, mismatches, shown = [], 0, 0
+    search = hw.get_available_food.func
+    for kind, args in traffic:
+        if kind == "book":
+            hw.book_food.func("", "", listing_id=hw.listing_handle(rng.choice(listing_ids)))
+        elif kind == "post":
+            hw.store_food_in_db.func(hotel_location=f"{CITY[0]:.5f},{CITY[1]:.5f}", **args)
+        else:
+            started = time.perf_counter()
+            result = search(**args)
+            timings.append(time.perf_counter() - started)
+            ids = _LISTING_ID.findall(result)
+            shown += len(ids)
+            if check:
+                cache, ctx.search_cache = ctx.search_cache, None
+                mismatches += _LISTING_ID.findall(search(**args)) != ids
+                ctx.search_cache = cache
+    timings.sort()
+    summary = ctx.search_cache.summary() if ctx.search_cache is not None else {}
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95)] * 1000,
+        "hit_rate": summary.get("hit_rate"),
+        "unanswered": summary.get("unanswered", 0),
+        "rows_cached": summary.get("weight", 0),
+        "mismatches": mismatches if check else None,
+        "shown": shown
+    }
+
+
+def replay_model_calls(hw, turns: int, rng) -> tuple:
+    """(LLM calls without the response cache, with it) for the same first calls of `turns` turns."""
+    messages = []
+    for _ in range(turns):
+        phrase = rng.choice(PHRASES)
+        if rng.random() < 0.3:
+            phrase = phrase.capitalize() + "  "
+        messages.append(phrase)
+    calls = []
+    for enabled in (False, True):
+        hw.USE_LLM_RESPONSE_CACHE = enabled
+        new_context(hw, True, True)
+        hw.llm = StubLLM()
+        for n, message in enumerate(messages):
+            hw.model_call({"messages": [HumanMessage(content=message)], "user_type": "worker", "session_id": f"worker-{n}"})
+        calls.append(hw.llm.calls)
+    return calls[0], calls[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--write-share", type=float, default=0.02, help="Share of requests that book or post (bumping the version)")
+    parser.add_argument("--turns", type=int, default=500, help="Worker turns replayed for the response cache")
+    parser.add_argument("--backends", default="listing cache,collection")
+    parser.add_argument("--uri", default=None, help="MongoDB URI (defaults to an in-process mongomock)")
+    args = parser.parse_args()
+
+    if not args.uri:
+        client = mongomock.MongoClient()
+        pymongo.MongoClient = lambda *a, **kw: client
+    with contextlib.redirect_stdout(io.StringIO()):
+        import hotelWorker as hw
+    if args.uri:
+        hw.MONGODB_URI, hw.DATABASE_NAME = args.uri, "food_waste_benchmarks"
+    hw.configure_logging("ERROR")
+    hw.tracer.enabled = False
+
+    traffic = make_traffic(args.requests, args.write_share, random.Random(3))
+    searches = sum(1 for kind, _ in traffic if kind == "search")
+    print(f"📊 {searches} first-page searches and {len(traffic) - searches} bookings/posts over {args.listings} listings")
+    print(f"   {'backend':<14} {'search cache':<13} {'median ms':>10} {'p95 ms':>8} {'hit rate':>9} {'rows cached':>12} "
+          f"{'mismatches':>11}")
+    for backend in [b.strip() for b in args.backends.split(",")]:
+        replayed = traffic if backend == "listing cache" or args.uri else without_distance(traffic)
+        for cached in (False, True) if backend == "collection" else (False,):
+            new_context(hw, backend == "listing cache", cached)
+            listing_ids = seed(hw.context().food_collection, args.listings, random.Random(5))
+            if args.uri:
+                ensure_indexes(hw.context().food_collection)
+            result = replay(hw, replayed, listing_ids, random.Random(9), check=cached)
+            hit_rate = f"{result['hit_rate']:.0%}" if cached else "-"
+            mismatches = result["mismatches"] if cached else "-"
+            print(f"   {backend:<14} {'on' if cached else 'off':<13} {result['median_ms']:>10.3f} {result['p95_ms']:>8.3f} "
+                  f"{hit_rate:>9} {result['rows_cached']:>12} {mismatches:>11}")
+
+    without, with_cache = replay_model_calls(hw, args.turns, random.Random(11))
+    print(f"🤖 First model call of {args.turns} free-form worker turns: {without} LLM calls without the response cache, "
+          f"{with_cache} with it ({1 - with_cache / without:.0%} saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Search latency with and without the per-call count_documents.
+
+Before: get_available_food ran count_documents({"is_available": True})
+before every search to detect an empty database. After: the search query
+runs directly and only an empty result consults the maintained counter
+document (an _id lookup).
+
+Usage:
+    python benchmarks/search_latency.py                          # mongomock stand-in
+    python benchmarks/search_latency.py --uri mongodb://localhost:27017
+    python benchmarks/search_latency.py --sizes 10000,100000,1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from active_counter import ActiveItemCounter
+
+FOOD_NAMES = ["pasta", "biryani", "chicken tikka", "pizza", "burger", "sandwich", "noodles", "falafel", "shawarma", "dal"]
+
+
+def get_database(uri: str):
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri)["food_waste_benchmarks"]
+    import mongomock
+    return mongomock.MongoClient()["food_waste_benchmarks"]
+
+
+def seed(db, size: int):
+    collection = db["search_latency"]
+    collection.drop()
+    collection.create_index([("is_available", 1), ("price", 1)])
+    rng = random.Random(size)
+    now = datetime.now()
+    batch = []
+    for i in range(size):
+        lat, lon = 25.2 + rng.uniform(-0.3, 0.3), 55.3 + rng.uniform(-0.3, 0.3)
+        batch.append({
+            "hotel_name": f"Hotel {i % 500}",
+            "food_name": rng.choice(FOOD_NAMES),
+            "price": round(rng.uniform(1, 50), 2),
+            "quantity": rng.randint(1, 10),
+            "location": {"type": "Point", "coordinates": [lon, lat]},
+            "hotel_location": f"{lat},{lon}",
+            "timestamp": now,
+            "created_at": now,
+            "is_available": rng.random() < 0.8,
+            "status": "active"
+        })
+        if len(batch) == 10000:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+    counter = ActiveItemCounter(db, collection, counter_id="search_latency")
+    counter.resync()
+    return collection, counter
+
+
+def search_before(collection, counter, query):
+    if collection.count_documents({"is_available": True}) == 0:
+        return []
+    return list(collection.find(query).sort("price", 1))
+
+
+def search_after(collection, counter, query):
+    results = list(collection.find(query).sort("price", 1))
+    if not results and counter.value() == 0:
+        return []
+    return results
+
+
+def measure(search, collection, counter, repeats: int) -> float:
+    query = {"is_available": True, "price": {"$lte": 2.0}}
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        search(collection, counter, query)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=None, help="MongoDB URI (defaults to an in-process mongomock)")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated listing counts")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    db = get_database(args.uri)
+    print("📊 Median search latency (ms)")
+    print(f"   {'listings':>10} {'before':>10} {'after':>10} {'speedup':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        collection, counter = seed(db, size)
+        before = measure(search_before, collection, counter, args.repeats)
+        after = measure(search_after, collection, counter, args.repeats)
+        print(f"   {size:>10} {before:>10.2f} {after:>10.2f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
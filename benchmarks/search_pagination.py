@@ -0,0 +1,85 @@
+"""Tool message size and latency: materializing every match vs. one page.
+
+Before: get_available_food read every matching listing into a list and
+formatted all of them into the tool message. After: it reads one page
+(limit + 1 rows, projected) off the cursor and hands back a next_page
+token. The search is the worst case, "show me food under $999999".
+
+Usage:
+    python benchmarks/search_pagination.py --sizes 1000,10000,50000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongomock
+import pymongo
+
+pymongo.MongoClient = lambda *args, **kwargs: mongomock.MongoClient()
+
+FOOD_NAMES = ["pasta", "biryani", "chicken tikka", "pizza", "burger", "sandwich", "noodles", "falafel", "shawarma", "dal"]
+MAX_PRICE = 999999
+
+
+def seed(hw, size: int):
+    from bulk_ingest import build_food_document
+    hw.food_collection.delete_many({})
+    rng = random.Random(size)
+    documents = [
+        build_food_document(f"Hotel {i % 500}", rng.choice(FOOD_NAMES), round(rng.uniform(1, 50), 2), rng.randint(1, 10),
+                            f"{25.2 + rng.uniform(-0.3, 0.3)},{55.3 + rng.uniform(-0.3, 0.3)}")
+        for i in range(size)
+    ]
+    hw.food_collection.insert_many(documents)
+    hw.active_items.resync()
+
+
+def search_unpaged(hw) -> str:
+    results = list(hw.food_collection.find(hw.search_query(MAX_PRICE)).sort("price", 1))
+    text, _ = hw.format_food_results(results, MAX_PRICE, limit=len(results))
+    return text
+
+
+def search_paged(hw) -> str:
+    return hw.get_available_food.invoke({"max_price": MAX_PRICE})
+
+
+def measure(search, hw, repeats: int) -> tuple:
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            started = time.perf_counter()
+            text = search(hw)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,50000", help="Comma-separated listing counts")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import hotelWorker as hw
+    hw.context().listing_cache = None  # measure the database path
+
+    print("📊 Worst-case search: median latency (ms) and tool message size (~tokens, 4 chars each)")
+    print(f"   {'listings':>9} {'unpaged ms':>11} {'paged ms':>9} {'unpaged tok':>12} {'paged tok':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        seed(hw, size)
+        before_ms, before_chars = measure(search_unpaged, hw, args.repeats)
+        after_ms, after_chars = measure(search_paged, hw, args.repeats)
+        print(f"   {size:>9} {before_ms:>11.1f} {after_ms:>9.1f} {before_chars // 4:>12} {after_chars // 4:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Ranking search candidates: per-row Python scoring + full sort vs. ranking.py.
+
+For each candidate count, builds listings with random price, distance,
+quantity and age, and times picking the best K with:
+- python: scoring each listing in a Python loop, then sorting them all
+- ranking.py: one vectorized NumPy pass and argpartition top-K selection
+
+Both produce the same order; the benchmark checks that before timing.
+
+Usage:
+    python benchmarks/search_ranking.py
+    python benchmarks/search_ranking.py --sizes 500,10000,100000 --k 11
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archival import DEFAULT_SHELF_LIFE
+from ranking import BEST_DEAL, QUANTITY_SATURATION, price_scale, rank_listings
+
+RADIUS_M = 5000
+
+
+def make_listings(size: int, now: datetime) -> list:
+    rng = random.Random(size)
+    return [
+        {
+            "_id": i,
+            "price": round(rng.uniform(1, 50), 2),
+            "quantity": rng.randint(1, 20),
+            "distance": rng.uniform(0, RADIUS_M),
+            "created_at": now - timedelta(minutes=rng.uniform(0, 12 * 60))
+        }
+        for i in range(size)
+    ]
+
+
+def python_rank(documents: list, k: int, now: datetime) -> list:
+    scale = price_scale(documents)
+    shelf_life = DEFAULT_SHELF_LIFE.total_seconds()
+    scored = []
+    for document in documents:
+        age = (now - document["created_at"]).total_seconds()
+        score = (BEST_DEAL.price * document["price"] / scale
+                 + BEST_DEAL.distance * min(document["distance"] / RADIUS_M, 1.0)
+                 + BEST_DEAL.freshness * min(max(age / shelf_life, 0.0), 1.0)
+                 + BEST_DEAL.quantity * (1.0 - min(document["quantity"], QUANTITY_SATURATION) / QUANTITY_SATURATION))
+        scored.append((score, document["_id"], document))
+    scored.sort(key=lambda entry: (entry[0], entry[1]))
+    return [document for _, _, document in scored[:k]]
+
+
+def timed(function, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="500,10000,100000", help="Comma-separated candidate counts")
+    parser.add_argument("--k", type=int, default=11, help="Rows kept (a page plus one)")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    print(f"📊 Median time to pick the best {args.k} candidates (ms)")
+    print(f"   {'candidates':>10} {'python':>9} {'ranking':>9} {'speedup':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        documents = make_listings(size, now)
+        expected = [document["_id"] for document in python_rank(documents, args.k, now)]
+        actual = [document["_id"] for document in rank_listings(documents, args.k, now, max_distance_meters=RADIUS_M)]
+        assert expected == actual, "ranking.py disagrees with the reference scoring"
+
+        python_ms = timed(lambda: python_rank(documents, args.k, now), args.repeats)
+        ranking_ms = timed(lambda: rank_listings(documents, args.k, now, max_distance_meters=RADIUS_M), args.repeats)
+        print(f"   {size:>10} {python_ms:>9.2f} {ranking_ms:>9.2f} {python_ms / ranking_ms:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
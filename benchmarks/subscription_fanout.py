@@ -0,0 +1,171 @@
+"""Food alerts: one subscription match per insert vs. workers polling search.
+
+For each number of subscribed workers, registers that many standing
+searches around one city (most with a 1-10 km radius, some with an item
+name), then stores a stream of new listings and reports:
+- match: median time to match one insert against every subscription
+  with SubscriptionIndex, and with a scan of every subscription (the two
+  must agree)
+- notify: time from dispatch until the LocalSink holds every notification
+- poll: what the same workers cost if each instead re-ran its search
+  every --poll-seconds against an in-memory ListingCache (the cheapest
+  search path, leaving out the LLM round trip each poll also takes)
+
+Usage:
+    python benchmarks/subscription_fanout.py
+    python benchmarks/subscription_fanout.py --subscribers 1000,10000,100000 --inserts 500 --poll-seconds 60
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongomock
+
+from bulk_ingest import build_food_document
+from food_queries import matches_item_name
+from geo import EARTH_RADIUS_M, parse_coordinates
+from listing_cache import ListingCache
+from subscriptions import LocalSink, NotificationDispatcher, SubscriptionIndex, new_subscription
+
+MENU = ["Paneer Tikka", "Chicken Biryani", "Veg Noodles", "Margherita Pizza", "Beef Burger", "French Fries", "Dal Makhani",
+        "Falafel Wrap", "Chicken Shawarma", "Lentil Soup", "Caesar Salad", "Garlic Naan", "Chocolate Cake"]
+WANTED = ["pizza", "chicken", "biryani", "burger", "soup", "noodles", "falafel", "cake"]
+CITY = (25.2, 55.3)
+CACHED_LISTINGS = 10000
+
+
+def random_location(rng) -> str:
+    return f"{CITY[0] + rng.uniform(-0.3, 0.3):.5f},{CITY[1] + rng.uniform(-0.3, 0.3):.5f}"
+
+
+def random_listing(rng, i: int) -> dict:
+    document = build_food_document(f"Hotel {i % 500}", rng.choice(MENU), round(rng.uniform(1, 25), 2), rng.randint(1, 9),
+                                   random_location(rng))
+    document["_id"] = i
+    return document
+
+
+def build_subscriptions(count: int, rng) -> list:
+    subscriptions = []
+    for i in range(count):
+        radius_m = rng.uniform(1000, 10000) if rng.random() < 0.7 else None
+        item_name = rng.choice(WANTED) if rng.random() < 0.5 else None
+        subscriptions.append(new_subscription(f"worker-{i}", rng.randint(3, 30), item_name, random_location(rng), radius_m))
+    return subscriptions
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    a = math.sin(math.radians(lat2 - lat1) / 2) ** 2 + \
+        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def scan_match(subscriptions: list, listing: dict) -> set:
+    lat, lon = parse_coordinates(listing["hotel_location"])
+    matched = set()
+    for subscription in subscriptions:
+        if listing["price"] > subscription.max_price:
+            continue
+        if subscription.item_name is not None and not matches_item_name(listing, subscription.item_name):
+            continue
+        if subscription.radius_m is not None and distance_m(lat, lon, subscription.lat, subscription.lon) > subscription.radius_m:
+            continue
+        matched.add(subscription.subscription_id)
+    return matched
+
+
+def median_ms(timings: list) -> float:
+    return statistics.median(timings) * 1000
+
+
+def build_cache(rng) -> ListingCache:
+    collection = mongomock.MongoClient()["food_waste_benchmarks"]["subscription_fanout"]
+    collection.drop()
+    collection.insert_many([random_listing(rng, i) for i in range(CACHED_LISTINGS)])
+    cache = ListingCache(collection)
+    cache.load()
+    return cache
+
+
+def poll_cost_ms(cache: ListingCache, subscriptions: list, samples: int, page: int) -> float:
+    """Median time of one search_near_me-style search, as a polling worker would run it."""
+    timings = []
+    for subscription in subscriptions[:samples]:
+        started = time.perf_counter()
+        cache.search(subscription.max_price, subscription.item_name, subscription.lat, subscription.lon,
+                     subscription.radius_m, limit=page)
+        timings.append(time.perf_counter() - started)
+    return median_ms(timings)
+
+
+def delivery_seconds(notifications: list) -> float:
+    sink = LocalSink()
+    expected = len(notifications)
+    dispatcher = NotificationDispatcher([sink], max_pending=max(expected, 1))
+    started = time.perf_counter()
+    dispatcher.dispatch(notifications)
+    while dispatcher.counts["delivered"] + dispatcher.counts["dropped"] < expected:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    dispatcher.stop()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", default="1000,10000,100000", help="Comma-separated subscription counts")
+    parser.add_argument("--inserts", type=int, default=500, help="Listings stored (and matched) per run")
+    parser.add_argument("--scan-inserts", type=int, default=50, help="Inserts also matched by scanning every subscription")
+    parser.add_argument("--poll-seconds", type=float, default=60, help="How often a polling worker would search")
+    parser.add_argument("--inserts-per-minute", type=float, default=20, help="Listing rate used for the per-minute totals")
+    parser.add_argument("--page", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    cache = build_cache(rng)
+    print(f"📊 Matching {args.inserts} inserts against standing searches vs. polling a {CACHED_LISTINGS}-listing cache "
+          f"every {args.poll_seconds:g}s")
+    print(f"   {'subscribers':>11} {'index ms':>9} {'scan ms':>8} {'notified':>9} {'deliver ms':>11} "
+          f"{'poll ms':>8} {'match ms/min':>13} {'poll ms/min':>12} {'LLM calls/min':>14}")
+    for count in [int(s) for s in args.subscribers.split(",")]:
+        subscriptions = build_subscriptions(count, rng)
+        index = SubscriptionIndex()
+        for subscription in subscriptions:
+            index.add(subscription)
+        listings = [random_listing(rng, CACHED_LISTINGS + i) for i in range(args.inserts)]
+
+        index_timings, notifications = [], []
+        for i, listing in enumerate(listings):
+            started = time.perf_counter()
+            matched = index.match([listing])
+            index_timings.append(time.perf_counter() - started)
+            notifications.extend(matched)
+            if i < args.scan_inserts:
+                expected = scan_match(subscriptions, listing)
+                if {n.subscription.subscription_id for n in matched} != expected:
+                    raise SystemExit(f"❌ Index and scan disagree on insert {i}")
+
+        scan_timings = []
+        for listing in listings[:args.scan_inserts]:
+            started = time.perf_counter()
+            scan_match(subscriptions, listing)
+            scan_timings.append(time.perf_counter() - started)
+
+        deliver_ms = delivery_seconds(notifications) * 1000
+        poll_ms = poll_cost_ms(cache, subscriptions, 200, args.page)
+        match_per_minute = median_ms(index_timings) * args.inserts_per_minute
+        polls_per_minute = count * 60 / args.poll_seconds
+        print(f"   {count:>11} {median_ms(index_timings):>9.3f} {median_ms(scan_timings):>8.1f} {len(notifications):>9} "
+              f"{deliver_ms:>11.1f} {poll_ms:>8.3f} {match_per_minute:>13.1f} {poll_ms * polls_per_minute:>12.0f} "
+              f"{polls_per_minute:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
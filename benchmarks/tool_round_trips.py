@@ -0,0 +1,125 @@
+"""LLM calls per user turn: sequential tool steps vs. composite/parallel tools.
+
+Replays a scripted conversation set through the compiled graph twice with a
+scripted fake LLM:
+
+- sequential: the old prompt's behaviour, get_location() first, then one
+  tool per model turn (each step costs another LLM round-trip)
+- composite: search_near_me / post_surplus_here resolve the location
+  themselves and independent calls are emitted in the same model turn,
+  where the tools node runs them concurrently
+
+The fast-path router is switched off so every turn goes through the LLM.
+Geolocation uses the offline fake provider with a configurable latency.
+
+Usage:
+    python benchmarks/tool_round_trips.py --llm-latency 0.8 --location-latency 0.3
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongomock
+import pymongo
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+pymongo.MongoClient = lambda *args, **kwargs: mongomock.MongoClient()
+
+LOCATION = "<location>"
+
+# (user_type, message, sequential steps, composite steps); each step is the
+# list of tool calls the model emits in one turn.
+CONVERSATIONS = [
+    ("hotel", "I'm from Taj Hotel. We have 5 pasta portions for $8 each",
+     [[("get_location", {"hotel_name": "Taj Hotel"})],
+      [("store_food_in_db", {"hotel_name": "Taj Hotel", "food_name": "pasta", "price": 8, "quantity": 5, "hotel_location": LOCATION})]],
+     [[("post_surplus_here", {"hotel_name": "Taj Hotel", "food_name": "pasta", "price": 8, "quantity": 5})]]),
+    ("hotel", "Grand Plaza here: 4 biryani at $6, 3 falafel wraps at $4 and 6 soups at $3",
+     [[("get_location", {"hotel_name": "Grand Plaza"})],
+      [("store_food_in_db", {"hotel_name": "Grand Plaza", "food_name": "biryani", "price": 6, "quantity": 4, "hotel_location": LOCATION})],
+      [("store_food_in_db", {"hotel_name": "Grand Plaza", "food_name": "falafel wrap", "price": 4, "quantity": 3, "hotel_location": LOCATION})],
+      [("store_food_in_db", {"hotel_name": "Grand Plaza", "food_name": "soup", "price": 3, "quantity": 6, "hotel_location": LOCATION})]],
+     [[("post_surplus_here", {"hotel_name": "Grand Plaza", "food_name": "biryani", "price": 6, "quantity": 4}),
+       ("post_surplus_here", {"hotel_name": "Grand Plaza", "food_name": "falafel wrap", "price": 4, "quantity": 3}),
+       ("post_surplus_here", {"hotel_name": "Grand Plaza", "food_name": "soup", "price": 3, "quantity": 6})]]),
+    ("worker", "Show me food under $10",
+     [[("get_location", {})], [("get_available_food", {"max_price": 10})]],
+     [[("search_near_me", {"max_price": 10})]]),
+    ("worker", "I want pizza or pasta within 5km under $15",
+     [[("get_location", {})],
+      [("get_available_food", {"max_price": 15, "item_name": "pizza", "max_distance_km": 5, "user_location": LOCATION})],
+      [("get_available_food", {"max_price": 15, "item_name": "pasta", "max_distance_km": 5, "user_location": LOCATION})]],
+     [[("search_near_me", {"max_price": 15, "item_name": "pizza", "max_distance_km": 5}),
+       ("search_near_me", {"max_price": 15, "item_name": "pasta", "max_distance_km": 5})]]),
+    ("worker", "Book the pasta from Taj Hotel and the biryani from Grand Plaza",
+     [[("book_food", {"hotel_name": "Taj Hotel", "food_name": "pasta"})],
+      [("book_food", {"hotel_name": "Grand Plaza", "food_name": "biryani"})]],
+     [[("book_food", {"hotel_name": "Taj Hotel", "food_name": "pasta"}),
+       ("book_food", {"hotel_name": "Grand Plaza", "food_name": "biryani"})]]),
+]
+
+
+class ScriptedLLM:
+    """Emits the scripted tool-call steps for the current turn, then a reply."""
+
+    def __init__(self, latency: float, plans: dict):
+        self.latency = latency
+        self.plans = plans
+        self.calls = 0
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        self.calls += 1
+        turn_start = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+        steps = self.plans[messages[turn_start].content]
+        step = sum(1 for m in messages[turn_start:] if isinstance(m, AIMessage))
+        if step >= len(steps):
+            return AIMessage(content="Done.")
+        last_tool = next((m for m in reversed(messages) if isinstance(m, ToolMessage)), None)
+        tool_calls = []
+        for i, (name, args) in enumerate(steps[step]):
+            args = {k: (last_tool.content if v == LOCATION else v) for k, v in args.items()}
+            tool_calls.append({"name": name, "args": args, "id": f"call_{self.calls}_{i}"})
+        return AIMessage(content="", tool_calls=tool_calls)
+
+
+def run(hw, mode: str, llm_latency: float) -> tuple:
+    plans = {message: (sequential if mode == "sequential" else composite)
+             for _, message, sequential, composite in CONVERSATIONS}
+    hw.llm = ScriptedLLM(llm_latency, plans)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, (user_type, message, _, _) in enumerate(CONVERSATIONS):
+            hw.app.invoke({"messages": [HumanMessage(content=message)], "user_type": user_type, "session_id": f"{mode}-{i}"})
+    return hw.llm.calls, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Seconds per fake LLM call")
+    parser.add_argument("--location-latency", type=float, default=0.3, help="Seconds per fake geolocation lookup")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import hotelWorker as hw
+    from geolocation import FakeLocationProvider
+    hw.USE_FAST_PATH_ROUTER = False
+
+    turns = len(CONVERSATIONS)
+    print(f"📊 LLM round-trips over {turns} scripted user turns")
+    for mode in ("sequential", "composite"):
+        hw.location_cache.provider = FakeLocationProvider(latency=args.location_latency)
+        hw.location_cache._entries.clear()
+        hw.hotel_locations.clear()
+        calls, elapsed = run(hw, mode, args.llm_latency)
+        print(f"   {mode:<10} LLM calls={calls:<4} per turn={calls / turns:4.2f} wall={elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Atomic booking helpers for the food_items collection.
+
+Every booking is one conditional ``find_one_and_update``. The stock guard
+(``is_available`` and ``quantity >= n``) lives in the filter, and the
+decrement, ``is_available`` flip and ``sold_out`` status are applied by a
+single update pipeline, so two workers racing for the last portion can
+never both succeed.
+"""
+
+import asyncio
+from datetime import datetime
+from pymongo import ReturnDocument
+
+
+def booking_update(quantity: int = 1) -> list:
+    """Update pipeline that takes `quantity` portions and flips sold-out listings."""
+    return [
+        {
+            "$set": {
+                "quantity": {"$subtract": ["$quantity", quantity]},
+                "last_booked": datetime.now()
+            }
+        },
+        {
+            "$set": {
+                "is_available": {"$gt": ["$quantity", 0]},
+                "status": {"$cond": [{"$gt": ["$quantity", 0]}, "$status", "sold_out"]}
+            }
+        }
+    ]
+
+
+def book_listing(collection, listing_filter: dict, quantity: int = 1):
+    """Atomically book `quantity` portions from the first listing matching `listing_filter`.
+
+    Args:
+        collection: The food_items collection
+        listing_filter: Query identifying the listing (e.g. by hotel and food name)
+        quantity: Number of portions to take
+
+    Returns:
+        The listing as it is after the booking, or None if no matching listing
+        had enough portions left
+
+    Raises:
+        ValueError: If `quantity` is below 1
+    """
+    return collection.find_one_and_update(
+        guarded_filter(listing_filter, quantity),
+        booking_update(quantity),
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def abook_listing(collection, listing_filter: dict, quantity: int = 1):
+    """Async variant of book_listing for an AsyncMongoClient collection."""
+    return await collection.find_one_and_update(
+        guarded_filter(listing_filter, quantity),
+        booking_update(quantity),
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def guarded_filter(listing_filter: dict, quantity: int) -> dict:
+    """Restrict a listing filter to listings that still have `quantity` portions."""
+    check_quantity(quantity)
+    guarded = dict(listing_filter)
+    guarded["is_available"] = True
+    guarded["quantity"] = {"$gte": quantity}
+    return guarded
+
+
+def check_quantity(quantity: int):
+    """Refuse bookings of fewer than one portion; the update would add stock back."""
+    if quantity < 1:
+        raise ValueError(f"quantity must be at least 1, got {quantity}")
+
+
+def book_many(collection, bookings) -> list:
+    """Book a batch of listings, each with its own atomic conditional update.
+
+    Args:
+        collection: The food_items collection
+        bookings: Iterable of (listing_filter, quantity) pairs
+
+    Returns:
+        List of (listing_filter, quantity, booked_document_or_None) in input order
+    """
+    results = []
+    for listing_filter, quantity in bookings:
+        booked = book_listing(collection, listing_filter, quantity)
+        results.append((listing_filter, quantity, booked))
+    return results
+
+
+async def abook_many(collection, bookings) -> list:
+    """Async variant of book_many; the bookings are issued concurrently."""
+    bookings = list(bookings)
+    booked = await asyncio.gather(*(
+        abook_listing(collection, listing_filter, quantity) for listing_filter, quantity in bookings
+    ))
+    return [(listing_filter, quantity, item) for (listing_filter, quantity), item in zip(bookings, booked)]
@@ -0,0 +1,261 @@
+"""Bulk surplus ingestion for hotels posting a whole menu at once.
+
+Posting dishes one `store_food_in_db` call at a time costs an LLM turn, a
+location lookup and an insert round trip per dish. Here a batch is
+validated and normalized up front, the hotel location is parsed once, and
+the valid documents go out with `insert_many(ordered=False)` in chunks, so
+one bad row (or a duplicate key) does not stop the rest.
+
+Every input item gets an `ItemResult` in input order: "stored", "invalid"
+(rejected before the write) or "failed" (rejected by the server).
+
+Usage:
+    python bulk_ingest.py --uri mongodb://localhost:27017 --hotel "Taj Hotel" --location 25.2048,55.2708 menu.csv
+    python bulk_ingest.py --uri mongodb://localhost:27017 --hotel "Taj Hotel" --location 25.2048,55.2708 menu.json
+
+CSV files need a header with food_name, price and quantity columns (and
+optionally shelf_life_hours); JSON files hold a list of objects with the
+same keys.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from pymongo.errors import BulkWriteError
+
+from archival import DEFAULT_SHELF_LIFE, expiry_time
+from food_queries import normalize_food_name, normalized_name_fields
+
+INSERT_CHUNK_SIZE = 1000
+MAX_FOOD_NAME_LENGTH = 200
+
+
+class ItemResult(NamedTuple):
+    """Outcome for one item of a batch, in input order."""
+    index: int
+    food_name: str
+    status: str  # "stored", "invalid" or "failed"
+    detail: str = ""
+
+
+def parse_location(hotel_location: str) -> tuple:
+    """(lat, lon) from "latitude,longitude"; raises ValueError if malformed or out of range."""
+    lat, lon = map(float, hotel_location.split(','))
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"coordinates out of range: {hotel_location}")
+    return lat, lon
+
+
+def build_food_document(hotel_name: str, food_name: str, price: float, quantity: int, hotel_location: str,
+                        shelf_life: timedelta = DEFAULT_SHELF_LIFE) -> dict:
+    """Build a food_items document; raises ValueError for a malformed location."""
+    lat, lon = parse_location(hotel_location)
+    created_at = datetime.now()
+
+    return {
+        "hotel_name": hotel_name,
+        "food_name": food_name,
+        **normalized_name_fields(food_name, hotel_name),
+        "price": float(price),
+        "quantity": int(quantity),
+        # Never changes, so reports can tell how much of a listing sold
+        "posted_quantity": int(quantity),
+        "location": {
+            "type": "Point",
+            "coordinates": [lon, lat]
+        },
+        "hotel_location": hotel_location,
+        "timestamp": created_at,
+        "created_at": created_at,
+        "expires_at": expiry_time(created_at, shelf_life),
+        "is_available": True,
+        "status": "active"
+    }
+
+
+def normalize_item(item: dict) -> tuple:
+    """(food_name, price, quantity) from a raw row; raises ValueError if it is not a valid listing."""
+    food_name = " ".join(str(item.get("food_name") or "").split())
+    if not normalize_food_name(food_name):
+        raise ValueError("missing food name")
+    if len(food_name) > MAX_FOOD_NAME_LENGTH:
+        raise ValueError("food name too long")
+
+    try:
+        price = round(float(item.get("price")), 2)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid price: {item.get('price')!r}")
+    if not price >= 0:
+        raise ValueError(f"invalid price: {item.get('price')!r}")
+
+    try:
+        quantity = float(item.get("quantity"))
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid quantity: {item.get('quantity')!r}")
+    if quantity != int(quantity) or quantity < 1:
+        raise ValueError(f"invalid quantity: {item.get('quantity')!r}")
+
+    return food_name, price, int(quantity)
+
+
+def item_shelf_life(item: dict, default: timedelta) -> timedelta:
+    """The row's own shelf_life_hours if it has one, else `default`; raises ValueError if invalid."""
+    hours = item.get("shelf_life_hours")
+    if hours in (None, ""):
+        return default
+    try:
+        hours = float(hours)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid shelf life: {hours!r}")
+    if not hours > 0:
+        raise ValueError(f"invalid shelf life: {hours!r}")
+    return timedelta(hours=hours)
+
+
+def prepare_food_batch(hotel_name: str, items: list, hotel_location: str, shelf_life: timedelta = DEFAULT_SHELF_LIFE) -> tuple:
+    """Validate a batch and build its documents.
+
+    Returns (documents, positions, results): `documents[k]` is the document
+    for input item `positions[k]`, and `results` holds an ItemResult for each
+    rejected item and None for the ones still to be written. Raises
+    ValueError if the hotel name or location is unusable, since that
+    affects every item.
+    """
+    hotel_name = " ".join((hotel_name or "").split())
+    if not hotel_name:
+        raise ValueError("missing hotel name")
+    parse_location(hotel_location)
+
+    documents, positions = [], []
+    results = [None] * len(items)
+    seen = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = ItemResult(index, "", "invalid", "item is not an object")
+            continue
+        try:
+            food_name, price, quantity = normalize_item(item)
+            item_life = item_shelf_life(item, shelf_life)
+        except ValueError as e:
+            results[index] = ItemResult(index, str(item.get("food_name") or ""), "invalid", str(e))
+            continue
+        key = normalize_food_name(food_name)
+        if key in seen:
+            results[index] = ItemResult(index, food_name, "invalid", f"duplicate of item {seen[key] + 1}")
+            continue
+        seen[key] = index
+        documents.append(build_food_document(hotel_name, food_name, price, quantity, hotel_location, item_life))
+        positions.append(index)
+    return documents, positions, results
+
+
+def insert_food_batch(collection, hotel_name: str, items: list, hotel_location: str, chunk_size: int = INSERT_CHUNK_SIZE,
+                      shelf_life: timedelta = DEFAULT_SHELF_LIFE) -> tuple:
+    """Validate and insert a batch; returns (results, stored_documents)."""
+    documents, positions, results = prepare_food_batch(hotel_name, items, hotel_location, shelf_life)
+    failed = {}
+    for start in range(0, len(documents), chunk_size):
+        try:
+            collection.insert_many(documents[start:start + chunk_size], ordered=False)
+        except BulkWriteError as e:
+            failed.update(_write_errors(e, start))
+    return _finish(documents, positions, results, failed)
+
+
+async def ainsert_food_batch(collection, hotel_name: str, items: list, hotel_location: str, chunk_size: int = INSERT_CHUNK_SIZE,
+                             shelf_life: timedelta = DEFAULT_SHELF_LIFE) -> tuple:
+    """insert_food_batch for an AsyncMongoClient collection."""
+    documents, positions, results = prepare_food_batch(hotel_name, items, hotel_location, shelf_life)
+    failed = {}
+    for start in range(0, len(documents), chunk_size):
+        try:
+            await collection.insert_many(documents[start:start + chunk_size], ordered=False)
+        except BulkWriteError as e:
+            failed.update(_write_errors(e, start))
+    return _finish(documents, positions, results, failed)
+
+
+def _write_errors(error: BulkWriteError, offset: int) -> dict:
+    """Document index -> error message for the writes a chunk rejected."""
+    return {offset + write_error["index"]: write_error.get("errmsg", "write error")
+            for write_error in error.details.get("writeErrors", [])}
+
+
+def _finish(documents: list, positions: list, results: list, failed: dict) -> tuple:
+    stored = []
+    for k, (document, index) in enumerate(zip(documents, positions)):
+        if k in failed:
+            results[index] = ItemResult(index, document["food_name"], "failed", failed[k])
+        else:
+            results[index] = ItemResult(index, document["food_name"], "stored", str(document.get("_id", "")))
+            stored.append(document)
+    return results, stored
+
+
+def summarize_results(results: list, max_lines: int = 20) -> str:
+    """Short per-item report for the LLM or the terminal."""
+    stored = sum(1 for r in results if r.status == "stored")
+    lines = [f"Stored {stored} of {len(results)} items."]
+    problems = [r for r in results if r.status != "stored"]
+    for r in problems[:max_lines]:
+        lines.append(f"❌ item {r.index + 1} '{r.food_name}': {r.status} - {r.detail}")
+    if len(problems) > max_lines:
+        lines.append(f"... and {len(problems) - max_lines} more rejected items")
+    return "\n".join(lines)
+
+
+def load_items(path: str) -> list:
+    """Rows from a CSV (with header) or JSON (list of objects) file."""
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            items = json.load(f)
+        if not isinstance(items, list):
+            raise ValueError("JSON import must be a list of items")
+        return items
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", help="CSV or JSON file of items")
+    parser.add_argument("--uri", required=True, help="MongoDB connection string")
+    parser.add_argument("--database", default="food_waste_db")
+    parser.add_argument("--collection", default="food_items")
+    parser.add_argument("--hotel", required=True, help="Hotel name for every item")
+    parser.add_argument("--location", required=True, help='Hotel coordinates as "latitude,longitude"')
+    parser.add_argument("--chunk-size", type=int, default=INSERT_CHUNK_SIZE)
+    parser.add_argument("--shelf-life-hours", type=float, default=DEFAULT_SHELF_LIFE.total_seconds() / 3600,
+                        help="Hours until listings without their own shelf_life_hours expire")
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+    from active_counter import ActiveItemCounter
+    db = MongoClient(args.uri)[args.database]
+    collection = db[args.collection]
+
+    try:
+        items = load_items(args.file)
+        started = time.perf_counter()
+        results, stored = insert_food_batch(collection, args.hotel, items, args.location, args.chunk_size,
+                                            timedelta(hours=args.shelf_life_hours))
+        elapsed = time.perf_counter() - started
+    except (OSError, ValueError) as e:
+        print(f"❌ Import failed: {e}")
+        sys.exit(1)
+
+    if stored:
+        ActiveItemCounter(db, collection).increment(len(stored))
+    print(summarize_results(results))
+    print(f"✓ {len(stored)} items in {elapsed:.2f}s ({len(stored) / elapsed if elapsed else 0:.0f} items/s)")
+    if len(stored) < len(results):
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Rule-based parser for requests that do not need the LLM.
+
+A large share of messages are fully structured: "book pasta from Taj
+Hotel", "food under $10 within 5km", "I'm from Taj Hotel. We have 5 pasta
+portions for $8 each". For those, `parse_request()` extracts the tool
+arguments directly so the graph can call the tool without a Gemini round
+trip. Anything it is not sure about (missing budget, references like "the
+first option", negations, multiple items) returns None and goes to the
+LLM as before.
+
+`RouterMetrics` tracks how much traffic the fast path serves and an
+estimate of the LLM latency it saved.
+"""
+
+import re
+import threading
+from typing import NamedTuple
+
+NEARBY_DEFAULT_KM = 3
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+
+_DISTANCE = re.compile(
+    r"(?:within|under|in|less than|up to)?\s*" + _NUMBER + r"\s*(?:km|kms|kilometers?|kilometres?)\b(?:\s*(?:radius|away|of me|from me))?",
+    re.IGNORECASE
+)
+_NEARBY = re.compile(r"\b(?:nearby|near me|close by|close to me|closest|around me|in my area)\b", re.IGNORECASE)
+_PRICE = re.compile(
+    r"(?:(?:under|below|less than|max(?:imum)?|up to|upto|within|budget(?: of| is)?|for)\s*)?"
+    r"(?:\$|aed\s*|usd\s*)\s*" + _NUMBER + r"|"
+    r"(?:under|below|less than|max(?:imum)?|up to|upto|budget(?: of| is)?)\s*" + _NUMBER + r"(?![\d.])(?!\s*(?:km|kms|kilomet))\s*(?:\$|dollars?|bucks)?",
+    re.IGNORECASE
+)
+_BOOK = re.compile(
+    r"^(?:please\s+)?(?:book|order|reserve)\s+(?:me\s+)?(?:(?P<quantity>\d+)\s+(?:x\s+)?)?(?:the\s+|a\s+|an\s+|some\s+)?"
+    r"(?P<food>.+?)\s+from\s+(?:the\s+)?(?P<hotel>.+?)\s*[.!]*$",
+    re.IGNORECASE
+)
+_POST = re.compile(
+    r"^(?:(?:hi|hello|hey)[,!.]?\s*)?(?:i'?m|i am|we'?re|we are|this is)\s+(?:from\s+)?(?P<hotel>[^.,!]+?)\s*[.,!]\s*"
+    r"(?:we\s+have|we've got|we have got|there (?:are|is)|i have)\s+(?P<quantity>\d+)\s+(?P<food>.+?)\s+"
+    r"(?:for|at)\s+\$?\s*(?P<price>\d+(?:\.\d+)?)\s*\$?(?:\s*(?:each|per\s+\w+|a piece|apiece))?\s*[.!]*$",
+    re.IGNORECASE
+)
+
+_PORTION_WORDS = re.compile(r"\s+(?:portions?|plates?|servings?|boxes?|pieces?|packs?|trays?|bowls?)$", re.IGNORECASE)
+_LEADING_PORTION = re.compile(r"^(?:portions?|plates?|servings?|boxes?|packs?|trays?|bowls?)\s+of\s+", re.IGNORECASE)
+
+# Words that need conversational context or change the meaning of a request
+_AMBIGUOUS = re.compile(
+    r"\b(?:it|this|that|these|those|first|second|third|last|option|same|another|not|no|without|except|instead|cancel|or)\b|\?",
+    re.IGNORECASE
+)
+_SEARCH_WORDS = re.compile(r"\b(?:show|find|search|looking|want|need|get|any|food|something|anything|hungry|eat|meals?)\b", re.IGNORECASE)
+_FILLER = {
+    "show", "me", "find", "search", "for", "i", "want", "need", "some", "any", "food", "something", "anything",
+    "get", "looking", "please", "the", "a", "an", "cheap", "available", "can", "you", "to", "eat", "meal", "meals",
+    "hungry", "im", "i'm", "am", "options", "is", "there", "what", "under", "below", "within", "max", "budget",
+    "of", "less", "than", "up", "upto", "dollars", "dollar", "bucks", "km", "nearby", "near", "close", "around",
+    "in", "my", "area", "by", "with", "price"
+}
+MAX_ITEM_WORDS = 3
+# "order food from Taj" names no dish; the LLM asks which one
+_GENERIC_FOOD = {"food", "something", "anything", "stuff", "meal", "meals", "lunch", "dinner", "breakfast", "leftovers"}
+# Words that qualify a request (where from, when, for whom) rather than name a dish
+_QUALIFIERS = (r"from|at|today|tonight|tomorrow|later|morning|afternoon|evening|people|persons?|guests?|"
+               r"delivery|deliver|deliveries|pick\s*up|pickup")
+_SEARCH_QUALIFIERS = re.compile(r"\b(?:" + _QUALIFIERS + r")\b", re.IGNORECASE)
+# Inside a booking's dish or hotel name, also budgets, numbers and other trailing clauses
+_NAME_QUALIFIERS = re.compile(
+    r"\b(?:" + _QUALIFIERS + r"|under|below|less|over|above|max(?:imum)?|budget|upto|up to|for|by|with|within|near|"
+    r"nearby|around|each|please|asap|now)\b|[\d$€£]",
+    re.IGNORECASE
+)
+
+
+class Intent(NamedTuple):
+    """A request the fast path can serve: a tool action and its arguments."""
+    action: str  # "search", "book" or "post"
+    args: dict
+
+
+def parse_request(text: str, user_type: str):
+    """Parse a message into an Intent, or None if the LLM should handle it."""
+    text = (text or "").strip()
+    if not text or len(text) > 200:
+        return None
+
+    if user_type == "worker":
+        return _parse_booking(text) or _parse_search(text)
+    if user_type == "hotel":
+        return _parse_post(text)
+    return None
+
+
+def _parse_booking(text: str):
+    match = _BOOK.match(text)
+    if not match:
+        return None
+    food = match.group("food").strip()
+    hotel = match.group("hotel").strip()
+    if _AMBIGUOUS.search(food) or _AMBIGUOUS.search(hotel) or re.search(r"\band\b|,", food + " " + hotel):
+        return None
+    if food.lower() in _GENERIC_FOOD or _NAME_QUALIFIERS.search(food) or _NAME_QUALIFIERS.search(hotel):
+        return None
+    quantity = int(match.group("quantity") or 1)
+    if quantity < 1:
+        return None
+    return Intent("book", {"hotel_name": hotel, "food_name": food, "quantity": quantity})
+
+
+def _parse_search(text: str):
+    if _AMBIGUOUS.search(text) or re.search(r"\b(?:book|order|reserve)\b", text, re.IGNORECASE):
+        return None
+
+    price_match = _PRICE.search(text)
+    if not price_match:
+        return None  # no budget: the LLM asks for one
+    max_price = float(price_match.group(1) or price_match.group(2))
+
+    remaining = text[:price_match.start()] + " " + text[price_match.end():]
+    max_distance_km = None
+    distance_match = _DISTANCE.search(remaining)
+    if distance_match:
+        max_distance_km = float(distance_match.group(1))
+        remaining = remaining[:distance_match.start()] + " " + remaining[distance_match.end():]
+    elif _NEARBY.search(remaining):
+        max_distance_km = NEARBY_DEFAULT_KM
+        remaining = _NEARBY.sub(" ", remaining)
+
+    if not _SEARCH_WORDS.search(text) and not remaining.strip(" .!,"):
+        return None
+
+    words = [w for w in re.findall(r"[a-z][a-z'-]*", remaining.lower()) if w not in _FILLER]
+    if len(words) > MAX_ITEM_WORDS or re.search(r"\d", remaining) or _SEARCH_QUALIFIERS.search(remaining):
+        return None
+    item_name = " ".join(words) or None
+
+    return Intent("search", {"max_price": max_price, "item_name": item_name, "max_distance_km": max_distance_km})
+
+
+def _parse_post(text: str):
+    match = _POST.match(text)
+    if not match:
+        return None
+    food = _LEADING_PORTION.sub("", _PORTION_WORDS.sub("", match.group("food").strip()))
+    hotel = match.group("hotel").strip()
+    quantity = int(match.group("quantity"))
+    if not food or quantity < 1 or re.search(r"\band\b|,", food) or _AMBIGUOUS.search(food):
+        return None
+    return Intent("post", {"hotel_name": hotel, "food_name": food, "price": float(match.group("price")), "quantity": quantity})
+
+
+class RouterMetrics:
+    """Counts fast-path vs. LLM turns and estimates the latency saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fast_path_turns = 0
+        self.llm_turns = 0
+        self.fast_path_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def record_fast_path(self, seconds: float):
+        with self._lock:
+            self.fast_path_turns += 1
+            self.fast_path_seconds += seconds
+
+    def record_fallback(self):
+        with self._lock:
+            self.llm_turns += 1
+
+    def record_llm_call(self, seconds: float):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+
+    def summary(self) -> dict:
+        with self._lock:
+            total_turns = self.fast_path_turns + self.llm_turns
+            avg_llm_call = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+            llm_calls_per_turn = self.llm_calls / self.llm_turns if self.llm_turns else 0.0
+            avg_fast_path = self.fast_path_seconds / self.fast_path_turns if self.fast_path_turns else 0.0
+            saved = self.fast_path_turns * avg_llm_call * llm_calls_per_turn
+            return {
+                "turns": total_turns,
+                "fast_path_turns": self.fast_path_turns,
+                "fast_path_fraction": self.fast_path_turns / total_turns if total_turns else 0.0,
+                "avg_fast_path_ms": avg_fast_path * 1000,
+                "avg_llm_call_ms": avg_llm_call * 1000,
+                "llm_calls_per_llm_turn": llm_calls_per_turn,
+                "estimated_llm_seconds_saved": saved
+            }
@@ -0,0 +1,134 @@
+"""Typo-tolerant food-name index for the listing cache.
+
+MongoDB item search matches each searched word as a prefix of a word in
+the listing's name (see food_queries.py). That finds "tikka" in "Paneer
+Tikka", and synonyms find "Chow Mein" for "noodles", but "chiken" finds
+nothing. `FoodNameIndex` answers the same queries from memory and also
+accepts words within a small edit distance of a name word.
+
+It keeps an inverted index from name words to listing ids, and a trigram
+index over the distinct words. A query word is expanded once to the
+vocabulary words it matches, and the result is cached until the
+vocabulary changes:
+- prefix: every word starting with it, as in MongoDB
+- typo: words within `max_edits(word)` edits (optimal string alignment
+  distance, so a swapped pair of letters is one edit). Candidates must
+  share enough trigrams with the query word: one edit changes at most
+  three of a word's padded trigrams.
+
+The listing cache adds each listing's words when it is stored (in
+`store_food_in_db` and the batch and change-stream paths) and drops them
+when it sells out or is archived.
+"""
+
+from collections import Counter
+
+from food_queries import food_name_tokens, item_name_alternatives
+
+# Words shorter than this only match by prefix ("beef" must not find "beer")
+MIN_TYPO_LENGTH = 5
+# Cached query-word expansions; cleared when full or the vocabulary changes
+MAX_CACHED_EXPANSIONS = 10000
+
+
+def max_edits(word: str) -> int:
+    if len(word) < MIN_TYPO_LENGTH:
+        return 0
+    return 1 if len(word) < 9 else 2
+
+
+def trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 once it is known to exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class FoodNameIndex:
+    """Listing ids by name word, searchable by prefix, synonym and near-miss spelling."""
+
+    def __init__(self):
+        self._words = {}       # listing id -> its name words
+        self._postings = {}    # word -> set of listing ids
+        self._by_trigram = {}  # trigram -> set of words
+        self._expansions = {}  # query word -> frozenset of matching words
+
+    def __len__(self):
+        return len(self._words)
+
+    def add(self, listing_id, food_name: str):
+        self.remove(listing_id)
+        words = tuple(dict.fromkeys(food_name_tokens(food_name)))
+        self._words[listing_id] = words
+        for word in words:
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = set()
+                for trigram in trigrams(word):
+                    self._by_trigram.setdefault(trigram, set()).add(word)
+                self._expansions.clear()
+            postings.add(listing_id)
+
+    def remove(self, listing_id):
+        for word in self._words.pop(listing_id, ()):
+            postings = self._postings[word]
+            postings.discard(listing_id)
+            if postings:
+                continue
+            del self._postings[word]
+            for trigram in trigrams(word):
+                words = self._by_trigram[trigram]
+                words.discard(word)
+                if not words:
+                    del self._by_trigram[trigram]
+            self._expansions.clear()
+
+    def matching_words(self, query_word: str) -> frozenset:
+        """Vocabulary words that `query_word` matches, by prefix or within its edit budget."""
+        matches = self._expansions.get(query_word)
+        if matches is not None:
+            return matches
+        found = {word for word in self._postings if word.startswith(query_word)}
+        edits = max_edits(query_word)
+        if edits:
+            query_trigrams = trigrams(query_word)
+            shared = Counter(word for trigram in query_trigrams for word in self._by_trigram.get(trigram, ()))
+            needed = len(query_trigrams) - 3 * edits
+            found.update(word for word, count in shared.items()
+                         if count >= needed and word not in found and edit_distance(query_word, word, edits) <= edits)
+        if len(self._expansions) >= MAX_CACHED_EXPANSIONS:
+            self._expansions.clear()
+        matches = self._expansions[query_word] = frozenset(found)
+        return matches
+
+    def search(self, item_name: str) -> set:
+        """Ids of listings whose name matches every searched word of any alternative (see item_name_alternatives)."""
+        found = set()
+        for tokens in item_name_alternatives(item_name):
+            ids = None
+            for token in tokens:
+                token_ids = set()
+                for word in self.matching_words(token):
+                    token_ids |= self._postings[word]
+                ids = token_ids if ids is None else ids & token_ids
+                if not ids:
+                    break
+            found |= ids or set()
+        return found
@@ -0,0 +1,290 @@
+"""Query shapes used by the food tools.
+
+Keeping the filters and pipelines in one place means the tools, the
+listing cache and the index plan check in `indexes.py` all agree on what
+the queries look like.
+
+Item search matches the words of the food name by prefix against the
+normalized `food_name_tokens` field ("tikka" finds "Chicken Tikka",
+"pizz" finds "Pizza"). An anchored, case-sensitive prefix on a lowercase
+multikey field is answered from the index, unlike the old unanchored,
+case-insensitive `$regex` on `food_name`, which had to scan every row.
+Dishes that go by several names (`FOOD_SYNONYMS`) are searched under all
+of them: "noodles" also finds "Chow Mein". The listing cache adds typo
+tolerance on top (see food_names.py).
+
+Results are paged with a keyset on (price, _id) or (distance, _id): a
+`next_page` token carries the sort key of the last row shown, and the
+next query starts strictly after it, so deep pages cost the same as the
+first one and nothing is skipped or repeated when listings change.
+Ranked searches (see ranking.py) page on (score, _id) instead; their
+token also carries the time and price scale the scores were computed
+with, so every page ranks the candidates the same way.
+
+Each result carries a listing handle, its ObjectId in base 36, and
+booking by handle is a lookup on _id. Booking by name matches the
+normalized `hotel_name_norm` and `food_name_norm` fields exactly,
+instead of the old anchored case-insensitive `$regex`, which could not
+use an index and broke on names with `(`, `+` or `.`.
+"""
+
+import base64
+import functools
+import json
+import re
+from datetime import datetime
+from typing import NamedTuple
+
+from bson import ObjectId
+
+_WORD = re.compile(r"[a-z0-9]+")
+_HANDLE_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+_HEX_ID = re.compile(r"[0-9a-f]{24}")
+
+# Only the fields the search results show
+SEARCH_PROJECTION = {
+    "hotel_name": 1,
+    "food_name": 1,
+    "price": 1,
+    "quantity": 1,
+    "hotel_location": 1,
+    "timestamp": 1,
+    "created_at": 1
+}
+
+
+# Names for the same dish; searching for one finds listings under any of them
+FOOD_SYNONYMS = [
+    ("noodles", "chow mein", "lo mein", "ramen", "udon"),
+    ("fries", "chips"),
+    ("eggplant", "aubergine", "brinjal"),
+    ("zucchini", "courgette"),
+    ("chickpeas", "chana", "garbanzo"),
+    ("cottage cheese", "paneer"),
+    ("lentils", "dal", "daal", "dhal"),
+    ("spinach", "palak", "saag"),
+    ("potato", "aloo"),
+    ("prawns", "shrimp"),
+    ("coriander", "cilantro"),
+    ("yogurt", "yoghurt", "curd", "dahi", "laban"),
+    ("flatbread", "naan", "roti", "chapati", "khubz"),
+    ("shawarma", "doner", "gyro"),
+    ("soda", "soft drink", "cola"),
+]
+
+
+class PageToken(NamedTuple):
+    after: tuple                # (sort_value, _id) of the last row shown
+    ranked_at: datetime = None  # set for ranked searches
+    scale: float = None
+
+
+def normalize_food_name(food_name: str) -> str:
+    """Lowercase a food name and collapse punctuation/whitespace to single spaces."""
+    return " ".join(food_name_tokens(food_name))
+
+
+def food_name_tokens(food_name: str) -> list:
+    """Split a food name into lowercase words."""
+    return _WORD.findall(food_name.lower())
+
+
+def normalize_hotel_name(hotel_name: str) -> str:
+    """Case-folded hotel name with whitespace collapsed; punctuation is kept, so "Joe's (Downtown)" stays distinct."""
+    return " ".join(hotel_name.casefold().split())
+
+
+def normalized_name_fields(food_name: str, hotel_name: str = None) -> dict:
+    """Fields to store alongside `food_name` (and `hotel_name`) so item search and booking can use an index."""
+    fields = {
+        "food_name_norm": normalize_food_name(food_name),
+        "food_name_tokens": food_name_tokens(food_name)
+    }
+    if hotel_name is not None:
+        fields["hotel_name_norm"] = normalize_hotel_name(hotel_name)
+    return fields
+
+
+def listing_handle(listing_id) -> str:
+    """Short handle for a listing: its ObjectId in base 36 (at most 19 characters instead of 24).
+
+    It decodes back to the _id (see parse_listing_handle); ids that are
+    not ObjectIds are shown as they are.
+    """
+    if not isinstance(listing_id, ObjectId):
+        return str(listing_id)
+    number = int(str(listing_id), 16)
+    digits = []
+    while number:
+        number, digit = divmod(number, 36)
+        digits.append(_HANDLE_DIGITS[digit])
+    return "".join(reversed(digits)) or "0"
+
+
+def parse_listing_handle(handle: str) -> ObjectId:
+    """The _id behind a listing handle (or a 24-digit hex ObjectId); raises ValueError if it is neither."""
+    handle = str(handle).strip().lower()
+    if _HEX_ID.fullmatch(handle):
+        return ObjectId(handle)
+    try:
+        number = int(handle, 36)
+    except ValueError:
+        raise ValueError(f"invalid listing id: {handle!r}") from None
+    if not 0 <= number < 1 << 96:
+        raise ValueError(f"invalid listing id: {handle!r}")
+    return ObjectId(f"{number:024x}")
+
+
+def booking_query(hotel_name: str = None, food_name: str = None, listing_id: str = None, now: datetime = None) -> dict:
+    """Filter for the unexpired listing to book: by handle when given, else by normalized hotel and food name.
+
+    Raises ValueError for a malformed handle, or when neither a handle nor
+    both names are given.
+    """
+    query = {"expires_at": {"$gt": now or datetime.now()}}
+    if listing_id:
+        query["_id"] = parse_listing_handle(listing_id)
+        return query
+    if not hotel_name or not food_name:
+        raise ValueError("a booking needs a listing id, or a hotel name and a food name")
+    query["hotel_name_norm"] = normalize_hotel_name(hotel_name)
+    food_name_norm = normalize_food_name(food_name)
+    # Names without a single latin letter or digit normalize to nothing
+    if food_name_norm:
+        query["food_name_norm"] = food_name_norm
+    else:
+        query["food_name"] = food_name.strip()
+    return query
+
+
+def _same_word(searched: str, word: str) -> bool:
+    return searched == word or searched + "s" == word or searched == word + "s"
+
+
+def _find_phrase(tokens: list, phrase: list):
+    for start in range(len(tokens) - len(phrase) + 1):
+        if all(_same_word(token, word) for token, word in zip(tokens[start:], phrase)):
+            return start
+    return None
+
+
+_SYNONYM_GROUPS = [[tuple(food_name_tokens(name)) for name in group] for group in FOOD_SYNONYMS]
+
+
+@functools.lru_cache(maxsize=1024)
+def item_name_alternatives(item_name: str) -> tuple:
+    """Word tuples a listing's name may match: the searched words, then each synonym swapped in."""
+    tokens = tuple(food_name_tokens(item_name))
+    alternatives = [tokens] if tokens else []
+    for group in _SYNONYM_GROUPS:
+        for phrase in group:
+            start = _find_phrase(tokens, phrase)
+            if start is None:
+                continue
+            for other in group:
+                if other == phrase:
+                    continue
+                alternative = tokens[:start] + other + tokens[start + len(phrase):]
+                if alternative not in alternatives:
+                    alternatives.append(alternative)
+            break
+    return tuple(alternatives)
+
+
+def _prefix_filter(tokens: list) -> dict:
+    prefixes = [re.compile("^" + re.escape(token)) for token in tokens]
+    if len(prefixes) == 1:
+        return {"food_name_tokens": prefixes[0]}
+    return {"$and": [{"food_name_tokens": prefix} for prefix in prefixes]}
+
+
+def item_name_filter(item_name: str) -> dict:
+    """Filter matching listings whose name has a word starting with each searched word (or a synonym's)."""
+    alternatives = [_prefix_filter(tokens) for tokens in item_name_alternatives(item_name)]
+    if not alternatives:
+        return {}
+    if len(alternatives) == 1:
+        return alternatives[0]
+    # Under $and so it does not collide with the page keyset's top-level $or
+    return {"$and": [{"$or": alternatives}]}
+
+
+def matches_item_name(document: dict, item_name: str) -> bool:
+    """In-process equivalent of item_name_filter for cached listings."""
+    words = document.get("food_name_tokens") or food_name_tokens(document["food_name"])
+    return any(all(any(word.startswith(token) for word in words) for token in tokens)
+               for tokens in item_name_alternatives(item_name))
+
+
+def search_query(max_price: float, item_name: str = None, after: tuple = None, now: datetime = None) -> dict:
+    """Filter for available, unexpired listings within budget, optionally by item name.
+
+    `after` is a decoded page token, (price, _id) of the last row already
+    shown; only listings sorting after it by (price, _id) match.
+    """
+    query = {
+        "is_available": True,
+        "price": {"$lte": max_price},
+        "expires_at": {"$gt": now or datetime.now()}
+    }
+    if item_name:
+        query.update(item_name_filter(item_name))
+    if after is not None:
+        price, listing_id = after
+        query["price"]["$gte"] = price
+        query["$or"] = [{"price": {"$gt": price}}, {"_id": {"$gt": listing_id}}]
+    return query
+
+
+def geo_search_pipeline(lat: float, lon: float, max_distance_meters: float, max_price: float, item_name: str = None,
+                        after: tuple = None, limit: int = None) -> list:
+    """$geoNear pipeline for available listings within budget and radius, nearest first.
+
+    The availability and price filters go in $geoNear's own `query` so the
+    compound 2dsphere index can apply them while walking outwards. `after`
+    is a decoded page token, (distance, _id) of the last row already shown:
+    `minDistance` skips the nearer rings and the $match drops ties already
+    returned.
+    """
+    geo_near = {
+        "near": {
+            "type": "Point",
+            "coordinates": [lon, lat]
+        },
+        "distanceField": "distance",
+        "maxDistance": max_distance_meters,
+        "query": search_query(max_price, item_name),
+        "spherical": True
+    }
+    pipeline = [{"$geoNear": geo_near}]
+    if after is not None:
+        distance, listing_id = after
+        geo_near["minDistance"] = distance
+        pipeline.append({"$match": {"$or": [{"distance": {"$gt": distance}}, {"_id": {"$gt": listing_id}}]}})
+    if limit is not None:
+        pipeline.append({"$sort": {"distance": 1, "_id": 1}})
+        pipeline.append({"$limit": limit})
+        pipeline.append({"$project": {**SEARCH_PROJECTION, "distance": 1}})
+    return pipeline
+
+
+def encode_page_token(sort_value: float, listing_id, ranked_at: datetime = None, scale: float = None) -> str:
+    """Opaque next_page token for the row with this sort key (price, distance or score) and _id."""
+    payload = {"k": sort_value, "id": str(listing_id), "oid": isinstance(listing_id, ObjectId)}
+    if ranked_at is not None:
+        payload["t"] = ranked_at.timestamp()
+        payload["s"] = scale
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_page_token(token: str) -> PageToken:
+    """PageToken from a next_page token; raises ValueError if it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        listing_id = ObjectId(payload["id"]) if payload["oid"] else payload["id"]
+        if "t" in payload:
+            return PageToken((float(payload["k"]), listing_id), datetime.fromtimestamp(payload["t"]), float(payload["s"]))
+        return PageToken((float(payload["k"]), listing_id))
+    except Exception as e:
+        raise ValueError(f"invalid page token: {token!r}") from e
@@ -0,0 +1,114 @@
+"""Vectorized great-circle distances and an in-memory nearest-neighbour index.
+
+`haversine_m()` computes the distance from one point to N points in one
+NumPy pass. `GeoIndex` is a static grid index over a snapshot of points.
+Points are sorted by (lat cell, lon cell) key, and each row of cells a
+query touches is one contiguous slice found by binary search. Radius
+queries are exact: the grid only picks the candidates, and the haversine
+decides. `nearest()` grows the radius until k points fall inside it.
+
+The listing cache builds one over the active listings, so nearby searches
+can be answered locally instead of with a `$geoNear` round trip.
+"""
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111195.0
+DEFAULT_CELL_DEGREES = 0.05
+
+# Cell keys are row * _ROW_STRIDE + column; columns span at most 360 / cell size
+_ROW_STRIDE = 1 << 32
+
+
+def parse_coordinates(coordinates: str) -> tuple:
+    """(lat, lon) from "latitude,longitude"; raises ValueError if malformed."""
+    lat, lon = map(float, coordinates.split(','))
+    return lat, lon
+
+
+def haversine_m(lat: float, lon: float, lats, lons) -> np.ndarray:
+    """Distances in meters from (lat, lon) to each of (lats, lons), all in degrees."""
+    lat1 = math.radians(lat)
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lats - lat1
+    dlon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoIndex:
+    """Static lat/lon grid index with exact radius and k-nearest queries."""
+
+    def __init__(self, ids, lats, lons, cell_degrees: float = DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        keys = self._keys_for(lats, lons)
+        order = np.argsort(keys, kind="stable")
+
+        self.ids = [ids[i] for i in order] if not isinstance(ids, np.ndarray) else ids[order]
+        self._lats = lats[order]
+        self._lons = lons[order]
+        self._keys = keys[order]
+        self._cell_count = len(np.unique(self._keys)) if len(self._keys) else 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def radius(self, lat: float, lon: float, radius_m: float) -> tuple:
+        """(positions, distances) of every point within `radius_m`, nearest first.
+
+        Positions index into `self.ids`.
+        """
+        candidates = self._candidates(lat, lon, radius_m)
+        distances = haversine_m(lat, lon, self._lats[candidates], self._lons[candidates])
+        inside = distances <= radius_m
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+    def nearest(self, lat: float, lon: float, k: int, max_radius_m: float = None) -> tuple:
+        """(positions, distances) of the k nearest points (within `max_radius_m` if given)."""
+        if not len(self) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        radius_m = self.cell_degrees * METERS_PER_DEGREE_LAT
+        limit = max_radius_m if max_radius_m is not None else math.pi * EARTH_RADIUS_M
+        while True:
+            radius_m = min(radius_m, limit)
+            positions, distances = self.radius(lat, lon, radius_m)
+            if len(positions) >= k or radius_m >= limit:
+                return positions[:k], distances[:k]
+            radius_m *= 2
+
+    def _keys_for(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        rows = np.floor(lats / self.cell_degrees).astype(np.int64)
+        columns = np.floor(lons / self.cell_degrees).astype(np.int64)
+        return rows * _ROW_STRIDE + columns
+
+    def _candidates(self, lat: float, lon: float, radius_m: float) -> np.ndarray:
+        """Positions of the points in every grid cell the radius can reach."""
+        lat_span = radius_m / METERS_PER_DEGREE_LAT
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_span, 90.0)))
+        lon_span = radius_m / (METERS_PER_DEGREE_LAT * cos_lat) if cos_lat > 1e-9 else 360.0
+
+        row_low = math.floor((lat - lat_span) / self.cell_degrees)
+        row_high = math.floor((lat + lat_span) / self.cell_degrees)
+        column_low = math.floor((lon - lon_span) / self.cell_degrees)
+        column_high = math.floor((lon + lon_span) / self.cell_degrees)
+
+        # Near the poles, across the antimeridian, or covering more cells
+        # than are occupied, a scan is as cheap as the slicing
+        rows = row_high - row_low + 1
+        if lon - lon_span < -180 or lon + lon_span > 180 or rows * (column_high - column_low + 1) > 4 * self._cell_count:
+            return np.arange(len(self))
+
+        starts = np.arange(row_low, row_high + 1, dtype=np.int64) * _ROW_STRIDE
+        lows = np.searchsorted(self._keys, starts + column_low, side="left")
+        highs = np.searchsorted(self._keys, starts + column_high, side="right")
+        slices = [np.arange(low, high) for low, high in zip(lows, highs) if high > low]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(slices)
@@ -0,0 +1,238 @@
+"""Geolocation providers and a location cache.
+
+The prompt has the model call get_location() on every hotel post and
+worker search, yet a hotel's or worker's position barely changes between
+messages. `LocationCache` remembers the last fix per key for a TTL and
+refreshes low-accuracy (IP-based) fixes sooner. Concurrent cold lookups
+for the same key are coalesced into a single provider request.
+
+Providers implement `locate()` / `alocate()` and return a `Location` or
+None. `GoogleGeolocationProvider` calls the Google Geolocation API, which
+locates the machine making the request (this server), not the chat
+client, so its answer is the same for every client and is cached once per
+process. Providers that can locate a given address set `uses_client_ip`
+and are cached per client IP. `FakeLocationProvider` answers from fixed
+coordinates, optionally per client IP, for offline runs.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import requests
+
+from tracing import logger
+
+GOOGLE_GEOLOCATION_URL = "https://www.googleapis.com/geolocation/v1/geolocate"
+
+
+class Location(NamedTuple):
+    lat: float
+    lng: float
+    accuracy: float = None
+
+    def coordinates(self) -> str:
+        return f"{self.lat},{self.lng}"
+
+
+class LocationProvider:
+    """Interface for geolocation back ends."""
+
+    # True if locate() answers for `client_ip`; otherwise it locates this process
+    uses_client_ip = False
+
+    def locate(self, client_ip: str = None):
+        raise NotImplementedError
+
+    async def alocate(self, client_ip: str = None):
+        return await asyncio.to_thread(self.locate, client_ip)
+
+
+class GoogleGeolocationProvider(LocationProvider):
+    """Google Geolocation API (IP-based when no Wi-Fi/cell data is sent).
+
+    With `considerIp` the API uses the address the request comes from, so
+    `client_ip` is ignored and every lookup returns this server's location.
+    """
+
+    def __init__(self, api_key: str, timeout: float = 5):
+        self.api_key = api_key
+        self.timeout = timeout
+        self._async_client = None
+
+    def locate(self, client_ip: str = None):
+        response = requests.post(self._url(), json={"considerIp": True}, timeout=self.timeout)
+        return self._parse(response.status_code, response.json() if response.status_code == 200 else None)
+
+    async def alocate(self, client_ip: str = None):
+        import httpx
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._async_client.post(self._url(), json={"considerIp": True})
+        return self._parse(response.status_code, response.json() if response.status_code == 200 else None)
+
+    def _url(self) -> str:
+        return f"{GOOGLE_GEOLOCATION_URL}?key={self.api_key}"
+
+    def _parse(self, status_code: int, data: dict):
+        if status_code != 200:
+            logger.warning("   ⚠️ Geolocation API returned status code: %s", status_code)
+            return None
+        location = data.get('location', {})
+        lat = location.get('lat')
+        lng = location.get('lng')
+        if lat is None or lng is None:
+            logger.warning("   ⚠️ Could not get coordinates from the geolocation API")
+            return None
+        return Location(lat, lng, data.get('accuracy'))
+
+
+class FakeLocationProvider(LocationProvider):
+    """Offline provider: fixed coordinates, optionally per client IP."""
+
+    def __init__(self, default: Location = Location(25.2048, 55.2708, 50.0), by_client_ip: dict = None, latency: float = 0.0):
+        self.default = default
+        self.by_client_ip = by_client_ip or {}
+        self.latency = latency
+        self.calls = 0
+
+    @property
+    def uses_client_ip(self) -> bool:
+        return bool(self.by_client_ip)
+
+    def locate(self, client_ip: str = None):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.by_client_ip.get(client_ip, self.default)
+
+    async def alocate(self, client_ip: str = None):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.by_client_ip.get(client_ip, self.default)
+
+
+class _Pending:
+    """A lookup in flight that other callers for the same key can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.location = None
+
+
+class LocationCache:
+    """TTL cache of client locations with accuracy-aware refresh and coalescing."""
+
+    def __init__(self, provider: LocationProvider, ttl_seconds: float = 600, low_accuracy_meters: float = 5000,
+                 low_accuracy_ttl_seconds: float = 60, max_entries: int = 10000, on_lookup=None):
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self.low_accuracy_meters = low_accuracy_meters
+        self.low_accuracy_ttl_seconds = low_accuracy_ttl_seconds
+        self.max_entries = max_entries
+        self.on_lookup = on_lookup  # called with "hit", "miss" or "coalesced"
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (fetched_at, Location), least recently used first
+        self._pending = {}          # key -> _Pending (sync callers)
+        self._async_pending = {}    # key -> asyncio.Future (async callers)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: str, client_ip: str = None):
+        """Cached location for `key`, looking it up (once) if missing or stale."""
+        with self._lock:
+            location = self._fresh(key)
+            if location is not None:
+                self.hits += 1
+                self._observe("hit")
+                return location
+            pending = self._pending.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._pending[key] = _Pending()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        self._observe("miss" if leader else "coalesced")
+
+        if not leader:
+            pending.done.wait(timeout=30)
+            return pending.location
+
+        try:
+            pending.location = self.provider.locate(client_ip)
+        finally:
+            with self._lock:
+                self._store(key, pending.location)
+                del self._pending[key]
+            pending.done.set()
+        return pending.location
+
+    async def aget(self, key: str, client_ip: str = None):
+        """Async variant of get(); coalesces concurrent lookups on the event loop."""
+        with self._lock:
+            location = self._fresh(key)
+            if location is not None:
+                self.hits += 1
+                self._observe("hit")
+                return location
+            future = self._async_pending.get(key)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+        self._observe("coalesced" if future is not None else "miss")
+
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_pending[key] = future
+        location = None
+        try:
+            location = await self.provider.alocate(client_ip)
+        finally:
+            with self._lock:
+                self._store(key, location)
+                del self._async_pending[key]
+            future.set_result(location)
+        return location
+
+    def put(self, key: str, location: Location):
+        with self._lock:
+            self._store(key, location)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _observe(self, outcome: str):
+        if self.on_lookup is not None:
+            self.on_lookup(outcome)
+
+    def _fresh(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        fetched_at, location = entry
+        ttl = self.ttl_seconds
+        if location.accuracy is not None and location.accuracy > self.low_accuracy_meters:
+            ttl = self.low_accuracy_ttl_seconds
+        if time.monotonic() - fetched_at > ttl:
+            return None
+        self._entries.move_to_end(key)
+        return location
+
+    def _store(self, key: str, location):
+        # Failed lookups are not cached, so the next call retries
+        if location is None:
+            return
+        self._entries[key] = (time.monotonic(), location)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
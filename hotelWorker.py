@@ -1,93 +1,392 @@
 from typing import Annotated, TypedDict, Sequence, Literal
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langgraph.graph import StateGraph, END
 from langchain_core.tools import tool
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode
-from datetime import datetime
+from langgraph.prebuilt import InjectedState, ToolNode
+from datetime import datetime, timedelta
+import threading
+import time
+import uuid
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
-import requests
+
+from booking import book_listing, book_many as book_many_listings
+from reservations import (RESERVATIONS_COLLECTION_NAME, ReservationReaper, cancel_reservation as cancel_held_reservation,
+                          confirm_reservation, hold_listing, hold_many, reopened)
+from subscriptions import LocalSink, NotificationDispatcher, SubscriptionIndex, build_sinks, find_sink, new_subscription
+from archival import HISTORY_COLLECTION_NAME, ArchiveSweeper
+from bulk_ingest import build_food_document, insert_food_batch, summarize_results
+from listing_cache import ListingCache
+from result_cache import CollectionVersions, ResponseCache, SearchResultCache
+from active_counter import ActiveItemCounter
+from food_queries import (SEARCH_PROJECTION, booking_query, decode_page_token, encode_page_token, geo_search_pipeline, listing_handle,
+                          search_query)
+from indexes import migrate, missing_indexes
+from reports import format_listing, format_summary, list_listings
+from sessions import SESSIONS_COLLECTION_NAME, SessionStore
+from geolocation import GoogleGeolocationProvider, LocationCache
+from geo import haversine_m, parse_coordinates
+from ranking import CHEAPEST, RankingWeights, price_scale, rank_listings
+from fast_router import RouterMetrics, parse_request
+from prompts import TOOL_RESULT_MAX_CHARS, system_prompt, trim_tool_results
+from tracing import MongoCommandTracer, Tracer, build_exporters, configure_logging, llm_usage, logger, set_attributes
 
 # MongoDB Configuration
 MONGODB_URI = "Enter your MongoDB URI here"
 DATABASE_NAME = "food_waste_db"
 COLLECTION_NAME = "food_items"
 
-try:
-    print("🔌 Connecting to MongoDB...")
-    mongo_client = MongoClient(MONGODB_URI)
-    mongo_client.admin.command('ping')
-    print("✓ Successfully connected to MongoDB!")
-    
-    db = mongo_client[DATABASE_NAME]
-    food_collection = db[COLLECTION_NAME]
-    
-    food_collection.create_index("hotel_name")
-    food_collection.create_index("price")
-    food_collection.create_index("food_name")
-    food_collection.create_index("is_available")
-    food_collection.create_index("created_at")
-    
-    food_collection.create_index([("location", "2dsphere")])
+# Connection pool and timeouts. The client connects on first use, so
+# importing this module never waits on (or fails because of) MongoDB.
+MONGO_MAX_POOL_SIZE = 50
+MONGO_MIN_POOL_SIZE = 0
+MONGO_MAX_IDLE_TIME_MS = 60000
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000
+MONGO_CONNECT_TIMEOUT_MS = 5000
+MONGO_SOCKET_TIMEOUT_MS = 30000
+# Indexes and backfills of older listings are a one-time migration
+# (python indexes.py --uri ...); True runs it every time the app starts
+RUN_MIGRATIONS_ON_STARTUP = False
+
+# Serve worker searches from an in-process snapshot of active listings
+USE_LISTING_CACHE = True
+LISTING_CACHE_MAX_STALENESS_SECONDS = 5
+# Nearby searches: True filters and sorts by distance on the cached snapshot
+# (NumPy grid index, see geo.py), False always sends a $geoNear to MongoDB
+USE_LOCAL_GEO_SEARCH = True
+
+# First-page search results are cut from cached candidates shared by
+# nearby workers with similar budgets (see result_cache.py); every write to
+# the listings invalidates them. Only used when searches go to MongoDB
+# (USE_LISTING_CACHE off): the listing cache already answers in about a
+# millisecond, faster than cutting a result from the candidates
+USE_SEARCH_RESULT_CACHE = True
+SEARCH_CACHE_TTL_SECONDS = 30
+SEARCH_CACHE_MAX_ENTRIES = 2000
+SEARCH_CACHE_MAX_ROWS = 200000
+SEARCH_CACHE_CELL_DEGREES = 0.01
+# Reuse the model's response for an identical normalized input (system
+# prompt, history, user text, tool results) instead of calling Gemini again
+USE_LLM_RESPONSE_CACHE = False
+LLM_RESPONSE_CACHE_TTL_SECONDS = 300
+LLM_RESPONSE_CACHE_MAX_ENTRIES = 5000
+LLM_RESPONSE_CACHE_MAX_CHARS = 5_000_000
+
+# Per-session conversation history
+SESSION_MAX_SESSIONS = 1000
+SESSION_TTL_SECONDS = 3600
+SESSION_MAX_HISTORY_TOKENS = 2000
+SESSION_PERSIST_TO_MONGO = False
+
+# Answer fully structured requests without calling the LLM
+USE_FAST_PATH_ROUTER = True
+
+# Shrink tool results the model has already answered from before they are
+# resent (search pages to one line per listing, others to a length bound)
+TRIM_TOOL_RESULTS = True
+
+# Listings expire this long after posting. Expired listings, and sold-out
+# ones after a grace period, are moved to food_items_history by a sweeper.
+LISTING_SHELF_LIFE = timedelta(hours=12)
+SOLD_OUT_ARCHIVE_GRACE = timedelta(hours=1)
+ARCHIVE_SWEEP_INTERVAL_SECONDS = 300
+HISTORY_RETENTION_DAYS = 90  # None keeps history forever
+
+# Bookings hold portions until the hotel confirms the pickup; holds not
+# confirmed in time are released back to the listing by a reaper
+# (see reservations.py). False books portions for good, as before.
+USE_RESERVATIONS = True
+RESERVATION_HOLD_TTL = timedelta(minutes=30)
+RESERVATION_REAPER_INTERVAL_SECONDS = 60
+RESERVATION_RETENTION_DAYS = 30  # closed reservations; None keeps them forever
+
+# Food alerts: workers subscribe to a search once and are notified when a
+# matching listing is posted, instead of searching again (see
+# subscriptions.py). Sinks: "local" (kept in memory, shown by the
+# interactive worker mode), "webhook" (POSTed to NOTIFICATION_WEBHOOK_URL)
+USE_SUBSCRIPTIONS = True
+SUBSCRIPTION_TTL = timedelta(hours=2)
+SUBSCRIPTION_MAX_RADIUS_KM = 25
+SUBSCRIPTIONS_PER_SESSION = 5
+NOTIFICATION_SINKS = ["local"]
+NOTIFICATION_WEBHOOK_URL = None
+# New listings are matched against the subscriptions of the process that
+# stored them. With several processes (runner.py) a worker's alert can live
+# in another one, so True matches them instead as each process's listing
+# cache reads them back from MongoDB, whichever process posted them
+# (needs USE_LISTING_CACHE)
+MATCH_SUBSCRIPTIONS_FROM_LISTING_CACHE = False
+
+# Search results per page (and the most a "top K" request may ask for)
+SEARCH_PAGE_SIZE = 10
+SEARCH_MAX_PAGE_SIZE = 50
+
+# sort_by="best" ranks by a blend of price, distance, freshness and
+# quantity left (see ranking.py), over at most this many of the cheapest
+# (or, with a distance, nearest) matching listings
+RANKING_WEIGHTS = RankingWeights(price=0.45, distance=0.30, freshness=0.15, quantity=0.10)
+RANKING_MAX_CANDIDATES = 500
+
+# Diagnostics: "DEBUG" prints every tool step to the console, "INFO" only
+# results, "WARNING" only problems (for production)
+LOG_LEVEL = "INFO"
+# Spans for graph nodes, tools, LLM calls, MongoDB commands and location
+# lookups (see tracing.py); exporters: "ring" (last spans in memory),
+# "jsonl" (appended to TRACE_JSONL_PATH), "prometheus" (text format metrics)
+TRACING_ENABLED = True
+TRACE_EXPORTERS = ["ring", "prometheus"]
+TRACE_JSONL_PATH = "traces.jsonl"
+
+configure_logging(LOG_LEVEL)
+tracer = Tracer(build_exporters(TRACE_EXPORTERS, TRACE_JSONL_PATH), enabled=TRACING_ENABLED)
+mongo_tracer = MongoCommandTracer(tracer)
+
+
+
+def mongo_client_options() -> dict:
+    """Pool size, timeouts and command tracing shared by the sync and async clients."""
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "event_listeners": [mongo_tracer]
+    }
+
+
+class AppContext:
+    """MongoDB handles and the state built on them.
+
+    Creating one does no I/O: the client connects on its first command,
+    the active items counter seeds itself on first use and the listing
+    cache loads on its first search. `startup()` does that work up front
+    for long-running processes.
+    """
+
+    def __init__(self):
+        self.mongo_client = MongoClient(MONGODB_URI, connect=False, **mongo_client_options())
+        self.db = self.mongo_client[DATABASE_NAME]
+        self.food_collection = self.db[COLLECTION_NAME]
+        self.history_collection = self.db[HISTORY_COLLECTION_NAME]
+        self.reservations = self.db[RESERVATIONS_COLLECTION_NAME]
+        self.active_items = ActiveItemCounter(self.db, self.food_collection)
+        self.listing_versions = CollectionVersions()
+        self.listing_cache = None
+        if USE_LISTING_CACHE:
+            self.listing_cache = ListingCache(self.food_collection, max_staleness_seconds=LISTING_CACHE_MAX_STALENESS_SECONDS,
+                                              on_change=self.listings_changed,
+                                              on_new=read_back_listings if MATCH_SUBSCRIPTIONS_FROM_LISTING_CACHE else None)
+        self.search_cache = None
+        if USE_SEARCH_RESULT_CACHE and self.listing_cache is None:
+            self.search_cache = SearchResultCache(self.listing_versions, COLLECTION_NAME, max_entries=SEARCH_CACHE_MAX_ENTRIES,
+                                                  ttl_seconds=SEARCH_CACHE_TTL_SECONDS, max_rows=SEARCH_CACHE_MAX_ROWS,
+                                                  cell_degrees=SEARCH_CACHE_CELL_DEGREES)
+        self.response_cache = None
+        if USE_LLM_RESPONSE_CACHE:
+            self.response_cache = ResponseCache(max_entries=LLM_RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds=LLM_RESPONSE_CACHE_TTL_SECONDS,
+                                                max_chars=LLM_RESPONSE_CACHE_MAX_CHARS)
+        # Conversation history, one per hotel/worker session
+        self.session_store = SessionStore(
+            max_sessions=SESSION_MAX_SESSIONS,
+            ttl_seconds=SESSION_TTL_SECONDS,
+            max_history_tokens=SESSION_MAX_HISTORY_TOKENS,
+            collection=self.db[SESSIONS_COLLECTION_NAME] if SESSION_PERSIST_TO_MONGO else None
+        )
+        self.archive_sweeper = ArchiveSweeper(
+            self.food_collection,
+            self.history_collection,
+            interval_seconds=ARCHIVE_SWEEP_INTERVAL_SECONDS,
+            sold_out_grace=SOLD_OUT_ARCHIVE_GRACE,
+            on_archived=forget_archived_listings
+        )
+        self.reservation_reaper = ReservationReaper(
+            self.food_collection,
+            self.reservations,
+            interval_seconds=RESERVATION_REAPER_INTERVAL_SECONDS,
+            on_released=record_released_holds
+        )
+        # Standing worker searches; the dispatcher starts on its first notification
+        self.subscriptions = SubscriptionIndex(max_radius_m=SUBSCRIPTION_MAX_RADIUS_KM * 1000,
+                                               max_per_session=SUBSCRIPTIONS_PER_SESSION)
+        self.notifier = NotificationDispatcher(build_sinks(NOTIFICATION_SINKS, NOTIFICATION_WEBHOOK_URL))
+
+    def listings_changed(self):
+        """Make cached search results stale after a write to the listings."""
+        self.listing_versions.bump(COLLECTION_NAME)
+
+    def close(self):
+        self.archive_sweeper.stop()
+        self.reservation_reaper.stop()
+        self.notifier.stop()
+        self.mongo_client.close()
+
+
+_context = None
+_startup_lock = threading.Lock()
+
+
+def context() -> AppContext:
+    """The process-wide AppContext, created on first use."""
+    global _context
+    if _context is None:
+        with _startup_lock:
+            if _context is None:
+                _context = AppContext()
+    return _context
+
+
+def run_migrations() -> dict:
+    """Create indexes and backfill older listings (idempotent, see indexes.migrate)."""
+    results = migrate(context().db, COLLECTION_NAME, LISTING_SHELF_LIFE, HISTORY_RETENTION_DAYS, RESERVATION_RETENTION_DAYS,
+                      SESSION_TTL_SECONDS)
+    logger.info("✓ Compound and geospatial indexes ready for food searches")
+    if results["normalized_names"]:
+        logger.info("✓ Added normalized food names to %s older listings", results['normalized_names'])
+    if results["expiry"]:
+        logger.info("✓ Added expiry times to %s older listings", results['expiry'])
+    return results
+
+
+def startup(migrations: bool = None) -> AppContext:
+    """Connect and start background work for a long-running process.
+
+    Raises ConnectionFailure if MongoDB cannot be reached. Without
+    `migrations` (default RUN_MIGRATIONS_ON_STARTUP) missing indexes are
+    only reported.
+    """
+    ctx = context()
+    logger.info("🔌 Connecting to MongoDB...")
+    ctx.mongo_client.admin.command('ping')
+    logger.info("✓ Successfully connected to MongoDB!")
+    logger.info("✓ Using database: %s, collection: %s", DATABASE_NAME, COLLECTION_NAME)
     
-    print(f"✓ Using database: {DATABASE_NAME}, collection: {COLLECTION_NAME}")
-    print(f"✓ Geospatial indexing enabled for location-based searches")
+    if migrations is None:
+        migrations = RUN_MIGRATIONS_ON_STARTUP
+    if migrations:
+        run_migrations()
+    else:
+        missing = missing_indexes(ctx.food_collection)
+        if missing:
+            logger.warning("⚠️ Missing indexes: %s. Run python indexes.py --uri ... to create them.", ', '.join(missing))
     
-except ConnectionFailure as e:
-    print(f"❌ Failed to connect to MongoDB: {e}")
-    print("Please make sure MongoDB is running and accessible.")
-    exit(1)
+    logger.info("✓ Active items counter: %s", ctx.active_items.seed())
+    if ctx.listing_cache is not None:
+        ctx.listing_cache.load()
+        if ctx.listing_cache.start_change_stream():
+            logger.info("✓ Listing cache loaded (%s active items), following change stream", len(ctx.listing_cache))
+        else:
+            logger.info("✓ Listing cache loaded (%s active items), polling every %ss", len(ctx.listing_cache), LISTING_CACHE_MAX_STALENESS_SECONDS)
+    ctx.archive_sweeper.start()
+    if USE_RESERVATIONS:
+        ctx.reservation_reaper.start()
+    return ctx
+
+
+def shutdown():
+    """Stop the background sweeps and close the MongoDB client, if they were ever created."""
+    if _context is not None:
+        _context.close()
+
 
-# Simple in-memory conversation storage
-conversation_memory = []
+# Scripts written against the old import-time globals (hw.food_collection,
+# hw.listing_cache, hw.app, ...) get them from the lazy context
+_CONTEXT_ATTRIBUTES = {"mongo_client", "db", "food_collection", "history_collection", "reservations", "active_items",
+                       "listing_cache", "session_store", "archive_sweeper", "reservation_reaper", "subscriptions",
+                       "notifier", "search_cache", "response_cache"}
+
+
+def __getattr__(name):
+    if name in _CONTEXT_ATTRIBUTES:
+        return getattr(context(), name)
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
     user_type: str  # "hotel" or "worker"
+    session_id: str
+    client_ip: str  # optional, set by servers that know the client's address
 
 GOOGLE_GEOLOCATION_API_KEY = "your_google_api_key_here"
 
+# Reuse the last location instead of calling the API every message
+LOCATION_CACHE_TTL_SECONDS = 600
+LOCATION_LOW_ACCURACY_METERS = 5000
+LOCATION_LOW_ACCURACY_TTL_SECONDS = 60
+
+location_cache = LocationCache(
+    GoogleGeolocationProvider(GOOGLE_GEOLOCATION_API_KEY),
+    ttl_seconds=LOCATION_CACHE_TTL_SECONDS,
+    low_accuracy_meters=LOCATION_LOW_ACCURACY_METERS,
+    low_accuracy_ttl_seconds=LOCATION_LOW_ACCURACY_TTL_SECONDS,
+    on_lookup=lambda outcome: set_attributes(cache=outcome)
+)
+
+# Last known coordinates per hotel, filled as hotels post food
+hotel_locations = {}
+
+
 @tool
-def get_location() -> str:
-    """Get the current location coordinates of the user (hotel or worker)."""
-    print("🔧 [TOOL] get_location() called")
+def get_location(hotel_name: str = None, state: Annotated[dict, InjectedState] = None) -> str:
+    """Get the current location coordinates of the user (hotel or worker).
+    
+    Args:
+        hotel_name: Optional - the hotel's name, if the user is a hotel; its stored location is reused
+    """
+    logger.debug("🔧 [TOOL] get_location() called")
+    
+    if hotel_name:
+        coordinates = known_hotel_location(hotel_name)
+        if coordinates:
+            logger.info("   ✓ Reusing stored location for %s: %s", hotel_name, coordinates)
+            return coordinates
     
     try:
-        url = f"https://www.googleapis.com/geolocation/v1/geolocate?key={GOOGLE_GEOLOCATION_API_KEY}"
+        key, client_ip = location_cache_key(state)
+        with tracer.span("geolocation", "geolocation"):
+            location = location_cache.get(key, client_ip)
         
-        payload = {
-            "considerIp": True
-        }
-        
-        response = requests.post(url, json=payload, timeout=5)
+        if location is None:
+            return "error - coordinates not found"
         
-        if response.status_code == 200:
-            data = response.json()
-            location = data.get('location', {})
-            lat = location.get('lat')
-            lng = location.get('lng')
-            accuracy = data.get('accuracy', 'Unknown')
-            
-            if lat and lng:
-                coordinates = f"{lat},{lng}"
-                print(f"   ✓ Retrieved coordinates: {coordinates}")
-                print(f"   📍 Accuracy: {accuracy} meters")
-                return coordinates
-            else:
-                print("   ⚠️ Could not get coordinates from API")
-                return "error - coordinates not found"
-        else:
-            print(f"   ⚠️ API returned status code: {response.status_code}")
-            return "error - coordinates not found"  
+        logger.info("   ✓ Retrieved coordinates: %s", location.coordinates())
+        logger.debug("   📍 Accuracy: %s meters", location.accuracy if location.accuracy is not None else 'Unknown')
+        return location.coordinates()
             
     except Exception as e:
-        print(f"   ❌ Error getting location: {e}")
+        logger.error("   ❌ Error getting location: %s", e)
         return "error - coordinates not found"  
 
 
+def location_cache_key(state: dict) -> tuple:
+    """Cache key and client IP for a lookup.
+
+    Per client IP only when the provider can locate one; the Google API
+    locates this server, so its fix is shared by the whole process.
+    """
+    client_ip = (state or {}).get("client_ip")
+    if client_ip and location_cache.provider.uses_client_ip:
+        return f"ip:{client_ip}", client_ip
+    return "process", None
+
+
+def known_hotel_location(hotel_name: str):
+    """Coordinates this hotel last posted food from, if any."""
+    coordinates = hotel_locations.get(hotel_name)
+    if coordinates:
+        return coordinates
+    latest = context().food_collection.find_one({"hotel_name": hotel_name}, {"hotel_location": 1}, sort=[("created_at", -1)])
+    if latest:
+        hotel_locations[hotel_name] = latest["hotel_location"]
+        return latest["hotel_location"]
+    return None
+
+
 @tool
 def store_food_in_db(hotel_name: str, food_name: str, price: float, quantity: int, hotel_location: str) -> str:
     """Store leftover food information in the MongoDB database.
@@ -99,233 +398,744 @@ def store_food_in_db(hotel_name: str, food_name: str, price: float, quantity: in
         quantity: Quantity available (e.g., "5", "2")
         hotel_location: Location coordinates of the hotel (format: "latitude,longitude")
     """
-    print("🔧 [TOOL] store_food_in_db() called")
-    print(f"   📝 Hotel: {hotel_name}")
-    print(f"   📝 Food: {food_name}")
-    print(f"   📝 Price: ${price}")
-    print(f"   📝 Quantity: {quantity}")
-    print(f"   📝 Location: {hotel_location}")
+    logger.debug("🔧 [TOOL] store_food_in_db() called")
+    logger.debug("   📝 Hotel: %s", hotel_name)
+    logger.debug("   📝 Food: %s", food_name)
+    logger.debug("   📝 Price: $%s", price)
+    logger.debug("   📝 Quantity: %s", quantity)
+    logger.debug("   📝 Location: %s", hotel_location)
     
     try:
-        lat, lon = map(float, hotel_location.split(','))
-        
-        document = {
-            "hotel_name": hotel_name,
-            "food_name": food_name,
-            "price": float(price),  
-            "quantity": int(quantity),
-            "location": {
-                "type": "Point",
-                "coordinates": [lon, lat]  
-            },
-            "hotel_location": hotel_location,  
-            "timestamp": datetime.now(),
-            "created_at": datetime.now(),
-            "is_available": True,
-            "status": "active"
-        }
+        ctx = context()
+        document = build_food_document(hotel_name, food_name, price, quantity, hotel_location, LISTING_SHELF_LIFE)
         
         # Insert into MongoDB
-        result = food_collection.insert_one(document)
-        total_items = food_collection.count_documents({"is_available": True})
+        result = ctx.food_collection.insert_one(document)
+        if ctx.listing_cache is not None:
+            ctx.listing_cache.upsert(document)
+        ctx.listings_changed()
+        hotel_locations[hotel_name] = hotel_location
+        total_items = ctx.active_items.increment()
+        notify_subscribers([document])
         
-        print(f"   ✓ Successfully stored in MongoDB")
-        print(f"   ✓ Document ID: {result.inserted_id}")
-        print(f"   ✓ Total active items in database: {total_items}")
+        logger.info("   ✓ Successfully stored in MongoDB")
+        logger.info("   ✓ Document ID: %s", result.inserted_id)
+        logger.info("   ✓ Total active items in database: %s", total_items)
         
         return f"✓ Stored: {food_name} (${price}) from {hotel_name} at location {hotel_location}"
         
     except ValueError as e:
-        print(f"   ❌ Error parsing location: {e}")
+        logger.error("   ❌ Error parsing location: %s", e)
         return f"❌ Error: Invalid location format. Please use 'latitude,longitude'"
     except Exception as e:
-        print(f"   ❌ Database error: {e}")
+        logger.error("   ❌ Database error: %s", e)
         return f"❌ Error storing food in database: {str(e)}"
 
 
 @tool
-def get_available_food(max_price: float, item_name: str = None, max_distance_km: float = None, user_location: str = None) -> str:
-    """Get all available food within budget and distance, optionally filtered by item name, sorted by price (lowest to highest).
+def get_available_food(max_price: float, item_name: str = None, max_distance_km: float = None, user_location: str = None,
+                       page_token: str = None, limit: int = None, sort_by: str = None) -> str:
+    """Get available food within budget and distance, optionally filtered by item name, best overall deal first (or cheapest/nearest first). Returns one page of results.
     
     Args:
         max_price: Maximum price worker is willing to pay
         item_name: Optional - specific food item name to search for (e.g., "pizza", "chicken", "pasta")
         max_distance_km: Optional - maximum distance in kilometers from user location
         user_location: Optional - user's coordinates in format "latitude,longitude" (required if max_distance_km is provided)
+        page_token: Optional - the next_page token from a previous result, to get the following page (keep the other arguments the same)
+        limit: Optional - number of results to return (e.g. 3 for "the 3 cheapest"), default 10
+        sort_by: Optional - "best" (default: weighs price, distance, freshness and quantity left), "price" (cheapest first) or "distance" (nearest first)
     """
-    print("🔧 [TOOL] get_available_food() called")
-    print(f"   📝 Max Price: ${max_price}")
-    print(f"   📝 Item Name: {item_name if item_name else 'Any'}")
-    print(f"   📝 Max Distance: {max_distance_km if max_distance_km else 'Any'} km")
-    print(f"   📝 User Location: {user_location if user_location else 'Not provided'}")
+    logger.debug("🔧 [TOOL] get_available_food() called")
+    logger.debug("   📝 Max Price: $%s", max_price)
+    logger.debug("   📝 Item Name: %s", item_name if item_name else 'Any')
+    logger.debug("   📝 Max Distance: %s km", max_distance_km if max_distance_km else 'Any')
+    logger.debug("   📝 User Location: %s", user_location if user_location else 'Not provided')
     
     try:
-        query = {
-            "is_available": True,
-            "price": {"$lte": max_price}
-        }
-        
+        ctx = context()
+        limit = search_page_size(limit)
+        token = decode_page_token(page_token) if page_token else None
+        order, ranked = search_order(sort_by, bool(max_distance_km and user_location), token)
+        # Ranked searches fetch a bounded candidate set and page in-process;
+        # the others page in the query, one extra row telling whether there is a next page
+        after = token.after if token and not ranked else None
+        fetch = RANKING_MAX_CANDIDATES if ranked else limit + 1
+        lat = lon = max_distance_meters = None
         if item_name:
-            query["food_name"] = {"$regex": item_name, "$options": "i"}
-            print(f"   🔍 Filtering by item name: {item_name}")
+            logger.debug("   🔍 Filtering by item name: %s", item_name)
         
-        total_items = food_collection.count_documents({"is_available": True})
-        if total_items == 0:
-            print("   ⚠️ Database is empty")
-            return "Sorry, no food available right now. Please check back later."
-        
-        print(f"   🔍 Searching in {total_items} total available items...")
+        if ctx.listing_cache is not None:
+            ctx.listing_cache.refresh_if_stale()
         
         if max_distance_km and user_location:
             try:
                 lat, lon = map(float, user_location.split(','))
-                max_distance_meters = max_distance_km * 1000  
-                
-                query["location"] = {
-                    "$near": {
-                        "$geometry": {
-                            "type": "Point",
-                            "coordinates": [lon, lat]  
-                        },
-                        "$maxDistance": max_distance_meters
-                    }
-                }
-                print(f"   🔍 Using geospatial query for {max_distance_km}km radius")
-                
-                pipeline = [
-                    {
-                        "$geoNear": {
-                            "near": {
-                                "type": "Point",
-                                "coordinates": [lon, lat]
-                            },
-                            "distanceField": "distance",
-                            "maxDistance": max_distance_meters,
-                            "spherical": True
-                        }
-                    },
-                    {
-                        "$match": {
-                            "is_available": True,
-                            "price": {"$lte": max_price}
-                        }
-                    }
-                ]
-                
-                if item_name:
-                    pipeline[1]["$match"]["food_name"] = {"$regex": item_name, "$options": "i"}
-                
-                affordable_foods = list(food_collection.aggregate(pipeline))
-                
-                for food in affordable_foods:
-                    food["distance_km"] = round(food["distance"] / 1000, 2)
-                
-                print(f"   ✓ Found {len(affordable_foods)} items within {max_distance_km}km")
-                
             except ValueError as e:
-                print(f"   ❌ Error parsing user location: {e}")
+                logger.error("   ❌ Error parsing user location: %s", e)
                 return "❌ Error: Invalid location format. Please try again."
-        else:
-            affordable_foods = list(food_collection.find(query).sort("price", 1))  
-            print(f"   ✓ Found {len(affordable_foods)} items matching criteria")
+            max_distance_meters = max_distance_km * 1000
         
-        if not affordable_foods:
-            print("   ⚠️ No items found matching criteria")
-            if item_name:
-                return f"No {item_name} found under ${max_price}" + (f" within {max_distance_km}km" if max_distance_km else "") + ". Try adjusting your search criteria."
-            else:
-                return f"No food found under ${max_price}" + (f" within {max_distance_km}km" if max_distance_km else "") + ". Try adjusting your search criteria."
+        affordable_foods = None
+        # Only first pages are cached; later pages continue from their token
+        if ctx.search_cache is not None and token is None:
+            affordable_foods = ctx.search_cache.search(
+                max_price, item_name, lat, lon, max_distance_meters, fetch,
+                lambda query: fetch_candidates(ctx, query.max_price, item_name, query.lat, query.lon, query.radius_m, None, query.limit)
+            )
+            set_attributes(search_cache_hits=int(affordable_foods is not None))
+        if affordable_foods is None:
+            affordable_foods = fetch_candidates(ctx, max_price, item_name, lat, lon, max_distance_meters, after, fetch)
         
-        if max_distance_km and user_location:
-            print(f"   📊 Sorted by distance (nearest first)")
-        else:
-            print(f"   📊 Sorted by price (cheapest first)")
+        ranked_at = scale = None
+        if ranked:
+            affordable_foods, ranked_at, scale = rank_search_results(affordable_foods, order, token, limit + 1, max_distance_meters)
         
-        search_criteria = f"{item_name} " if item_name else ""
-        distance_criteria = f"within {max_distance_km}km " if max_distance_km else ""
-        result = f"Found {len(affordable_foods)} {search_criteria}option(s) {distance_criteria}under ${max_price}:\n\n"
+        result, shown = format_food_results(affordable_foods, max_price, item_name, max_distance_km, user_location, limit, token is None,
+                                            order, ranked_at, scale)
+        set_attributes(results=shown, sort_by=order, first_page=token is None)
         
-        for i, food in enumerate(affordable_foods, 1):
-            result += f"{i}. {food['food_name']}\n"
-            result += f"   🏨 Hotel: {food['hotel_name']}\n"
-            result += f"   💰 Price: ${food['price']}\n"
-            result += f"   📦 Quantity: {food['quantity']}\n"
-            result += f"   📍 Location: {food['hotel_location']}\n"
-            if "distance_km" in food:
-                result += f"   📏 Distance: {food['distance_km']} km\n"
-            result += f"   🕐 Posted: {food['timestamp'].strftime('%Y-%m-%d %H:%M:%S') if isinstance(food['timestamp'], datetime) else food['timestamp']}\n\n"
-        
-        if max_distance_km and user_location:
-            result += f"💡 Nearest option: '{affordable_foods[0]['food_name']}' from {affordable_foods[0]['hotel_name']} at {affordable_foods[0]['distance_km']} km for ${affordable_foods[0]['price']}"
-        else:
-            result += f"💡 Best deal: '{affordable_foods[0]['food_name']}' from {affordable_foods[0]['hotel_name']} at ${affordable_foods[0]['price']}"
+        # Only an empty first page needs to know whether the whole database is empty
+        if not shown and token is None and count_active_items() == 0:
+            logger.warning("   ⚠️ Database is empty")
+            return "Sorry, no food available right now. Please check back later."
         
-        print(f"   ✓ Returning {len(affordable_foods)} results")
         return result
         
+    except ValueError as e:
+        logger.error("   ❌ Bad search arguments: %s", e)
+        return f"❌ Error: {e}." + (" Start the search again without a page_token." if page_token else "")
     except Exception as e:
-        print(f"   ❌ Database query error: {e}")
+        logger.error("   ❌ Database query error: %s", e)
         return f"❌ Error searching for food: {str(e)}"
 
 
+def fetch_candidates(ctx: AppContext, max_price: float, item_name: str = None, lat: float = None, lon: float = None,
+                     max_distance_meters: float = None, after: tuple = None, limit: int = None):
+    """Search rows in the query's order: by (price, _id), or with a location by (distance, _id) carrying a `distance`."""
+    if max_distance_meters is not None:
+        if ctx.listing_cache is not None and USE_LOCAL_GEO_SEARCH:
+            logger.debug("   🔍 Using cached snapshot for %gkm radius", max_distance_meters / 1000)
+            return ctx.listing_cache.search(max_price, item_name, lat, lon, max_distance_meters, after, limit)
+        logger.debug("   🔍 Using geospatial query for %gkm radius", max_distance_meters / 1000)
+        return list(ctx.food_collection.aggregate(geo_search_pipeline(lat, lon, max_distance_meters, max_price, item_name, after, limit)))
+    if ctx.listing_cache is not None:
+        logger.debug("   🔍 Using cached snapshot")
+        return ctx.listing_cache.search(max_price, item_name, after=after, limit=limit)
+    return list(ctx.food_collection.find(search_query(max_price, item_name, after), SEARCH_PROJECTION)
+                .sort([("price", 1), ("_id", 1)]).limit(limit))
+
+
+def search_page_size(limit: int = None) -> int:
+    """Page size for a search: the requested top-K, or the default, capped."""
+    if not limit or limit < 1:
+        return SEARCH_PAGE_SIZE
+    return min(int(limit), SEARCH_MAX_PAGE_SIZE)
+
+
+def search_order(sort_by: str, nearby: bool, token=None) -> tuple:
+    """(order, ranked) for a search's sort_by.
+    
+    `order` is "best", "price" or "distance" ("distance" needs a location).
+    `ranked` tells whether the candidates are scored in-process: always for
+    "best", and for "price" within a radius, since $geoNear returns rows
+    nearest first. Raises ValueError for an unknown sort_by or a page token
+    from a search with another one.
+    """
+    order = (sort_by or "best").lower()
+    if order not in ("best", "price", "distance"):
+        raise ValueError(f"sort_by must be 'best', 'price' or 'distance', not {sort_by!r}")
+    if order == "distance" and not nearby:
+        order = "price"
+    ranked = order == "best" or (order == "price" and nearby)
+    if token is not None and (token.ranked_at is not None) != ranked:
+        raise ValueError("page token is from a search with a different sort_by")
+    return order, ranked
+
+
+def rank_search_results(candidates, order: str, token, k: int, max_distance_meters: float = None) -> tuple:
+    """(top k candidates by score, ranked_at, price scale); later pages reuse the token's ranked_at and scale."""
+    candidates = list(candidates)
+    # Whole seconds, so the time survives the page token exactly
+    ranked_at = token.ranked_at if token else datetime.now().replace(microsecond=0)
+    scale = token.scale if token else price_scale(candidates)
+    weights = RANKING_WEIGHTS if order == "best" else CHEAPEST
+    results = rank_listings(candidates, k, ranked_at, scale, token.after if token else None, weights,
+                            max_distance_meters, LISTING_SHELF_LIFE)
+    return results, ranked_at, scale
+
+
+def format_food_results(affordable_foods, max_price: float, item_name: str = None, max_distance_km: float = None,
+                        user_location: str = None, limit: int = SEARCH_PAGE_SIZE, first_page: bool = True,
+                        order: str = None, ranked_at: datetime = None, scale: float = None) -> tuple:
+    """Format one page of search results for the LLM, in the order the query returned them.
+    
+    Reads at most limit + 1 rows from `affordable_foods` (a cursor or list);
+    the extra row only signals that a next page exists. Ranked results
+    (`ranked_at` set) carry a `score`, which the next page token continues
+    from. Returns the text and the number of listings shown.
+    """
+    nearby = bool(max_distance_km and user_location)
+    order = order or ("distance" if nearby else "price")
+    lines = []
+    first = last = None
+    has_more = False
+    shown = 0
+    
+    for food in affordable_foods:
+        if shown == limit:
+            has_more = True
+            break
+        shown += 1
+        last = food
+        if first is None:
+            first = food
+        timestamp = food['timestamp'].strftime('%Y-%m-%d %H:%M:%S') if isinstance(food['timestamp'], datetime) else food['timestamp']
+        lines.append(f"{shown}. {food['food_name']}\n")
+        lines.append(f"   🏨 Hotel: {food['hotel_name']}\n")
+        lines.append(f"   💰 Price: ${food['price']}\n")
+        lines.append(f"   📦 Quantity: {food['quantity']}\n")
+        lines.append(f"   📍 Location: {food['hotel_location']}\n")
+        if "distance" in food:
+            lines.append(f"   📏 Distance: {round(food['distance'] / 1000, 2)} km\n")
+        lines.append(f"   🕐 Posted: {timestamp}\n")
+        lines.append(f"   🔖 Listing: {listing_handle(food['_id'])}\n\n")
+    
+    if not shown:
+        logger.warning("   ⚠️ No items found matching criteria")
+        what = item_name if item_name else "food"
+        return f"No {'more ' if not first_page else ''}{what} found under ${max_price}" + (f" within {max_distance_km}km" if max_distance_km else "") + ". Try adjusting your search criteria.", 0
+    
+    if order == "best":
+        logger.debug("   📊 Ranked by price, distance, freshness and quantity (best first)")
+    elif order == "distance":
+        logger.debug("   📊 Sorted by distance (nearest first)")
+    else:
+        logger.debug("   📊 Sorted by price (cheapest first)")
+    
+    search_criteria = f"{item_name} " if item_name else ""
+    distance_criteria = f"within {max_distance_km}km " if max_distance_km else ""
+    header = f"Showing {shown} {search_criteria}option(s) {distance_criteria}under ${max_price}:\n\n"
+    
+    footer = []
+    if first_page and order == "best":
+        away = f", {round(first['distance'] / 1000, 2)} km away" if "distance" in first else ""
+        footer.append(f"💡 Best overall: '{first['food_name']}' from {first['hotel_name']} at ${first['price']}{away}")
+    elif first_page and order == "distance":
+        footer.append(f"💡 Nearest option: '{first['food_name']}' from {first['hotel_name']} at {round(first['distance'] / 1000, 2)} km for ${first['price']}")
+    elif first_page:
+        footer.append(f"💡 Best deal: '{first['food_name']}' from {first['hotel_name']} at ${first['price']}")
+    if has_more and ranked_at is not None:
+        next_page = encode_page_token(last["score"], last["_id"], ranked_at, scale)
+        footer.append(f"➡️ More results available: next_page={next_page}")
+    elif has_more:
+        next_page = encode_page_token(last["distance"] if order == "distance" else last["price"], last["_id"])
+        footer.append(f"➡️ More results available: next_page={next_page}")
+    
+    logger.info("   ✓ Returning %s results%s", shown, " (more available)" if has_more else "")
+    return header + "".join(lines) + "\n".join(footer), shown
+
+
+COMPACT_FIELDS = {"🏨 Hotel: ": "{}", "💰 Price: ": "{}", "📦 Quantity: ": "qty {}", "📏 Distance: ": "{}", "🔖 Listing: ": "id {}"}
+DROPPED_FIELDS = ("📍 Location: ", "🕐 Posted: ")
+
+
+def compact_food_results(text: str) -> str:
+    """A format_food_results page with one line per listing, for resending once answered.
+
+    Drops coordinates and posting times; keeps the numbering, the footer
+    and any next_page token, so "book the second one" and "show me more"
+    still work from the compacted copy.
+    """
+    lines = []
+    for line in text.split("\n"):
+        field = line.strip()
+        if not field or field.startswith(DROPPED_FIELDS):
+            continue
+        label = next((label for label in COMPACT_FIELDS if field.startswith(label)), None)
+        if label is not None and lines:
+            lines[-1] += " | " + COMPACT_FIELDS[label].format(field[len(label):])
+        else:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+TOOL_RESULT_COMPACTORS = {"get_available_food": compact_food_results, "search_near_me": compact_food_results}
+
+
 @tool
-def book_food(hotel_name: str, food_name: str) -> str:
-    """Book a food item from a hotel. Reduces quantity by 1 and sets availability to False if quantity reaches 0.
+def book_food(hotel_name: str, food_name: str, listing_id: str = None, state: Annotated[dict, InjectedState] = None) -> str:
+    """Book a food item from a hotel. Holds 1 portion for the worker to pick up and returns a reservation code.
     
     Args:
         hotel_name: Name of the hotel
         food_name: Name of the food item to book
+        listing_id: Optional - the listing id shown in the search results; books exactly that listing
     """
-    print("🔧 [TOOL] book_food() called")
-    print(f"   📝 Hotel: {hotel_name}")
-    print(f"   📝 Food: {food_name}")
+    logger.debug("🔧 [TOOL] book_food() called")
+    logger.debug("   📝 Hotel: %s", hotel_name)
+    logger.debug("   📝 Food: %s", food_name)
     
     try:
-        food_item = food_collection.find_one({
-            "hotel_name": {"$regex": f"^{hotel_name}$", "$options": "i"},
-            "food_name": {"$regex": f"^{food_name}$", "$options": "i"},
-            "is_available": True
-        })
+        ctx = context()
+        query = listing_filter(hotel_name, food_name, listing_id)
+        # Stock check, decrement and sold-out flip happen in one atomic update
+        reservation = None
+        if USE_RESERVATIONS:
+            held = hold_listing(ctx.food_collection, ctx.reservations, query, ttl=RESERVATION_HOLD_TTL, session_id=session_of(state))
+            reservation, booked_item = held or (None, None)
+        else:
+            booked_item = book_listing(ctx.food_collection, query)
+        if booked_item:
+            record_booking(booked_item)
         
-        if not food_item:
-            print(f"   ❌ Food item not found or not available")
+        if not booked_item:
+            logger.error("   ❌ Food item not found or not available")
             return f"❌ Sorry, '{food_name}' from {hotel_name} is not available. It may have been booked already."
         
-        current_quantity = food_item['quantity']
-        print(f"   📦 Current quantity: {current_quantity}")
+        logger.info("   ✓ Successfully booked!")
+        logger.info("   ✓ New quantity: %s", booked_item['quantity'])
+        if booked_item['quantity'] <= 0:
+            logger.warning("   ⚠️ Quantity reached 0 - marked as unavailable")
+        return booking_reply(booked_item["hotel_name"], booked_item["food_name"], booked_item, reservation)
+            
+    except Exception as e:
+        logger.error("   ❌ Database error: %s", e)
+        return f"❌ Error booking food: {str(e)}"
+
+
+@tool
+def book_many(hotel_names: list[str], food_names: list[str], quantities: list[int] = None, listing_ids: list[str] = None,
+              state: Annotated[dict, InjectedState] = None) -> str:
+    """Book several food items in one go, e.g. when a worker reserves for a group.
+    
+    Args:
+        hotel_names: Hotel name for each booking
+        food_names: Food item name for each booking (same order as hotel_names)
+        quantities: Optional - portions for each booking (defaults to 1 each)
+        listing_ids: Optional - listing id from the search results for each booking (same order)
+    """
+    logger.debug("🔧 [TOOL] book_many() called")
+    logger.debug("   📝 Bookings requested: %s", len(food_names))
+    
+    if len(hotel_names) != len(food_names):
+        return "❌ Error: Each booking needs both a hotel name and a food name."
+    
+    if not quantities:
+        quantities = [1] * len(food_names)
+    elif len(quantities) != len(food_names):
+        return "❌ Error: Please give one quantity per booking."
+    if not listing_ids:
+        listing_ids = [None] * len(food_names)
+    elif len(listing_ids) != len(food_names):
+        return "❌ Error: Please give one listing id per booking."
+    
+    try:
+        bookings = [
+            (listing_filter(hotel, food, listing_id), int(quantity))
+            for hotel, food, quantity, listing_id in zip(hotel_names, food_names, quantities, listing_ids)
+        ]
+        ctx = context()
+        valid = [(query, quantity) for query, quantity in bookings if quantity >= 1]
+        if USE_RESERVATIONS:
+            results = hold_many(ctx.food_collection, ctx.reservations, valid, ttl=RESERVATION_HOLD_TTL, session_id=session_of(state))
+        else:
+            results = [(query, quantity, (None, booked_item) if booked_item else None)
+                       for query, quantity, booked_item in book_many_listings(ctx.food_collection, valid)]
         
-        new_quantity = current_quantity - 1
+        lines = []
+        booked_count = 0
+        results = iter(results)
+        for hotel, food, (_, quantity) in zip(hotel_names, food_names, bookings):
+            if quantity < 1:
+                lines.append(quantity_problem_line(hotel, food, quantity))
+                continue
+            _, _, booked = next(results)
+            if booked:
+                booked_count += 1
+                record_booking(booked[1])
+            lines.append(booked_line(hotel, food, quantity, booked))
         
-        update_data = {
-            "quantity": new_quantity,
-            "last_booked": datetime.now()
-        }
+        logger.info("   ✓ Booked %s/%s items", booked_count, len(bookings))
+        return f"Booked {booked_count} of {len(bookings)} requested items:\n" + "\n".join(lines)
         
-        if new_quantity <= 0:
-            update_data["is_available"] = False
-            update_data["status"] = "sold_out"
-            print(f"   ⚠️ Quantity reached 0 - marking as unavailable")
+    except Exception as e:
+        logger.error("   ❌ Database error: %s", e)
+        return f"❌ Error booking food: {str(e)}"
+
+
+@tool
+def search_near_me(max_price: float, item_name: str = None, max_distance_km: float = None, page_token: str = None, limit: int = None,
+                   sort_by: str = None, state: Annotated[dict, InjectedState] = None) -> str:
+    """Search available food for a worker in one step. Looks up the worker's location itself when a distance is given. Returns one page of results.
+    
+    Args:
+        max_price: Maximum price worker is willing to pay
+        item_name: Optional - specific food item name to search for (e.g., "pizza", "chicken", "pasta")
+        max_distance_km: Optional - maximum distance in kilometers from the worker
+        page_token: Optional - the next_page token from a previous result, to get the following page (keep the other arguments the same)
+        limit: Optional - number of results to return (e.g. 3 for "the 3 cheapest"), default 10
+        sort_by: Optional - "best" (default: weighs price, distance, freshness and quantity left), "price" (cheapest first) or "distance" (nearest first)
+    """
+    logger.debug("🔧 [TOOL] search_near_me() called")
+    
+    search_args = {"max_price": max_price, "item_name": item_name, "max_distance_km": max_distance_km, "page_token": page_token, "limit": limit,
+                   "sort_by": sort_by}
+    if max_distance_km:
+        user_location = get_location.invoke({"state": state})
+        if user_location.startswith("error"):
+            return "❌ Could not determine your location. Try searching without a distance."
+        search_args["user_location"] = user_location
+    
+    return get_available_food.invoke({k: v for k, v in search_args.items() if v is not None})
+
+
+@tool
+def post_surplus_here(hotel_name: str, food_name: str, price: float, quantity: int, state: Annotated[dict, InjectedState] = None) -> str:
+    """Post a hotel's leftover food in one step. Looks up the hotel's location itself.
+    
+    Args:
+        hotel_name: Name of the hotel
+        food_name: Name/description of the food item
+        price: Price of the food
+        quantity: Quantity available (e.g., "5", "2")
+    """
+    logger.debug("🔧 [TOOL] post_surplus_here() called")
+    
+    hotel_location = get_location.invoke({"hotel_name": hotel_name, "state": state})
+    if hotel_location.startswith("error"):
+        return "❌ Could not determine the hotel's location. Please try again."
+    
+    return store_food_in_db.invoke({
+        "hotel_name": hotel_name,
+        "food_name": food_name,
+        "price": price,
+        "quantity": quantity,
+        "hotel_location": hotel_location
+    })
+
+
+
+@tool
+def store_food_batch(hotel_name: str, food_names: list[str], prices: list[float], quantities: list[int], state: Annotated[dict, InjectedState] = None) -> str:
+    """Post many leftover dishes from one hotel at once (e.g. a full menu at close of service). Looks up the hotel's location itself.
+    
+    Args:
+        hotel_name: Name of the hotel
+        food_names: Name/description of each food item
+        prices: Price of each food item (same order as food_names)
+        quantities: Quantity available of each food item (same order as food_names)
+    """
+    logger.debug("🔧 [TOOL] store_food_batch() called")
+    logger.debug("   📝 Hotel: %s", hotel_name)
+    logger.debug("   📝 Items: %s", len(food_names))
+    
+    if not (len(food_names) == len(prices) == len(quantities)):
+        return "❌ Error: Please give one price and one quantity per food item."
+    
+    hotel_location = get_location.invoke({"hotel_name": hotel_name, "state": state})
+    if hotel_location.startswith("error"):
+        return "❌ Could not determine the hotel's location. Please try again."
+    
+    items = [
+        {"food_name": food_name, "price": price, "quantity": quantity}
+        for food_name, price, quantity in zip(food_names, prices, quantities)
+    ]
+    try:
+        ctx = context()
+        results, stored = insert_food_batch(ctx.food_collection, hotel_name, items, hotel_location, shelf_life=LISTING_SHELF_LIFE)
+        if ctx.listing_cache is not None:
+            for document in stored:
+                ctx.listing_cache.upsert(document)
+        if stored:
+            ctx.listings_changed()
+        hotel_locations[hotel_name] = hotel_location
+        total_items = ctx.active_items.increment(len(stored)) if stored else ctx.active_items.value()
+        notify_subscribers(stored)
         
-        result = food_collection.update_one(
-            {"_id": food_item["_id"]},
-            {"$set": update_data}
-        )
+        logger.info("   ✓ Stored %s/%s items", len(stored), len(results))
+        logger.info("   ✓ Total active items in database: %s", total_items)
+        return f"{summarize_results(results)}\nHotel: {hotel_name} at location {hotel_location}"
         
-        if result.modified_count > 0:
-            print(f"   ✓ Successfully booked!")
-            print(f"   ✓ New quantity: {new_quantity}")
-            
-            if new_quantity <= 0:
-                return f"✓ Successfully booked '{food_name}' from {hotel_name} for ${food_item['price']}!\n🎉 This was the last item available!"
-            else:
-                return f"✓ Successfully booked '{food_name}' from {hotel_name} for ${food_item['price']}!\n📦 Remaining quantity: {new_quantity}"
-        else:
-            print(f"   ❌ Failed to update database")
-            return f"❌ Failed to book the item. Please try again."
-            
+    except ValueError as e:
+        logger.error("   ❌ Invalid batch: %s", e)
+        return f"❌ Error: {e}"
     except Exception as e:
-        print(f"   ❌ Database error: {e}")
-        return f"❌ Error booking food: {str(e)}"
+        logger.error("   ❌ Database error: %s", e)
+        return f"❌ Error storing food in database: {str(e)}"
+
+
+def booking_reply(hotel_name: str, food_name: str, booked_item: dict, reservation: dict = None) -> str:
+    """What book_food tells the worker about a successful booking or hold."""
+    if reservation is not None:
+        reply = f"✓ Reserved '{food_name}' from {hotel_name} for ${booked_item['price']}!\n{pickup_note(reservation)}"
+    else:
+        reply = f"✓ Successfully booked '{food_name}' from {hotel_name} for ${booked_item['price']}!"
+    if booked_item['quantity'] <= 0:
+        return f"{reply}\n🎉 This was the last item available!"
+    return f"{reply}\n📦 Remaining quantity: {booked_item['quantity']}"
+
+
+def session_of(state: dict):
+    """The chat session a tool runs for, or None when it is called outside the graph."""
+    return state.get("session_id", "default") if state is not None else None
+
+
+def booked_line(hotel_name: str, food_name: str, quantity: int, booked) -> str:
+    """One book_many result line; `booked` is (reservation or None, listing) or None."""
+    if not booked:
+        return f"❌ {quantity} x '{food_name}' from {hotel_name} - not available in that quantity"
+    reservation, booked_item = booked
+    line = f"✓ {quantity} x '{food_name}' from {hotel_name} for ${booked_item['price']} each (remaining: {booked_item['quantity']})"
+    return f"{line}\n   {pickup_note(reservation)}" if reservation is not None else line
+
+
+def quantity_problem_line(hotel_name: str, food_name: str, quantity: int) -> str:
+    """book_many result line for a booking that was refused before touching the database."""
+    return f"❌ {quantity} x '{food_name}' from {hotel_name} - quantity must be at least 1"
+
+
+def pickup_note(reservation: dict) -> str:
+    return f"🎫 Reservation code: {reservation['_id']} - show it at pickup by {reservation['expires_at']:%H:%M}, or the food is released"
+
+
+def reservation_problem(code: str, reservation: dict) -> str:
+    """Why a reservation could not be confirmed or cancelled."""
+    if reservation is None:
+        return f"❌ Reservation {code}: unknown code"
+    reasons = {
+        "held": "the hold has expired",
+        "expired": "the hold has expired",
+        "confirmed": "already picked up",
+        "cancelled": "it was cancelled"
+    }
+    return f"❌ Reservation {code} ({reservation['quantity']} x '{reservation['food_name']}' from {reservation['hotel_name']}): {reasons.get(reservation['status'], reservation['status'])}"
+
+
+@tool
+def confirm_pickup(hotel_name: str, reservation_codes: list[str], state: Annotated[dict, InjectedState] = None) -> str:
+    """Confirm that workers picked up their reserved food (hotel side). Confirm several codes at once for a group pickup.
+    
+    Args:
+        hotel_name: Name of the hotel handing the food over
+        reservation_codes: The reservation code(s) the workers show
+    """
+    logger.debug("🔧 [TOOL] confirm_pickup() called")
+    logger.debug("   📝 Codes: %s", len(reservation_codes))
+    
+    if state is not None and state.get("user_type") != "hotel":
+        return "❌ Error: Only the hotel can confirm a pickup."
+    
+    try:
+        ctx = context()
+        lines = []
+        confirmed = 0
+        for code in reservation_codes:
+            update = confirm_reservation(ctx.food_collection, ctx.reservations, code, hotel_name)
+            if not update.ok:
+                lines.append(reservation_problem(code, update.reservation))
+                continue
+            confirmed += 1
+            if ctx.listing_cache is not None:
+                ctx.listing_cache.upsert(update.listing)
+            reservation = update.reservation
+            lines.append(f"✓ Reservation {code}: {reservation['quantity']} x '{reservation['food_name']}' picked up")
+        
+        logger.info("   ✓ Confirmed %s/%s pickups", confirmed, len(reservation_codes))
+        return f"Confirmed {confirmed} of {len(reservation_codes)} pickups:\n" + "\n".join(lines)
+        
+    except Exception as e:
+        logger.error("   ❌ Database error: %s", e)
+        return f"❌ Error confirming pickup: {str(e)}"
+
+
+@tool
+def cancel_reservation(reservation_code: str, state: Annotated[dict, InjectedState] = None) -> str:
+    """Cancel a worker's reservation and put the held food back on offer.
+    
+    Args:
+        reservation_code: The reservation code from the booking
+    """
+    logger.debug("🔧 [TOOL] cancel_reservation() called")
+    logger.debug("   📝 Code: %s", reservation_code)
+    
+    try:
+        ctx = context()
+        update = cancel_held_reservation(ctx.food_collection, ctx.reservations, reservation_code, session_of(state))
+        if not update.ok:
+            return reservation_problem(reservation_code, update.reservation)
+        reservation = update.reservation
+        if ctx.listing_cache is not None:
+            ctx.listing_cache.upsert(update.listing)
+        ctx.listings_changed()
+        if reopened(update.listing, reservation["quantity"]):
+            ctx.active_items.increment()
+        
+        logger.info("   ✓ Released %s portion(s), quantity now %s", reservation['quantity'], update.listing['quantity'])
+        return f"✓ Cancelled reservation {reservation_code} for {reservation['quantity']} x '{reservation['food_name']}' from {reservation['hotel_name']}."
+        
+    except Exception as e:
+        logger.error("   ❌ Database error: %s", e)
+        return f"❌ Error cancelling reservation: {str(e)}"
+
+
+@tool
+def subscribe_to_food(max_price: float, item_name: str = None, max_distance_km: float = None,
+                      state: Annotated[dict, InjectedState] = None) -> str:
+    """Alert the worker as soon as matching food is posted, instead of searching again later. Looks up the worker's location itself when a distance is given.
+    
+    Args:
+        max_price: Maximum price worker is willing to pay
+        item_name: Optional - specific food item name to watch for (e.g., "pizza", "chicken", "pasta")
+        max_distance_km: Optional - maximum distance in kilometers from the worker
+    """
+    logger.debug("🔧 [TOOL] subscribe_to_food() called")
+    
+    user_location = None
+    if max_distance_km:
+        user_location = get_location.invoke({"state": state})
+        if user_location.startswith("error"):
+            return "❌ Could not determine your location. Try an alert without a distance."
+    return add_subscription(state, max_price, item_name, max_distance_km, user_location)
+
+
+def add_subscription(state: dict, max_price: float, item_name: str = None, max_distance_km: float = None,
+                     user_location: str = None) -> str:
+    """Register a worker's standing search; shared by the sync and async tools."""
+    if not USE_SUBSCRIPTIONS:
+        return "❌ Food alerts are not available. Please search again later."
+    session_id = (state or {}).get("session_id", "default")
+    try:
+        subscription = new_subscription(session_id, max_price, item_name, user_location,
+                                        max_distance_km * 1000 if max_distance_km else None, SUBSCRIPTION_TTL)
+    except ValueError as e:
+        logger.error("   ❌ Invalid subscription: %s", e)
+        return f"❌ Error: {e}"
+    subscription = context().subscriptions.add(subscription)
+    
+    logger.info("   ✓ Subscription %s: %s", subscription.subscription_id, subscription.describe())
+    hours = SUBSCRIPTION_TTL.total_seconds() / 3600
+    return (f"🔔 Alert {subscription.subscription_id} set: {subscription.describe()}, for the next {hours:g} hours. "
+            f"The worker is notified as soon as a hotel posts a match.")
+
+
+@tool
+def unsubscribe_from_food(subscription_id: str = None, state: Annotated[dict, InjectedState] = None) -> str:
+    """Stop food alerts: one alert by its id, or all of the worker's alerts.
+    
+    Args:
+        subscription_id: Optional - the alert id from subscribe_to_food; leave it out to stop every alert
+    """
+    logger.debug("🔧 [TOOL] unsubscribe_from_food() called")
+    
+    session_id = (state or {}).get("session_id", "default")
+    subscriptions = context().subscriptions
+    if subscription_id:
+        removed = subscriptions.remove(subscription_id.strip(), session_id)
+        if removed is None:
+            return f"❌ No alert {subscription_id} found. It may have expired."
+        return f"✓ Stopped alert {removed.subscription_id}: {removed.describe()}."
+    removed = subscriptions.remove_session(session_id)
+    if not removed:
+        return "No food alerts are set."
+    return f"✓ Stopped {len(removed)} alert(s)."
+
+
+def notify_subscribers(documents: list, read_back: bool = False) -> int:
+    """Match newly stored listings against the standing subscriptions and queue the notifications.
+
+    With MATCH_SUBSCRIPTIONS_FROM_LISTING_CACHE only listings the listing
+    cache read back (`read_back`) are matched, so each is matched once.
+    Never raises: a failed match must not fail the insert that triggered it.
+    """
+    if not USE_SUBSCRIPTIONS or not documents:
+        return 0
+    ctx = context()
+    if read_back != (MATCH_SUBSCRIPTIONS_FROM_LISTING_CACHE and ctx.listing_cache is not None):
+        return 0
+    try:
+        with tracer.span("subscriptions.match", "subscriptions", listings=len(documents)):
+            notifications = ctx.subscriptions.match(documents)
+            set_attributes(notifications=len(notifications))
+        if notifications:
+            ctx.notifier.dispatch(notifications)
+            logger.info("   🔔 Notifying %s subscribed worker(s)", len(notifications))
+        return len(notifications)
+    except Exception as e:
+        logger.warning("⚠️ Could not notify subscribers: %s", e)
+        return 0
+
+
+def read_back_listings(documents: list):
+    notify_subscribers(documents, read_back=True)
+
+
+def show_notifications(session_id: str):
+    """Print the food alerts delivered to this session since the last call."""
+    sink = find_sink(context().notifier, LocalSink)
+    if sink is None:
+        return
+    for notification in sink.drain(session_id):
+        print(notification.message())
+
+
+def record_booking(booked_item: dict):
+    """Propagate a booked listing to the in-process cache and active counter."""
+    ctx = context()
+    if ctx.listing_cache is not None:
+        ctx.listing_cache.upsert(booked_item)
+    ctx.listings_changed()
+    if not booked_item["is_available"]:
+        ctx.active_items.decrement()
+
+
+def record_released_holds(listings: list, reopened_count: int):
+    """Propagate listings whose expired holds the reaper released to the cache and active counter."""
+    ctx = context()
+    if ctx.listing_cache is not None:
+        for listing in listings:
+            ctx.listing_cache.upsert(listing)
+    if listings:
+        ctx.listings_changed()
+    if reopened_count:
+        ctx.active_items.increment(reopened_count)
+
+
+def count_active_items() -> int:
+    """Number of available listings, without scanning the collection."""
+    ctx = context()
+    if ctx.listing_cache is not None:
+        return len(ctx.listing_cache)
+    return ctx.active_items.value()
+
+
+def forget_archived_listings(documents: list):
+    """Drop archived listings from the cache and the active counter."""
+    ctx = context()
+    still_available = 0
+    for document in documents:
+        if ctx.listing_cache is not None:
+            ctx.listing_cache.remove(document["_id"])
+        if document.get("is_available"):
+            still_available += 1
+    if documents:
+        ctx.listings_changed()
+    if still_available:
+        ctx.active_items.decrement(still_available)
+
+
+def listing_filter(hotel_name: str, food_name: str, listing_id: str = None) -> dict:
+    """Query matching an unexpired listing: by its listing id when given, else by hotel and food name (case-insensitive).
+
+    A listing id that does not parse (the model garbled it) falls back to
+    the names rather than failing the booking.
+    """
+    if listing_id:
+        try:
+            return booking_query(listing_id=listing_id)
+        except ValueError:
+            logger.warning("   ⚠️ Ignoring invalid listing id %r, booking by name", listing_id)
+    return booking_query(hotel_name, food_name)
 
 
 def calculate_distance_between_coords(coord1: str, coord2: str) -> float:
@@ -338,178 +1148,260 @@ def calculate_distance_between_coords(coord1: str, coord2: str) -> float:
     Returns:
         Distance in kilometers
     """
-    from math import radians, sin, cos, sqrt, atan2
-    
-    lat1, lon1 = map(float, coord1.split(','))
-    lat2, lon2 = map(float, coord2.split(','))
+    lat1, lon1 = parse_coordinates(coord1)
+    lat2, lon2 = parse_coordinates(coord2)
+    return float(haversine_m(lat1, lon1, [lat2], [lon2])[0]) / 1000
+
+
+tools = [tracer.instrument_tool(t) for t in (get_location, store_food_in_db, get_available_food, book_food, book_many, search_near_me,
+                                             post_surplus_here, store_food_batch, confirm_pickup, cancel_reservation,
+                                             subscribe_to_food, unsubscribe_from_food)]
+# Only hotel sessions' model is given these; a worker must not confirm its own hold
+HOTEL_ONLY_TOOLS = {"confirm_pickup"}
+
+
+def tools_for(user_type: str) -> list:
+    return [t for t in tools if user_type == "hotel" or t.name not in HOTEL_ONLY_TOOLS]
+
+
+# The Gemini client is created on the first model call; tests and
+# benchmarks assign a stand-in here instead
+llm = None
+_chat_model = None
+_bound_models = {}
+
+
+def get_llm(user_type: str = None):
+    """The model for `user_type` sessions, bound to the tools they may call (a stand-in in `llm` as it is)."""
+    global _chat_model
+    if llm is not None:
+        return llm
+    if user_type not in _bound_models:
+        with _startup_lock:
+            if _chat_model is None:
+                from langchain_google_genai import ChatGoogleGenerativeAI
+                _chat_model = ChatGoogleGenerativeAI(
+                    model="gemini-2.0-flash-exp",
+                    google_api_key="Enter your Google API key here",
+                )
+            if user_type not in _bound_models:
+                _bound_models[user_type] = _chat_model.bind_tools(tools_for(user_type))
+    return _bound_models[user_type]
+
+
+def build_model_messages(state: AgentState, history: list = None) -> list:
+    """System prompt + this session's history (read from the session store unless given) + the current turn."""
+    user_type = state.get("user_type", "unknown")
+    session_id = state.get("session_id", "default")
     
-    R = 6371.0
+    logger.debug("\n🤖 [MODEL] Processing message for user_type: %s (session %s)", user_type, session_id)
     
-    lat1_rad = radians(lat1)
-    lon1_rad = radians(lon1)
-    lat2_rad = radians(lat2)
-    lon2_rad = radians(lon2)
     
-    dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
+    # Same system message for every call with this user type, so the
+    # request prefix stays stable across tool rounds, turns and sessions
+    if history is None:
+        history = context().session_store.get_history(session_id)
+    all_messages = [system_prompt(user_type)] + trim_answered(history + list(state["messages"]))
     
-    a = sin(dlat / 2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    logger.debug("   📤 Sending %s messages to LLM", len(all_messages))
+    return all_messages
+
+
+def trim_answered(messages: list) -> list:
+    """Messages with the tool results the model has already answered from shrunk."""
+    if not TRIM_TOOL_RESULTS:
+        return messages
+    return trim_tool_results(messages, TOOL_RESULT_COMPACTORS, TOOL_RESULT_MAX_CHARS)
+
+
+def finish_model_turn(state: AgentState, response) -> AgentState:
+    """Record a completed turn in the session store and emit the response."""
+    turn = completed_turn(state, response)
+    if turn is not None:
+        kept = context().session_store.append(state.get("session_id", "default"), turn)
+        logger.debug("   🗂️ Session history: %s messages", len(kept))
     
-    distance = R * c
-    return distance
+    return {"messages": [response]}
+
+
+def completed_turn(state: AgentState, response):
+    """The messages to add to the session history, or None while the model is still calling tools."""
+    # The turn is complete once the model answers without calling tools
+    if response.tool_calls:
+        return None
+    return trim_answered(list(state["messages"]) + [response])
 
 
-tools = [get_location, store_food_in_db, get_available_food, book_food]
+def cached_response(all_messages: list):
+    """The cached model response for this input, or None (always None with USE_LLM_RESPONSE_CACHE off)."""
+    response_cache = context().response_cache
+    if response_cache is None:
+        return None
+    response = response_cache.get(all_messages)
+    set_attributes(llm_cache_hits=int(response is not None))
+    if response is not None:
+        logger.debug("   ♻️ Reusing cached LLM response")
+    return response
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash-exp",
-    google_api_key="Enter your Google API key here",
-).bind_tools(tools)
+
+def cache_response(all_messages: list, response):
+    response_cache = context().response_cache
+    if response_cache is not None:
+        response_cache.put(all_messages, response)
 
 
 def model_call(state: AgentState) -> AgentState:
-    user_type = state.get("user_type", "unknown")
+    all_messages = build_model_messages(state)
+    response = cached_response(all_messages)
+    if response is not None:
+        return finish_model_turn(state, response)
+    started = time.perf_counter()
+    with tracer.span("llm", "llm", messages=len(all_messages)) as span:
+        response = get_llm(state.get("user_type")).invoke(all_messages)
+        span.set(tool_calls=len(response.tool_calls), **llm_usage(response))
+    router_metrics.record_llm_call(time.perf_counter() - started)
+    logger.debug("   📥 Received response from LLM")
+    cache_response(all_messages, response)
+    return finish_model_turn(state, response)
+
+
+router_metrics = RouterMetrics()
+
+
+def parse_fast_path(state: AgentState):
+    """Intent for the latest user message if the fast path can serve it, else None."""
+    last_message = state["messages"][-1]
+    if not USE_FAST_PATH_ROUTER or not isinstance(last_message, HumanMessage):
+        return None
+    return parse_request(last_message.content, state.get("user_type"))
+
+
+def run_intent(intent, state: AgentState):
+    """Call the tools for a parsed intent directly; None means hand over to the LLM."""
+    args = intent.args
     
-    print(f"\n🤖 [MODEL] Processing message for user_type: {user_type}")
-    
-    system_prompt = SystemMessage(content=f"""You are a helpful AI assistant for a food waste management system.
-
-CURRENT USER TYPE: {user_type.upper()}
-
-**If user is a HOTEL:**
-When a hotel tells you about leftover food, you must ALWAYS follow these steps:
-1. Call get_location() first to get their GPS coordinates (format: "latitude,longitude")
-2. Extract the following information from their message:
-   - hotel_name: The name of the hotel (e.g., "Taj Hotel", "Grand Plaza", "Marriott")
-   - food_name: The name or description of the food item
-   - price: The price per item/portion (as a number)
-   - quantity: How much food is available (e.g., "5", "2", "3") as number
-3. Take above details from user strictly, if he doesn't provide them, ask him to repeat
-4. Call store_food_in_db() with all the details: hotel_name, food_name, price, quantity, and hotel_location (coordinates from step 1)
-5. Confirm the storage with a friendly message to the hotel
-
-Example:
-Hotel: "I'm from Taj Hotel. We have 5 pasta portions for $8 each"
-You: Call get_location() → get coordinates → Call store_food_in_db("Taj Hotel", "pasta", 8, 5, coordinates) → Confirm
-
-**If user is a WORKER:**
-When a worker asks for food, you must ALWAYS follow these steps:
-
-STEP 1 - Check for PRICE:
-- If the worker mentioned a price limit (e.g., "under $10", "below $5", "max $7"), note it
-- If NO price mentioned, ask politely: "What's your budget? How much are you willing to spend?"
-- If they STILL don't provide a price after asking, set max_price to 999999 (show everything)
-
-STEP 2 - Check for ITEM NAME:
-- Check if they mentioned a specific food item (e.g., "pizza", "chicken", "pasta", "burger", "sandwich")
-- If yes, note the item_name
-- If no, leave item_name as None
-
-STEP 3 - Check for DISTANCE:
-- Check if they mentioned distance/radius keywords like:
-  * "within Xkm", "under Xkm", "X kilometers"
-  * "nearby", "near me", "close", "closest"
-  * "in my area", "around me"
-- If distance mentioned:
-  * Extract the number (e.g., "within 5km" → 5)
-  * If they say "nearby/close" without number, assume 3km as default
-  * Note max_distance_km
-- If NO distance mentioned, leave max_distance_km as None
-
-STEP 4 - Get Location (when needed):
-- Call get_location() to get worker's GPS coordinates
-- You ALWAYS need this, whether they mention distance or not
-
-STEP 5 - Search for Food:
-- Call get_available_food() with appropriate parameters:
-  * max_price (from STEP 1)
-  * item_name (from STEP 2, or None)
-  * max_distance_km (from STEP 3, or None)
-  * user_location (from STEP 4, only if max_distance_km is provided)
-
-STEP 6 - Present Results:
-- Show the results clearly
-- If distance search: Results are sorted by nearest first
-- If no distance: Results are sorted by cheapest first
-- Be friendly and helpful
-
-STEP 7 - Booking (when requested):
-- If worker wants to book/order/reserve a specific item:
-  * They must provide: hotel name and food name
-  * If missing info, ask: "Which food from which hotel would you like to book?"
-  * Once you have both, call book_food(hotel_name, food_name)
-  * Confirm the booking with price and remaining quantity
-- Booking keywords: "book", "order", "reserve", "take", "I want this", "get this", "I'll take"
-
-Examples:
-Worker: "Show me food under $10"
-You: Call get_location() → Call get_available_food(10, None, None, None) → Present results
-
-Worker: "I want pizza within 5km under $15"
-You: Call get_location() → get coordinates → Call get_available_food(15, "pizza", 5, coordinates) → Present results
-
-Worker: "Book the pasta from Taj Hotel"
-You: Call book_food("Taj Hotel", "pasta") → Confirm booking with price and quantity
-
-Worker: "I want the chicken from Grand Plaza"
-You: Call book_food("Grand Plaza", "chicken") → Confirm booking
-
-Worker: "I'll take the first option"
-You: [identify hotel and food from previous results] → Call book_food(hotel_name, food_name) → Confirm
-
-Worker: "I want something nearby"
-You: "What's your budget?" → [if they say "$8"] → Call get_location() → get coordinates → Call get_available_food(8, None, 3, coordinates) → Present results
-
-Worker: "Show me chicken"
-You: "What's your budget?" → [if they don't answer] → Call get_location() → Call get_available_food(999999, "chicken", None, None) → Present results
-
-Be concise, friendly, and helpful. You are currently helping a {user_type}.""")
-    
-    all_messages = [system_prompt] + conversation_memory + state["messages"]
-    
-    print(f"   📤 Sending {len(all_messages)} messages to LLM")
-    response = llm.invoke(all_messages)
-    print(f"   📥 Received response from LLM")
-    
-    conversation_memory.extend(state["messages"])
-    conversation_memory.append(response)
-    
-    if len(conversation_memory) > 10:
-        del conversation_memory[:len(conversation_memory) - 10]
-        print(f"   🗑️ Trimmed conversation memory to last 10 messages")
+    if intent.action == "search":
+        return search_near_me.invoke({**{k: v for k, v in args.items() if v is not None}, "state": state})
     
-    return {"messages": [response]}
+    if intent.action == "book":
+        if args["quantity"] == 1:
+            return booked_reply(book_food.invoke({"hotel_name": args["hotel_name"], "food_name": args["food_name"], "state": state}))
+        return booked_reply(book_many.invoke({"hotel_names": [args["hotel_name"]], "food_names": [args["food_name"]],
+                                              "quantities": [args["quantity"]], "state": state}))
+    
+    if intent.action == "post":
+        return post_surplus_here.invoke({**args, "state": state})
+    
+    return None
+
+
+def booked_reply(reply: str):
+    """A fast-path booking's reply, or None if nothing was booked.
+
+    The names were taken from the message as written; the LLM can search
+    for what the worker meant instead of passing on "not available".
+    """
+    if reply.startswith("❌") or reply.startswith("Booked 0 of"):
+        return None
+    return reply
+
+
+def finish_fast_path(state: AgentState, intent, reply, started: float) -> AgentState:
+    """Record a fast-path turn, or mark it for the LLM if no reply was produced."""
+    if reply is None:
+        return fast_path_missed(intent)
+    context().session_store.append(state.get("session_id", "default"), fast_path_turn(state, intent, reply))
+    return fast_path_served(intent, reply, started)
+
+
+def fast_path_missed(intent) -> AgentState:
+    router_metrics.record_fallback()
+    logger.debug("   ↪️ Fast path could not complete '%s' - handing over to LLM", intent.action)
+    return {}
+
+
+def fast_path_turn(state: AgentState, intent, reply: str) -> list:
+    """The messages a fast-path turn adds to the session history."""
+    # The history keeps a compact copy of search replies, like it does of search tool results
+    stored = compact_food_results(reply) if intent.action == "search" and TRIM_TOOL_RESULTS else reply
+    return list(state["messages"]) + [AIMessage(content=stored)]
+
+
+def fast_path_served(intent, reply: str, started: float) -> AgentState:
+    router_metrics.record_fast_path(time.perf_counter() - started)
+    logger.debug("   ⚡ Served '%s' without an LLM call", intent.action)
+    return {"messages": [AIMessage(content=reply)]}
+
+
+def fast_path(state: AgentState) -> AgentState:
+    logger.debug("\n⚡ [ROUTER] Checking for a structured request...")
+    intent = parse_fast_path(state)
+    if intent is None:
+        router_metrics.record_fallback()
+        logger.debug("   ↪️ Not a structured request - using LLM")
+        return {}
+    
+    started = time.perf_counter()
+    return finish_fast_path(state, intent, run_intent(intent, state), started)
+
+
+def after_fast_path(state: AgentState) -> Literal["agent", "end"]:
+    return "end" if isinstance(state["messages"][-1], AIMessage) else "agent"
 
 
 def should_continue(state: AgentState) -> Literal["continue", "end"]:
     messages = state["messages"]
     last_message = messages[-1]
     
-    print(f"\n🔀 [DECISION] Checking if should continue...")
+    logger.debug("\n🔀 [DECISION] Checking if should continue...")
     
     if not last_message.tool_calls:
-        print(f"   ✓ No tool calls found - ending conversation")
+        logger.debug("   ✓ No tool calls found - ending conversation")
         return "end"
     else:
-        print(f"   ✓ Tool calls found: {len(last_message.tool_calls)} call(s)")
+        logger.debug("   ✓ Tool calls found: %s call(s)", len(last_message.tool_calls))
         for i, tool_call in enumerate(last_message.tool_calls, 1):
-            print(f"      {i}. {tool_call['name']}()")
+            logger.debug("      %s. %s()", i, tool_call['name'])
         return "continue"
 
 
-# Build graph
-graph = StateGraph(AgentState)
-graph.add_node("our_agent", model_call)
-tool_node = ToolNode(tools=tools)
-graph.add_node("tools", tool_node)
-graph.set_entry_point("our_agent")
-graph.add_conditional_edges("our_agent", should_continue, {
-    "continue": "tools",
-    "end": END
-})
-graph.add_edge("tools", "our_agent")
-app = graph.compile()
+def build_graph(agent_node, graph_tools, router_node=None):
+    """Compile the agent <-> tools loop, optionally behind a fast-path router node."""
+    graph = StateGraph(AgentState)
+    graph.add_node("our_agent", tracer.wrap(agent_node, "our_agent", "node"))
+    # ToolNode runs all tool calls from one model turn concurrently (thread
+    # pool for invoke, asyncio.gather for ainvoke), so independent calls the
+    # prompt asks for in the same turn cost a single round-trip
+    tool_node = ToolNode(tools=graph_tools)
+    graph.add_node("tools", tool_node)
+    if router_node is not None:
+        graph.add_node("fast_path", tracer.wrap(router_node, "fast_path", "node"))
+        graph.set_entry_point("fast_path")
+        graph.add_conditional_edges("fast_path", after_fast_path, {
+            "agent": "our_agent",
+            "end": END
+        })
+    else:
+        graph.set_entry_point("our_agent")
+    graph.add_conditional_edges("our_agent", should_continue, {
+        "continue": "tools",
+        "end": END
+    })
+    graph.add_edge("tools", "our_agent")
+    return graph.compile()
+
+
+_app = None
+
+
+def get_app():
+    """The compiled sync graph, built on first use."""
+    global _app
+    if _app is None:
+        with _startup_lock:
+            if _app is None:
+                _app = build_graph(model_call, tools, router_node=fast_path)
+    return _app
 
 
 def print_stream(stream):
@@ -533,6 +1425,8 @@ def hotel_interactive():
     print("- Type 'exit' to quit")
     print("="*60)
     
+    session_id = str(uuid.uuid4())
+    
     while True:
         message = input("\n🏨 Hotel Input: ").strip()
         
@@ -547,9 +1441,10 @@ def hotel_interactive():
         print("-" * 60)
         inputs = {
             "messages": [HumanMessage(content=message)],
-            "user_type": "hotel"
+            "user_type": "hotel",
+            "session_id": session_id
         }
-        print_stream(app.stream(inputs, stream_mode="values"))
+        print_stream(get_app().stream(inputs, stream_mode="values"))
 
 
 def worker_interactive():
@@ -560,10 +1455,14 @@ def worker_interactive():
     print("Instructions:")
     print("- Search for food by mentioning your budget, preferences, and location")
     print("- Book food by saying 'book [food] from [hotel]'")
+    print("- Ask to be alerted when food you want is posted, e.g. 'tell me when pizza under $8 shows up'")
     print("- Type 'exit' to quit")
     print("="*60)
     
+    session_id = str(uuid.uuid4())
+    
     while True:
+        show_notifications(session_id)
         message = input("\n👷 Worker Input: ").strip()
         
         if message.lower() == 'exit':
@@ -577,33 +1476,27 @@ def worker_interactive():
         print("-" * 60)
         inputs = {
             "messages": [HumanMessage(content=message)],
-            "user_type": "worker"
+            "user_type": "worker",
+            "session_id": session_id
         }
-        print_stream(app.stream(inputs, stream_mode="values"))
+        print_stream(get_app().stream(inputs, stream_mode="values"))
 
 
-def show_database():
-    """Show current database contents."""
+def show_database(limit: int = 20):
+    """Show a summary of the database and its newest listings (aggregated by MongoDB, see reports.py)."""
+    ctx = context()
     print("\n" + "=" * 60)
     print("📊 CURRENT DATABASE")
     print("=" * 60)
+    print(format_summary(ctx.food_collection, ctx.history_collection))
     
-    # Get all documents from MongoDB
-    all_foods = list(food_collection.find())
-    
-    if all_foods:
-        for i, food in enumerate(all_foods, 1):
-            print(f"\n{i}. {food['food_name']}")
-            print(f"   Hotel: {food['hotel_name']}")
-            print(f"   Price: ${food['price']}")
-            print(f"   Quantity: {food['quantity']}")
-            print(f"   Location: {food['hotel_location']}")
-            print(f"   Available: {food['is_available']}")
-            print(f"   Status: {food.get('status', 'active')}")
-            print(f"   Added: {food['timestamp']}")
-            if 'last_booked' in food:
-                print(f"   Last Booked: {food['last_booked']}")
-            print(f"   MongoDB ID: {food['_id']}")
+    listings, next_page = list_listings(ctx.food_collection, limit=limit)
+    if listings:
+        print(f"🆕 Newest {len(listings)} listings")
+        for i, listing in enumerate(listings, 1):
+            print(f"   {format_listing(i, listing)}")
+        if next_page:
+            print(f"   ... more with: python reports.py --uri ... listings --page-token {next_page}")
     else:
         print("No food items in database")
     print("=" * 60)
@@ -613,6 +1506,13 @@ def show_database():
 
 if __name__ == "__main__":
     
+    try:
+        startup()
+    except ConnectionFailure as e:
+        logger.error("❌ Failed to connect to MongoDB: %s", e)
+        logger.error("Please make sure MongoDB is running and accessible.")
+        exit(1)
+    
     # ========== CHOOSE ONE MODE ==========
     
     # MODE 1: Interactive Hotel Mode
@@ -623,5 +1523,5 @@ if __name__ == "__main__":
     
     # Close MongoDB connection
     print("\n🔌 Closing MongoDB connection...")
-    mongo_client.close()
+    shutdown()
     print("✓ MongoDB connection closed.")
\ No newline at end of file
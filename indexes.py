@@ -0,0 +1,213 @@
+"""Index definitions for the food_items collection, tuned to the tool queries.
+
+Query shapes (see food_queries.py) and the indexes that serve them:
+- is_available + price <= x, sorted by price   -> {is_available, price, _id, expires_at}
+- is_available + item words (+ price)          -> {is_available, food_name_tokens, price, _id, expires_at}
+- $geoNear + is_available + price              -> {location: 2dsphere, is_available, price, expires_at}
+- booking by hotel and food name               -> {hotel_name_norm, food_name_norm, expires_at}
+  (booking by listing handle is an _id lookup)
+- hotel location and admin listing pages       -> {hotel_name, created_at}, {created_at}
+  (reports.py), newest first
+- archival sweeps (see archival.py)            -> {expires_at}, {last_booked}
+- expired reservation holds (reservations.py)  -> {holds.expires_at}
+
+Every search also requires expires_at > now. It is the trailing key of the
+search indexes, so expired rows are filtered on index keys, not fetched.
+
+`check_query_plans()` runs explain() on each shape, and on the admin
+report queries, and reports any that fall back to a COLLSCAN.
+
+The app does not build indexes when it starts. `migrate()` (this script's
+default action) creates them, backfills fields older listings lack and
+seeds the active items counter; run it once per deployment and after
+upgrades. It is idempotent. It also indexes the history, reservations and
+sessions collections.
+
+Usage:
+    python indexes.py --uri mongodb://localhost:27017            # migrate: indexes + backfills
+    python indexes.py --uri mongodb://localhost:27017 --check    # fail on COLLSCAN plans
+"""
+
+import argparse
+import sys
+from datetime import timedelta
+
+from pymongo import ASCENDING, GEOSPHERE, IndexModel, UpdateOne
+from pymongo.errors import OperationFailure
+
+from bson import ObjectId
+
+from active_counter import ActiveItemCounter
+from archival import DEFAULT_SHELF_LIFE, HISTORY_COLLECTION_NAME, backfill_expiry, ensure_history_indexes
+from food_queries import booking_query, geo_search_pipeline, listing_handle, normalized_name_fields, search_query
+from reports import LISTING_PROJECTION, active_filter, listing_query, report_since
+from reservations import RESERVATIONS_COLLECTION_NAME, ensure_reservation_indexes
+from sessions import SESSIONS_COLLECTION_NAME, ensure_session_indexes
+
+FOOD_INDEXES = [
+    # _id is the tie-breaker of the (price, _id) page keyset
+    IndexModel(
+        [("is_available", ASCENDING), ("price", ASCENDING), ("_id", ASCENDING), ("expires_at", ASCENDING)],
+        name="available_price_id_expires"
+    ),
+    IndexModel(
+        [("is_available", ASCENDING), ("food_name_tokens", ASCENDING), ("price", ASCENDING), ("_id", ASCENDING), ("expires_at", ASCENDING)],
+        name="available_name_tokens_price_id_expires"
+    ),
+    IndexModel(
+        [("location", GEOSPHERE), ("is_available", ASCENDING), ("price", ASCENDING), ("expires_at", ASCENDING)],
+        name="location_available_price_expires"
+    ),
+    IndexModel(
+        [("hotel_name_norm", ASCENDING), ("food_name_norm", ASCENDING), ("expires_at", ASCENDING)],
+        name="hotel_food_norm_expires"
+    ),
+    IndexModel([("hotel_name", ASCENDING), ("created_at", ASCENDING)]),
+    IndexModel([("created_at", ASCENDING)]),
+    IndexModel([("expires_at", ASCENDING)]),
+    IndexModel([("last_booked", ASCENDING)]),
+    # Sparse: only listings with portions on hold have holds
+    IndexModel([("holds.expires_at", ASCENDING)], sparse=True),
+]
+
+# Indexes from earlier versions that the compound ones replace.
+# The bare 2dsphere index must go: $geoNear refuses to pick between two.
+SUPERSEDED_INDEXES = [
+    "price_1", "food_name_1", "is_available_1", "location_2dsphere", "hotel_name_1",
+    "available_price", "available_name_tokens_price", "location_available_price",
+    "available_price_id", "available_name_tokens_price_id"
+]
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def ensure_indexes(collection) -> list:
+    """Drop superseded indexes and create the declared ones (idempotent)."""
+    existing = collection.index_information()
+    for name in SUPERSEDED_INDEXES:
+        if name in existing:
+            collection.drop_index(name)
+    return collection.create_indexes(FOOD_INDEXES)
+
+
+def missing_indexes(collection) -> list:
+    """Names of declared indexes the collection does not have yet."""
+    existing = collection.index_information()
+    return [index.document["name"] for index in FOOD_INDEXES if index.document["name"] not in existing]
+
+
+def backfill_normalized_names(collection) -> int:
+    """Add food_name_norm/food_name_tokens/hotel_name_norm to listings stored before they existed."""
+    updated = 0
+    batch = []
+    missing = {"$or": [{"food_name_tokens": {"$exists": False}}, {"hotel_name_norm": {"$exists": False}}]}
+    for document in collection.find(missing, {"food_name": 1, "hotel_name": 1}):
+        fields = normalized_name_fields(document["food_name"], document["hotel_name"])
+        batch.append(UpdateOne({"_id": document["_id"]}, {"$set": fields}))
+        if len(batch) == BACKFILL_BATCH_SIZE:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
+
+
+def migrate(db, collection_name: str = "food_items", shelf_life=DEFAULT_SHELF_LIFE, history_retention_days: float = None,
+            reservation_retention_days: float = None, session_ttl_seconds: float = 3600) -> dict:
+    """Indexes on the listings, history, reservations and sessions collections, field backfills and the active items counter."""
+    collection = db[collection_name]
+    return {
+        "indexes": ensure_indexes(collection),
+        "normalized_names": backfill_normalized_names(collection),
+        "expiry": backfill_expiry(collection, shelf_life),
+        "history_indexes": ensure_history_indexes(db[HISTORY_COLLECTION_NAME], history_retention_days),
+        "reservation_indexes": ensure_reservation_indexes(db[RESERVATIONS_COLLECTION_NAME], reservation_retention_days),
+        "session_indexes": ensure_session_indexes(db[SESSIONS_COLLECTION_NAME], session_ttl_seconds),
+        "active_items": ActiveItemCounter(db, collection).seed()
+    }
+
+
+def tool_query_plans(collection) -> dict:
+    """explain() output for every query shape the tools and admin reports issue."""
+    db = collection.database
+    plans = {
+        "search by price": collection.find(search_query(10)).sort([("price", 1), ("_id", 1)]).limit(11).explain(),
+        "search by item": collection.find(search_query(10, "chicken tikka")).sort([("price", 1), ("_id", 1)]).limit(11).explain(),
+        "search next page": collection.find(search_query(10, after=(4.5, ObjectId()))).sort([("price", 1), ("_id", 1)]).limit(11).explain(),
+    }
+    plans["search nearby"] = db.command(
+        "aggregate", collection.name,
+        pipeline=geo_search_pipeline(25.2, 55.3, 5000, 10, "pizza", limit=11),
+        explain=True
+    )
+    plans["book by name"] = collection.find(booking_query("Taj Hotel", "chicken tikka")).limit(1).explain()
+    plans["book by listing id"] = collection.find(booking_query(listing_id=listing_handle(ObjectId()))).limit(1).explain()
+    newest_first = [("created_at", -1), ("_id", -1)]
+    plans["admin listing page"] = collection.find(listing_query(), LISTING_PROJECTION).sort(newest_first).limit(21).explain()
+    plans["admin listing by hotel"] = collection.find(listing_query("Taj Hotel"), LISTING_PROJECTION).sort(newest_first).limit(21).explain()
+    plans["admin hotel summary"] = db.command("aggregate", collection.name, pipeline=[{"$match": active_filter()}, {"$count": "n"}],
+                                              explain=True)
+    plans["admin sell-through"] = collection.find({"created_at": {"$gte": report_since(7)}}).explain()
+    return plans
+
+
+def find_collscans(plan) -> bool:
+    """True if any stage anywhere in an explain() document is a COLLSCAN."""
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(find_collscans(value) for value in plan.values())
+    if isinstance(plan, list):
+        return any(find_collscans(value) for value in plan)
+    return False
+
+
+def check_query_plans(collection) -> list:
+    """Names of tool queries whose plan contains a COLLSCAN (empty list = all indexed)."""
+    return [name for name, plan in tool_query_plans(collection).items() if find_collscans(plan)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", required=True, help="MongoDB connection string")
+    parser.add_argument("--database", default="food_waste_db")
+    parser.add_argument("--collection", default="food_items")
+    parser.add_argument("--shelf-life-hours", type=float, default=DEFAULT_SHELF_LIFE.total_seconds() / 3600,
+                        help="Shelf life given to listings stored before expiry existed")
+    parser.add_argument("--history-retention-days", type=float, default=90, help="TTL on archived listings (0 keeps them forever)")
+    parser.add_argument("--reservation-retention-days", type=float, default=30,
+                        help="TTL on confirmed, cancelled and expired reservations (0 keeps them forever)")
+    parser.add_argument("--session-ttl-seconds", type=float, default=3600, help="TTL on idle persisted chat sessions")
+    parser.add_argument("--check", action="store_true", help="Only explain the tool queries and fail on COLLSCAN")
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+    db = MongoClient(args.uri)[args.database]
+    collection = db[args.collection]
+
+    if args.check:
+        try:
+            offenders = check_query_plans(collection)
+        except OperationFailure as e:
+            print(f"❌ explain() failed: {e}")
+            sys.exit(1)
+        if offenders:
+            for name in offenders:
+                print(f"❌ COLLSCAN in query plan: {name}")
+            sys.exit(1)
+        print("✓ All tool and report queries use an index")
+        return
+
+    results = migrate(db, args.collection, timedelta(hours=args.shelf_life_hours), args.history_retention_days or None,
+                      args.reservation_retention_days or None, args.session_ttl_seconds)
+    print(f"✓ Indexes: {', '.join(results['indexes'])}")
+    print(f"✓ History indexes: {', '.join(results['history_indexes'])}")
+    print(f"✓ Reservation indexes: {', '.join(results['reservation_indexes'])}")
+    print(f"✓ Session indexes: {', '.join(results['session_indexes'])}")
+    print(f"✓ Backfilled normalized names on {results['normalized_names']} listings")
+    print(f"✓ Backfilled expiry times on {results['expiry']} listings")
+    print(f"✓ Active items counter: {results['active_items']}")
+
+
+if __name__ == "__main__":
+    main()
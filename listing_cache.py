@@ -0,0 +1,334 @@
+"""In-process snapshot of the active food_items listings.
+
+Worker searches vastly outnumber hotel posts and bookings, so instead of
+hitting MongoDB on every search we keep the active rows in memory, indexed
+by price (a sorted list), by location (a NumPy grid index, see geo.py) and
+by food name (a typo-tolerant word index, see food_names.py).
+
+The location index is static, so it is rebuilt lazily: listings added
+since the last build are kept in a small pending set and measured by brute
+force, and the index is rebuilt once that set grows past a fraction of
+the snapshot. Removed listings simply drop out of the results.
+
+The snapshot is kept fresh in two ways:
+- write-through: inserts and bookings made by this process are applied
+  immediately via `upsert()`
+- change feed: a MongoDB change stream when the deployment supports one
+  (replica sets / Atlas), otherwise polling on a `created_at`/`last_booked`
+  watermark whenever the snapshot is older than `max_staleness_seconds`
+
+`on_change`, if given, is called whenever the change feed brings a
+listing that differs from the snapshot's copy, i.e. a write made by
+another process (see result_cache.py). `on_new`, if given, is called with
+each recently posted listing the change feed brings, once, whichever
+process posted it (food alerts across processes, see runner.py).
+"""
+
+import heapq
+import threading
+import time
+from bisect import bisect_right, insort
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from itertools import islice
+import numpy as np
+from pymongo.errors import PyMongoError
+
+from food_names import FoodNameIndex
+from geo import DEFAULT_CELL_DEGREES, GeoIndex, haversine_m
+
+# Re-read a little before the watermark so writes from processes with a
+# slightly lagging clock are not skipped; re-applying a listing is harmless.
+WATERMARK_OVERLAP = timedelta(seconds=2)
+# Listings posted longer ago than this are not passed to on_new
+NEW_LISTING_WINDOW = timedelta(minutes=10)
+
+# Rebuild the location index once this many listings (or this share of the
+# snapshot, whichever is larger) were added since the last build
+GEO_REBUILD_MIN_PENDING = 256
+GEO_REBUILD_FRACTION = 0.1
+
+
+class ListingCache:
+    """Snapshot of active listings with price and spatial-grid indexes."""
+
+    def __init__(self, collection, max_staleness_seconds: float = 5.0, grid_size_degrees: float = DEFAULT_CELL_DEGREES,
+                 on_change=None, on_new=None):
+        self.collection = collection
+        self.max_staleness_seconds = max_staleness_seconds
+        self.grid_size_degrees = grid_size_degrees
+        self.on_change = on_change
+        self.on_new = on_new
+
+        self._lock = threading.RLock()
+        self._listings = {}        # _id -> document
+        self._price_index = []     # sorted [(price, _id)]
+        self._geo_index = None     # GeoIndex over the listings present at the last build
+        self._geo_pending = set()  # _ids added since, not in the index yet
+        self._names = FoodNameIndex()
+        self._watermark = None     # newest created_at / last_booked seen
+        self._announced = OrderedDict()  # _id -> created_at of listings passed to on_new
+        self._loaded = False
+        self._last_refresh = 0.0
+        self._streaming = False
+
+    def __len__(self):
+        return len(self._listings)
+
+    # ---------- loading and refreshing ----------
+
+    def load(self):
+        """Replace the snapshot with every available listing.
+
+        Listings in the first snapshot are not passed to `on_new`; ones a
+        later reload finds for the first time are.
+        """
+        new = []
+        with self._lock:
+            self._listings.clear()
+            self._price_index.clear()
+            self._geo_index = None
+            self._geo_pending.clear()
+            self._names = FoodNameIndex()
+            self._watermark = None
+            for document in self.collection.find({"is_available": True}):
+                self.upsert(document)
+                self._advance_watermark(document)
+                if self.on_new is not None and self._first_sighting(document) and self._loaded:
+                    new.append(document)
+            self._loaded = True
+            self._rebuild_geo_index()
+            self._last_refresh = time.monotonic()
+        if self.on_change is not None:
+            self.on_change()
+        if new:
+            self.on_new(new)
+
+    def refresh_if_stale(self):
+        """Poll for changes if the snapshot is older than the staleness bound."""
+        if self._streaming:
+            return
+        if time.monotonic() - self._last_refresh < self.max_staleness_seconds:
+            return
+        self.refresh()
+
+    def refresh(self):
+        """Apply every listing created or booked since the last watermark."""
+        with self._lock:
+            if self._watermark is None:
+                self.load()
+                return
+            since = self._watermark - WATERMARK_OVERLAP
+            changed = self.collection.find({
+                "$or": [
+                    {"created_at": {"$gte": since}},
+                    {"last_booked": {"$gte": since}}
+                ]
+            })
+            for document in changed:
+                self._apply(document)
+            self._last_refresh = time.monotonic()
+
+    def start_change_stream(self) -> bool:
+        """Follow the collection's change stream in a background thread.
+
+        Returns False when the server does not support change streams
+        (standalone mongod), in which case polling stays in charge.
+        """
+        try:
+            stream = self.collection.watch(full_document="updateLookup")
+        except Exception:
+            # Standalone servers and test stand-ins have no change streams
+            return False
+
+        def follow():
+            try:
+                with stream:
+                    for change in stream:
+                        document = change.get("fullDocument")
+                        if document is not None:
+                            self._apply(document)
+                        elif change.get("operationType") == "delete":
+                            self.remove(change["documentKey"]["_id"])
+                            if self.on_change is not None:
+                                self.on_change()
+            except PyMongoError:
+                pass
+            self._streaming = False
+
+        self._streaming = True
+        threading.Thread(target=follow, name="listing-cache-stream", daemon=True).start()
+        return True
+
+    # ---------- write-through ----------
+
+    def upsert(self, document: dict):
+        """Add, replace or drop a listing depending on its availability."""
+        with self._lock:
+            self.remove(document["_id"])
+            if not document.get("is_available"):
+                return
+            listing_id = document["_id"]
+            self._listings[listing_id] = document
+            insort(self._price_index, (document["price"], listing_id))
+            self._names.add(listing_id, document["food_name"])
+            if document.get("location"):
+                self._geo_pending.add(listing_id)
+
+    def remove(self, listing_id):
+        with self._lock:
+            document = self._listings.pop(listing_id, None)
+            if document is None:
+                return
+            entry = (document["price"], listing_id)
+            position = bisect_right(self._price_index, entry) - 1
+            if position >= 0 and self._price_index[position] == entry:
+                del self._price_index[position]
+            self._names.remove(listing_id)
+            self._geo_pending.discard(listing_id)
+
+    # ---------- search ----------
+
+    def search(self, max_price: float, item_name: str = None, lat: float = None, lon: float = None, max_distance_meters: float = None,
+               after: tuple = None, limit: int = None) -> list:
+        """Search the snapshot the same way get_available_food queries MongoDB.
+
+        Without a location, results are sorted by (price, _id), cheapest first.
+        With one, they carry a `distance` in meters and are sorted by
+        (distance, _id), nearest first. `after` is a decoded page token and
+        `limit` caps the page, as in the database queries. `item_name`
+        matches like the database query, plus small typos.
+        """
+        near = lat is not None and lon is not None and max_distance_meters is not None
+        now = datetime.now()
+        with self._lock:
+            named = self._names.search(item_name) if item_name else None
+            if near:
+                distances = self._distances_within(lat, lon, max_distance_meters)
+                documents = [self._listings[listing_id] for listing_id in distances]
+            else:
+                start = 0 if after is None else bisect_right(self._price_index, after)
+                end = bisect_right(self._price_index, (max_price, _MAX_KEY))
+                priced = end - start
+                # Walking the name matches sorts all of them; walking the prices
+                # reads about priced / len(named) rows per result
+                if named is not None and len(named) < priced and (limit is None or len(named) ** 2 < limit * priced):
+                    entries = sorted((self._listings[listing_id]["price"], listing_id) for listing_id in named)
+                    candidates = (listing_id for price, listing_id in entries
+                                  if price <= max_price and (after is None or (price, listing_id) > after))
+                else:
+                    candidates = (listing_id for _, listing_id in islice(self._price_index, start, end))
+                # Candidates are already in (price, _id) order, so stop at a full
+                # page instead of reading every row in the price range
+                matching = self._matching((self._listings[listing_id] for listing_id in candidates), max_price, named, now)
+                return [dict(document) for document in islice(matching, limit)]
+
+        results = []
+        for document in self._matching(documents, max_price, named, now):
+            distance = distances[document["_id"]]
+            if after is not None and (distance, document["_id"]) <= after:
+                continue
+            results.append((distance, document))
+        key = lambda entry: (entry[0], entry[1]["_id"])
+        ordered = heapq.nsmallest(limit, results, key=key) if limit is not None else sorted(results, key=key)
+        return [dict(document, distance=distance) for distance, document in ordered]
+
+    @staticmethod
+    def _matching(documents, max_price: float, named: set, now: datetime):
+        for document in documents:
+            if document["price"] > max_price:
+                continue
+            # Expired rows stay in the snapshot until the archive sweep deletes them
+            expires_at = document.get("expires_at")
+            if expires_at is not None and expires_at <= now:
+                continue
+            if named is not None and document["_id"] not in named:
+                continue
+            yield document
+
+    # ---------- internals ----------
+
+    def _apply(self, document: dict):
+        """Upsert a listing read back from MongoDB and move the watermark.
+
+        Write-through updates deliberately do not move the watermark: this
+        process's clock must not hide older writes from other processes.
+        """
+        with self._lock:
+            changed = self._listings.get(document["_id"]) != (document if document.get("is_available") else None)
+            self.upsert(document)
+            self._advance_watermark(document)
+            new = self.on_new is not None and document.get("is_available") and self._first_sighting(document)
+        # Re-read rows this process already applied (the watermark overlap) are not changes
+        if changed and self.on_change is not None:
+            self.on_change()
+        if new:
+            self.on_new([document])
+
+    def _first_sighting(self, document: dict) -> bool:
+        """True the first time a listing posted within NEW_LISTING_WINDOW is seen.
+
+        Write-through upserts do not count, so a listing this process
+        posted is still new when the change feed brings it back.
+        """
+        cutoff = datetime.now() - NEW_LISTING_WINDOW
+        while self._announced and next(iter(self._announced.values())) < cutoff:
+            self._announced.popitem(last=False)
+        created_at = document.get("created_at")
+        if created_at is None or created_at < cutoff or document["_id"] in self._announced:
+            return False
+        self._announced[document["_id"]] = created_at
+        return True
+
+    def _advance_watermark(self, document: dict):
+        for field in ("created_at", "last_booked"):
+            value = document.get(field)
+            if value is not None and (self._watermark is None or value > self._watermark):
+                self._watermark = value
+
+    def _distances_within(self, lat: float, lon: float, radius_m: float) -> dict:
+        """_id -> distance in meters for every listing within the radius."""
+        pending = self._geo_pending
+        indexed = len(self._geo_index) if self._geo_index is not None else 0
+        if self._geo_index is None or len(pending) > max(GEO_REBUILD_MIN_PENDING, GEO_REBUILD_FRACTION * indexed):
+            self._rebuild_geo_index()
+            pending = ()
+
+        distances = {}
+        positions, found = self._geo_index.radius(lat, lon, radius_m)
+        for position, distance in zip(positions.tolist(), found.tolist()):
+            listing_id = self._geo_index.ids[position]
+            # Listings booked out or removed since the build are skipped
+            if listing_id in self._listings:
+                distances[listing_id] = distance
+
+        if pending:
+            ids = list(pending)
+            lons, lats = np.array([self._listings[listing_id]["location"]["coordinates"] for listing_id in ids]).T
+            for listing_id, distance in zip(ids, haversine_m(lat, lon, lats, lons).tolist()):
+                if distance <= radius_m:
+                    distances[listing_id] = distance
+        return distances
+
+    def _rebuild_geo_index(self):
+        ids, lats, lons = [], [], []
+        for listing_id, document in self._listings.items():
+            location = document.get("location")
+            if location:
+                lon, lat = location["coordinates"]
+                ids.append(listing_id)
+                lats.append(lat)
+                lons.append(lon)
+        self._geo_index = GeoIndex(ids, lats, lons, self.grid_size_degrees)
+        self._geo_pending.clear()
+
+
+class _MaxKey:
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_MAX_KEY = _MaxKey()
@@ -0,0 +1,132 @@
+"""System prompts and tool-result trimming for the model calls.
+
+`model_call` used to rebuild one f-string prompt with both the hotel and
+the worker instructions on every call, including every tool-loop round.
+Prompts are now one template per user type, built once and reused, so:
+- each call sends only the instructions for the user it is serving
+- the system message is byte-identical across calls and sessions of the
+  same user type, and always first, so providers that cache a repeated
+  request prefix (Gemini's implicit caching) can reuse it; nothing
+  per-request (session ids, times, locations) may go into a template
+
+Tool results are the other large, repeated part of a request: a search
+page is resent on every later round and turn of the session. Results the
+model has already answered from are shrunk by `trim_tool_results`:
+registered compactors rewrite them (e.g. one line per listing), and any
+other tool result is cut to a length bound.
+"""
+
+import functools
+
+from langchain_core.messages import AIMessage, SystemMessage, ToolMessage
+
+TOOL_RESULT_MAX_CHARS = 1500
+
+INTRODUCTION = """You are a helpful AI assistant for Sufra, a food waste management system that connects hotels with leftover food to workers looking for cheap meals."""
+
+HOTEL_INSTRUCTIONS = """**HOTEL users** post leftover food.
+For each dish you need hotel_name, food_name, price (per portion, a number) and quantity (a number). Take them strictly from the user; if any is missing, ask them to repeat it.
+- One dish, or a few: call post_surplus_here(hotel_name, food_name, price, quantity) once per dish, all in the SAME turn. It finds the hotel's location itself - do NOT call get_location() first.
+- A whole menu (more than 3 dishes): call store_food_batch(hotel_name, food_names, prices, quantities) once instead.
+Then confirm what was stored with a friendly message.
+When workers collect food they booked, they show a reservation code: call confirm_pickup(hotel_name, reservation_codes) with every code they show, in one call.
+
+Examples:
+Hotel: "I'm from Taj Hotel. We have 5 pasta portions for $8 each"
+You: post_surplus_here("Taj Hotel", "pasta", 8, 5) → confirm
+Hotel: "Grand Plaza closing up: 4 biryani $6, 3 falafel wraps $4, 6 soups $3, 2 cakes $5"
+You: store_food_batch("Grand Plaza", ["biryani", "falafel wrap", "soup", "cake"], [6, 4, 3, 5], [4, 3, 6, 2]) → report what was stored"""
+
+WORKER_INSTRUCTIONS = """**WORKER users** search for and book food.
+Searching: call search_near_me(max_price, item_name, max_distance_km). It finds the worker's location itself - do NOT call get_location() first.
+- max_price: their budget ("under $10", "max $7"). If they gave none, ask "What's your budget? How much are you willing to spend?"; if they still don't say, use 999999.
+- item_name: a specific food they asked for ("pizza", "chicken", "burger"), else None.
+- max_distance_km: the number in "within 5km", "under 2 kilometers"; 3 for "nearby", "near me", "close", "around me" without a number; else None.
+- sort_by: leave it out (best overall deal: cheap, close, freshly posted, plenty left) unless they want the cheapest ("price") or the closest ("distance").
+- limit: only when they want the best few, e.g. "the 3 cheapest" → limit=3, sort_by="price".
+Results come one page at a time (10 by default). If a result ends with next_page=..., say there are more; when they ask for more, repeat the call with the same arguments plus page_token set to that value.
+
+Booking ("book", "order", "reserve", "take", "I want this", "get this", "I'll take"):
+- You need the hotel name and the food name. Take them from earlier results when they point at one ("the first option"), otherwise ask "Which food from which hotel would you like to book?"
+- One item: book_food(hotel_name, food_name, listing_id). Several (e.g. "2 pasta from Taj and 1 biryani from Grand Plaza"): book_many(hotel_names, food_names, quantities, listing_ids) once.
+- Pass the listing id ("🔖 Listing" / "id") of the result they picked; leave it out when they name an item you have not shown.
+- Bookings are held for pickup. Confirm with the price, the reservation code and the pickup time from the result; the hotel confirms the code at pickup.
+- To cancel a booking: cancel_reservation(reservation_code).
+
+Alerts ("tell me when", "let me know if", "notify me"): subscribe_to_food(max_price, item_name, max_distance_km), same arguments as a search. When a search finds nothing, offer an alert instead of asking them to search again later. To stop: unsubscribe_from_food(subscription_id), or no id for all alerts.
+
+Make independent tool calls (e.g. two searches, or bookings at different hotels) in the SAME turn - they run in parallel.
+
+Examples:
+"Show me food under $10" → search_near_me(10, None, None)
+"Show me more" → search_near_me(10, None, None, page_token="<next_page from the last result>")
+"I want pizza within 5km under $15" → search_near_me(15, "pizza", 5)
+"What's the closest food under $6?" → search_near_me(6, None, 3, sort_by="distance")
+"Book the pasta from Taj Hotel" → book_food("Taj Hotel", "pasta")
+"I'll take the first option" → book_food(hotel and food of result 1, listing id of result 1)
+"I want something nearby" → ask their budget; "$8" → search_near_me(8, None, 3)
+"Show me chicken" → ask their budget; no answer → search_near_me(999999, "chicken", None)
+"Tell me when pizza under $8 shows up nearby" → subscribe_to_food(8, "pizza", 3)"""
+
+CLOSING = """Be concise, friendly, and helpful."""
+
+
+@functools.lru_cache(maxsize=None)
+def _system_prompt(user_type: str) -> SystemMessage:
+    if user_type == "hotel":
+        sections = [HOTEL_INSTRUCTIONS]
+    elif user_type == "worker":
+        sections = [WORKER_INSTRUCTIONS]
+    else:
+        sections = [HOTEL_INSTRUCTIONS, WORKER_INSTRUCTIONS]
+    body = "\n\n".join([INTRODUCTION, f"CURRENT USER TYPE: {user_type.upper()}", *sections, CLOSING])
+    return SystemMessage(content=body)
+
+
+def system_prompt(user_type: str) -> SystemMessage:
+    """The system message for a user type, built once; unknown types get both roles' instructions."""
+    user_type = (user_type or "").lower()
+    return _system_prompt(user_type if user_type in ("hotel", "worker") else "unknown")
+
+
+def answered_boundary(messages: list) -> int:
+    """Index of the first message the model has not answered yet.
+
+    The tool results of the latest round (the ToolMessages right after the
+    last AI message with tool calls) are about to be read; everything
+    before them has already been acted on.
+    """
+    boundary = len(messages)
+    while boundary > 0 and isinstance(messages[boundary - 1], ToolMessage):
+        boundary -= 1
+    if boundary == len(messages) or boundary == 0:
+        return len(messages)
+    previous = messages[boundary - 1]
+    return boundary if isinstance(previous, AIMessage) and previous.tool_calls else len(messages)
+
+
+def trim_tool_result(content: str, compactor=None, max_chars: int = TOOL_RESULT_MAX_CHARS) -> str:
+    if compactor is not None:
+        return compactor(content)
+    if len(content) <= max_chars:
+        return content
+    return content[:max_chars] + " …[trimmed]"
+
+
+def trim_tool_results(messages: list, compactors: dict = None, max_chars: int = TOOL_RESULT_MAX_CHARS) -> list:
+    """`messages` with the tool results the model has already answered from shrunk.
+
+    `compactors` maps a tool name to a function that rewrites its result;
+    results of other tools are cut to `max_chars`. Trimming is idempotent,
+    so histories can be trimmed again on every call.
+    """
+    compactors = compactors or {}
+    boundary = answered_boundary(messages)
+    trimmed = []
+    for i, message in enumerate(messages):
+        if i < boundary and isinstance(message, ToolMessage) and isinstance(message.content, str):
+            content = trim_tool_result(message.content, compactors.get(message.name), max_chars)
+            if content != message.content:
+                message = message.model_copy(update={"content": content})
+        trimmed.append(message)
+    return trimmed
@@ -0,0 +1,97 @@
+"""Demand-aware ranking of search candidates.
+
+Sorting purely by price ignores that a listing is 9 km away or was posted
+eleven hours ago; sorting purely by distance ignores the price. Here every
+candidate gets one score, a weighted blend of normalized terms where lower
+is better:
+
+- price: relative to the most expensive candidate
+- distance: relative to the search radius (0 without a location)
+- freshness: time since created_at as a share of the shelf life
+- quantity: fewer portions left means more likely to be gone on arrival
+
+The terms are computed for all candidates in one NumPy pass, and the top
+K are picked with `np.partition` (linear-time selection), so only those
+K rows (plus any tied with the K-th score) get fully sorted.
+
+Scores depend on the time of ranking and the price scale, so both go into
+the page token. The next page then scores the same candidates the same
+way and continues after the last (score, _id) shown.
+"""
+
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import numpy as np
+
+from archival import DEFAULT_SHELF_LIFE
+
+QUANTITY_SATURATION = 10  # more portions than this do not improve the score
+
+
+class RankingWeights(NamedTuple):
+    price: float = 0.45
+    distance: float = 0.30
+    freshness: float = 0.15
+    quantity: float = 0.10
+
+
+BEST_DEAL = RankingWeights()
+CHEAPEST = RankingWeights(price=1.0, distance=0.0, freshness=0.0, quantity=0.0)
+
+
+def price_scale(documents: list) -> float:
+    """Price that maps to a price term of 1: the most expensive candidate."""
+    return max((document["price"] for document in documents), default=1.0) or 1.0
+
+
+def score_listings(documents: list, now: datetime, scale: float, weights: RankingWeights = BEST_DEAL,
+                   max_distance_meters: float = None, shelf_life: timedelta = DEFAULT_SHELF_LIFE) -> np.ndarray:
+    """Blended score per document (lower is better)."""
+    count = len(documents)
+    prices = np.fromiter((document["price"] for document in documents), dtype=np.float64, count=count)
+    quantities = np.fromiter((document["quantity"] for document in documents), dtype=np.float64, count=count)
+    ages = np.fromiter(
+        ((now - (document.get("created_at") or now)).total_seconds() for document in documents),
+        dtype=np.float64, count=count
+    )
+
+    scores = weights.price * (prices / scale)
+    scores += weights.freshness * np.clip(ages / shelf_life.total_seconds(), 0.0, 1.0)
+    scores += weights.quantity * (1.0 - np.minimum(quantities, QUANTITY_SATURATION) / QUANTITY_SATURATION)
+    if max_distance_meters and weights.distance:
+        distances = np.fromiter((document.get("distance", 0.0) for document in documents), dtype=np.float64, count=count)
+        scores += weights.distance * np.clip(distances / max_distance_meters, 0.0, 1.0)
+    return scores
+
+
+def rank_listings(documents, k: int, now: datetime, scale: float = None, after: tuple = None,
+                  weights: RankingWeights = BEST_DEAL, max_distance_meters: float = None,
+                  shelf_life: timedelta = DEFAULT_SHELF_LIFE) -> list:
+    """The k best documents by score, as copies carrying a `score`, best first.
+
+    `after` is a decoded page token, (score, _id) of the last row already
+    shown. `scale` is the price scale from that token (computed from the
+    candidates on the first page).
+    """
+    documents = list(documents)
+    if not documents or k <= 0:
+        return []
+    if scale is None:
+        scale = price_scale(documents)
+    scores = score_listings(documents, now, scale, weights, max_distance_meters, shelf_life)
+
+    eligible = np.arange(len(documents))
+    if after is not None:
+        after_score, after_id = after
+        eligible = eligible[scores >= after_score]
+        eligible = np.array([i for i in eligible.tolist()
+                             if scores[i] > after_score or documents[i]["_id"] > after_id], dtype=np.int64)
+    if len(eligible) > k:
+        # Keep every row tied with the k-th score; the sort below picks the
+        # k smallest by (score, _id), which is what the next page resumes after
+        kth_score = np.partition(scores[eligible], k - 1)[k - 1]
+        eligible = eligible[scores[eligible] <= kth_score]
+
+    best = sorted(eligible.tolist(), key=lambda i: (scores[i], documents[i]["_id"]))[:k]
+    return [dict(documents[i], score=float(scores[i])) for i in best]
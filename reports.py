@@ -0,0 +1,277 @@
+"""Admin reports over the listings, computed by MongoDB instead of in Python.
+
+`show_database` used to load every listing with `list(find())` and print
+a dozen lines per document, which takes minutes and a lot of memory at
+production size. The reports here send only aggregates or one page over
+the wire:
+- `hotel_summary`: per hotel, active listings, portions left and on hold,
+  and the price range ($group over the available, unexpired listings)
+- `meals_saved_per_day` and `sell_through`: portions sold, by posting day
+  or by hotel, over the live listings and their archived history
+- `price_histogram`: available listings and portions per price bucket
+- `list_listings`: one projected page, newest first, filtered by hotel,
+  status or availability, with a keyset next_page token
+- `export_listings`: every matching listing as NDJSON or CSV, read through
+  a cursor in batches, so memory stays flat however large the export
+
+Sold portions are `posted_quantity - quantity - held`. Listings stored
+before `posted_quantity` existed count as nothing sold.
+
+Usage:
+    python reports.py --uri mongodb://localhost:27017                          # summary
+    python reports.py --uri mongodb://localhost:27017 listings --hotel "Taj Hotel"
+    python reports.py --uri mongodb://localhost:27017 export --format csv --output listings.csv
+"""
+
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime, timedelta
+
+from food_queries import decode_page_token, encode_page_token
+
+EXPORT_BATCH_SIZE = 1000
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+REPORT_DAYS = 7
+PRICE_BUCKETS = [0, 2, 5, 10, 15, 20, 30, 50]
+
+LISTING_FIELDS = ["hotel_name", "food_name", "price", "quantity", "posted_quantity", "held", "status", "is_available",
+                  "hotel_location", "created_at", "expires_at", "last_booked"]
+LISTING_PROJECTION = {field: 1 for field in LISTING_FIELDS}
+
+
+def active_filter(now: datetime = None) -> dict:
+    return {"is_available": True, "expires_at": {"$gt": now or datetime.now()}}
+
+
+def sold_portions() -> dict:
+    """Expression for the portions of a listing that were booked or confirmed."""
+    held = {"$ifNull": ["$held", 0]}
+    posted = {"$ifNull": ["$posted_quantity", {"$add": ["$quantity", held]}]}
+    return {"$subtract": [{"$subtract": [posted, "$quantity"]}, held]}
+
+
+def posted_portions() -> dict:
+    return {"$ifNull": ["$posted_quantity", {"$add": ["$quantity", {"$ifNull": ["$held", 0]}]}]}
+
+
+def report_since(days: float, now: datetime = None) -> datetime:
+    """Midnight `days - 1` days before now, so the window is `days` whole calendar days."""
+    today = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days - 1)
+
+
+def hotel_summary(collection, now: datetime = None, limit: int = None) -> list:
+    """Active listings per hotel, most portions left first."""
+    pipeline = [
+        {"$match": active_filter(now)},
+        {"$group": {
+            "_id": "$hotel_name",
+            "listings": {"$sum": 1},
+            "portions": {"$sum": "$quantity"},
+            "held": {"$sum": {"$ifNull": ["$held", 0]}},
+            "min_price": {"$min": "$price"},
+            "avg_price": {"$avg": "$price"}
+        }},
+        {"$sort": {"portions": -1, "_id": 1}}
+    ]
+    if limit:
+        pipeline.append({"$limit": limit})
+    return [{"hotel_name": row.pop("_id"), **row} for row in collection.aggregate(pipeline)]
+
+
+def _sold_by(collections, key: dict, since: datetime) -> dict:
+    """{key value: [posted, sold]} summed over every collection."""
+    totals = {}
+    pipeline = [
+        {"$match": {"created_at": {"$gte": since}}},
+        {"$group": {"_id": key, "posted": {"$sum": posted_portions()}, "sold": {"$sum": sold_portions()}}}
+    ]
+    for collection in collections:
+        for row in collection.aggregate(pipeline):
+            counts = totals.setdefault(row["_id"], [0, 0])
+            counts[0] += row["posted"]
+            counts[1] += row["sold"]
+    return totals
+
+
+def meals_saved_per_day(collection, history=None, days: float = REPORT_DAYS, now: datetime = None) -> list:
+    """[(day, portions posted, portions sold)] by posting day, oldest first; days without listings are left out.
+
+    `history` (the archived listings) is aggregated separately and merged,
+    since older servers have no $unionWith.
+    """
+    collections = [collection] + ([history] if history is not None else [])
+    day = {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+    totals = _sold_by(collections, day, report_since(days, now))
+    return [(day, posted, sold) for day, (posted, sold) in sorted(totals.items())]
+
+
+def sell_through(collection, history=None, days: float = REPORT_DAYS, now: datetime = None, limit: int = None) -> list:
+    """Per hotel, portions posted and sold in the window and the share sold, most sold first."""
+    collections = [collection] + ([history] if history is not None else [])
+    totals = _sold_by(collections, "$hotel_name", report_since(days, now))
+    rows = [{"hotel_name": hotel, "posted": posted, "sold": sold, "rate": sold / posted if posted else 0.0}
+            for hotel, (posted, sold) in totals.items()]
+    rows.sort(key=lambda row: (-row["sold"], row["hotel_name"]))
+    return rows[:limit] if limit else rows
+
+
+def price_histogram(collection, boundaries=PRICE_BUCKETS, now: datetime = None) -> list:
+    """[(low, high, listings, portions)] for the available listings; the last bucket (high None) is open."""
+    rows = collection.aggregate([
+        {"$match": active_filter(now)},
+        {"$bucket": {
+            "groupBy": "$price",
+            "boundaries": boundaries,
+            "default": "more",
+            "output": {"listings": {"$sum": 1}, "portions": {"$sum": "$quantity"}}
+        }}
+    ])
+    counts = {row["_id"]: (row["listings"], row["portions"]) for row in rows}
+    buckets = []
+    for low, high in zip(boundaries, boundaries[1:] + [None]):
+        listings, portions = counts.get(low if high is not None else "more", (0, 0))
+        buckets.append((low, high, listings, portions))
+    return buckets
+
+
+def listing_query(hotel_name: str = None, status: str = None, available: bool = None) -> dict:
+    query = {}
+    if hotel_name:
+        query["hotel_name"] = hotel_name
+    if status:
+        query["status"] = status
+    if available is not None:
+        query["is_available"] = available
+    return query
+
+
+def list_listings(collection, hotel_name: str = None, status: str = None, available: bool = None, page_token: str = None,
+                  limit: int = DEFAULT_PAGE_SIZE) -> tuple:
+    """(listings, next_page token or None): one projected page, newest first.
+
+    Pages are keyed on (created_at, _id), served by the {created_at} and
+    {hotel_name, created_at} indexes. Raises ValueError for a bad token.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = listing_query(hotel_name, status, available)
+    if page_token:
+        created_at, listing_id = decode_page_token(page_token).after
+        created_at = datetime.fromtimestamp(created_at)
+        query["$or"] = [{"created_at": {"$lt": created_at}}, {"created_at": created_at, "_id": {"$lt": listing_id}}]
+    rows = list(collection.find(query, LISTING_PROJECTION).sort([("created_at", -1), ("_id", -1)]).limit(limit + 1))
+    next_page = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_page = encode_page_token(rows[-1]["created_at"].timestamp(), rows[-1]["_id"])
+    return rows, next_page
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_listings(collection, out, fmt: str = "ndjson", query: dict = None, batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """Write every listing matching `query` to `out` as NDJSON or CSV; returns how many were written.
+
+    Rows are read through one cursor, `batch_size` at a time, and written as
+    they arrive.
+    """
+    if fmt not in ("ndjson", "csv"):
+        raise ValueError(f"unknown export format: {fmt!r}")
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=["_id", *LISTING_FIELDS], extrasaction="ignore")
+        writer.writeheader()
+    written = 0
+    for row in collection.find(query or {}, LISTING_PROJECTION, batch_size=batch_size):
+        row = {"_id": str(row.pop("_id")), **{key: _plain(value) for key, value in row.items()}}
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            out.write(json.dumps(row) + "\n")
+        written += 1
+    return written
+
+
+def format_summary(collection, history=None, days: float = REPORT_DAYS, now: datetime = None, top: int = 10) -> str:
+    """The text summary `show_database` and this script's default action print."""
+    now = now or datetime.now()
+    lines = ["🏨 Active listings by hotel"]
+    hotels = hotel_summary(collection, now, limit=top)
+    for row in hotels:
+        lines.append(f"   {row['hotel_name']}: {row['listings']} listing(s), {row['portions']} portion(s) left, "
+                     f"{row['held']} on hold, from ${row['min_price']:g} (avg ${row['avg_price']:.2f})")
+    if not hotels:
+        lines.append("   No available food")
+
+    lines.append(f"🍽️ Meals saved, last {days:g} days (posted / sold)")
+    for day, posted, sold in meals_saved_per_day(collection, history, days, now):
+        lines.append(f"   {day}: {posted} / {sold}")
+
+    lines.append(f"📈 Sell-through by hotel, last {days:g} days")
+    for row in sell_through(collection, history, days, now, limit=top):
+        lines.append(f"   {row['hotel_name']}: {row['sold']}/{row['posted']} portions ({row['rate']:.0%})")
+
+    lines.append("💰 Available listings by price")
+    for low, high, listings, portions in price_histogram(collection, now=now):
+        label = f"${low:g}-{high:g}" if high is not None else f"${low:g}+"
+        lines.append(f"   {label:<9} {listings} listing(s), {portions} portion(s)")
+    return "\n".join(lines)
+
+
+def format_listing(index: int, listing: dict) -> str:
+    line = (f"{index}. {listing['food_name']} - {listing['hotel_name']} - ${listing['price']} - "
+            f"{listing['quantity']}/{listing.get('posted_quantity', '?')} left")
+    if listing.get("held"):
+        line += f", {listing['held']} on hold"
+    return f"{line} - {listing.get('status', 'active')} - posted {listing['created_at']:%Y-%m-%d %H:%M} - {listing['_id']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("report", nargs="?", default="summary", choices=["summary", "listings", "export"])
+    parser.add_argument("--uri", required=True, help="MongoDB connection string")
+    parser.add_argument("--database", default="food_waste_db")
+    parser.add_argument("--collection", default="food_items")
+    parser.add_argument("--days", type=float, default=REPORT_DAYS, help="Window of the meals saved and sell-through reports")
+    parser.add_argument("--hotel", default=None, help="Only this hotel's listings")
+    parser.add_argument("--status", default=None, help="Only listings with this status (active, held, sold_out)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_PAGE_SIZE, help="Listings per page")
+    parser.add_argument("--page-token", default=None, help="next_page token from the previous page")
+    parser.add_argument("--format", default="ndjson", choices=["ndjson", "csv"], help="Export format")
+    parser.add_argument("--output", default=None, help="Export file (default: stdout)")
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+    from archival import HISTORY_COLLECTION_NAME
+    db = MongoClient(args.uri)[args.database]
+    collection = db[args.collection]
+
+    if args.report == "summary":
+        print(format_summary(collection, db[HISTORY_COLLECTION_NAME], args.days))
+    elif args.report == "listings":
+        try:
+            rows, next_page = list_listings(collection, args.hotel, args.status, page_token=args.page_token, limit=args.limit)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        for i, listing in enumerate(rows, 1):
+            print(format_listing(i, listing))
+        if next_page:
+            print(f"next_page={next_page}")
+    else:
+        query = listing_query(args.hotel, args.status)
+        if args.output:
+            with open(args.output, "w", newline="", encoding="utf-8") as out:
+                written = export_listings(collection, out, args.format, query)
+            print(f"✓ Exported {written} listings to {args.output}")
+        else:
+            export_listings(collection, sys.stdout, args.format, query)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""Hold-and-confirm reservations for food_items listings.
+
+Booking used to take portions for good the moment a worker asked for
+them, so no-shows stranded food. A booking now places a hold: the
+portions leave `quantity` (searches and other bookings no longer see
+them) and are recorded on the listing itself, in a `holds` array of
+{_id, quantity, expires_at}, with their total in `held`. The hold is then
+either
+- confirmed when the worker picks the food up: the portions are gone for
+  good, as with the old booking
+- cancelled by the worker, or released by `ReservationReaper` once it
+  expires: the portions go back into `quantity`
+
+The listing document is the only source of truth for portions. Placing,
+confirming and releasing a hold are each one conditional update of that
+document (the hold must still be there, and unexpired to confirm), so a
+hold is released or confirmed exactly once however the calls race, and
+`quantity + held` never changes except by confirmations. The reaper
+releases every expired hold of a batch of listings in one `update_many`.
+
+The `reservations` collection records each hold for the confirm/cancel
+API: the code a worker shows is its `_id`, and its status (held,
+confirmed, cancelled or expired) is written after the listing update that
+decided it. Closed reservations are dropped after a retention period by
+a TTL index on `closed_at`.
+
+Usage:
+    python reservations.py --uri mongodb://localhost:27017              # release expired holds once
+    python reservations.py --uri mongodb://localhost:27017 --dry-run    # count only
+"""
+
+import argparse
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+
+from booking import check_quantity, guarded_filter
+from food_queries import normalize_hotel_name
+from tracing import logger
+
+RESERVATIONS_COLLECTION_NAME = "reservations"
+DEFAULT_HOLD_TTL = timedelta(minutes=30)
+RELEASE_BATCH_SIZE = 1000
+
+
+class ReservationUpdate(NamedTuple):
+    ok: bool             # this call changed the reservation
+    reservation: dict    # as it is now; None if the code is unknown
+    listing: dict = None  # the listing after the update, when there was one
+
+
+def parse_reservation_code(code: str):
+    try:
+        return ObjectId(str(code).strip())
+    except (InvalidId, TypeError):
+        return None
+
+
+def _holds_where(condition: dict) -> dict:
+    return {"$filter": {"input": {"$ifNull": ["$holds", []]}, "as": "hold", "cond": condition}}
+
+
+def hold_update(reservation_id, quantity: int, expires_at: datetime, now: datetime = None) -> list:
+    """Update pipeline that moves `quantity` portions from quantity into a new hold."""
+    now = now or datetime.now()
+    return [
+        {
+            "$set": {
+                "quantity": {"$subtract": ["$quantity", quantity]},
+                "held": {"$add": [{"$ifNull": ["$held", 0]}, quantity]},
+                "holds": {"$concatArrays": [
+                    {"$ifNull": ["$holds", []]},
+                    [{"_id": reservation_id, "quantity": quantity, "expires_at": expires_at}]
+                ]},
+                "last_booked": now
+            }
+        },
+        {
+            "$set": {
+                "is_available": {"$gt": ["$quantity", 0]},
+                "status": {"$cond": [{"$gt": ["$quantity", 0]}, "$status", "held"]}
+            }
+        }
+    ]
+
+
+def confirm_update(reservation_id, now: datetime = None) -> list:
+    """Update pipeline that drops a hold without returning its portions."""
+    confirmed = {"$let": {"vars": {"confirmed": _holds_where({"$eq": ["$$hold._id", reservation_id]})},
+                          "in": {"$sum": "$$confirmed.quantity"}}}
+    return [
+        {
+            "$set": {
+                "held": {"$subtract": ["$held", confirmed]},
+                "holds": _holds_where({"$ne": ["$$hold._id", reservation_id]}),
+                "last_booked": now or datetime.now()
+            }
+        },
+        {
+            "$set": {
+                "status": {"$cond": [{"$and": [{"$lte": ["$quantity", 0]}, {"$lte": ["$held", 0]}]}, "sold_out", "$status"]}
+            }
+        }
+    ]
+
+
+def _release_update(release: dict, keep: dict, now: datetime = None) -> list:
+    """Update pipeline that returns the portions of the holds matching `release`; `keep` is its complement."""
+    released = {"$let": {"vars": {"released": _holds_where(release)}, "in": {"$sum": "$$released.quantity"}}}
+    return [
+        {
+            "$set": {
+                "quantity": {"$add": ["$quantity", released]},
+                "held": {"$subtract": ["$held", released]},
+                "holds": _holds_where(keep),
+                "last_booked": now or datetime.now()
+            }
+        },
+        {
+            "$set": {
+                "is_available": {"$gt": ["$quantity", 0]},
+                "status": {"$cond": [{"$gt": ["$quantity", 0]}, "active", "$status"]}
+            }
+        }
+    ]
+
+
+def release_hold_update(reservation_id, now: datetime = None) -> list:
+    """Update pipeline that gives one hold's portions back to the listing."""
+    return _release_update({"$eq": ["$$hold._id", reservation_id]}, {"$ne": ["$$hold._id", reservation_id]}, now)
+
+
+def release_expired_update(now: datetime) -> list:
+    """Update pipeline that gives the portions of every hold expired by `now` back to the listing."""
+    return _release_update({"$lte": ["$$hold.expires_at", now]}, {"$gt": ["$$hold.expires_at", now]}, now)
+
+
+def new_reservation(listing: dict, reservation_id, quantity: int, now: datetime, expires_at: datetime,
+                    session_id: str = None) -> dict:
+    return {
+        "_id": reservation_id,
+        "listing_id": listing["_id"],
+        "hotel_name": listing["hotel_name"],
+        "food_name": listing["food_name"],
+        "price": listing["price"],
+        "quantity": quantity,
+        "status": "held",
+        "created_at": now,
+        "expires_at": expires_at,
+        # The chat session that placed the hold; only it may cancel the hold
+        "session_id": session_id
+    }
+
+
+def close_update(status: str) -> dict:
+    # TTL indexes compare against UTC
+    return {"$set": {"status": status, "closed_at": datetime.now(timezone.utc)}}
+
+
+def hold_listing(collection, reservations, listing_filter: dict, quantity: int = 1, ttl: timedelta = DEFAULT_HOLD_TTL,
+                 session_id: str = None):
+    """Hold `quantity` portions of the first listing matching `listing_filter` for `ttl`, on behalf of `session_id`.
+
+    Returns:
+        (reservation, listing after the hold), or None if no matching listing
+        had enough portions left
+
+    Raises:
+        ValueError: If `quantity` is below 1
+    """
+    check_quantity(quantity)
+    now = datetime.now()
+    reservation_id = ObjectId()
+    expires_at = now + ttl
+    listing = collection.find_one_and_update(
+        guarded_filter(listing_filter, quantity),
+        hold_update(reservation_id, quantity, expires_at, now),
+        return_document=ReturnDocument.AFTER
+    )
+    if listing is None:
+        return None
+    reservation = new_reservation(listing, reservation_id, quantity, now, expires_at, session_id)
+    try:
+        reservations.insert_one(reservation)
+    except PyMongoError:
+        # Without a record nobody can confirm the hold; give the portions back
+        # now rather than when the reaper finds it expired
+        collection.update_one({"_id": listing["_id"], "holds._id": reservation_id},
+                              release_hold_update(reservation_id))
+        raise
+    return reservation, listing
+
+
+def hold_many(collection, reservations, holds, ttl: timedelta = DEFAULT_HOLD_TTL, session_id: str = None) -> list:
+    """Place several holds, each with its own atomic update; holds are (listing_filter, quantity) pairs.
+
+    Returns (listing_filter, quantity, (reservation, listing) or None) in input order.
+    Raises ValueError before placing any hold if a quantity is below 1.
+    """
+    holds = list(holds)
+    for _, quantity in holds:
+        check_quantity(quantity)
+    return [(listing_filter, quantity, hold_listing(collection, reservations, listing_filter, quantity, ttl, session_id))
+            for listing_filter, quantity in holds]
+
+
+def confirm_reservation(collection, reservations, code, hotel_name: str = None) -> ReservationUpdate:
+    """Confirm a held reservation (the worker picked the food up) if it has not expired.
+
+    With `hotel_name`, a code for another hotel's food is treated as unknown.
+    """
+    reservation = reservations.find_one({"_id": parse_reservation_code(code)})
+    if reservation is not None and hotel_name is not None and \
+            normalize_hotel_name(reservation["hotel_name"]) != normalize_hotel_name(hotel_name):
+        return ReservationUpdate(False, None)
+    if reservation is None or reservation["status"] != "held":
+        return ReservationUpdate(False, reservation)
+    listing = collection.find_one_and_update(
+        {"_id": reservation["listing_id"], "holds": {"$elemMatch": {"_id": reservation["_id"], "expires_at": {"$gt": datetime.now()}}}},
+        confirm_update(reservation["_id"]),
+        return_document=ReturnDocument.AFTER
+    )
+    if listing is None:
+        # Expired, or released or confirmed by someone else in the meantime
+        return ReservationUpdate(False, reservations.find_one({"_id": reservation["_id"]}))
+    reservations.update_one({"_id": reservation["_id"]}, close_update("confirmed"))
+    return ReservationUpdate(True, dict(reservation, status="confirmed"), listing)
+
+
+def cancel_reservation(collection, reservations, code, session_id: str = None) -> ReservationUpdate:
+    """Release a held reservation's portions back to its listing.
+
+    With `session_id`, only a reservation that session placed is found;
+    anyone else's code is treated as unknown.
+    """
+    reservation_filter = {"_id": parse_reservation_code(code)}
+    if session_id is not None:
+        reservation_filter["session_id"] = session_id
+    reservation = reservations.find_one(reservation_filter)
+    if reservation is None or reservation["status"] != "held":
+        return ReservationUpdate(False, reservation)
+    listing = collection.find_one_and_update(
+        {"_id": reservation["listing_id"], "holds._id": reservation["_id"]},
+        release_hold_update(reservation["_id"]),
+        return_document=ReturnDocument.AFTER
+    )
+    if listing is None:
+        return ReservationUpdate(False, reservations.find_one({"_id": reservation["_id"]}))
+    reservations.update_one({"_id": reservation["_id"]}, close_update("cancelled"))
+    return ReservationUpdate(True, dict(reservation, status="cancelled"), listing)
+
+
+def reopened(listing: dict, released: int) -> bool:
+    """True if releasing `released` portions made a sold-out listing bookable again."""
+    return listing["is_available"] and listing["quantity"] == released
+
+
+async def ahold_listing(collection, reservations, listing_filter: dict, quantity: int = 1, ttl: timedelta = DEFAULT_HOLD_TTL,
+                        session_id: str = None):
+    """Async variant of hold_listing for AsyncMongoClient collections."""
+    check_quantity(quantity)
+    now = datetime.now()
+    reservation_id = ObjectId()
+    expires_at = now + ttl
+    listing = await collection.find_one_and_update(
+        guarded_filter(listing_filter, quantity),
+        hold_update(reservation_id, quantity, expires_at, now),
+        return_document=ReturnDocument.AFTER
+    )
+    if listing is None:
+        return None
+    reservation = new_reservation(listing, reservation_id, quantity, now, expires_at, session_id)
+    try:
+        await reservations.insert_one(reservation)
+    except PyMongoError:
+        await collection.update_one({"_id": listing["_id"], "holds._id": reservation_id},
+                                    release_hold_update(reservation_id))
+        raise
+    return reservation, listing
+
+
+async def ahold_many(collection, reservations, holds, ttl: timedelta = DEFAULT_HOLD_TTL, session_id: str = None) -> list:
+    """Place several holds concurrently; holds are (listing_filter, quantity) pairs.
+
+    Returns (listing_filter, quantity, (reservation, listing) or None) in input order.
+    """
+    holds = list(holds)
+    for _, quantity in holds:
+        check_quantity(quantity)
+    results = await asyncio.gather(*(
+        ahold_listing(collection, reservations, listing_filter, quantity, ttl, session_id) for listing_filter, quantity in holds
+    ))
+    return [(listing_filter, quantity, result) for (listing_filter, quantity), result in zip(holds, results)]
+
+
+def release_expired_holds(collection, reservations, now: datetime = None, batch_size: int = RELEASE_BATCH_SIZE,
+                          on_released=None) -> int:
+    """Release every hold that expired by `now`, a batch of listings per update.
+
+    Returns the portions of the expired holds found; a hold confirmed or
+    cancelled between the read and the update is counted but not released.
+    `on_released(listings, reopened)` gets each batch of listings as they
+    are after the release and how many of them were sold out before it.
+    """
+    now = now or datetime.now()
+    released = 0
+    while True:
+        before = list(collection.find({"holds.expires_at": {"$lte": now}}, {"holds": 1, "is_available": 1}).limit(batch_size))
+        if not before:
+            break
+        ids = [listing["_id"] for listing in before]
+        # The filter is checked again per listing, so holds confirmed or
+        # cancelled since the read above are not released twice
+        collection.update_many({"_id": {"$in": ids}, "holds.expires_at": {"$lte": now}}, release_expired_update(now))
+        after = {listing["_id"]: listing for listing in collection.find({"_id": {"$in": ids}})}
+        released += sum(hold["quantity"] for listing in before for hold in listing["holds"] if hold["expires_at"] <= now)
+        if on_released is not None:
+            reopened_count = sum(1 for listing in before
+                                 if not listing.get("is_available") and after.get(listing["_id"], {}).get("is_available"))
+            on_released(list(after.values()), reopened_count)
+        if len(before) < batch_size:
+            break
+    reservations.update_many({"status": "held", "expires_at": {"$lte": now}}, close_update("expired"))
+    return released
+
+
+def ensure_reservation_indexes(reservations, retention_days: float = None) -> list:
+    """Indexes for the reservations collection; a TTL on closed_at when retention is set."""
+    names = [
+        reservations.create_index([("status", ASCENDING), ("expires_at", ASCENDING)]),
+        reservations.create_index([("listing_id", ASCENDING)])
+    ]
+    existing = reservations.index_information().get("closed_at_1", {})
+    ttl = int(retention_days * 86400) if retention_days else None
+    if existing and existing.get("expireAfterSeconds") != ttl:
+        reservations.drop_index("closed_at_1")
+    if ttl:
+        names.append(reservations.create_index("closed_at", expireAfterSeconds=ttl))
+    else:
+        names.append(reservations.create_index("closed_at"))
+    return names
+
+
+class ReservationReaper:
+    """Runs release_expired_holds every `interval_seconds` in a daemon thread."""
+
+    def __init__(self, collection, reservations, interval_seconds: float = 60, batch_size: int = RELEASE_BATCH_SIZE,
+                 on_released=None):
+        self.collection = collection
+        self.reservations = reservations
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.on_released = on_released
+        self.released = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sweep(self) -> int:
+        released = release_expired_holds(self.collection, self.reservations, batch_size=self.batch_size,
+                                         on_released=self.on_released)
+        self.released += released
+        return released
+
+    def start(self):
+        def run():
+            while not self._stop.wait(self.interval_seconds):
+                try:
+                    self.sweep()
+                except PyMongoError as e:
+                    logger.warning("⚠️ Reservation sweep failed: %s", e)
+
+        self._thread = threading.Thread(target=run, name="reservation-reaper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", required=True, help="MongoDB connection string")
+    parser.add_argument("--database", default="food_waste_db")
+    parser.add_argument("--collection", default="food_items")
+    parser.add_argument("--dry-run", action="store_true", help="Only count expired holds")
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+    from active_counter import ActiveItemCounter
+    db = MongoClient(args.uri)[args.database]
+    collection = db[args.collection]
+
+    if args.dry_run:
+        print(f"✓ {collection.count_documents({'holds.expires_at': {'$lte': datetime.now()}})} listings have expired holds")
+        return
+
+    reopened_total = []
+    released = release_expired_holds(collection, db[RESERVATIONS_COLLECTION_NAME],
+                                     on_released=lambda listings, reopened_count: reopened_total.append(reopened_count))
+    if sum(reopened_total):
+        ActiveItemCounter(db, collection).increment(sum(reopened_total))
+    print(f"✓ Released {released} held portions ({sum(reopened_total)} listings bookable again)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Caches for repeated worker searches and LLM calls.
+
+At meal peaks many workers ask nearly the same thing ("food under $5 near
+me") within seconds of each other. Two caches take the repeats off
+MongoDB and Gemini:
+
+- `SearchResultCache` (level 1) keeps the candidates of first-page
+  searches that go to MongoDB. It is only built without a listing cache,
+  which answers faster than a result can be cut from an entry. The key rounds the budget up to a price bucket, the location
+  to a grid cell and the radius up to a whole step, so nearby workers with
+  similar budgets share an entry. An entry holds the candidates of that
+  wider search: listings under the bucket's price, within the radius plus
+  the cell's half-diagonal of the cell centre. Each request is then cut
+  out of the entry exactly: its own price, its own distances. Results are
+  the same as without the cache, never rounded. If the wider search hit
+  its row cap, the entry may not hold every listing the request needs.
+  The cache then answers None and the caller queries as before.
+- `ResponseCache` (level 2) keeps model responses by a hash of the
+  normalized model input: system prompt, history, user text (case-folded,
+  whitespace collapsed), tool calls and tool results. The same input
+  gets the same response without a Gemini call. Answers about listings
+  carry the tool results in their key, so new results mean a new key.
+
+Entries are dropped least recently used first, after a TTL, or once the
+cache holds too many entries or too many rows/characters. Level 1
+entries also carry the version of the listings collection they were read
+at (`CollectionVersions`). Every insert, booking, release or archive
+bumps it, which invalidates them all at once. Listings written by other
+processes do not reach the version, so only the TTL bounds how stale an
+entry can be; the multi-process runner turns the cache off.
+"""
+
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from food_queries import item_name_alternatives
+from geo import haversine_m
+
+# Budgets are rounded up to the next of these; larger ones are kept as they are
+PRICE_BUCKETS = (2, 5, 10, 15, 20, 30, 50, 100)
+DEFAULT_CELL_DEGREES = 0.01
+DEFAULT_RADIUS_STEP_M = 5000
+DEFAULT_MAX_CANDIDATES = 2000
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class LRUCache:
+    """Thread-safe LRU map with a TTL, an entry cap and a cap on the summed entry weights.
+
+    Entries stored with a version are only returned while the caller asks
+    with the same version.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 60, max_weight: int = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_weight = max_weight
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (stored_at, version, weight, value)
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0      # found, but expired or from an older version
+        self.evictions = 0  # dropped to make room
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version=None):
+        """The value for `key`, or None if it is missing, expired or from another version."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, stored_version, _, value = entry
+            if now - stored_at > self.ttl_seconds or stored_version != version:
+                self._drop(key)
+                self.stale += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, weight: int = 1, version=None):
+        """Store `value`; one heavier than the whole weight cap is not cached."""
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), version, weight, value)
+            self.weight += weight
+            while len(self._entries) > self.max_entries or (self.max_weight is not None and self.weight > self.max_weight):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
+
+    def summary(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                "entries": len(self._entries),
+                "weight": self.weight,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def _drop(self, key):
+        self.weight -= self._entries.pop(key)[2]
+
+
+class CollectionVersions:
+    """A write counter per collection; results cached at an older count are stale."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def get(self, collection_name: str) -> int:
+        return self._versions.get(collection_name, 0)
+
+    def bump(self, collection_name: str) -> int:
+        with self._lock:
+            version = self._versions[collection_name] = self._versions.get(collection_name, 0) + 1
+        return version
+
+
+def price_bucket(max_price: float) -> float:
+    """The budget rounded up to the next of PRICE_BUCKETS."""
+    position = bisect_left(PRICE_BUCKETS, max_price)
+    return PRICE_BUCKETS[position] if position < len(PRICE_BUCKETS) else max_price
+
+
+class CandidateQuery(NamedTuple):
+    """The wider search a level 1 entry holds; lat, lon and radius_m are None without a location."""
+    key: tuple
+    max_price: float
+    lat: float
+    lon: float
+    radius_m: float
+    limit: int
+
+
+class _Candidates(NamedTuple):
+    rows: list            # as the search returned them: by (price, _id), or nearest the cell centre first
+    prices: np.ndarray
+    expires: np.ndarray   # expires_at timestamps, inf where unknown
+    lats: np.ndarray      # None without a location
+    lons: np.ndarray
+    complete: bool        # False if the search stopped at its row cap
+
+
+def _coordinates(row: dict) -> tuple:
+    location = row.get("location")
+    if location:
+        lon, lat = location["coordinates"]
+        return lat, lon
+    try:
+        lat, lon = map(float, row["hotel_location"].split(","))
+        return lat, lon
+    except (KeyError, ValueError):
+        return math.nan, math.nan
+
+
+class SearchResultCache:
+    """Level 1: candidates of first-page searches, shared by nearby workers with similar budgets."""
+
+    def __init__(self, versions: CollectionVersions, collection_name: str, max_entries: int = 2000, ttl_seconds: float = 30,
+                 max_rows: int = 200000, max_candidates: int = DEFAULT_MAX_CANDIDATES, cell_degrees: float = DEFAULT_CELL_DEGREES,
+                 radius_step_m: float = DEFAULT_RADIUS_STEP_M):
+        self.versions = versions
+        self.collection_name = collection_name
+        self.max_candidates = max_candidates
+        self.cell_degrees = cell_degrees
+        self.radius_step_m = radius_step_m
+        self.entries = LRUCache(max_entries, ttl_seconds, max_weight=max_rows)
+        self.unanswered = 0  # lookups the entry could not answer exactly (it stopped at its row cap)
+
+    def candidate_query(self, max_price: float, item_name: str = None, lat: float = None, lon: float = None,
+                        max_distance_meters: float = None) -> CandidateQuery:
+        """The wider search whose candidates answer this one."""
+        bucket = price_bucket(max_price)
+        item = item_name_alternatives(item_name) if item_name else None
+        if lat is None or lon is None or max_distance_meters is None:
+            return CandidateQuery((bucket, item), bucket, None, None, None, self.max_candidates)
+        row, column = math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+        center_lat, center_lon = (row + 0.5) * self.cell_degrees, (column + 0.5) * self.cell_degrees
+        radius = math.ceil(max_distance_meters / self.radius_step_m) * self.radius_step_m
+        # Every point of the cell is within the half-diagonal of its centre
+        half = self.cell_degrees / 2
+        corners = haversine_m(center_lat, center_lon, [center_lat - half, center_lat + half], [center_lon + half, center_lon + half])
+        return CandidateQuery((bucket, item, row, column, radius), bucket, center_lat, center_lon,
+                              radius + float(corners.max()), self.max_candidates)
+
+    def search(self, max_price: float, item_name: str, lat: float, lon: float, max_distance_meters: float, limit: int, load):
+        """At most `limit` results, ordered like the uncached search, or None if the cache cannot answer exactly.
+
+        `load(query)` runs the wider CandidateQuery on a miss and returns its
+        rows in the search's order.
+        """
+        query = self.candidate_query(max_price, item_name, lat, lon, max_distance_meters)
+        version = self.versions.get(self.collection_name)
+        candidates = self.entries.get(query.key, version)
+        if candidates is None:
+            candidates = self._store(query, load(query), version)
+        return self._answer(candidates, max_price, lat, lon, max_distance_meters, limit)
+
+    async def asearch(self, max_price: float, item_name: str, lat: float, lon: float, max_distance_meters: float, limit: int,
+                      aload):
+        """Async variant of search(); `aload(query)` is a coroutine function."""
+        query = self.candidate_query(max_price, item_name, lat, lon, max_distance_meters)
+        version = self.versions.get(self.collection_name)
+        candidates = self.entries.get(query.key, version)
+        if candidates is None:
+            candidates = self._store(query, await aload(query), version)
+        return self._answer(candidates, max_price, lat, lon, max_distance_meters, limit)
+
+    def summary(self) -> dict:
+        return {**self.entries.summary(), "unanswered": self.unanswered}
+
+    def _store(self, query: CandidateQuery, rows, version: int) -> _Candidates:
+        rows = list(rows)
+        prices = np.array([row["price"] for row in rows], dtype=np.float64)
+        expires = np.array([row["expires_at"].timestamp() if isinstance(row.get("expires_at"), datetime) else math.inf
+                            for row in rows], dtype=np.float64)
+        lats = lons = None
+        if query.lat is not None:
+            points = np.array([_coordinates(row) for row in rows], dtype=np.float64).reshape(-1, 2)
+            lats, lons = points[:, 0], points[:, 1]
+        candidates = _Candidates(rows, prices, expires, lats, lons, len(rows) < query.limit)
+        # The version was read before the search, so a write during it leaves the entry stale
+        self.entries.put(query.key, candidates, weight=max(len(rows), 1), version=version)
+        return candidates
+
+    def _answer(self, candidates: _Candidates, max_price: float, lat: float, lon: float, max_distance_meters: float,
+                limit: int):
+        now = time.time()
+        if candidates.lats is None:
+            # Rows are by (price, _id), so the affordable ones are a prefix
+            end = int(np.searchsorted(candidates.prices, max_price, side="right"))
+            fresh = candidates.expires[:end] > now
+            positions = np.flatnonzero(fresh)[:limit] if not fresh.all() else range(min(end, limit))
+            if not candidates.complete and len(positions) < limit:
+                self.unanswered += 1
+                return None
+            return [candidates.rows[i] for i in positions]
+
+        # A cut entry holds the listings nearest the cell centre, not the request's location
+        if not candidates.complete:
+            self.unanswered += 1
+            return None
+        distances = haversine_m(lat, lon, candidates.lats, candidates.lons)
+        inside = np.flatnonzero((distances <= max_distance_meters) & (candidates.prices <= max_price) & (candidates.expires > now))
+        ordered = sorted(inside.tolist(), key=lambda i: (distances[i], candidates.rows[i]["_id"]))[:limit]
+        return [dict(candidates.rows[i], distance=float(distances[i])) for i in ordered]
+
+
+def _normalized_message(message) -> list:
+    if isinstance(message, HumanMessage):
+        return ["human", _WHITESPACE.sub(" ", str(message.content)).strip().casefold()]
+    if isinstance(message, ToolMessage):
+        return ["tool", message.name, str(message.content)]
+    calls = [[call["name"], call.get("args")] for call in getattr(message, "tool_calls", None) or []]
+    return [message.type, str(message.content), calls]
+
+
+def response_cache_key(messages: list) -> str:
+    """Hash of the normalized model input. Tool call ids are left out: they differ between otherwise identical calls."""
+    payload = json.dumps([_normalized_message(message) for message in messages], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Level 2: model responses by normalized input."""
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 300, max_chars: int = 5_000_000):
+        self.entries = LRUCache(max_entries, ttl_seconds, max_weight=max_chars)
+
+    def get(self, messages: list):
+        """A fresh copy of the response cached for this input, or None.
+
+        The copy gets new tool call ids, so two sessions given the same
+        cached response never share an id.
+        """
+        response = self.entries.get(response_cache_key(messages))
+        if response is None:
+            return None
+        tool_calls = [dict(call, id=f"call_{uuid.uuid4().hex[:24]}") for call in response.tool_calls]
+        return AIMessage(content=response.content, tool_calls=tool_calls)
+
+    def put(self, messages: list, response):
+        if getattr(response, "invalid_tool_calls", None):
+            return
+        weight = len(str(response.content)) + sum(len(json.dumps(call.get("args"), default=str)) for call in response.tool_calls)
+        self.entries.put(response_cache_key(messages), AIMessage(content=response.content, tool_calls=response.tool_calls),
+                         weight=max(weight, 1))
+
+    def summary(self) -> dict:
+        return self.entries.summary()
@@ -0,0 +1,509 @@
+"""Multi-process deployment: async agent workers behind a sticky session router.
+
+One async_agent.py process multiplexes many sessions, but its Python runs
+on one core. This runner starts --workers processes, each a full
+async_agent server on a loopback port, and listens on --port itself,
+forwarding every request line to the worker that owns its session:
+
+- sticky: a session stays on the worker it was first routed to, so its
+  history, location and cached searches stay in that process's memory
+- by region: a session whose first request carries a "location" is routed
+  by the REGION_CELL_DEGREES grid cell it falls in, the same way listings
+  are placed by their `location` field, so each worker serves a few areas
+  and its search, location and response caches stay hot for them. Cells
+  are spread with rendezvous hashing, bounded to REGION_LOAD_FACTOR times
+  the average sessions per worker so one busy city is not pinned on one
+  process. Sessions without a location are spread by their id
+- pre-warmed: a worker is routed to once it has connected, loaded the
+  listing cache, compiled the graph, created the LLM client and opened
+  its MongoDB pools (at least --min-pool-size connections each)
+
+State every worker needs lives in MongoDB. Session histories are persisted
+(SESSION_PERSIST_TO_MONGO), so a session moved to another worker resumes
+its conversation. New listings are matched against food alerts as each
+worker's listing cache reads them back (MATCH_SUBSCRIPTIONS_FROM_LISTING_CACHE),
+whichever worker stored them. The search result cache is off: other
+workers' writes would never invalidate it.
+
+A worker that exits is restarted (with backoff); meanwhile its sessions
+move to the others and turns it was running are answered with a
+retryable error. On SIGINT or SIGTERM the runner drains: it stops
+accepting connections, every worker refuses new turns and finishes its
+running ones (up to --drain-seconds), their replies are relayed, and then
+everything exits.
+
+Protocol: async_agent.py's, plus an optional "location" ("latitude,longitude")
+used to pick the worker, and "retry": true on errors worth resending:
+    -> {"session_id": "abc", "user_type": "worker", "message": "food under $10", "location": "25.2048,55.2708"}
+    <- {"type": "reply", "session_id": "abc", "error": "Server is shutting down, please send this again", "retry": true}
+
+Usage:
+    python runner.py --workers 4 --port 8765
+    python runner.py --workers 8 --host 0.0.0.0 --metrics-dir /var/lib/node_exporter
+    python runner.py --worker-init mymodule:setup   # setup(index) runs in each worker before hotelWorker is imported
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import importlib
+import json
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from collections import OrderedDict, deque
+
+from geo import parse_coordinates
+from tracing import PrometheusExporter, configure_logging, find_exporter, logger
+
+# Per worker, as async_agent.py's (not imported here: --worker-init must run before hotelWorker is)
+MAX_CONCURRENT_TURNS = 200
+DRAIN_SECONDS = 30
+REGION_CELL_DEGREES = 0.25  # about 28 km
+REGION_LOAD_FACTOR = 1.25
+ROUTER_MAX_SESSIONS = 100000
+ROUTER_SESSION_TTL_SECONDS = 3600
+WORKER_MIN_POOL_SIZE = 10
+WORKER_START_TIMEOUT_SECONDS = 120
+# Extra time a draining worker gets to close its connections and MongoDB client
+WORKER_STOP_GRACE_SECONDS = 10
+SUPERVISE_INTERVAL_SECONDS = 1
+RESTART_BACKOFF_MAX_SECONDS = 30
+# A worker that stayed up this long restarts without backoff
+RESTART_RESET_SECONDS = 60
+
+
+class NoWorkerAvailable(Exception):
+    """Every worker is down or restarting."""
+
+
+def region_key(location, cell_degrees: float = REGION_CELL_DEGREES):
+    """The grid cell of "latitude,longitude" as a routing key, or None if it is not a location."""
+    try:
+        lat, lon = parse_coordinates(location)
+    except (ValueError, AttributeError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return f"region:{math.floor(lat / cell_degrees)}:{math.floor(lon / cell_degrees)}"
+
+
+def _score(key: str, worker: int) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{key}#{worker}".encode(), digest_size=8).digest(), "big")
+
+
+class SessionRouter:
+    """Sticky session -> worker assignment, by region for sessions that send a location.
+
+    New sessions go to the highest-scoring live worker for their key
+    (rendezvous hashing) that is below `load_factor` times the average
+    session count, so keys keep their worker as workers come and go and
+    no worker takes much more than its share. Assignments idle for
+    `ttl_seconds` (or beyond `max_sessions`, least recently used first)
+    are forgotten.
+    """
+
+    def __init__(self, workers: int, max_sessions: int = ROUTER_MAX_SESSIONS, ttl_seconds: float = ROUTER_SESSION_TTL_SECONDS,
+                 region_cell_degrees: float = REGION_CELL_DEGREES, load_factor: float = REGION_LOAD_FACTOR):
+        self.workers = workers
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.region_cell_degrees = region_cell_degrees  # None routes every session by its id
+        self.load_factor = load_factor
+
+        self._live = set(range(workers))
+        self._sessions = OrderedDict()  # session_id -> (last_used, worker)
+        self._load = [0] * workers      # sessions assigned to each worker
+        self.by_region = 0
+
+    def route(self, session_id: str, location: str = None) -> int:
+        """The worker for this session's turn; raises NoWorkerAvailable if every worker is down."""
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None and entry[1] in self._live:
+            worker = entry[1]
+        else:
+            if entry is not None:
+                self._load[entry[1]] -= 1
+            key = region_key(location, self.region_cell_degrees) if self.region_cell_degrees and location else None
+            self.by_region += key is not None
+            worker = self._pick(key or f"session:{session_id}")
+            self._load[worker] += 1
+        self._sessions[session_id] = (now, worker)
+        return worker
+
+    def worker_down(self, worker: int):
+        """Stop routing to `worker`; its sessions move on their next turn."""
+        self._live.discard(worker)
+
+    def worker_up(self, worker: int):
+        self._live.add(worker)
+
+    def summary(self) -> dict:
+        return {"sessions": len(self._sessions), "by_region": self.by_region, "per_worker": list(self._load),
+                "live": sorted(self._live)}
+
+    def _pick(self, key: str) -> int:
+        if not self._live:
+            raise NoWorkerAvailable()
+        ranked = sorted(self._live, key=lambda worker: _score(key, worker), reverse=True)
+        cap = math.ceil(self.load_factor * (len(self._sessions) + 1) / len(ranked))
+        return next((worker for worker in ranked if self._load[worker] < cap), ranked[0])
+
+    def _expire(self, now: float):
+        while self._sessions:
+            session_id, (last_used, worker) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl_seconds and len(self._sessions) < self.max_sessions:
+                break
+            del self._sessions[session_id]
+            self._load[worker] -= 1
+
+
+# ============== WORKER PROCESS ==============
+
+def load_hook(spec: str):
+    """The function named by "module:function"."""
+    module_name, _, function_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def configure_worker(hw, index: int, options: dict):
+    """Settings a worker needs to share state with the others, applied before its AppContext is created."""
+    hw.MONGO_MIN_POOL_SIZE = max(hw.MONGO_MIN_POOL_SIZE, options["min_pool_size"])
+    hw.SESSION_PERSIST_TO_MONGO = True
+    if hw.USE_LISTING_CACHE:
+        hw.MATCH_SUBSCRIPTIONS_FROM_LISTING_CACHE = True
+    else:
+        if hw.USE_SUBSCRIPTIONS:
+            logger.warning("⚠️ USE_LISTING_CACHE is off: food alerts only fire for listings posted through the same worker")
+        # Nothing would tell the search cache about the other workers' writes
+        hw.USE_SEARCH_RESULT_CACHE = False
+    if options["log_level"]:
+        configure_logging(options["log_level"])
+    if options["metrics_dir"]:
+        exporter = find_exporter(hw.tracer, PrometheusExporter)
+        if exporter is None:
+            exporter = PrometheusExporter()
+            hw.tracer.exporters.append(exporter)
+        exporter.labels["worker"] = str(index)
+
+
+async def keep_listing_cache_fresh(hw):
+    """Poll for listings other workers posted when there is no change stream; an idle worker runs no searches to do it."""
+    cache = hw.context().listing_cache
+    if cache is None:
+        return
+    while True:
+        await asyncio.sleep(hw.LISTING_CACHE_MAX_STALENESS_SECONDS)
+        try:
+            await asyncio.to_thread(cache.refresh_if_stale)  # returns at once while following a change stream
+        except Exception as e:
+            logger.warning("⚠️ Could not refresh the listing cache: %s", e)
+
+
+async def wait_for_stop(runner, stopping: asyncio.Event):
+    """Set `stopping` when the runner says "stop" on its pipe, or closes it by exiting."""
+    while not stopping.is_set():
+        if await asyncio.to_thread(runner.poll, 1.0):
+            break
+    stopping.set()
+
+
+async def serve_worker(index: int, port: int, options: dict, runner):
+    import async_agent
+    import hotelWorker as hw
+
+    configure_worker(hw, index, options)
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    with contextlib.suppress(NotImplementedError):  # no signal handlers on Windows event loops
+        loop.add_signal_handler(signal.SIGTERM, stopping.set)
+    tasks = [asyncio.create_task(wait_for_stop(runner, stopping))]
+
+    def on_ready():
+        tasks.append(asyncio.create_task(keep_listing_cache_fresh(hw)))
+        runner.send("ready")
+
+    metrics_file = os.path.join(options["metrics_dir"], f"sufra_worker_{index}.prom") if options["metrics_dir"] else None
+    try:
+        await async_agent.serve("127.0.0.1", port, options["max_concurrent_turns"], metrics_file, trust_client_ip=True,
+                                drain_seconds=options["drain_seconds"], stop=stopping, on_ready=on_ready)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def run_worker(index: int, port: int, options: dict, runner):
+    """Entry point of worker process `index`; `runner` is its end of the pipe to the runner."""
+    # Ctrl-C reaches the whole process group; the runner tells the workers when to drain
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if options["worker_init"]:
+        load_hook(options["worker_init"])(index)
+    asyncio.run(serve_worker(index, port, options, runner))
+
+
+# ============== ROUTER ==============
+
+class _Upstream:
+    """A connection to one worker, carrying the sessions of one client connection routed there."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = deque()  # session ids of turns sent and not answered yet, in order
+        self.relay = None
+
+    @property
+    def closed(self) -> bool:
+        return self.writer.is_closing() or (self.relay is not None and self.relay.done())
+
+
+def _line(message: dict) -> bytes:
+    return (json.dumps(message) + "\n").encode()
+
+
+def _reply(message: dict) -> bytes:
+    """A line answering a client's turn."""
+    return _line({"type": "reply", **message})
+
+
+class Runner:
+    """Starts and supervises the worker processes and routes client connections to them."""
+
+    def __init__(self, workers: int, host: str = "127.0.0.1", port: int = 8765, worker_base_port: int = None,
+                 router: SessionRouter = None, **options):
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.worker_base_port = worker_base_port or port + 1
+        self.router = router or SessionRouter(workers)
+        self.options = {"max_concurrent_turns": MAX_CONCURRENT_TURNS, "min_pool_size": WORKER_MIN_POOL_SIZE,
+                        "drain_seconds": DRAIN_SECONDS, "metrics_dir": None, "worker_init": None, "log_level": None, **options}
+        self.stopping = False
+
+        # Each worker gets its own pipe rather than sharing a multiprocessing.Event: a worker
+        # killed while waiting on the Event would leave set() blocked for good
+        self._mp = multiprocessing.get_context("spawn")
+        self._processes = [None] * workers
+        self._pipes = [None] * workers
+        self._started_at = [0.0] * workers
+        self._restarts = [0] * workers
+        self._restarting = {}  # worker -> restart task
+        self._clients = {}  # client StreamWriter -> the task serving it
+
+    def worker_port(self, index: int) -> int:
+        return self.worker_base_port + index
+
+    # ---------- workers ----------
+
+    def start_worker(self, index: int):
+        pipe, worker_end = self._mp.Pipe()
+        process = self._mp.Process(target=run_worker, args=(index, self.worker_port(index), self.options, worker_end),
+                                   name=f"sufra-worker-{index}", daemon=True)
+        process.start()
+        worker_end.close()  # so the pipe reports EOF once the worker is gone
+        if self._pipes[index] is not None:
+            self._pipes[index].close()
+        self._processes[index], self._pipes[index] = process, pipe
+        self._started_at[index] = time.monotonic()
+
+    async def wait_ready(self, index: int) -> bool:
+        """True once worker `index` is warm and listening; False if it exited or timed out first."""
+        pipe = self._pipes[index]
+        deadline = time.monotonic() + WORKER_START_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            if await asyncio.to_thread(pipe.poll, 0.5):
+                try:
+                    return pipe.recv() == "ready"
+                except EOFError:
+                    return False
+        return False
+
+    async def supervise(self):
+        """Restart workers that exit, until the runner stops."""
+        while not self.stopping:
+            await asyncio.sleep(SUPERVISE_INTERVAL_SECONDS)
+            for index, process in enumerate(self._processes):
+                if index not in self._restarting and not process.is_alive():
+                    self._restarting[index] = asyncio.create_task(self.restart(index))
+
+    async def restart(self, index: int):
+        try:
+            self.router.worker_down(index)
+            uptime = time.monotonic() - self._started_at[index]
+            self._restarts[index] = 0 if uptime > RESTART_RESET_SECONDS else self._restarts[index] + 1
+            delay = min(RESTART_BACKOFF_MAX_SECONDS, 2 ** self._restarts[index] - 1)
+            logger.warning("⚠️ Worker %s exited with code %s, restarting in %ss", index, self._processes[index].exitcode, delay)
+            await asyncio.sleep(delay)
+            if self.stopping:
+                return
+            self.start_worker(index)
+            if await self.wait_ready(index):
+                self.router.worker_up(index)
+                logger.info("✓ Worker %s is back on port %s", index, self.worker_port(index))
+        finally:
+            del self._restarting[index]
+
+    async def stop_workers(self):
+        """Tell every worker to drain and wait for them; workers still running after the grace period are terminated."""
+        for pipe in self._pipes:
+            with contextlib.suppress(OSError):
+                pipe.send("stop")
+        deadline = time.monotonic() + self.options["drain_seconds"] + WORKER_STOP_GRACE_SECONDS
+        for index, process in enumerate(self._processes):
+            if process is None:
+                continue
+            await asyncio.to_thread(process.join, max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("⚠️ Worker %s did not stop in time, terminating it", index)
+                process.terminate()
+
+    # ---------- client connections ----------
+
+    async def handle_client(self, reader, writer):
+        """Forward each request line to its session's worker and relay everything the workers send back."""
+        peer = writer.get_extra_info("peername")
+        client_ip = peer[0] if peer else None
+        upstreams = {}  # worker -> _Upstream
+        self._clients[writer] = asyncio.current_task()
+        try:
+            while line := await reader.readline():
+                session_id = None
+                try:
+                    request = json.loads(line)
+                    session_id = request["session_id"]
+                    request["client_ip"] = client_ip
+                    upstream = await self.upstream_for(upstreams, session_id, request.get("location"), writer)
+                    upstream.pending.append(session_id)
+                    upstream.writer.write(_line(request))
+                    await upstream.writer.drain()
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    writer.write(_reply({"error": f"Bad request: {e}"}))
+                except (NoWorkerAvailable, OSError):
+                    writer.write(_reply({"session_id": session_id, "error": "No worker is available, please send this again",
+                                         "retry": True}))
+                await writer.drain()
+        except OSError:
+            pass  # the client went away
+        finally:
+            del self._clients[writer]
+            for upstream in upstreams.values():
+                upstream.writer.close()
+            writer.close()
+
+    async def upstream_for(self, upstreams: dict, session_id: str, location, client_writer) -> _Upstream:
+        """This client connection's connection to the session's worker, opened if needed."""
+        worker = self.router.route(session_id, location)
+        upstream = upstreams.get(worker)
+        if upstream is not None and not upstream.closed:
+            return upstream
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", self.worker_port(worker))
+        except OSError:
+            if self._processes[worker].is_alive():
+                raise
+            # It died since the supervisor last looked: move the session now
+            self.router.worker_down(worker)
+            return await self.upstream_for(upstreams, session_id, location, client_writer)
+        upstream = upstreams[worker] = _Upstream(reader, writer)
+        upstream.relay = asyncio.create_task(self.relay(upstream, client_writer))
+        return upstream
+
+    async def relay(self, upstream: _Upstream, client_writer):
+        """Copy a worker's replies and food alerts to the client until the worker closes the connection."""
+        try:
+            while line := await upstream.reader.readline():
+                # Only replies answer a pending turn; alerts can arrive at any time
+                if upstream.pending and json.loads(line).get("type") == "reply":
+                    upstream.pending.popleft()
+                client_writer.write(line)
+                await client_writer.drain()
+        except OSError:
+            pass
+        finally:
+            if upstream.pending and not client_writer.is_closing():
+                for session_id in upstream.pending:
+                    client_writer.write(_reply({"session_id": session_id, "error": "The worker stopped during this turn, "
+                                                                                   "please send it again", "retry": True}))
+            upstream.pending.clear()
+            upstream.writer.close()
+
+    # ---------- main loop ----------
+
+    async def run(self) -> int:
+        """Start the workers, serve until SIGINT or SIGTERM, then drain; returns the exit status."""
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError):  # Windows: Ctrl-C raises KeyboardInterrupt instead
+                loop.add_signal_handler(signum, stop.set)
+
+        for index in range(self.workers):
+            self.start_worker(index)
+        started = await asyncio.gather(*(self.wait_ready(index) for index in range(self.workers)))
+        for index, ready in enumerate(started):
+            if not ready:
+                self.router.worker_down(index)
+                logger.error("❌ Worker %s did not start", index)
+        if not any(started):
+            await self.stop_workers()
+            return 1
+
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        print(f"✓ Runner listening on {self.host}:{self.port}, {sum(started)}/{self.workers} workers on ports "
+              f"{self.worker_port(0)}-{self.worker_port(self.workers - 1)}")
+        supervisor = asyncio.create_task(self.supervise())
+        try:
+            await stop.wait()
+        finally:
+            self.stopping = True
+            supervisor.cancel()
+            server.close()
+            logger.info("⏳ Draining the workers...")
+            await self.stop_workers()
+            tasks = list(self._clients.values())
+            for writer in list(self._clients):
+                writer.close()
+            if tasks:
+                await asyncio.wait(tasks, timeout=1)
+            logger.info("✓ Stopped (%s sessions routed)", self.router.summary()['sessions'])
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--worker-base-port", type=int, default=None, help="Worker i listens on this + i (default: --port + 1)")
+    parser.add_argument("--max-concurrent-turns", type=int, default=MAX_CONCURRENT_TURNS, help="Per worker")
+    parser.add_argument("--min-pool-size", type=int, default=WORKER_MIN_POOL_SIZE, help="MongoDB connections each worker keeps open")
+    parser.add_argument("--drain-seconds", type=float, default=DRAIN_SECONDS, help="On shutdown, wait this long for running turns")
+    parser.add_argument("--region-cell-degrees", type=float, default=REGION_CELL_DEGREES,
+                        help="Route sessions that send a location by this grid (0 routes every session by its id)")
+    parser.add_argument("--metrics-dir", default=None, help="Each worker writes Prometheus metrics to sufra_worker_<i>.prom here")
+    parser.add_argument("--worker-init", default=None,
+                        help="module:function called with the worker index before hotelWorker is imported")
+    parser.add_argument("--log-level", default=None, help="DEBUG, INFO or WARNING (default: hotelWorker.LOG_LEVEL)")
+    args = parser.parse_args()
+    if args.log_level:
+        configure_logging(args.log_level)
+
+    runner = Runner(args.workers, args.host, args.port, args.worker_base_port,
+                    router=SessionRouter(args.workers, region_cell_degrees=args.region_cell_degrees or None),
+                    max_concurrent_turns=args.max_concurrent_turns, min_pool_size=args.min_pool_size,
+                    drain_seconds=args.drain_seconds, metrics_dir=args.metrics_dir, worker_init=args.worker_init,
+                    log_level=args.log_level)
+    try:
+        sys.exit(asyncio.run(runner.run()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
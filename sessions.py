@@ -0,0 +1,170 @@
+"""Per-session conversation history for the agent.
+
+Each hotel or worker chat gets its own history keyed by session id, so
+concurrent users never see each other's messages and every LLM call
+resends only its own conversation.
+
+Sessions live in an LRU-bounded dict with idle-TTL eviction. Optionally
+they are also persisted to MongoDB so a restarted process (or another
+worker process) can pick a conversation back up. Async callers use
+`aget_history()` / `aappend()` with an AsyncMongoClient collection for the
+same sessions, so a cache miss or a save never blocks the event loop.
+The store does no I/O when it is created; `ensure_session_indexes()`
+(run by indexes.migrate) adds the TTL index that expires idle sessions.
+
+History is trimmed to a token budget by dropping whole turns from the
+front: a turn starts at a HumanMessage, so an AI tool call is never
+separated from its tool results.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from langchain_core.messages import HumanMessage, messages_from_dict, messages_to_dict
+
+SESSIONS_COLLECTION_NAME = "sessions"
+
+
+def estimate_tokens(messages) -> int:
+    """Rough token count (~4 characters per token plus per-message overhead)."""
+    total = 0
+    for message in messages:
+        total += len(str(message.content)) // 4 + 4
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            total += len(str(tool_call.get("args", ""))) // 4 + 4
+    return total
+
+
+def trim_to_token_budget(messages: list, max_tokens: int) -> list:
+    """Drop the oldest whole turns until the history fits in `max_tokens`.
+
+    The newest turn is always kept, even when it alone is over the budget.
+    """
+    messages = list(messages)
+    newest_turn = max((i for i, message in enumerate(messages) if isinstance(message, HumanMessage)), default=0)
+    while newest_turn > 0 and estimate_tokens(messages) > max_tokens:
+        next_turn = next(i for i, message in enumerate(messages) if i > 0 and isinstance(message, HumanMessage))
+        del messages[:next_turn]
+        newest_turn -= next_turn
+    return messages
+
+
+def ensure_session_indexes(sessions, ttl_seconds: float = 3600) -> list:
+    """TTL index on updated_at so persisted sessions expire after `ttl_seconds` idle."""
+    existing = sessions.index_information().get("updated_at_1", {})
+    if existing and existing.get("expireAfterSeconds") != int(ttl_seconds):
+        sessions.drop_index("updated_at_1")
+    return [sessions.create_index("updated_at", expireAfterSeconds=int(ttl_seconds))]
+
+
+class SessionStore:
+    """LRU + TTL bounded store of conversation histories keyed by session id."""
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 3600, max_history_tokens: int = 2000, collection=None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_history_tokens = max_history_tokens
+        self.collection = collection  # optional MongoDB persistence
+
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session_id -> (last_used, messages)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get_history(self, session_id: str) -> list:
+        """Messages from previous turns of this session (oldest first)."""
+        now = time.monotonic()
+        messages = self._cached(session_id, now)
+        if messages is None:
+            messages = self._load(session_id)
+            with self._lock:
+                self._store(session_id, now, messages)
+        return list(messages)
+
+    def append(self, session_id: str, new_messages) -> list:
+        """Add a completed turn to the session and return the trimmed history."""
+        history = self._extend(session_id, self.get_history(session_id), new_messages)
+        self._save(session_id, history)
+        return history
+
+    async def aget_history(self, session_id: str, collection=None) -> list:
+        """get_history() loading through `collection`, an AsyncMongoClient collection of the same sessions."""
+        now = time.monotonic()
+        messages = self._cached(session_id, now)
+        if messages is None:
+            messages = await self._aload(session_id, collection)
+            with self._lock:
+                self._store(session_id, now, messages)
+        return list(messages)
+
+    async def aappend(self, session_id: str, new_messages, collection=None) -> list:
+        """append() saving through `collection`, an AsyncMongoClient collection of the same sessions."""
+        history = self._extend(session_id, await self.aget_history(session_id, collection), new_messages)
+        if self.collection is not None:
+            if collection is None:
+                await asyncio.to_thread(self._save, session_id, history)
+            else:
+                await collection.update_one({"_id": session_id}, self._save_update(history), upsert=True)
+        return history
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if self.collection is not None:
+            self.collection.delete_one({"_id": session_id})
+
+    def _cached(self, session_id: str, now: float):
+        """The session's messages if it is in memory and not idle past the TTL, else None."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and now - entry[0] <= self.ttl_seconds:
+                self._sessions[session_id] = (now, entry[1])
+                self._sessions.move_to_end(session_id)
+                return entry[1]
+            self._sessions.pop(session_id, None)
+        return None
+
+    def _extend(self, session_id: str, history: list, new_messages) -> list:
+        history = trim_to_token_budget(history + list(new_messages), self.max_history_tokens)
+        with self._lock:
+            self._store(session_id, time.monotonic(), history)
+        return history
+
+    def _store(self, session_id: str, last_used: float, messages: list):
+        self._sessions[session_id] = (last_used, messages)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        # Least recently used first, so idle sessions are at the front
+        while self._sessions:
+            oldest_id, (oldest_used, _) = next(iter(self._sessions.items()))
+            if last_used - oldest_used <= self.ttl_seconds:
+                break
+            del self._sessions[oldest_id]
+
+    def _load(self, session_id: str) -> list:
+        if self.collection is None:
+            return []
+        document = self.collection.find_one({"_id": session_id})
+        return messages_from_dict(document["messages"]) if document else []
+
+    async def _aload(self, session_id: str, collection=None) -> list:
+        if self.collection is None:
+            return []
+        if collection is None:
+            return await asyncio.to_thread(self._load, session_id)
+        document = await collection.find_one({"_id": session_id})
+        return messages_from_dict(document["messages"]) if document else []
+
+    def _save(self, session_id: str, messages: list):
+        if self.collection is None:
+            return
+        self.collection.update_one({"_id": session_id}, self._save_update(messages), upsert=True)
+
+    @staticmethod
+    def _save_update(messages: list) -> dict:
+        return {"$set": {"messages": messages_to_dict(messages), "updated_at": datetime.now(timezone.utc)}}
@@ -0,0 +1,472 @@
+"""Standing food searches, matched once against every new listing.
+
+Workers used to find food only by polling search: each poll is an LLM
+round trip and a geo query, and food posted between polls goes cold. A
+worker can now subscribe instead, with a budget, optionally an item name
+and optionally a radius around where they are. `SubscriptionIndex` keeps
+the subscriptions in memory, and each stored listing (or batch) is
+matched against it in one pass:
+- subscriptions with a radius are filed under every grid cell their
+  circle touches, so a listing only meets the ones filed under its own
+  cell; the haversine decides, as in geo.GeoIndex
+- subscriptions without a radius are grouped by item name and sorted by
+  budget, so each name is checked once per listing and the budgets it
+  fits are one slice
+- names match as in search (food_queries.matches_item_name: word
+  prefixes and synonyms)
+
+Each subscription that matches gets one `Notification` per insert, with
+every listing it matched. `NotificationDispatcher` hands notifications to
+pluggable async sinks on an event loop (its own thread, or the server's
+loop), so storing a listing never waits for delivery:
+- `LocalSink` keeps them in memory per session, for the interactive
+  worker mode and tests
+- `WebhookSink` POSTs them as JSON to a push gateway
+
+Subscriptions live in the process that took them and expire after a TTL.
+"""
+
+import asyncio
+import bisect
+import math
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import NamedTuple
+
+from food_queries import food_name_tokens, listing_handle, matches_item_name
+from geo import DEFAULT_CELL_DEGREES, METERS_PER_DEGREE_LAT, haversine_m, parse_coordinates
+from tracing import logger
+
+DEFAULT_SUBSCRIPTION_TTL = timedelta(hours=2)
+MAX_RADIUS_M = 25000.0
+MAX_SUBSCRIPTIONS_PER_SESSION = 5
+# Notifications waiting for delivery; more are dropped rather than slowing inserts
+MAX_PENDING_NOTIFICATIONS = 10000
+MAX_CONCURRENT_DELIVERIES = 100
+LOCAL_SINK_MAX_PER_SESSION = 50
+# Expired subscriptions are dropped when a listing meets them, and swept at most this often
+PURGE_INTERVAL = timedelta(minutes=1)
+
+
+class Subscription(NamedTuple):
+    subscription_id: str
+    session_id: str
+    max_price: float
+    item_name: str = None
+    lat: float = None
+    lon: float = None
+    radius_m: float = None
+    expires_at: datetime = None
+
+    def describe(self) -> str:
+        text = f"{self.item_name or 'any food'} under ${self.max_price:g}"
+        if self.radius_m is not None:
+            text += f" within {self.radius_m / 1000:g} km"
+        return text
+
+
+class Notification(NamedTuple):
+    subscription: Subscription
+    listings: tuple  # (listing, distance in meters or None), cheapest first
+
+    def message(self) -> str:
+        lines = [f"🔔 New food for your alert '{self.subscription.describe()}':"]
+        for listing, distance_m in self.listings:
+            line = f"- {listing['food_name']} (${listing['price']}, {listing['quantity']} left) from {listing['hotel_name']}"
+            if distance_m is not None:
+                line += f", {distance_m / 1000:.1f} km away"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def to_json(self) -> dict:
+        return {
+            "session_id": self.subscription.session_id,
+            "subscription_id": self.subscription.subscription_id,
+            "notification": self.message(),
+            "listings": [
+                {"listing_id": listing_handle(listing["_id"]), "hotel_name": listing["hotel_name"], "food_name": listing["food_name"],
+                 "price": listing["price"], "quantity": listing["quantity"], "hotel_location": listing["hotel_location"],
+                 "distance_m": round(distance_m) if distance_m is not None else None}
+                for listing, distance_m in self.listings
+            ]
+        }
+
+
+def new_subscription(session_id: str, max_price: float, item_name: str = None, location: str = None,
+                     radius_m: float = None, ttl: timedelta = DEFAULT_SUBSCRIPTION_TTL, now: datetime = None) -> Subscription:
+    """A subscription; raises ValueError for a malformed location or a radius without one."""
+    if item_name is not None and not food_name_tokens(item_name):
+        item_name = None
+    lat = lon = None
+    if radius_m is not None:
+        if location is None:
+            raise ValueError("a radius needs a location")
+        lat, lon = parse_coordinates(location)
+    return Subscription(uuid.uuid4().hex, session_id, float(max_price), item_name, lat, lon,
+                        float(radius_m) if radius_m is not None else None, (now or datetime.now()) + ttl)
+
+
+class _PriceLadder:
+    """Subscription ids sorted by budget, so the ones a price fits are one slice."""
+
+    def __init__(self):
+        self.prices = []
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, max_price: float, subscription_id: str):
+        position = bisect.bisect_left(self.prices, max_price)
+        self.prices.insert(position, max_price)
+        self.ids.insert(position, subscription_id)
+
+    def remove(self, max_price: float, subscription_id: str):
+        position = bisect.bisect_left(self.prices, max_price)
+        while self.ids[position] != subscription_id:
+            position += 1
+        del self.prices[position]
+        del self.ids[position]
+
+    def affording(self, price: float) -> list:
+        return self.ids[bisect.bisect_left(self.prices, price):]
+
+
+class SubscriptionIndex:
+    """Subscriptions by grid cell, matched against new listings in one pass."""
+
+    def __init__(self, cell_degrees: float = DEFAULT_CELL_DEGREES, max_radius_m: float = MAX_RADIUS_M,
+                 max_per_session: int = MAX_SUBSCRIPTIONS_PER_SESSION):
+        self.cell_degrees = cell_degrees
+        self.max_radius_m = max_radius_m
+        self.max_per_session = max_per_session
+        self._lock = threading.Lock()
+        self._subscriptions = {}  # id -> Subscription
+        self._cells = {}          # (row, column) -> set of ids
+        self._filed = {}          # id -> cells it is filed under
+        self._anywhere = {}       # item name -> _PriceLadder of ids without a radius
+        self._unfiled = set()     # ids with a radius too close to a pole or the antimeridian to file
+        self._by_session = {}     # session id -> set of ids
+        self._next_purge = datetime.now() + PURGE_INTERVAL
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def add(self, subscription: Subscription) -> Subscription:
+        """Register a subscription (its radius capped at `max_radius_m`).
+
+        A session already at `max_per_session` loses its oldest subscription.
+        """
+        if subscription.radius_m is not None and subscription.radius_m > self.max_radius_m:
+            subscription = subscription._replace(radius_m=self.max_radius_m)
+        if datetime.now() >= self._next_purge:
+            self.purge_expired()
+        with self._lock:
+            self._remove(subscription.subscription_id)
+            session_ids = self._by_session.get(subscription.session_id, set())
+            while len(session_ids) >= self.max_per_session:
+                self._remove(min(session_ids, key=lambda sid: self._subscriptions[sid].expires_at))
+            self._subscriptions[subscription.subscription_id] = subscription
+            session_ids.add(subscription.subscription_id)
+            self._by_session[subscription.session_id] = session_ids
+            cells = self._cells_for(subscription)
+            if subscription.radius_m is None:
+                self._anywhere.setdefault(subscription.item_name, _PriceLadder()).add(subscription.max_price, subscription.subscription_id)
+            elif cells is None:
+                self._unfiled.add(subscription.subscription_id)
+            else:
+                self._filed[subscription.subscription_id] = cells
+                for cell in cells:
+                    self._cells.setdefault(cell, set()).add(subscription.subscription_id)
+        return subscription
+
+    def remove(self, subscription_id: str, session_id: str = None):
+        """Remove a subscription (only if it belongs to `session_id`, when given); returns it or None."""
+        with self._lock:
+            subscription = self._subscriptions.get(subscription_id)
+            if subscription is None or (session_id is not None and subscription.session_id != session_id):
+                return None
+            return self._remove(subscription_id)
+
+    def remove_session(self, session_id: str) -> list:
+        with self._lock:
+            return [self._remove(sid) for sid in list(self._by_session.get(session_id, ()))]
+
+    def for_session(self, session_id: str) -> list:
+        with self._lock:
+            return sorted((self._subscriptions[sid] for sid in self._by_session.get(session_id, ())), key=lambda s: s.expires_at)
+
+    def purge_expired(self, now: datetime = None) -> int:
+        now = now or datetime.now()
+        with self._lock:
+            self._next_purge = now + PURGE_INTERVAL
+            expired = [sid for sid, subscription in self._subscriptions.items() if subscription.expires_at <= now]
+            for sid in expired:
+                self._remove(sid)
+        return len(expired)
+
+    def match(self, listings, now: datetime = None) -> list:
+        """One Notification per live subscription that any of `listings` matches."""
+        now = now or datetime.now()
+        matched = {}  # id -> [(listing, distance)]
+        expired = set()
+        with self._lock:
+            for listing in listings:
+                if not listing.get("is_available", True) or listing.get("quantity", 1) <= 0:
+                    continue
+                price = listing["price"]
+                names = {None: True}  # item name -> whether this listing matches it
+
+                def named(item_name):
+                    found = names.get(item_name)
+                    if found is None:
+                        found = names[item_name] = matches_item_name(listing, item_name)
+                    return found
+
+                for item_name, ladder in self._anywhere.items():
+                    if named(item_name):
+                        for sid in ladder.affording(price):
+                            if self._subscriptions[sid].expires_at <= now:
+                                expired.add(sid)
+                            else:
+                                matched.setdefault(sid, []).append((listing, None))
+
+                lat, lon = parse_coordinates(listing["hotel_location"])
+                located = []
+                for sid in chain(self._cells.get(self._cell(lat, lon), ()), self._unfiled):
+                    subscription = self._subscriptions[sid]
+                    if subscription.expires_at <= now:
+                        expired.add(sid)
+                    elif price <= subscription.max_price and named(subscription.item_name):
+                        located.append(subscription)
+                if located:
+                    distances = haversine_m(lat, lon, [s.lat for s in located], [s.lon for s in located])
+                    for subscription, distance_m in zip(located, distances.tolist()):
+                        if distance_m <= subscription.radius_m:
+                            matched.setdefault(subscription.subscription_id, []).append((listing, distance_m))
+            for sid in expired:
+                self._remove(sid)
+            subscriptions = {sid: self._subscriptions[sid] for sid in matched}
+        return [Notification(subscriptions[sid], tuple(sorted(found, key=lambda pair: pair[0]["price"])))
+                for sid, found in matched.items()]
+
+    def _remove(self, subscription_id: str):
+        subscription = self._subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return None
+        session_ids = self._by_session.get(subscription.session_id)
+        if session_ids is not None:
+            session_ids.discard(subscription_id)
+            if not session_ids:
+                del self._by_session[subscription.session_id]
+        if subscription.radius_m is None:
+            ladder = self._anywhere[subscription.item_name]
+            ladder.remove(subscription.max_price, subscription_id)
+            if not ladder:
+                del self._anywhere[subscription.item_name]
+        self._unfiled.discard(subscription_id)
+        for cell in self._filed.pop(subscription_id, ()):
+            ids = self._cells[cell]
+            ids.discard(subscription_id)
+            if not ids:
+                del self._cells[cell]
+        return subscription
+
+    def _cell(self, lat: float, lon: float) -> tuple:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def _cells_for(self, subscription: Subscription):
+        """Grid cells the subscription's circle touches, or None to check it against every listing."""
+        if subscription.radius_m is None:
+            return None
+        lat_span = subscription.radius_m / METERS_PER_DEGREE_LAT
+        cos_lat = math.cos(math.radians(min(abs(subscription.lat) + lat_span, 90.0)))
+        if cos_lat <= 1e-9:
+            return None
+        lon_span = subscription.radius_m / (METERS_PER_DEGREE_LAT * cos_lat)
+        if subscription.lon - lon_span < -180 or subscription.lon + lon_span > 180:
+            return None
+        row_low, column_low = self._cell(subscription.lat - lat_span, subscription.lon - lon_span)
+        row_high, column_high = self._cell(subscription.lat + lat_span, subscription.lon + lon_span)
+        return [(row, column) for row in range(row_low, row_high + 1) for column in range(column_low, column_high + 1)]
+
+
+# ---------- delivery ----------
+
+class NotificationSink:
+    """Delivers notifications somewhere; `send` runs on the dispatcher's event loop."""
+
+    async def send(self, notification: Notification):
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class LocalSink(NotificationSink):
+    """Keeps the latest notifications per session in memory until they are drained."""
+
+    def __init__(self, max_per_session: int = LOCAL_SINK_MAX_PER_SESSION):
+        self.max_per_session = max_per_session
+        self._pending = {}  # session id -> deque of Notification
+        self._lock = threading.Lock()
+
+    async def send(self, notification: Notification):
+        with self._lock:
+            pending = self._pending.setdefault(notification.subscription.session_id, deque(maxlen=self.max_per_session))
+            pending.append(notification)
+
+    def drain(self, session_id: str) -> list:
+        with self._lock:
+            return list(self._pending.pop(session_id, ()))
+
+
+class WebhookSink(NotificationSink):
+    """POSTs each notification as JSON (see Notification.to_json) to a push gateway."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+        self._client = None
+
+    async def send(self, notification: Notification):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._client.post(self.url, json=notification.to_json())
+        response.raise_for_status()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def build_sinks(names, webhook_url: str = None) -> list:
+    """Sinks by name: "local", "webhook"."""
+    sinks = []
+    for name in names:
+        if name == "local":
+            sinks.append(LocalSink())
+        elif name == "webhook":
+            if not webhook_url:
+                raise ValueError("the webhook notification sink needs a URL")
+            sinks.append(WebhookSink(webhook_url))
+        else:
+            raise ValueError(f"unknown notification sink: {name!r}")
+    return sinks
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def find_sink(dispatcher, sink_type):
+    return next((sink for sink in dispatcher.sinks if isinstance(sink, sink_type)), None)
+
+
+class NotificationDispatcher:
+    """Delivers notifications to every sink from an event loop, off the inserting thread.
+
+    `dispatch()` is thread-safe and never blocks. Without `start(loop)`, the
+    first dispatch starts a daemon thread running a loop of its own; servers
+    already running asyncio pass theirs, so sinks can use its streams.
+    """
+
+    def __init__(self, sinks, max_pending: int = MAX_PENDING_NOTIFICATIONS,
+                 max_concurrent_deliveries: int = MAX_CONCURRENT_DELIVERIES):
+        self.sinks = list(sinks)
+        self.max_pending = max_pending
+        self.max_concurrent_deliveries = max_concurrent_deliveries
+        self.counts = {"dispatched": 0, "delivered": 0, "failed": 0, "dropped": 0}
+        self._loop = None
+        self._thread = None
+        self._queue = None
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def start(self, loop: asyncio.AbstractEventLoop = None):
+        """Deliver on `loop` (which must be running), or on a new loop in a daemon thread."""
+        with self._lock:
+            if self._loop is not None:
+                return
+            if loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="notification-dispatcher", daemon=True)
+                self._thread.start()
+            self._loop = loop
+            self._queue = None
+            loop.call_soon_threadsafe(self._start_worker)
+
+    def dispatch(self, notifications) -> int:
+        """Queue notifications for delivery; returns how many were queued."""
+        notifications = list(notifications)
+        if not notifications:
+            return 0
+        if self._loop is None:
+            self.start()
+        self._loop.call_soon_threadsafe(self._enqueue, notifications)
+        return len(notifications)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop delivering; notifications still queued are dropped."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+        if thread is None and _running_loop() is loop:
+            # Stopped from the server's own loop, which cannot wait on itself
+            loop.create_task(self._shutdown())
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), loop)
+        try:
+            future.result(timeout)
+        except Exception as e:
+            logger.warning("⚠️ Notification dispatcher did not stop cleanly: %s", e)
+        if thread is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            loop.close()
+
+    def _start_worker(self):
+        self._queue = asyncio.Queue(self.max_pending)
+        self._worker = asyncio.ensure_future(self._deliver())
+
+    def _enqueue(self, notifications: list):
+        for notification in notifications:
+            try:
+                self._queue.put_nowait(notification)
+                self.counts["dispatched"] += 1
+            except asyncio.QueueFull:
+                self.counts["dropped"] += 1
+
+    async def _deliver(self):
+        slots = asyncio.Semaphore(self.max_concurrent_deliveries)
+        while True:
+            notification = await self._queue.get()
+            await slots.acquire()
+            task = asyncio.ensure_future(self._send(notification))
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _send(self, notification: Notification):
+        for sink in self.sinks:
+            try:
+                await sink.send(notification)
+                self.counts["delivered"] += 1
+            except Exception as e:
+                self.counts["failed"] += 1
+                logger.warning("⚠️ Could not deliver notification to %s: %s", type(sink).__name__, e)
+
+    async def _shutdown(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for sink in self.sinks:
+            await sink.aclose()
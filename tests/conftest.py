@@ -0,0 +1,33 @@
+"""Shared fixtures: hotelWorker on a fresh in-memory mongomock database per test."""
+
+import contextlib
+import io
+import os
+import sys
+
+import mongomock
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mongo():
+    return mongomock.MongoClient()
+
+
+@pytest.fixture
+def hw(mongo, monkeypatch):
+    """hotelWorker with its AppContext on `mongo`; the context is dropped afterwards."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import hotelWorker
+    monkeypatch.setattr(hotelWorker, "MongoClient", lambda *args, **kwargs: mongo)
+    monkeypatch.setattr(hotelWorker, "_context", None)
+    monkeypatch.setattr(hotelWorker, "hotel_locations", {})
+    yield hotelWorker
+    hotelWorker.shutdown()
+
+
+@pytest.fixture
+def food(hw):
+    return hw.context().food_collection
@@ -0,0 +1,46 @@
+"""Archival: which listings leave food_items, and that a sweep moves them to history exactly once."""
+
+from datetime import datetime, timedelta
+
+from archival import SOLD_OUT_GRACE, archivable_filter, archive_batch, archive_stale_listings
+from bulk_ingest import build_food_document
+
+HERE = "25.2048,55.2708"
+
+
+def seed(food, now):
+    def listing(name, **fields):
+        document = dict(build_food_document("Taj Hotel", name, 5, 2, HERE), **fields)
+        return food.insert_one(document).inserted_id
+
+    return {
+        "live": listing("live"),
+        "expired": listing("expired", expires_at=now - timedelta(minutes=1)),
+        "sold out": listing("sold out", quantity=0, is_available=False, status="sold_out",
+                            last_booked=now - SOLD_OUT_GRACE - timedelta(minutes=1)),
+        "just sold out": listing("just sold out", quantity=0, is_available=False, status="sold_out",
+                                 last_booked=now - timedelta(minutes=1)),
+        "expired with a hold": listing("expired with a hold", expires_at=now - timedelta(minutes=1), held=1),
+    }
+
+
+def test_archivable_filter(mongo):
+    now = datetime.now()
+    food = mongo.db.food_items
+    ids = seed(food, now)
+    archivable = {item["_id"] for item in food.find(archivable_filter(now))}
+    assert archivable == {ids["expired"], ids["sold out"]}
+
+
+def test_archive_moves_listings_to_history_once(mongo):
+    now = datetime.now()
+    food, history = mongo.db.food_items, mongo.db.food_items_history
+    ids = seed(food, now)
+    # A copy left behind by an interrupted sweep does not stop the next one
+    history.insert_one(food.find_one({"_id": ids["expired"]}))
+
+    assert archive_stale_listings(food, history, now, batch_size=1) == {"expired": 1, "sold_out": 1}
+    assert {item["_id"] for item in food.find()} == {ids["live"], ids["just sold out"], ids["expired with a hold"]}
+    assert {item["_id"]: item.get("archive_reason") for item in history.find()} == {ids["expired"]: None,
+                                                                                    ids["sold out"]: "sold_out"}
+    assert archive_batch(food, history, now) == []
@@ -0,0 +1,69 @@
+"""Atomic booking: the stock guard and the decrement are one update, so stock never goes below zero."""
+
+import asyncio
+
+import pytest
+
+from booking import abook_listing, abook_many, book_listing, book_many
+from bulk_ingest import build_food_document
+
+HERE = "25.2048,55.2708"
+
+
+class AsyncCollection:
+    """The part of an AsyncMongoClient collection the booking helpers use, over mongomock."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def find_one_and_update(self, *args, **kwargs):
+        # Yield first, so gathered bookings interleave like concurrent requests
+        await asyncio.sleep(0)
+        return self.collection.find_one_and_update(*args, **kwargs)
+
+
+def listing(food, quantity: int):
+    return food.insert_one(build_food_document("Taj Hotel", "Biryani", 5, quantity, HERE)).inserted_id
+
+
+def test_bookings_stop_at_zero_and_flip_sold_out(mongo):
+    food = mongo.db.food_items
+    listing_id = listing(food, 3)
+    booked = [book_listing(food, {"_id": listing_id}) for _ in range(5)]
+    assert [item is not None for item in booked] == [True, True, True, False, False]
+    item = food.find_one({"_id": listing_id})
+    assert (item["quantity"], item["is_available"], item["status"]) == (0, False, "sold_out")
+
+
+def test_quantity_guard(mongo):
+    food = mongo.db.food_items
+    listing_id = listing(food, 2)
+    assert book_listing(food, {"_id": listing_id}, 3) is None
+    with pytest.raises(ValueError):
+        book_listing(food, {"_id": listing_id}, 0)
+    assert book_many(food, [({"_id": listing_id}, 2), ({"_id": listing_id}, 1)])[1][2] is None
+    assert food.find_one({"_id": listing_id})["quantity"] == 0
+
+
+def test_concurrent_async_bookings_never_oversell(mongo):
+    food = mongo.db.food_items
+    listing_id = listing(food, 5)
+    collection = AsyncCollection(food)
+
+    async def run():
+        singles = await asyncio.gather(*(abook_listing(collection, {"_id": listing_id}) for _ in range(12)))
+        pairs = await abook_many(collection, [({"_id": listing_id}, 2)] * 4)
+        return singles, pairs
+
+    singles, pairs = asyncio.run(run())
+    assert sum(item is not None for item in singles) == 5
+    assert all(item is None for _, _, item in pairs)
+    assert food.find_one({"_id": listing_id})["quantity"] == 0
+
+
+def test_book_food_tool_sells_each_portion_once(hw, food):
+    food.insert_one(build_food_document("Taj Hotel", "Biryani", 5, 3, HERE))
+    replies = [hw.book_many.func(["Taj Hotel"], ["Biryani"], [2]) for _ in range(3)]
+    assert [reply.split(" requested")[0] for reply in replies] == ["Booked 1 of 1", "Booked 0 of 1", "Booked 0 of 1"]
+    item = food.find_one()
+    assert (item["quantity"], item["held"]) == (1, 2)
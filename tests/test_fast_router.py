@@ -0,0 +1,53 @@
+"""Regression tests for the fast-path request parser."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage
+
+from bulk_ingest import build_food_document
+from fast_router import Intent, parse_request
+
+
+def test_distance_without_budget_goes_to_llm():
+    # "15km" must not be read as a $1 budget plus a 5km radius
+    assert parse_request("food under 15km", "worker") is None
+    assert parse_request("pizza within 2.5 km", "worker") is None
+
+
+def test_budget_and_distance():
+    assert parse_request("food under 15 within 3km", "worker") == Intent("search", {"max_price": 15.0, "item_name": None, "max_distance_km": 3.0})
+    assert parse_request("I want pizza within 5km under $15", "worker") == Intent(
+        "search", {"max_price": 15.0, "max_distance_km": 5.0, "item_name": "pizza"})
+
+
+def test_booking_needs_a_dish():
+    assert parse_request("order food from Taj", "worker") is None
+    assert parse_request("book something from Taj Hotel", "worker") is None
+    assert parse_request("order 2 rice from Marriott", "worker") == Intent(
+        "book", {"hotel_name": "Marriott", "food_name": "rice", "quantity": 2})
+
+
+def test_trailing_qualifiers_go_to_llm():
+    for message in ("food under $10 from Taj Hotel", "food under $10 tomorrow", "pasta under $8 for 3 people",
+                    "book pasta from Taj Hotel under $5", "order pizza from dominos for 3 people",
+                    "book rice from Taj Hotel tomorrow", "book 2 rice for $4 from Marriott"):
+        assert parse_request(message, "worker") is None, message
+
+
+def test_structured_requests_still_parse():
+    assert parse_request("chicken biryani under $8", "worker") == Intent(
+        "search", {"max_price": 8.0, "item_name": "chicken biryani", "max_distance_km": None})
+    assert parse_request("book pasta from Taj Hotel", "worker") == Intent(
+        "book", {"hotel_name": "Taj Hotel", "food_name": "pasta", "quantity": 1})
+
+
+def test_booking_nothing_found_goes_to_llm(hw, food):
+    state = {"messages": [HumanMessage(content="book pasta from Taj Hotel")], "user_type": "worker", "session_id": "w1"}
+    assert hw.fast_path(state) == {}
+
+    food.insert_one(build_food_document("Taj Hotel", "Pasta", 8, 2, "25.2048,55.2708"))
+    reply = hw.fast_path(state)["messages"][0].content
+    assert "Reservation code" in reply
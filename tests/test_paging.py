@@ -0,0 +1,55 @@
+"""Keyset page tokens and keyset-paged searches, from the listing cache and from MongoDB."""
+
+import random
+import re
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from bulk_ingest import build_food_document
+from food_queries import decode_page_token, encode_page_token
+
+HERE = "25.2048,55.2708"
+
+
+def test_page_tokens_round_trip():
+    listing_id = ObjectId()
+    assert decode_page_token(encode_page_token(4.5, listing_id)).after == (4.5, listing_id)
+    assert decode_page_token(encode_page_token(120.0, "legacy-id")).after == (120.0, "legacy-id")
+    ranked_at = datetime.now().replace(microsecond=0)
+    token = decode_page_token(encode_page_token(0.25, listing_id, ranked_at, 6.0))
+    assert (token.ranked_at, token.scale) == (ranked_at, 6.0)
+    with pytest.raises(ValueError):
+        decode_page_token("not-a-token")
+
+
+def page_through(hw, **arguments) -> list:
+    """Listing handles of every page of a get_available_food search, in the order shown."""
+    shown, page_token = [], None
+    while True:
+        result = hw.get_available_food.func(**arguments, page_token=page_token)
+        shown.extend(re.findall(r"🔖 Listing: (\S+)", result))
+        match = re.search(r"next_page=(\S+)", result)
+        if not match:
+            return shown
+        page_token = match.group(1)
+
+
+@pytest.mark.parametrize("listing_cache", [True, False])
+def test_price_pages_show_every_listing_once_in_price_order(hw, monkeypatch, listing_cache):
+    monkeypatch.setattr(hw, "USE_LISTING_CACHE", listing_cache)
+    rng = random.Random(11)
+    food = hw.context().food_collection
+    food.insert_many([build_food_document(f"Hotel {i % 5}", "rice", rng.choice([3, 4, 5]), rng.randint(1, 9), HERE)
+                      for i in range(30)])
+    food.insert_one(build_food_document("Hotel 9", "rice", 50, 1, HERE))
+
+    shown = page_through(hw, max_price=10, sort_by="price", limit=4)
+    expected = sorted(food.find({"price": {"$lte": 10}}), key=lambda item: (item["price"], item["_id"]))
+    assert shown == [hw.listing_handle(item["_id"]) for item in expected]
+
+
+def test_bad_page_token_asks_for_a_new_search(hw, food):
+    result = hw.get_available_food.func(max_price=10, page_token="not-a-token")
+    assert result.startswith("❌") and "without a page_token" in result
@@ -0,0 +1,53 @@
+"""Ranked search pagination: every candidate shows up exactly once across pages."""
+
+import random
+import re
+from datetime import datetime
+
+from bson import ObjectId
+
+from bulk_ingest import build_food_document
+from ranking import BEST_DEAL, CHEAPEST, rank_listings
+
+HERE = "25.2048,55.2708"
+
+
+def page_through(rank, k: int) -> list:
+    """_ids of every page from `rank(k, after)`, following (score, _id) of the last row shown."""
+    shown, after = [], None
+    while True:
+        page = rank(k + 1, after)
+        shown.extend(document["_id"] for document in page[:k])
+        if len(page) <= k:
+            return shown
+        after = (page[k - 1]["score"], page[k - 1]["_id"])
+
+
+def test_ties_are_paged_in_id_order():
+    rng = random.Random(3)
+    now = datetime.now()
+    for _ in range(20):
+        documents = [{"_id": ObjectId(), "price": float(rng.choice([3, 4, 5])), "quantity": rng.randint(1, 5), "created_at": now}
+                     for _ in range(rng.randint(10, 60))]
+        rng.shuffle(documents)
+        for weights in (CHEAPEST, BEST_DEAL):
+            shown = page_through(lambda k, after: rank_listings(documents, k, now, 5.0, after, weights), rng.randint(1, 7))
+            assert sorted(shown) == sorted(document["_id"] for document in documents)
+
+
+def test_paging_ranked_search_shows_every_listing_once(hw, food):
+    rng = random.Random(5)
+    food.insert_many([build_food_document(f"Hotel {i % 7}", "rice", rng.choice([3, 4, 5, 6]), rng.randint(1, 9),
+                                          f"{25.2048 + rng.uniform(-0.03, 0.03):.5f},{55.2708 + rng.uniform(-0.03, 0.03):.5f}")
+                      for i in range(40)])
+    arguments = {"max_price": 10, "max_distance_km": 10, "user_location": HERE, "sort_by": "price", "limit": 7}
+    shown = []
+    page_token = None
+    while True:
+        result = hw.get_available_food.func(**arguments, page_token=page_token)
+        shown.extend(re.findall(r"🔖 Listing: (\S+)", result))
+        match = re.search(r"next_page=(\S+)", result)
+        if not match:
+            break
+        page_token = match.group(1)
+    assert len(shown) == len(set(shown)) == 40
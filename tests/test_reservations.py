@@ -0,0 +1,90 @@
+"""Reservation holds on mongomock: hold, confirm, cancel and the reaper, without losing or doubling portions."""
+
+import random
+import re
+from datetime import datetime, timedelta
+
+from bulk_ingest import build_food_document
+from reservations import (ReservationReaper, cancel_reservation, confirm_reservation, hold_listing, hold_many,
+                          release_expired_holds)
+
+HERE = "25.2048,55.2708"
+
+
+def held_code(reply):
+    return re.search(r"Reservation code: (\S+)", reply).group(1)
+
+
+def test_only_the_booking_session_can_cancel(hw, food):
+    food.insert_one(build_food_document("Taj Hotel", "Pasta", 8, 2, "25.2048,55.2708"))
+    owner, other = {"session_id": "w1"}, {"session_id": "w2"}
+    code = held_code(hw.book_food.func("Taj Hotel", "Pasta", state=owner))
+
+    assert hw.cancel_reservation.func(code, state=other) == f"❌ Reservation {code}: unknown code"
+    assert food.find_one()["quantity"] == 1
+    assert hw.context().reservations.find_one()["status"] == "held"
+
+    assert "❌" not in hw.cancel_reservation.func(code, state=owner)
+    assert food.find_one()["quantity"] == 2
+
+
+def test_hold_confirm_and_release(mongo):
+    food, reservations = mongo.db.food_items, mongo.db.reservations
+    listing_id = food.insert_one(build_food_document("Taj Hotel", "Pasta", 8, 3, HERE)).inserted_id
+    reservation, listing = hold_listing(food, reservations, {"_id": listing_id}, 2)
+    assert (listing["quantity"], listing["held"]) == (1, 2)
+    assert hold_listing(food, reservations, {"_id": listing_id}, 2) is None
+
+    assert confirm_reservation(food, reservations, reservation["_id"], hotel_name="Other Hotel").reservation is None
+    assert confirm_reservation(food, reservations, reservation["_id"], hotel_name="taj hotel").ok
+    assert not confirm_reservation(food, reservations, reservation["_id"]).ok
+    assert not cancel_reservation(food, reservations, reservation["_id"]).ok
+    item = food.find_one({"_id": listing_id})
+    assert (item["quantity"], item["held"], item["holds"]) == (1, 0, [])
+    assert reservations.find_one()["status"] == "confirmed"
+
+
+def test_expired_holds_go_back_and_cannot_be_confirmed(mongo):
+    food, reservations = mongo.db.food_items, mongo.db.reservations
+    listing_id = food.insert_one(build_food_document("Taj Hotel", "Pasta", 8, 2, HERE)).inserted_id
+    reservation, listing = hold_listing(food, reservations, {"_id": listing_id}, 2, ttl=timedelta(seconds=-1))
+    assert not listing["is_available"]
+
+    assert not confirm_reservation(food, reservations, reservation["_id"]).ok
+    assert ReservationReaper(food, reservations).sweep() == 2
+    item = food.find_one({"_id": listing_id})
+    assert (item["quantity"], item["held"], item["is_available"], item["status"]) == (2, 0, True, "active")
+    assert reservations.find_one()["status"] == "expired"
+    assert release_expired_holds(food, reservations) == 0
+
+
+def test_random_holds_leak_no_portions(mongo):
+    rng = random.Random(7)
+    food, reservations = mongo.db.food_items, mongo.db.reservations
+    listing_ids = food.insert_many([build_food_document(f"Hotel {i}", "Rice", 4, rng.randint(1, 6), HERE)
+                                    for i in range(10)]).inserted_ids
+    stock = sum(item["quantity"] for item in food.find())
+    codes, confirmed = [], 0
+
+    for _ in range(300):
+        action = rng.random()
+        if action < 0.5:
+            holds = [({"_id": rng.choice(listing_ids)}, rng.randint(1, 3)) for _ in range(rng.randint(1, 3))]
+            ttl = timedelta(minutes=rng.choice([-1, 30]))
+            codes += [booked[0]["_id"] for _, _, booked in hold_many(food, reservations, holds, ttl) if booked]
+        elif action < 0.7 and codes:
+            update = confirm_reservation(food, reservations, rng.choice(codes))
+            confirmed += update.reservation["quantity"] if update.ok else 0
+        elif action < 0.9 and codes:
+            cancel_reservation(food, reservations, rng.choice(codes))
+        else:
+            release_expired_holds(food, reservations)
+        items = list(food.find())
+        assert all(item["quantity"] >= 0 for item in items)
+        assert all(item.get("held", 0) == sum(hold["quantity"] for hold in item.get("holds", [])) for item in items)
+        assert sum(item["quantity"] + item.get("held", 0) for item in items) + confirmed == stock
+
+    release_expired_holds(food, reservations, now=datetime.now() + timedelta(hours=1))
+    assert sum(item["quantity"] for item in food.find()) + confirmed == stock
+    assert reservations.count_documents({"status": "held"}) == 0
+    assert sum(r["quantity"] for r in reservations.find({"status": "confirmed"})) == confirmed
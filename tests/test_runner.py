@@ -0,0 +1,48 @@
+"""runner.py relay: replies answer pending turns, food alerts do not."""
+
+import asyncio
+import json
+
+from runner import Runner, _Upstream
+
+
+class Lines:
+    """Collects what the relay writes to the client."""
+
+    def __init__(self):
+        self.frames = []
+
+    def write(self, line):
+        self.frames.append(json.loads(line))
+
+    async def drain(self):
+        pass
+
+    def is_closing(self):
+        return False
+
+    def close(self):
+        pass
+
+
+def relay(*frames, pending=()):
+    async def run():
+        reader = asyncio.StreamReader()
+        for frame in frames:
+            reader.feed_data((json.dumps(frame) + "\n").encode())
+        reader.feed_eof()
+        upstream = _Upstream(reader, Lines())
+        upstream.pending.extend(pending)
+        client = Lines()
+        await Runner.relay(None, upstream, client)
+        return client.frames
+    return asyncio.run(run())
+
+
+def test_alerts_do_not_answer_pending_turns():
+    alert = {"type": "notification", "session_id": "s1", "notification": "🔔 New food"}
+    reply = {"type": "reply", "session_id": "s1", "reply": "Your alert is called \"notification\": see above"}
+    frames = relay(alert, reply, pending=["s1", "s2"])
+    assert frames[:2] == [alert, reply]
+    # The alert did not count as s1's reply, so only s2's turn is left unanswered
+    assert [(f["session_id"], f.get("retry")) for f in frames[2:]] == [("s2", True)]
@@ -0,0 +1,67 @@
+"""Session history: token-budget trimming and persistence."""
+
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from indexes import migrate
+from sessions import SessionStore, trim_to_token_budget
+
+
+def turn(question: str, answer: str) -> list:
+    return [HumanMessage(content=question), AIMessage(content=answer)]
+
+
+def test_trimming_drops_whole_oldest_turns():
+    history = turn("a" * 40, "b" * 40) + turn("c" * 40, "d" * 40) + turn("e", "f")
+    kept = trim_to_token_budget(history, 40)
+    assert [m.content[0] for m in kept] == ["c", "d", "e", "f"]
+    assert isinstance(kept[0], HumanMessage)
+
+
+def test_trimming_keeps_the_newest_turn_even_over_budget():
+    history = turn("a", "b") + turn("c" * 4000, "d")
+    assert [m.content[0] for m in trim_to_token_budget(history, 50)] == ["c", "d"]
+
+
+def test_persisted_sessions_resume_in_another_store(mongo):
+    collection = mongo.db.sessions
+    SessionStore(collection=collection).append("s1", turn("hi", "hello"))
+    assert [m.content for m in SessionStore(collection=collection).get_history("s1")] == ["hi", "hello"]
+
+
+class AsyncCollection:
+    """The part of an AsyncMongoClient collection the session store uses, over mongomock."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def find_one(self, *args, **kwargs):
+        return self.collection.find_one(*args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return self.collection.update_one(*args, **kwargs)
+
+
+class SyncForbidden:
+    """Stands in for the pymongo collection: async paths must not touch it."""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"sync {name}() called from an async session method")
+
+
+def test_async_methods_use_the_async_collection(mongo):
+    collection = mongo.db.sessions
+    collection.insert_one({"_id": "s1", "messages": []})
+
+    async def run():
+        await SessionStore(collection=SyncForbidden()).aappend("s2", turn("hi", "hello"), AsyncCollection(collection))
+        return await SessionStore(collection=SyncForbidden()).aget_history("s2", AsyncCollection(collection))
+
+    assert [m.content for m in asyncio.run(run())] == ["hi", "hello"]
+
+
+def test_migrate_adds_the_session_ttl_index(mongo):
+    migrate(mongo.db, session_ttl_seconds=600)
+    migrate(mongo.db, session_ttl_seconds=900)
+    assert mongo.db.sessions.index_information()["updated_at_1"]["expireAfterSeconds"] == 900
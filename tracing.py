@@ -0,0 +1,349 @@
+"""Spans for graph nodes, tools, LLM calls, MongoDB commands and geolocation.
+
+A `Tracer` times named spans and hands each finished one to its exporters.
+Spans nest through a context variable, which LangGraph copies into the
+threads and tasks its tool node runs on, so a tool's MongoDB commands show
+up under the tool, and the tool under the graph node that called it.
+
+Exporters:
+- `RingBufferExporter`: the last N spans in memory, for debugging a live process
+- `JsonLinesExporter`: one JSON object per span, appended to a file
+- `PrometheusExporter`: per-span counts, latency histograms and summed
+  numeric attributes (tokens, documents), rendered in the Prometheus text format
+
+The tool diagnostics that used to be plain `print`s go through the
+`sufra` logger instead. `configure_logging("DEBUG")` prints them to stdout
+exactly as before; a higher level keeps production runs quiet.
+"""
+
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from pymongo import monitoring
+
+logger = logging.getLogger("sufra")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+DEFAULT_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "started_at", "duration_ms", "attributes", "error")
+
+    def __init__(self, name: str, kind: str, parent=None, attributes: dict = None):
+        self.name = name
+        self.kind = kind
+        self.span_id = next(_span_ids)
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.parent_id = parent.span_id if parent is not None else None
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+def current_span():
+    return _current_span.get()
+
+
+def set_attributes(**attributes):
+    """Annotate the innermost open span, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+class Tracer:
+    """Creates spans and passes finished ones to the exporters; a no-op when disabled."""
+
+    def __init__(self, exporters=(), enabled: bool = True):
+        self.exporters = list(exporters)
+        self.enabled = enabled
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes):
+        if not self.enabled:
+            yield _NULL_SPAN
+            return
+        span = Span(name, kind, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - started) * 1000
+            _current_span.reset(token)
+            self.export(span)
+
+    def record(self, name: str, kind: str, duration_ms: float, error: str = None, **attributes):
+        """Export a span timed elsewhere (e.g. by a driver event) under the current span."""
+        if not self.enabled:
+            return
+        span = Span(name, kind, _current_span.get(), attributes)
+        span.started_at -= duration_ms / 1000
+        span.duration_ms = duration_ms
+        span.error = error
+        self.export(span)
+
+    def export(self, span: Span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.warning("⚠️ Trace exporter %s failed: %s", type(exporter).__name__, e)
+
+    def wrap(self, function, name: str, kind: str = "internal"):
+        """`function` (sync or async) with every call inside a span."""
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def traced_async(*args, **kwargs):
+                with self.span(name, kind):
+                    return await function(*args, **kwargs)
+            return traced_async
+
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            with self.span(name, kind):
+                return function(*args, **kwargs)
+        return traced
+
+    def instrument_tool(self, tool):
+        """Trace a LangChain tool's sync and async implementations in place; returns the tool."""
+        if getattr(tool, "func", None) is not None and not hasattr(tool.func, "__wrapped__"):
+            tool.func = self.wrap(tool.func, tool.name, "tool")
+        if getattr(tool, "coroutine", None) is not None and not hasattr(tool.coroutine, "__wrapped__"):
+            tool.coroutine = self.wrap(tool.coroutine, tool.name, "tool")
+        return tool
+
+
+class _NullSpan:
+    def set(self, **attributes):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class MongoCommandTracer(monitoring.CommandListener):
+    """pymongo listener that records every command as a `mongo` span with its latency and document count."""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.tracer.record(f"mongo.{event.command_name}", "mongo", event.duration_micros / 1000,
+                           documents=_document_count(event.reply))
+
+    def failed(self, event):
+        self.tracer.record(f"mongo.{event.command_name}", "mongo", event.duration_micros / 1000,
+                           error=str(event.failure.get("errmsg", event.failure)))
+
+
+def _document_count(reply) -> int:
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "value" in reply:  # findAndModify
+        return 0 if reply["value"] is None else 1
+    return reply.get("n", 0)
+
+
+def llm_usage(response) -> dict:
+    """Token counts from a chat model response, where the provider reports them."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    return {key: usage[key] for key in ("input_tokens", "output_tokens") if key in usage}
+
+
+# ---------- exporters ----------
+
+class RingBufferExporter:
+    """Keeps the most recent `capacity` spans in memory."""
+
+    def __init__(self, capacity: int = 1000):
+        self.spans = deque(maxlen=capacity)
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def recent(self, name: str = None, limit: int = None) -> list:
+        spans = [span for span in self.spans if name is None or span.name == name]
+        return spans[-limit:] if limit else spans
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per span to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusExporter:
+    """Aggregates spans into counters and latency histograms in the Prometheus text format.
+
+    Numeric span attributes are summed per span name (e.g. LLM input and
+    output tokens, documents returned by MongoDB commands). `labels` are
+    added to every series, e.g. {"worker": "2"} for one of several
+    processes writing to the same textfile directory.
+    """
+
+    def __init__(self, namespace: str = "sufra", buckets_ms: tuple = DEFAULT_BUCKETS_MS, labels: dict = None):
+        self.namespace = namespace
+        self.buckets_ms = tuple(buckets_ms)
+        self.labels = dict(labels or {})
+        self._lock = threading.Lock()
+        self._series = {}      # (name, kind) -> [count, errors, sum_ms, bucket counts]
+        self._attributes = {}  # (name, attribute) -> total
+
+    def export(self, span: Span):
+        with self._lock:
+            series = self._series.get((span.name, span.kind))
+            if series is None:
+                series = self._series[(span.name, span.kind)] = [0, 0, 0.0, [0] * len(self.buckets_ms)]
+            series[0] += 1
+            series[1] += span.error is not None
+            series[2] += span.duration_ms
+            for i, bound in enumerate(self.buckets_ms):
+                if span.duration_ms <= bound:
+                    series[3][i] += 1
+            for attribute, value in span.attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    key = (span.name, attribute)
+                    self._attributes[key] = self._attributes.get(key, 0) + value
+
+    def render(self) -> str:
+        prefix = self.namespace
+        constant = "".join(f'{key}="{_escape(str(value))}",' for key, value in sorted(self.labels.items()))
+        lines = [
+            f"# HELP {prefix}_span_duration_seconds Span latency by name and kind.",
+            f"# TYPE {prefix}_span_duration_seconds histogram"
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+            attributes = sorted(self._attributes.items())
+        for (name, kind), (count, errors, sum_ms, buckets) in series:
+            labels = f'{constant}name="{_escape(name)}",kind="{_escape(kind)}"'
+            for bound, bucket_count in zip(self.buckets_ms, buckets):
+                lines.append(f'{prefix}_span_duration_seconds_bucket{{{labels},le="{bound / 1000:g}"}} {bucket_count}')
+            lines.append(f'{prefix}_span_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{prefix}_span_duration_seconds_sum{{{labels}}} {sum_ms / 1000:.6f}")
+            lines.append(f"{prefix}_span_duration_seconds_count{{{labels}}} {count}")
+        lines.append(f"# HELP {prefix}_span_errors_total Spans that ended with an error.")
+        lines.append(f"# TYPE {prefix}_span_errors_total counter")
+        for (name, kind), (_, errors, _, _) in series:
+            lines.append(f'{prefix}_span_errors_total{{{constant}name="{_escape(name)}",kind="{_escape(kind)}"}} {errors}')
+        lines.append(f"# HELP {prefix}_span_attribute_total Sum of a numeric span attribute.")
+        lines.append(f"# TYPE {prefix}_span_attribute_total counter")
+        for (name, attribute), total in attributes:
+            lines.append(f'{prefix}_span_attribute_total{{{constant}name="{_escape(name)}",attribute="{_escape(attribute)}"}} '
+                         f'{total:g}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write the metrics to a file, e.g. for node_exporter's textfile collector."""
+        with open(path + ".tmp", "w", encoding="utf-8") as output:
+            output.write(self.render())
+        os.replace(path + ".tmp", path)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def build_exporters(names, jsonl_path: str = "traces.jsonl", ring_capacity: int = 1000) -> list:
+    """Exporters by name: "ring", "jsonl", "prometheus"."""
+    exporters = []
+    for name in names:
+        if name == "ring":
+            exporters.append(RingBufferExporter(ring_capacity))
+        elif name == "jsonl":
+            exporters.append(JsonLinesExporter(jsonl_path))
+        elif name == "prometheus":
+            exporters.append(PrometheusExporter())
+        else:
+            raise ValueError(f"unknown trace exporter: {name!r}")
+    return exporters
+
+
+def find_exporter(tracer: Tracer, exporter_type):
+    return next((exporter for exporter in tracer.exporters if isinstance(exporter, exporter_type)), None)
+
+
+# ---------- logging ----------
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at the time, so redirect_stdout still captures it."""
+
+    def __init__(self):
+        super().__init__()
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def configure_logging(level: str = "INFO"):
+    """Route the `sufra` logger to stdout at `level`.
+
+    DEBUG shows every tool step as the old prints did; INFO shows results,
+    WARNING only problems.
+    """
+    logger.setLevel(getattr(logging, level.upper()))
+    if not any(isinstance(handler, _StdoutHandler) for handler in logger.handlers):
+        handler = _StdoutHandler()
+        logger.addHandler(handler)
+    verbose = logger.level <= logging.DEBUG
+    for handler in logger.handlers:
+        if isinstance(handler, _StdoutHandler):
+            handler.setFormatter(logging.Formatter("%(message)s" if verbose else "%(asctime)s %(levelname)s %(message)s"))
+    logger.propagate = False